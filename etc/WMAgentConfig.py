@@ -110,6 +110,11 @@ config.BossAir.nCondorProcesses = 1
 config.BossAir.submitWMSMode = True
 config.BossAir.acctGroup = glideInAcctGroup
 config.BossAir.acctGroupUser = glideInAcctGroupUser
+# schedd names ("local" for the local schedd) and their max number of concurrent submissions
+config.BossAir.submitSchedds = {"local": 1}
+# worker node directory shared by the jobs of a pilot to cache the extracted sandboxes, and its size in MB
+# config.BossAir.sandboxCacheDir = "/tmp/wmagent_sandbox_cache"
+# config.BossAir.sandboxCacheSize = 10000
 
 config.section_("CoreDatabase")
 config.CoreDatabase.connectUrl = databaseUrl
@@ -180,6 +185,10 @@ config.JobAccountant.componentDir = config.General.workDir + "/JobAccountant"
 config.JobAccountant.logLevel = globalLogLevel
 config.JobAccountant.workerThreads = 1
 config.JobAccountant.pollInterval = 300
+config.JobAccountant.wakeUpOnNotification = True  # start a new cycle once upstream components notify
+config.JobAccountant.minPollInterval = 30  # but never sleep less than that (in seconds)
+config.JobAccountant.adaptivePolling = True  # poll sooner when busy, back off when idle
+config.JobAccountant.maxPollInterval = 1200  # upper limit of the idle back off (in seconds)
 config.JobAccountant.specDir = config.General.workDir + "/JobAccountant/SpecCache"
 
 config.component_("JobCreator")
@@ -206,6 +215,10 @@ config.JobSubmitter.componentDir = config.General.workDir + "/JobSubmitter"
 config.JobSubmitter.logLevel = globalLogLevel
 config.JobSubmitter.maxThreads = 1
 config.JobSubmitter.pollInterval = 120
+config.JobSubmitter.wakeUpOnNotification = True  # start a new cycle once upstream components notify
+config.JobSubmitter.minPollInterval = 30  # but never sleep less than that (in seconds)
+config.JobSubmitter.adaptivePolling = True  # poll sooner when busy, back off when idle
+config.JobSubmitter.maxPollInterval = 600  # upper limit of the idle back off (in seconds)
 config.JobSubmitter.workerThreads = 1
 config.JobSubmitter.jobsPerWorker = 100
 config.JobSubmitter.maxJobsPerPoll = 1000
@@ -240,6 +253,10 @@ config.ErrorHandler.namespace = "WMComponent.ErrorHandler.ErrorHandler"
 config.ErrorHandler.componentDir = config.General.workDir + "/ErrorHandler"
 config.ErrorHandler.logLevel = globalLogLevel
 config.ErrorHandler.pollInterval = 240
+config.ErrorHandler.wakeUpOnNotification = True  # start a new cycle once upstream components notify
+config.ErrorHandler.minPollInterval = 30  # but never sleep less than that (in seconds)
+config.ErrorHandler.adaptivePolling = True  # poll sooner when busy, back off when idle
+config.ErrorHandler.maxPollInterval = 960  # upper limit of the idle back off (in seconds)
 config.ErrorHandler.readFWJR = True
 config.ErrorHandler.maxFailTime = 120000
 config.ErrorHandler.maxProcessSize = 500
@@ -249,6 +266,10 @@ config.RetryManager.namespace = "WMComponent.RetryManager.RetryManager"
 config.RetryManager.componentDir = config.General.workDir + "/RetryManager"
 config.RetryManager.logLevel = globalLogLevel
 config.RetryManager.pollInterval = 240
+config.RetryManager.wakeUpOnNotification = True  # start a new cycle once upstream components notify
+config.RetryManager.minPollInterval = 30  # but never sleep less than that (in seconds)
+config.RetryManager.adaptivePolling = True  # poll sooner when busy, back off when idle
+config.RetryManager.maxPollInterval = 960  # upper limit of the idle back off (in seconds)
 config.RetryManager.plugins = {"default": "SquaredAlgo"}
 config.RetryManager.section_("SquaredAlgo")
 config.RetryManager.SquaredAlgo.section_("default")
@@ -10,7 +10,7 @@ function(head, req) {
 	var query = JSON.parse(req.query.filter);
 	var idOnly = JSON.parse(req.query.idOnly);
 
-	send("[");
+	send("[\n");
 	var first = true;
 	while (row = getRow()) {
 		
@@ -70,7 +70,7 @@ function(head, req) {
 		}
 
 		if (first != true) {
-  		  send(",")
+  		  send(",\n")
   	  	}
 
 		// Send element or id depending on what was asked
@@ -82,5 +82,5 @@ function(head, req) {
 		first = false; // from now on prepend "," to output
 	}
 
-	send("]");	
+	send("\n]");	
 }
\ No newline at end of file
@@ -52,6 +52,21 @@ def calculateChecksums(filename):
     return (format(adler32Checksum & 0xffffffff, '08x'), "%s" % cksumStdout[0])
 
 
+def calculateAdler32(filename, blockSize=1024 * 1024):
+    """
+    _calculateAdler32_
+
+    Get the adler32 checksum of a file, as the 8 characters hex string
+    also returned by calculateChecksums, without running cksum
+    """
+    adler32Checksum = 1  # adler32 of an empty string
+    with open(filename, 'rb') as f:
+        for chunk in iter((lambda: f.read(blockSize)), b''):
+            adler32Checksum = zlib.adler32(chunk, adler32Checksum)
+
+    return format(adler32Checksum & 0xffffffff, '08x')
+
+
 def tail(filename, nLines=20):
     """
     _tail_
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+"""
+Rate limiting of web server APIs, per user and endpoint.
+
+Each endpoint has a quota, checked with one of two algorithms:
+
+- token bucket, {"rate": r, "burst": b}: a user gets r requests per second
+  on average, and up to b in a burst;
+- sliding window, {"limit": n, "window": w}: a user gets at most n requests
+  in any w seconds, estimated from the counts of the current and previous
+  fixed windows.
+
+The state of the quotas lives in a store. MemoryStore keeps it in the
+process, SQLiteStore in a local database file which several worker
+processes of a server can share, e.g. on /dev/shm, merging their calls
+into it every second.
+
+Here is an example how to use this module:
+
+from Utils.RateLimiter import RateLimiter, SQLiteStore
+limiter = RateLimiter({"*": {"rate": 10, "burst": 20},
+                       "jobdetail": {"limit": 100, "window": 3600}},
+                      store=SQLiteStore("/dev/shm/wmstats-rates.db"))
+@limiter.make_limited("jobdetail")
+def api():
+    # define your api logic here
+
+Rejected calls get a 429 Too Many Requests error, with a Retry-After
+header giving the seconds to wait. The REST server applies a limiter to
+all its APIs when given one, see WMCore.REST.Server.MiniRESTApi.
+
+This supersedes Utils.Throttled, which only counts concurrent calls or
+calls per time range in a single process.
+"""
+
+from __future__ import division
+
+# standard modules
+import logging
+import math
+import sqlite3
+import threading
+import time
+from builtins import object
+
+# cherrypy modules
+import cherrypy
+
+
+def tokenBucket(state, now, cost, rate, burst):
+    """
+    Take cost tokens from a bucket refilled at rate tokens per second up to
+    burst tokens. The state is (tokens, last update time).
+    Return the new state and the seconds to wait, 0 if allowed.
+    """
+    if state is None:
+        tokens = burst
+    else:
+        tokens = min(burst, state[0] + (now - state[1]) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), 0
+    if cost > burst or not rate:
+        return (tokens, now), float("inf")
+    return (tokens, now), (cost - tokens) / rate
+
+
+def slidingWindow(state, now, cost, limit, window):
+    """
+    Count cost requests in a sliding window of window seconds allowing at
+    most limit requests. The count of the previous fixed window is weighted
+    by how much it overlaps the sliding one. The state is (start of the
+    current fixed window, its count, count of the previous fixed window).
+    Return the new state and the seconds to wait, 0 if allowed.
+    """
+    start = now - now % window
+    if state is None or state[0] < start - window:
+        count, previous = 0, 0
+    elif state[0] < start:
+        count, previous = 0, state[1]
+    else:
+        count, previous = state[1], state[2]
+    weight = 1 - (now - start) / window
+    if previous * weight + count + cost <= limit:
+        return (start, count + cost, previous), 0
+
+    # Wait for the previous window to weigh little enough, or if the current
+    # one is already full, for it to become the previous one and weigh less.
+    if cost > limit:
+        wait = float("inf")
+    elif count + cost <= limit:
+        wait = start + window * (1 - (limit - count - cost) / previous) - now
+    else:
+        wait = start + window * (2 - (limit - cost) / count) - now
+    return (start, count, previous), max(wait, 0.001)
+
+
+def requestUser():
+    "Return the DN or login of the user of the cherrypy request, else the client address"
+    user = getattr(cherrypy.request, 'user', None) or {}
+    return user.get('dn') or user.get('login') or cherrypy.request.remote.ip
+
+
+class TooManyRequests(cherrypy.HTTPError):
+    """
+    429 Too Many Requests error with a Retry-After header, which cherrypy
+    otherwise removes from error responses
+    """
+
+    def __init__(self, retryAfter, message=None):
+        cherrypy.HTTPError.__init__(self, 429, message)
+        self.retryAfter = retryAfter
+
+    def set_response(self):
+        cherrypy.HTTPError.set_response(self)
+        cherrypy.serving.response.headers["Retry-After"] = str(self.retryAfter)
+
+
+class MemoryStore(object):
+    """
+    Quota states of a single process, in a dictionary. Once it holds more
+    than maxKeys states, those not updated in expire seconds are dropped.
+    """
+
+    def __init__(self, maxKeys=100000, expire=3600):
+        self.lock = threading.Lock()
+        self.states = {}
+        self.maxKeys = maxKeys
+        self.expire = expire
+
+    def update(self, key, func, now):
+        """
+        Replace the state of key with the first item returned by func(state),
+        atomically, and return the second item
+        """
+        with self.lock:
+            entry = self.states.get(key)
+            state, result = func(entry and entry[0], now)
+            self.states[key] = (state, now)
+            if len(self.states) > self.maxKeys:
+                self.states = dict((k, v) for k, v in self.states.items() if v[1] > now - self.expire)
+        return result
+
+
+class SQLiteStore(object):
+    """
+    Quota states in a SQLite database file, shared by all the processes
+    using the same file. Each process decides on its own copy of the states
+    and merges the calls it allowed into the database every syncInterval
+    seconds, in one transaction, picking up the calls of the other
+    processes at the same time; a process may thus overrun a quota by what
+    the others allowed since its last merge. With a syncInterval of 0 every
+    update is one immediate transaction instead, so the processes take
+    turns on each key. States not updated in expire seconds are deleted
+    every cleanupEvery transactions.
+    """
+
+    def __init__(self, path, expire=3600, cleanupEvery=1000, timeout=5, syncInterval=1):
+        self.path = path
+        self.expire = expire
+        self.cleanupEvery = cleanupEvery
+        self.timeout = timeout
+        self.syncInterval = syncInterval
+        self.transactions = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.states = {}  # states as of the last merge, plus the calls since
+        self.pending = {}  # functions of the calls allowed since the last merge, by key
+        self.lastSync = time.time()
+        self._connection().execute("CREATE TABLE IF NOT EXISTS quota_state "
+                                   "(key TEXT PRIMARY KEY, a REAL, b REAL, c REAL, updated REAL)")
+
+    def _connection(self):
+        """
+        Return the database connection of the calling thread
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self.local.conn = conn
+        return conn
+
+    def _read(self, conn, key):
+        row = conn.execute("SELECT a, b, c FROM quota_state WHERE key = ?", (key,)).fetchone()
+        return row and tuple(value for value in row if value is not None)
+
+    def _transaction(self, updates, now):
+        """
+        Apply the functions of updates, a dict by key, to the states in the
+        database in one immediate transaction. Return the new states and the
+        results of the last function of each key.
+        """
+        conn = self._connection()
+        states, results = {}, {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, funcs in updates.items():
+                state = self._read(conn, key)
+                for func in funcs:
+                    state, results[key] = func(state, now)
+                conn.execute("INSERT OR REPLACE INTO quota_state VALUES (?, ?, ?, ?, ?)",
+                             (key,) + tuple(state) + (None,) * (3 - len(state)) + (now,))
+                states[key] = state
+            self.transactions += 1
+            if self.transactions % self.cleanupEvery == 0:
+                conn.execute("DELETE FROM quota_state WHERE updated < ?", (now - self.expire,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return states, results
+
+    def sync(self, now=None):
+        """
+        Merge the calls allowed since the last merge into the database
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            states = {}
+            if self.pending:
+                states, _ = self._transaction(self.pending, now)
+            # the other keys are read again when used
+            self.states = states
+            self.pending = {}
+            self.lastSync = now
+
+    def update(self, key, func, now):
+        """
+        Replace the state of key with the first item returned by func(state),
+        and return the second item
+        """
+        if not self.syncInterval:
+            return self._transaction({key: [func]}, now)[1][key]
+
+        if now - self.lastSync >= self.syncInterval:
+            self.sync(now)
+        with self.lock:
+            if key not in self.states:
+                self.states[key] = self._read(self._connection(), key)
+            self.states[key], result = func(self.states[key], now)
+            if not result:
+                self.pending.setdefault(key, []).append(func)
+        return result
+
+
+class RateLimiter(object):
+    """
+    RateLimiter class checks the calls of users to endpoints against the
+    quota of the endpoint, or the "*" quota of all the other endpoints.
+    Endpoints without a quota are not limited.
+    """
+
+    def __init__(self, quotas, store=None, label="default", logger=None):
+        """
+        :param quotas: dict of quotas by endpoint, see the module documentation
+        :param store: MemoryStore (default) or SQLiteStore of the quota states
+        :param label: name of the counters in the cherrypy statistics
+        """
+        self.quotas = {}
+        for endpoint, quota in quotas.items():
+            if "rate" in quota:
+                self.quotas[endpoint] = (tokenBucket, quota["rate"], quota.get("burst", quota["rate"]))
+            else:
+                self.quotas[endpoint] = (slidingWindow, quota["limit"], quota["window"])
+        self.store = store or MemoryStore()
+        self.logger = logger or logging.getLogger("WMCore.RateLimiter")
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.label = label
+        self.register()
+
+    def check(self, user, endpoint, cost=1):
+        """
+        Count a call of user to endpoint. Return 0 if allowed, otherwise the
+        seconds to wait before retrying, which may be inf.
+        """
+        quota = self.quotas.get(endpoint) or self.quotas.get("*")
+        if quota is None:
+            return 0
+        algorithm, limit, period = quota
+
+        def take(state, now):
+            return algorithm(state, now, cost, limit, period)
+
+        wait = self.store.update("%s|%s" % (user, endpoint), take, time.time())
+        with self.lock:
+            counters = self.counters.setdefault(endpoint, [0, 0])
+            counters[wait > 0] += 1
+        return wait
+
+    def enforce(self, user, endpoint, cost=1):
+        """
+        Count a call of user to endpoint, raise TooManyRequests if over the
+        quota
+        """
+        wait = self.check(user, endpoint, cost)
+        if wait:
+            retryAfter = int(min(math.ceil(wait), 86400))
+            self.logger.info("Rate limited user %s on %s for %d sec", user, endpoint, retryAfter)
+            msg = "The request rate of user %s exceeds the quota of %s, retry after %d sec" \
+                  % (user, endpoint, retryAfter)
+            raise TooManyRequests(retryAfter, msg)
+
+    def make_limited(self, endpoint=None):
+        "decorator for rate limited functions, by default named after the function"
+        def limited_decorator(fn):
+            name = endpoint or fn.__name__
+
+            def limited_wrapped_function(*args, **kw):
+                self.enforce(requestUser(), name)
+                return fn(*args, **kw)
+            return limited_wrapped_function
+        return limited_decorator
+
+    def allowed(self, endpoint):
+        "Return the number of calls allowed on endpoint by this process"
+        return self.counters.get(endpoint, [0, 0])[0]
+
+    def rejected(self, endpoint):
+        "Return the number of calls rejected on endpoint by this process"
+        return self.counters.get(endpoint, [0, 0])[1]
+
+    def register(self):
+        """
+        Publish the counters in the cherrypy statistics, under
+        RateLimiter/<label>, in the stats page of the REST servers
+        """
+        if not hasattr(logging, "statistics"):
+            logging.statistics = {}
+        stats = logging.statistics.setdefault("RateLimiter", {})
+        stats[self.label] = {
+            "Allowed": lambda s: sum(c[0] for c in self.counters.values()),
+            "Rejected": lambda s: sum(c[1] for c in self.counters.values()),
+            "Endpoints": lambda s: dict((e, {"Allowed": c[0], "Rejected": c[1]})
+                                        for e, c in list(self.counters.items())),
+        }
+
+
+def rateLimiterFromConfig(config, label):
+    """
+    Return the RateLimiter made from the rate_limits quotas of a configuration
+    section, with its states in the rate_limits_store SQLite file if given.
+    Return None if there are no rate_limits.
+    """
+    quotas = getattr(config, "rate_limits", None)
+    if not quotas:
+        return None
+    path = getattr(config, "rate_limits_store", None)
+    return RateLimiter(quotas, store=path and SQLiteStore(path), label=label)
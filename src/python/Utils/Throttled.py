@@ -29,6 +29,8 @@ thr = UserThrottleTime(limit=5) # adjust threshold limit here
 def api():
     # define your api logic here
 
+For rate limits shared by several server processes, with a Retry-After
+in the rejections, see Utils.RateLimiter.
 """
 
 from __future__ import division
@@ -6,6 +6,8 @@ Utilities related to timing and performance testing
 from __future__ import print_function, division, absolute_import
 
 from builtins import object
+import functools
+import threading
 import time
 
 
@@ -52,3 +54,65 @@ class CodeTimer(object):
         runtime = end - self.start
         msg = '{label} took {time} seconds to complete'
         print(msg.format(label=self.label, time=runtime))
+
+
+class CallCounter(object):
+    """
+    Thread safe accounting of the number of calls and the time spent in them,
+    grouped by category (e.g. DAO, HTTP) and name. Accounting only happens
+    while it's enabled, such that it can be switched on at runtime.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, category, name, elapsed):
+        """
+        Account for a call that took elapsed seconds
+        """
+        with self._lock:
+            entry = self._stats.setdefault(category, {}).setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def reset(self):
+        """
+        Forget all the calls accounted so far
+        """
+        with self._lock:
+            self._stats = {}
+
+    def summary(self):
+        """
+        Return a dictionary like {category: {name: {'calls': N, 'time': secs}}}
+        """
+        with self._lock:
+            return dict((category, dict((name, {'calls': entry[0], 'time': round(entry[1], 4)})
+                                        for name, entry in calls.items()))
+                        for category, calls in self._stats.items())
+
+
+# process wide call counter, used by the DAO and HTTP layers
+callCounter = CallCounter()
+
+
+def countCalls(category, name, func):
+    """
+    Wrap a function such that its calls are accounted, under the given
+    category and name, in the process wide call counter when it's enabled
+    """
+
+    @functools.wraps(func)
+    def wrapper(*arg, **kw):
+        if not callCounter.enabled:
+            return func(*arg, **kw)
+        t1 = time.time()
+        try:
+            return func(*arg, **kw)
+        finally:
+            callCounter.record(category, name, time.time() - t1)
+
+    wrapper.__wrapped__ = func
+    return wrapper
@@ -514,6 +514,7 @@ class AgentStatusPoller(BaseWorkerThread):
             healthDoc['worker_poll'] = worker['poll_interval']
             healthDoc['worker_last_hb'] = worker['last_updated']
             healthDoc['worker_cycle_time'] = worker['cycle_time']
+            healthDoc['worker_cycle_stats'] = worker.get('cycle_stats', {})
             healthDocs.append(healthDoc)
 
         return healthDocs
@@ -39,6 +39,7 @@ from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.WMBS.Job import Job
 from WMCore.WMException import WMException
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeUp import notifyComponents
 from WMCore.Services.ReqMgrAux.ReqMgrAux import ReqMgrAux
 
 
@@ -321,20 +322,31 @@ class ErrorHandlerPoller(BaseWorkerThread):
         """
         # Run over created, submitted and executed job failures
         failure_states = ['create', 'submit', 'job']
+        foundFailures = False
+        numJobs = 0
         for state in failure_states:
             idList = self.getJobs.execute(state="%sfailed" % state)
             logging.info("Found %d failed jobs in state %sfailed", len(idList), state)
+            numJobs += len(idList)
             for jobSlice in grouper(idList, self.maxProcessSize):
                 jobList = self.loadJobsFromList(jobSlice)
                 self.handleFailedJobs(jobList, state)
+                foundFailures = True
+
+        if foundFailures:
+            # jobs sent to cooloff are now waiting for the RetryManager
+            notifyComponents(self.config, ["RetryManager"])
 
         # Run over jobs done with retries
         idList = self.getJobs.execute(state='retrydone')
         logging.info("Found %d jobs done with all retries", len(idList))
+        numJobs += len(idList)
         for jobSlice in grouper(idList, self.maxProcessSize):
             jobList = self.loadJobsFromList(jobSlice)
             self.handleRetryDoneJobs(jobList)
 
+        self.reportCycleWork(numJobs)
+
         return
 
     def loadJobsFromList(self, idList):
@@ -11,6 +11,7 @@ import logging
 from Utils.IteratorTools import grouper
 from Utils.Timers import timeFunction
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeUp import notifyComponents
 from WMCore.Database.CouchUtils import CouchConnectionError
 from WMCore.DAOFactory import DAOFactory
 from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
@@ -60,14 +61,17 @@ class JobAccountantPoller(BaseWorkerThread):
         """
         completeJobs = self.getJobsAction.execute(state="complete")
         logging.info("Found %d completed jobs", len(completeJobs))
+        self.reportCycleWork(len(completeJobs))
 
         if len(completeJobs) == 0:
             logging.debug("No work to do; exiting")
             return
 
+        failedJobs = 0
         for jobsSlice in grouper(completeJobs, self.accountantWorkSize):
             try:
-                self.accountantWorker(jobsSlice)
+                results = self.accountantWorker(jobsSlice)
+                failedJobs += sum(1 for result in results if not result['jobSuccess'])
             except WMException:
                 myThread = threading.currentThread()
                 if getattr(myThread, 'transaction', None) is not None:
@@ -89,4 +93,7 @@ class JobAccountantPoller(BaseWorkerThread):
                 logging.exception(msg)
                 raise JobAccountantPollerException(msg)
 
+        if failedJobs:
+            # failed jobs are now waiting for the ErrorHandler
+            notifyComponents(self.config, ["ErrorHandler"])
         return
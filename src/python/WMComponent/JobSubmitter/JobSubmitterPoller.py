@@ -822,6 +822,8 @@ class JobSubmitterPoller(BaseWorkerThread):
 
             jobsToSubmit = self.assignJobLocations()
             self.submitJobs(jobsToSubmit=jobsToSubmit)
+            # a cycle limited by the free schedd slots is not a reason to poll again soon
+            self.reportCycleWork(sum(len(jobs) for jobs in jobsToSubmit.values()), self.maxJobsPerPoll)
         except WMException:
             if getattr(myThread, 'transaction', None) is not None:
                 myThread.transaction.rollback()
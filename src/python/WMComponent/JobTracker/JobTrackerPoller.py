@@ -13,6 +13,7 @@ import os.path
 from Utils.Timers import timeFunction
 from WMCore.WMExceptions import WM_JOB_ERROR_CODES
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeUp import notifyComponents
 from WMCore.DAOFactory import DAOFactory
 from WMCore.WMException import WMException
 from WMCore.FwkJobReport.Report import Report
@@ -109,6 +110,7 @@ class JobTrackerPoller(BaseWorkerThread):
         logging.info("Have list of %i executing jobs in WMBS", len(jobList))
 
         if not jobList:
+            self.reportCycleWork(0)
             return
 
         # retrieve completed jobs from BossAir that are 'executing' in WMBS
@@ -128,6 +130,7 @@ class JobTrackerPoller(BaseWorkerThread):
         # Assume all these jobs "passed" if they aren't in timeout
         self.passJobs(passedJobs)
         self.failJobs(failedJobs)
+        self.reportCycleWork(len(passedJobs) + len(failedJobs))
 
         return
 
@@ -163,6 +166,7 @@ class JobTrackerPoller(BaseWorkerThread):
         self.changeState.propagate(failedJobs, 'jobfailed', 'executing')
         logging.info("Failed %i jobs", len(failedJobs))
         myThread.transaction.commit()
+        notifyComponents(self.config, ["ErrorHandler"])
 
         return
 
@@ -186,6 +190,7 @@ class JobTrackerPoller(BaseWorkerThread):
         self.setFWJRAction.execute(binds=jrBinds, conn=myThread.transaction.conn, transaction=True)
         self.changeState.propagate(passedJobs, 'complete', 'executing')
         myThread.transaction.commit()
+        notifyComponents(self.config, ["JobAccountant"])
 
         logging.info("Passed %i jobs", len(passedJobs))
 
@@ -63,6 +63,7 @@ from WMCore.WMBS.Job import Job
 from WMCore.WMException import WMException
 from WMCore.WMFactory import WMFactory
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeUp import notifyComponents
 
 __all__ = []
 
@@ -156,8 +157,12 @@ class RetryManagerPoller(BaseWorkerThread):
         myThread = threading.currentThread()
         try:
             myThread.transaction.begin()
-            self.doRetries()
+            numRetried = self.doRetries()
             myThread.transaction.commit()
+            self.reportCycleWork(numRetried)
+            if numRetried:
+                # retried jobs are now waiting for the JobSubmitter
+                notifyComponents(self.config, ["JobSubmitter"])
         except WMException:
             if getattr(myThread, 'transaction', None) and \
                     getattr(myThread.transaction, 'transaction', None):
@@ -180,19 +185,20 @@ class RetryManagerPoller(BaseWorkerThread):
         """
         _processRetries_
 
-        Actually does the dirty work of figuring out what to do with jobs
+        Actually does the dirty work of figuring out what to do with jobs.
+        Returns the number of jobs moved out of cooloff.
         """
 
         if len(jobs) < 1:
             # We got no jobs?
-            return
+            return 0
 
         transitions = Transitions()
         oldstate = '%scooloff' % cooloffType
         if oldstate not in transitions.keys():
             msg = 'Unknown job type %s' % cooloffType
             logging.error(msg)
-            return
+            return 0
         propList = []
 
         newJobState = transitions[oldstate][0]
@@ -205,7 +211,7 @@ class RetryManagerPoller(BaseWorkerThread):
         if len(propList) > 0:
             self.changeState.propagate(propList, newJobState, oldstate)
 
-        return
+        return len(propList)
 
     def loadJobsFromList(self, idList):
         """
@@ -276,22 +282,24 @@ class RetryManagerPoller(BaseWorkerThread):
     def doRetries(self):
         """
         Queries DB for all watched filesets, if matching filesets become
-        available, create the subscriptions
+        available, create the subscriptions.
+        Returns the number of jobs retried.
         """
+        numRetried = 0
         # Discover the jobs that are in create cooloff
         jobs = self.getJobs.execute(state='createcooloff')
         logging.info("Found %s jobs in createcooloff", len(jobs))
-        self.processRetries(jobs, 'create')
+        numRetried += self.processRetries(jobs, 'create')
 
         # Discover the jobs that are in submit cooloff
         jobs = self.getJobs.execute(state='submitcooloff')
         logging.info("Found %s jobs in submitcooloff", len(jobs))
-        self.processRetries(jobs, 'submit')
+        numRetried += self.processRetries(jobs, 'submit')
 
         # Discover the jobs that are in run cooloff
         jobs = self.getJobs.execute(state='jobcooloff')
         logging.info("Found %s jobs in jobcooloff", len(jobs))
-        self.processRetries(jobs, 'job')
+        numRetried += self.processRetries(jobs, 'job')
 
         # Discover the jobs that are in paused, logging only purpose:
         jobs = self.getJobs.execute(state='jobpaused')
@@ -302,3 +310,5 @@ class RetryManagerPoller(BaseWorkerThread):
 
         jobs = self.getJobs.execute(state='submitpaused')
         logging.info("Found %s jobs in submitpaused", len(jobs))
+
+        return numRetried
@@ -5,13 +5,30 @@ that it can be pushed to the monitoring tool
 """
 from __future__ import division
 
+import json
+
 from WMCore.Database.DBFormatter import DBFormatter
 
 
 class MonitorWorkers(DBFormatter):
-    sql = """SELECT name, last_updated, state, poll_interval, cycle_time
+    sql = """SELECT name, last_updated, state, poll_interval, cycle_time, outcome
                FROM wm_workers ORDER BY name"""
 
+    @staticmethod
+    def parseCycleStats(outcome):
+        """
+        The outcome column holds the JSON cycle statistics published by
+        BaseWorkerThread, unless the worker algorithm returned something else
+        """
+        try:
+            cycleStats = json.loads(outcome)
+        except (TypeError, ValueError):
+            return {}
+        return cycleStats if isinstance(cycleStats, dict) else {}
+
     def execute(self, conn=None, transaction=False):
         result = self.dbi.processData(self.sql, conn=conn, transaction=transaction)
-        return self.formatDict(result)
+        workers = self.formatDict(result)
+        for worker in workers:
+            worker['cycle_stats'] = self.parseCycleStats(worker.pop('outcome', None))
+        return workers
@@ -37,6 +37,7 @@ from WMCore.Database.DBFactory import DBFactory
 from WMCore.Database.Transaction import Transaction
 from WMCore.WMException import WMException
 from WMCore.WMExceptions import WMEXCEPTION
+from WMCore.WorkerThreads.CycleProfiler import profileOnSignal
 from WMCore.WorkerThreads.WorkerThreadManager import WorkerThreadManager
 
 
@@ -395,6 +396,8 @@ class Harness:
         pid = createDaemon(compSect.componentDir, keepParent)
         # if this is not the parent start the component
         if pid == 0:
+            # SIGUSR2 switches the worker cycle profiler on, see CycleProfiler
+            profileOnSignal(compSect.componentDir)
             self.startComponent()
             # if this is the parent return control to the testing environment.
 
@@ -24,6 +24,7 @@ from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.DAOFactory import DAOFactory
 from WMCore.WMFactory import WMFactory
 from WMCore.BossAir.RunJob import RunJob
+from WMCore.BossAir.RunJobTable import RunJobTable
 from WMCore.WMConnectionBase import WMConnectionBase
 from WMCore.WMException import WMException
 from WMCore.FwkJobReport.Report import Report
@@ -61,6 +62,8 @@ class BossAirAPI(WMConnectionBase):
         self.states = []
 
         self.jobs = []
+        # in-process table of the active jobs, loaded by the first track()
+        self.jobTable = None
 
         self.pluginDir = config.BossAir.pluginDir
         # This is the default state jobs are created in
@@ -89,6 +92,7 @@ class BossAirAPI(WMConnectionBase):
         self.loadJobsDAO = self.daoFactory(classname="LoadByStatus")
         self.completeDAO = self.daoFactory(classname="CompleteJob")
         self.monitorDAO = self.daoFactory(classname="JobStatusForMonitoring")
+        self.activeStatesDAO = self.daoFactory(classname="LoadActiveStates")
 
         self.states = None
         self.loadPlugin(insertStates)
@@ -253,6 +257,10 @@ class BossAirAPI(WMConnectionBase):
 
         self.commitTransaction(existingTransaction)
 
+        if self.jobTable is not None:
+            self.jobTable.update(jobs)
+            self.jobTable.reindex(jobs)
+
         return
 
     def _deleteJobs(self, jobs):
@@ -432,25 +440,18 @@ class BossAirAPI(WMConnectionBase):
 
         jobsToTrack = {}
 
-        runningJobs = self._listRunJobs(active=True)
+        try:
+            self._syncJobTable()
+        except Exception:
+            self.jobTable = None
+            raise
 
-        if runJobIDs:
-            for job in runningJobs:
-                if job['id'] not in runJobIDs:
-                    runningJobs.remove(job)
-        if wmbsIDs:
-            for job in runningJobs:
-                if job['jobid'] not in wmbsIDs:
-                    runningJobs.remove(job)
+        loadedJobs = self.jobTable.listJobs(runJobIDs=runJobIDs, wmbsIDs=wmbsIDs)
 
-        if len(runningJobs) < 1:
+        if len(loadedJobs) < 1:
             # Then we have no running jobs
             return returnList
 
-        logging.info("About to start building running jobs")
-
-        loadedJobs = self._buildRunningJobsFromRunJobs(runJobs=runningJobs)
-
         logging.info("About to look for %i loadedJobs.", len(loadedJobs))
 
         for runningJob in loadedJobs:
@@ -490,8 +491,13 @@ class BossAirAPI(WMConnectionBase):
         logging.info("About to complete %i jobs", len(jobsToComplete))
         logging.debug("JobsToComplete: %s", jobsToComplete)
 
-        self._updateJobs(jobs=jobsToChange)
-        self._complete(jobs=jobsToComplete)
+        try:
+            self._updateJobs(jobs=jobsToChange)
+            self._complete(jobs=jobsToComplete)
+        except Exception:
+            # the plugins modified the jobs in place, reload them next time
+            self.jobTable = None
+            raise
 
         # We should have a globalState variable for changed jobs
         # from the plugin
@@ -557,6 +563,9 @@ class BossAirAPI(WMConnectionBase):
                                  transaction=self.existingTransaction())
         self.commitTransaction(existingTransaction)
 
+        if self.jobTable is not None:
+            self.jobTable.remove(idsToComplete)
+
         return
 
     def getComplete(self):
@@ -592,6 +601,10 @@ class BossAirAPI(WMConnectionBase):
         """
         if not jobs:
             return
+        if not workflowName:
+            # jobs which could not be killed stay active, to be retried in the next cycle
+            self.bulkKill(jobs, killMsg=killMsg, errorCode=errorCode)
+            return
         jobsToKill = {}
 
         # Now get a list of which jobs are in the batch system
@@ -614,42 +627,12 @@ class BossAirAPI(WMConnectionBase):
                 # Then we send them to the plugins
                 try:
                     pluginInst = self.plugins[plugin]
-                    if workflowName:
-                        # jobs are completed regardless whether the kill succeeded or not
-                        self._completeKill(jobs=jobsToKill[plugin])
-                        pluginInst.killWorkflowJobs(workflow=workflowName)
-                    else:
-                        # raise an exception if it fails to kill jobs, such that the same
-                        # jobs are retried again in the next cycle
-                        pluginInst.kill(jobs=jobsToKill[plugin], raiseEx=True)
-                        self._completeKill(jobs=jobsToKill[plugin])
+                    # jobs are completed regardless whether the kill succeeded or not
+                    self._completeKill(jobs=jobsToKill[plugin])
+                    pluginInst.killWorkflowJobs(workflow=workflowName)
 
                     # Register the killed jobs
-                    for job in jobsToKill[plugin]:
-                        if job.get('cache_dir') is None or job.get('retry_count') is None:
-                            continue
-                        # Try to save an error report as the jobFWJR
-                        if not os.path.isdir(job['cache_dir']):
-                            # Then we have a bad cache directory
-                            logging.error("Could not write a kill FWJR due to non-existant cache_dir for job %i\n", job['id'])
-                            logging.debug("cache_dir: %s\n", job['cache_dir'])
-                            continue
-                        reportName = os.path.join(job['cache_dir'], 'Report.%i.pkl' % job['retry_count'])
-                        errorReport = Report()
-                        if os.path.exists(reportName) and os.path.getsize(reportName) > 0:
-                            # Then there's already a report there.  Add messages
-                            errorReport.load(reportName)
-                        # Build a better job message
-                        if killMsg:
-                            reportedMsg = killMsg
-                        else:
-                            reportedMsg = WM_JOB_ERROR_CODES[errorCode]
-                            reportedMsg += '\n Job last known status was: %s' % job.get('globalState', 'Unknown')
-                        errorReport.addError("JobKilled", errorCode, "JobKilled", reportedMsg)
-                        try:
-                            errorReport.save(filename=reportName)
-                        except IOError as ioe:
-                            logging.warning('Cannot write report %s because of %s', reportName, ioe)
+                    self._writeKillReports(jobsToKill[plugin], killMsg, errorCode)
                 except RuntimeError:
                     logging.warning("Plugin failed to remove jobs. It will be retried in the next cycle.")
                 except WMException:
@@ -662,6 +645,87 @@ class BossAirAPI(WMConnectionBase):
                     raise BossAirException(msg)
         return
 
+    def bulkKill(self, jobs, killMsg=None, errorCode=71300):
+        """
+        _bulkKill_
+
+        Same as kill, but the plugins remove the jobs in bulk and report back
+        the ones they could not remove, instead of failing all of them.
+        Those remain active, such that they are retried in the next cycle.
+
+        Returns the list of WMBS job ids which could not be killed.
+        """
+        if not jobs:
+            return []
+        jobsToKill = {}
+        failedIDs = []
+
+        for runningJob in self._buildRunningJobs(wmbsJobs=jobs):
+            jobsToKill.setdefault(runningJob['plugin'], []).append(runningJob)
+
+        for plugin in jobsToKill:
+            if plugin not in self.plugins:
+                msg = "Jobs tracking with non-existant plugin %s\n" % (plugin)
+                msg += "They were submitted but can't be tracked?\n"
+                msg += "That's too strange to continue\n"
+                logging.error(msg)
+                raise BossAirException(msg)
+            try:
+                failedJobs = self.plugins[plugin].bulkKill(jobsToKill[plugin])
+            except WMException:
+                raise
+            except Exception as ex:
+                msg = "Unhandled exception while calling bulkKill method for plugin %s\n" % plugin
+                msg += str(ex)
+                logging.error(msg)
+                raise BossAirException(msg)
+
+            failedRunIDs = set(job['id'] for job in failedJobs)
+            killedJobs = [job for job in jobsToKill[plugin] if job['id'] not in failedRunIDs]
+            self._completeKill(jobs=killedJobs)
+            self._writeKillReports(killedJobs, killMsg, errorCode)
+            if failedJobs:
+                logging.warning("Plugin %s failed to remove %d out of %d jobs. They will be retried in the next cycle.",
+                                plugin, len(failedJobs), len(jobsToKill[plugin]))
+                failedIDs.extend(job['jobid'] for job in failedJobs)
+
+        return failedIDs
+
+    def _writeKillReports(self, jobs, killMsg, errorCode):
+        """
+        __writeKillReports_
+
+        Write the kill error into the FWJR of the killed jobs, appending it
+        to the existing report if any
+        """
+        for job in jobs:
+            if job.get('cache_dir') is None or job.get('retry_count') is None:
+                continue
+            # Try to save an error report as the jobFWJR
+            if not os.path.isdir(job['cache_dir']):
+                # Then we have a bad cache directory
+                logging.error("Could not write a kill FWJR due to non-existant cache_dir for job %i\n", job['id'])
+                logging.debug("cache_dir: %s\n", job['cache_dir'])
+                continue
+            reportName = os.path.join(job['cache_dir'], 'Report.%i.pkl' % job['retry_count'])
+            errorReport = Report()
+            if os.path.exists(reportName) and os.path.getsize(reportName) > 0:
+                # Then there's already a report there.  Add messages
+                errorReport.load(reportName)
+            # Build a better job message
+            if killMsg:
+                reportedMsg = killMsg
+            else:
+                reportedMsg = WM_JOB_ERROR_CODES[errorCode]
+                reportedMsg += '\n Job last known status was: %s' % job.get('globalState', 'Unknown')
+            errorReport.addError("JobKilled", errorCode, "JobKilled", reportedMsg)
+            try:
+                errorReport.save(filename=reportName)
+            except IOError as ioe:
+                logging.warning('Cannot write report %s because of %s', reportName, ioe)
+
+        return
+
     def update(self, jobs):
         """
         _update_
@@ -733,6 +797,65 @@ class BossAirAPI(WMConnectionBase):
                 raise BossAirException(msg)
         return jobkill
 
+    def bulkUpdateSiteInformation(self, jobs, siteName, excludeSite):
+        """
+        _bulkUpdateSiteInformation_
+
+        Same as updateSiteInformation, but also reporting the jobs whose
+        site lists could not be updated by the plugins.
+        Returns a tuple with the jobs to kill and the failed jobs.
+        """
+        jobkill = []
+        failedJobs = []
+        for plugin in self.plugins:
+            try:
+                pluginInst = self.plugins[plugin]
+                pluginKill, pluginFailed = pluginInst.bulkUpdateSiteInformation(jobs, siteName, excludeSite)
+                jobkill.extend(pluginKill)
+                failedJobs.extend(pluginFailed)
+            except WMException:
+                raise
+            except Exception as ex:
+                msg = "Unhandled exception while calling update method for plugin %s\n" % plugin
+                msg += str(ex)
+                logging.error(msg)
+                raise BossAirException(msg)
+        return jobkill, failedJobs
+
+    def _syncJobTable(self):
+        """
+        _syncJobTable_
+
+        Load the active jobs into the job table the first time. Afterwards
+        only the ids and states of the active jobs are read from the database,
+        to add the jobs submitted, drop the jobs completed and reload the jobs
+        updated by other BossAir instances.
+        """
+        if self.jobTable is None:
+            runningJobs = self._listRunJobs(active=True)
+            logging.info("About to start building %i running jobs", len(runningJobs))
+            self.jobTable = RunJobTable(self._buildRunningJobsFromRunJobs(runJobs=runningJobs))
+            return
+
+        activeStates = self.activeStatesDAO.execute(conn=self.getDBConn(),
+                                                    transaction=self.existingTransaction())
+        activeIDs = set(activeStates)
+        knownIDs = self.jobTable.ids()
+        self.jobTable.remove(knownIDs - activeIDs)
+        newIDs = activeIDs - knownIDs
+        changedIDs = set()
+        for runJobID in knownIDs & activeIDs:
+            runJob = self.jobTable.get(runJobID)
+            if (runJob['status'], runJob['status_time'], runJob['gridid'],
+                    runJob['retry_count']) != activeStates[runJobID]:
+                changedIDs.add(runJobID)
+        if newIDs or changedIDs:
+            self.jobTable.add(self._loadByID(jobs=[{'id': runJobID} for runJobID in newIDs | changedIDs]))
+        logging.info("Job table synchronized: %i new, %i updated and %i finished jobs out of %i active jobs",
+                     len(newIDs), len(changedIDs), len(knownIDs - activeIDs), len(self.jobTable))
+
+        return
+
     def _buildRunningJobsFromRunJobs(self, runJobs):
         """
         _buildRunningJobsFromRunJobs_
@@ -742,13 +865,10 @@ class BossAirAPI(WMConnectionBase):
         finalJobs = []
 
         loadedJobs = self._loadByID(jobs=runJobs)
+        runJobsByID = dict((rj['id'], rj) for rj in runJobs)
 
         for loadJob in loadedJobs:
-            runJob = None
-            for rj in runJobs:
-                if rj['id'] == loadJob['id']:
-                    runJob = rj
-                    break
+            runJob = runJobsByID[loadJob['id']]
             # We should have two instances of the job
             for key in runJob:
                 # Fill one from the other
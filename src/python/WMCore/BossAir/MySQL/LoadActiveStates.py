@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+_LoadActiveStates_
+
+MySQL implementation for listing the state of the active bl_runjob records
+"""
+
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class LoadActiveStates(DBFormatter):
+    """
+    _LoadActiveStates_
+
+    List the ids of all bl_runjob that are active, with the columns other
+    BossAir instances update, such that a cached set of RunJobs can be
+    synchronized cheaply with the database.
+    """
+    sql = """SELECT rj.id, st.name, rj.status_time, rj.grid_id, rj.retry_count
+               FROM bl_runjob rj
+               INNER JOIN bl_status st ON rj.sched_status = st.id
+               WHERE rj.status = 1"""
+
+    def execute(self, conn = None, transaction = False):
+        """
+        _execute_
+
+        Return a dictionary of (status, status_time, gridid, retry_count)
+        tuples by runjob id
+        """
+        result = self.dbi.processData(self.sql, binds = {}, conn = conn,
+                                      transaction = transaction)
+
+        return dict((x[0], tuple(x[1:])) for x in self.format(result))
@@ -19,6 +19,7 @@ class LoadByID(DBFormatter):
     sql = """SELECT rj.wmbs_id AS jobid, rj.grid_id AS gridid, rj.bulk_id AS bulkid,
                st.name AS status, rj.retry_count AS retry_count, rj.id AS id,
                rj.status_time AS status_time, wl.plugin AS plugin, wu.cert_dn AS userdn,
+               wu.group_name AS usergroup, wu.role_name AS userrole,
                wj.cache_dir AS cache_dir
                FROM bl_runjob rj
                LEFT OUTER JOIN wmbs_users wu ON wu.id = rj.user_id
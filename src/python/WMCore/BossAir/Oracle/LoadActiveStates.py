@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+"""
+_LoadActiveStates_
+
+Oracle implementation for listing the state of the active bl_runjob records
+"""
+
+
+from WMCore.BossAir.MySQL.LoadActiveStates import LoadActiveStates as MySQLLoadActiveStates
+
+class LoadActiveStates(MySQLLoadActiveStates):
+    """
+    _LoadActiveStates_
+
+    """
@@ -105,6 +105,19 @@ class BasePlugin(object):
 
         pass
 
+    def bulkKill(self, jobs):
+        """
+        _bulkKill_
+
+        Kill jobs, returning the ones which could not be killed.
+        Plugins able to act on many jobs at once should override it.
+        """
+        try:
+            self.kill(jobs, raiseEx=True)
+        except RuntimeError:
+            return list(jobs)
+        return []
+
     def updateJobInformation(self, workflow, task, **kwargs):
         """
         _updateJobInformation_
@@ -123,6 +136,15 @@ class BasePlugin(object):
         """
         pass
 
+    def bulkUpdateSiteInformation(self, jobs, siteName, excludeSite):
+        """
+        _bulkUpdateSiteInformation_
+
+        Same as updateSiteInformation, returning a tuple with the jobs
+        to kill and the jobs which could not be updated
+        """
+        return self.updateSiteInformation(jobs, siteName, excludeSite) or [], []
+
     @staticmethod
     def scramArchtoRequiredOS(scramArch=None):
         """
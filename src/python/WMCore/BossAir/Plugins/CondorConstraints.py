@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+_CondorConstraints_
+
+Compact ClassAd constraint expressions selecting sets of condor jobs.
+
+Acting on jobs one by one (or in small lists of job ids) costs one schedd
+command each. The jobs of the agent are queued in clusters of consecutive
+ProcIds, so any set of them can be described by a short expression of
+ClusterId/ProcId ranges, which the schedd evaluates in a single command.
+"""
+from __future__ import division
+
+import classad
+
+# maximum number of ranges or values per constraint expression
+MAX_CONSTRAINT_TERMS = 2000
+
+
+def procIdRanges(condorIds):
+    """
+    _procIdRanges_
+
+    Group condor job ids ("ClusterId.ProcId") into a dictionary of
+    ClusterId to a sorted list of (first, last) ProcId ranges.
+    """
+    procIds = {}
+    for condorId in condorIds:
+        clusterId, procId = str(condorId).split(".")
+        procIds.setdefault(int(clusterId), set()).add(int(procId))
+
+    ranges = {}
+    for clusterId, procs in procIds.items():
+        clusterRanges = []
+        for procId in sorted(procs):
+            if clusterRanges and clusterRanges[-1][1] == procId - 1:
+                clusterRanges[-1][1] = procId
+            else:
+                clusterRanges.append([procId, procId])
+        ranges[clusterId] = [tuple(procRange) for procRange in clusterRanges]
+    return ranges
+
+
+def _rangeTerm(clusterId, first, last):
+    """
+    Constraint of a single range of ProcIds in a cluster
+    """
+    if first == last:
+        return "(ClusterId == %d && ProcId == %d)" % (clusterId, first)
+    return "(ClusterId == %d && ProcId >= %d && ProcId <= %d)" % (clusterId, first, last)
+
+
+def jobIdConstraints(condorIds, maxTerms=MAX_CONSTRAINT_TERMS):
+    """
+    _jobIdConstraints_
+
+    Return a list of (constraint, condor ids) tuples, where each constraint
+    expression selects exactly its condor ids, with at most maxTerms ProcId
+    ranges. Together they cover all the given condor job ids.
+    """
+    constraints = []
+    terms = []
+    selected = []
+    for clusterId, clusterRanges in sorted(procIdRanges(condorIds).items()):
+        for first, last in clusterRanges:
+            if len(terms) == maxTerms:
+                constraints.append((" || ".join(terms), selected))
+                terms = []
+                selected = []
+            terms.append(_rangeTerm(clusterId, first, last))
+            selected.extend("%d.%d" % (clusterId, procId) for procId in range(first, last + 1))
+    if terms:
+        constraints.append((" || ".join(terms), selected))
+    return constraints
+
+
+def attributeConstraints(attribute, values, maxTerms=MAX_CONSTRAINT_TERMS):
+    """
+    _attributeConstraints_
+
+    Return a list of constraint expressions selecting the jobs with the
+    attribute set to any of the given string values, e.g. the
+    WMAgent_RequestName of a list of workflows.
+    """
+    terms = ["%s =?= %s" % (attribute, classad.quote(str(value))) for value in sorted(set(values))]
+    return [" || ".join(terms[idx:idx + maxTerms]) for idx in range(0, len(terms), maxTerms)]
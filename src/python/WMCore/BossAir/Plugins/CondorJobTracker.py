@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+_CondorJobTracker_
+
+Incremental tracking of the agent jobs in a condor schedd.
+
+Instead of retrieving the classads of every job in the queue each cycle,
+a gridid-indexed table of (status, location) is kept in memory. It's
+initialized with a full query of the queue, and then only the jobs whose
+EnteredCurrentStatus changed since the previous query (minus a safety
+margin) are retrieved, both from the queue and from the history, the
+latter for jobs that left the queue in between. A full query is still
+done every fullQueryInterval seconds to resynchronize the table.
+"""
+from __future__ import division
+
+import logging
+import time
+
+TRACK_ATTRIBUTES = ['ClusterId', 'ProcId', 'JobStatus', 'MachineAttrGLIDEIN_CMSSite0']
+
+
+class CondorJobTracker(object):
+    """
+    _CondorJobTracker_
+
+    Keeps the state of the jobs in a schedd between tracking cycles.
+    """
+
+    def __init__(self, constraint, exitCodeMap, stateMap, fullQueryInterval=3600, margin=60,
+                 gridIdPrefix=""):
+        """
+        constraint: classad expression selecting the jobs of this agent
+        exitCodeMap: mapping from the condor JobStatus to a status name
+        stateMap: mapping from a status name to the BossAir global state
+        gridIdPrefix: prefix of the grid ids of the jobs in this schedd
+        """
+        self.constraint = constraint
+        self.gridIdPrefix = gridIdPrefix
+        self.exitCodeMap = exitCodeMap
+        self.stateMap = stateMap
+        self.fullQueryInterval = fullQueryInterval
+        self.margin = margin
+
+        self.jobInfo = {}
+        self.lastQuery = None
+        self.lastFullQuery = None
+
+    def reset(self):
+        """
+        _reset_
+
+        Drop the job table, forcing a full query in the next cycle
+        """
+        self.jobInfo = {}
+        self.lastQuery = None
+        self.lastFullQuery = None
+
+    def _addJobAds(self, jobAds):
+        """
+        Update the job table with the given job ads, return how many
+        """
+        numAds = 0
+        for jobAd in jobAds:
+            gridId = "%s%s.%s" % (self.gridIdPrefix, jobAd['ClusterId'], jobAd['ProcId'])
+            jobStatus = self.exitCodeMap.get(jobAd.get('JobStatus'), 'Unknown')
+            self.jobInfo[gridId] = (jobStatus, jobAd.get('MachineAttrGLIDEIN_CMSSite0', None))
+            numAds += 1
+        return numAds
+
+    def needsFullQuery(self, now=None):
+        """
+        _needsFullQuery_
+
+        True if the job table has to be (re)built from scratch
+        """
+        now = now or time.time()
+        return self.lastFullQuery is None or now - self.lastFullQuery >= self.fullQueryInterval
+
+    def update(self, schedd):
+        """
+        _update_
+
+        Query the schedd and update the job table. Returns True if it was a
+        full query, in which case any job not in the table has left the queue.
+        Query exceptions are propagated, after resetting the table.
+        """
+        now = int(time.time())
+        try:
+            if self.needsFullQuery(now):
+                self.jobInfo = {}
+                numAds = self._addJobAds(schedd.xquery(self.constraint, TRACK_ATTRIBUTES))
+                self.lastFullQuery = now
+                fullQuery = True
+            else:
+                since = self.lastQuery - self.margin
+                constraint = "(%s) && EnteredCurrentStatus >= %d" % (self.constraint, since)
+                numAds = self._addJobAds(schedd.xquery(constraint, TRACK_ATTRIBUTES))
+                numAds += self._addJobAds(schedd.history(constraint, TRACK_ATTRIBUTES, -1,
+                                                         since="EnteredCurrentStatus < %d" % since))
+                fullQuery = False
+        except Exception:
+            self.reset()
+            raise
+
+        self.lastQuery = now
+        logging.debug("Retrieved %d classAds from Condor in a %s query, tracking %d jobs",
+                      numAds, "full" if fullQuery else "incremental", len(self.jobInfo))
+        return fullQuery
+
+    def track(self, schedd, jobs):
+        """
+        _track_
+
+        Same contract as the plugin track(): returns the running jobs, the
+        jobs that changed status and the jobs that are complete.
+        """
+        changeList = []
+        completeList = []
+        runningList = []
+
+        fullQuery = self.update(schedd)
+
+        for job in jobs:
+            jobState = self.jobInfo.get(job['gridid'])
+            if jobState is not None:
+                (newStatus, location) = jobState
+            elif fullQuery:
+                # if the schedd doesn't know a job, consider it complete
+                # doing any further checks is not cost effective
+                (newStatus, location) = ('Completed', None)
+            else:
+                # nothing happened to this job since the last query
+                (newStatus, location) = (job['status'], None)
+
+            # check for status changes
+            if newStatus != job['status']:
+
+                # update location info for Idle->Running transition
+                if newStatus == 'Running' and job['status'] == 'Idle':
+                    if location:
+                        job['location'] = location
+                        logging.debug("JobAdInfo: Job location for jobid=%i gridid=%s changed to %s", job['jobid'],
+                                      job['gridid'], location)
+
+                job['status'] = newStatus
+                job['status_time'] = int(time.time())
+                logging.debug("JobAdInfo: Job status for jobid=%i gridid=%s changed to %s", job['jobid'], job['gridid'],
+                              job['status'])
+                changeList.append(job)
+
+            job['globalState'] = self.stateMap.get(newStatus)
+
+            # stop tracking finished jobs
+            if job['globalState'] in ['Complete', 'Error']:
+                completeList.append(job)
+                self.jobInfo.pop(job['gridid'], None)
+            else:
+                runningList.append(job)
+
+        return runningList, changeList, completeList
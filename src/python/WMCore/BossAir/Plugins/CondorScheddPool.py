@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+_CondorScheddPool_
+
+Submission of batches of jobs to one or several condor schedds.
+
+The calling thread builds the submit request of each batch while worker
+threads, up to a configurable number per schedd, queue the batches already
+built in schedd transactions. The htcondor bindings allow a single queue
+management transaction per process, so the transactions themselves are
+serialized through TRANSACTION_LOCK, whatever the schedd: what overlaps is
+building the next batches with queueing the current one. Batches are taken
+by whichever schedd worker is free first. A batch failing in a schedd is retried in the other schedds before
+being reported as failed, and a schedd failing maxFailures transactions in
+a row is not used anymore for the rest of the submission.
+
+Jobs queued in a schedd other than the local one get a grid id prefixed
+with the schedd name, e.g. 'vocms0250.cern.ch#1234.0'.
+"""
+from __future__ import division
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LOCAL_SCHEDD = "local"
+SCHEDD_SEPARATOR = "#"
+
+# only one schedd transaction may be open at a time in the whole process
+TRANSACTION_LOCK = threading.Lock()
+
+
+def gridIdPrefix(scheddName):
+    """
+    _gridIdPrefix_
+
+    Prefix of the grid ids of the jobs queued in a given schedd
+    """
+    if scheddName == LOCAL_SCHEDD:
+        return ""
+    return scheddName + SCHEDD_SEPARATOR
+
+
+def makeGridId(scheddName, clusterId, procId):
+    """
+    _makeGridId_
+
+    Grid id of a job queued in a given schedd
+    """
+    return "%s%s.%s" % (gridIdPrefix(scheddName), clusterId, procId)
+
+
+def splitGridId(gridId):
+    """
+    _splitGridId_
+
+    Return the schedd name and the condor job id (ClusterId.ProcId) of a grid id
+    """
+    if SCHEDD_SEPARATOR in gridId:
+        return tuple(gridId.rsplit(SCHEDD_SEPARATOR, 1))
+    return LOCAL_SCHEDD, gridId
+
+
+@contextmanager
+def scheddTransaction(schedd):
+    """
+    _scheddTransaction_
+
+    Open a transaction in a schedd, waiting for any other transaction of
+    the process to be over
+    """
+    with TRANSACTION_LOCK:
+        with schedd.transaction() as txn:
+            yield txn
+
+
+def queueJobs(schedd, sub, jobParams):
+    """
+    _queueJobs_
+
+    Queue a batch of jobs in a single schedd transaction, return the ClusterId
+    """
+    with scheddTransaction(schedd) as txn:
+        submitRes = sub.queue_with_itemdata(txn, 1, iter(jobParams))
+        return submitRes.cluster()
+
+
+class SubmitBatch(object):
+    """
+    _SubmitBatch_
+
+    A batch of jobs and the result of its submission
+    """
+
+    def __init__(self, jobs, sub=None, jobParams=None):
+        self.jobs = jobs
+        self.sub = sub
+        self.jobParams = jobParams
+        self.tried = set()
+        self.scheddName = None
+        self.clusterId = None
+        self.error = None
+
+
+class SubmitPipeline(object):
+    """
+    _SubmitPipeline_
+
+    schedds is a dictionary of schedd name to (schedd object, max number of
+    concurrent transactions), buildBatch a function returning the submit
+    request and the item data for a list of jobs.
+    """
+
+    def __init__(self, schedds, buildBatch, queueBatch=queueJobs, maxFailures=3):
+        self.schedds = schedds
+        self.buildBatch = buildBatch
+        self.queueBatch = queueBatch
+        self.maxFailures = maxFailures
+
+        self.cond = threading.Condition()
+        self.pending = deque()
+        self.inFlight = 0
+        self.buildDone = False
+        self.healthy = set(schedds)
+        self.done = []
+        # jobs queued and seconds spent in transactions per schedd
+        self.stats = dict((name, {'jobs': 0, 'batches': 0, 'time': 0.0}) for name in schedds)
+        self.failures = dict((name, 0) for name in schedds)
+
+    def _nextBatch(self, scheddName):
+        """
+        Pop the next pending batch not tried yet in this schedd, None if
+        this worker has nothing left to do. Must be called holding the lock.
+        """
+        while scheddName in self.healthy:
+            for batch in self.pending:
+                if scheddName not in batch.tried:
+                    self.pending.remove(batch)
+                    self.inFlight += 1
+                    return batch
+            if self.buildDone and self.inFlight == 0:
+                return None
+            self.cond.wait()
+        return None
+
+    def _failPending(self):
+        """
+        Report as failed the pending batches no healthy schedd can take.
+        Must be called holding the lock.
+        """
+        for batch in list(self.pending):
+            if not self.healthy - batch.tried:
+                self.pending.remove(batch)
+                self.done.append(batch)
+
+    def _worker(self, scheddName):
+        schedd = self.schedds[scheddName][0]
+        while True:
+            with self.cond:
+                batch = self._nextBatch(scheddName)
+            if batch is None:
+                return
+
+            startTime = time.time()
+            try:
+                clusterId = self.queueBatch(schedd, batch.sub, batch.jobParams)
+            except Exception as ex:
+                logging.error("Submission of %d jobs to schedd %s failed: %s", len(batch.jobs), scheddName, str(ex))
+                with self.cond:
+                    self.inFlight -= 1
+                    batch.tried.add(scheddName)
+                    batch.error = ex
+                    self.failures[scheddName] += 1
+                    if scheddName in self.healthy and self.failures[scheddName] >= self.maxFailures:
+                        logging.error("Not submitting to schedd %s anymore in this cycle", scheddName)
+                        self.healthy.discard(scheddName)
+                    self.pending.appendleft(batch)
+                    self._failPending()
+                    self.cond.notify_all()
+            else:
+                with self.cond:
+                    self.inFlight -= 1
+                    batch.scheddName = scheddName
+                    batch.clusterId = clusterId
+                    batch.error = None
+                    self.done.append(batch)
+                    self.failures[scheddName] = 0
+                    stats = self.stats[scheddName]
+                    stats['jobs'] += len(batch.jobs)
+                    stats['batches'] += 1
+                    stats['time'] += time.time() - startTime
+                    self.cond.notify_all()
+
+    def run(self, jobBatches):
+        """
+        _run_
+
+        Submit an iterable of job lists, return the list of SubmitBatch
+        with either the schedd name and ClusterId or the error set.
+        """
+        workers = []
+        for scheddName, (dummySchedd, concurrency) in self.schedds.items():
+            for idx in range(max(int(concurrency), 1)):
+                worker = threading.Thread(target=self._worker, args=(scheddName,),
+                                          name="SubmitPipeline-%s-%d" % (scheddName, idx))
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+        maxPending = len(workers)
+
+        try:
+            for jobs in jobBatches:
+                batch = SubmitBatch(jobs)
+                with self.cond:
+                    while self.healthy and len(self.pending) >= maxPending:
+                        self.cond.wait()
+                    if not self.healthy:
+                        # no schedd left, don't bother building the request
+                        batch.error = RuntimeError("No schedd available for submission")
+                        self.done.append(batch)
+                        continue
+                try:
+                    batch.sub, batch.jobParams = self.buildBatch(jobs)
+                except Exception as ex:
+                    logging.exception("Failed to build the submit request of %d jobs", len(jobs))
+                    batch.error = ex
+                    with self.cond:
+                        self.done.append(batch)
+                    continue
+                with self.cond:
+                    self.pending.append(batch)
+                    self._failPending()
+                    self.cond.notify_all()
+        finally:
+            with self.cond:
+                self.buildDone = True
+                self.cond.notify_all()
+            for worker in workers:
+                worker.join()
+
+        # anything left behind couldn't be submitted anywhere
+        self.done.extend(self.pending)
+        self.pending.clear()
+        return self.done
@@ -17,6 +17,10 @@ import htcondor
 from Utils import FileTools
 from Utils.IteratorTools import grouper
 from WMCore.BossAir.Plugins.BasePlugin import BasePlugin
+from WMCore.BossAir.Plugins.CondorConstraints import attributeConstraints, jobIdConstraints
+from WMCore.BossAir.Plugins.CondorJobTracker import CondorJobTracker
+from WMCore.BossAir.Plugins.CondorScheddPool import (LOCAL_SCHEDD, SubmitPipeline, gridIdPrefix,
+                                                     makeGridId, scheddTransaction, splitGridId)
 from WMCore.Credential.Proxy import Proxy
 from WMCore.DAOFactory import DAOFactory
 from WMCore.FwkJobReport.Report import Report
@@ -24,6 +28,14 @@ from WMCore.WMInit import getWMBASE
 from WMCore.Lexicon import getIterMatchObjectOnRegexp, WMEXCEPTION_REGEXP, CONDOR_LOG_FILTER_REGEXP
 
 
+# job fields determining the submit parameters shared by the jobs of the
+# same workflow, task and resource shape, see SimpleCondorPlugin.getJobTemplate
+JOB_TEMPLATE_FIELDS = ('request_name', 'task_name', 'task_type', 'task_id', 'activity',
+                       'wf_priority', 'taskPriority', 'allowOpportunistic', 'inputDataset',
+                       'scramArch', 'swVersion', 'numberOfCores', 'minCores', 'maxCores',
+                       'resizeJob', 'estimatedJobTime', 'estimatedMemoryUsage', 'estimatedDiskUsage')
+
+
 def activityToType(jobActivity):
     """
     Function to map a workflow activity to a generic CMS job type.
@@ -116,6 +128,9 @@ class SimpleCondorPlugin(BasePlugin):
 
         self.agent = getattr(config.Agent, 'agentName', 'WMAgent')
         self.sandbox = None
+        # worker node directory where the Unpacker caches the sandboxes, and its size limit in MB
+        self.sandboxCacheDir = getattr(config.BossAir, 'sandboxCacheDir', None)
+        self.sandboxCacheSize = getattr(config.BossAir, 'sandboxCacheSize', 10000)
 
         self.scriptFile = config.JobSubmitter.submitScript
 
@@ -128,6 +143,22 @@ class SimpleCondorPlugin(BasePlugin):
         self.acctGroup = getattr(config.BossAir, 'acctGroup', "production")
         self.acctGroupUser = getattr(config.BossAir, 'acctGroupUser', "cmsdataops")
  
+        # submit parameters per workflow/task/resource shape and quoted site lists
+        self.jobTemplates = {}
+        self.quotedLists = {}
+        self.maxCachedTemplates = getattr(config.BossAir, 'maxCachedTemplates', 5000)
+
+        # schedds to submit to, with the max number of concurrent transactions in each of them
+        self.submitSchedds = getattr(config.BossAir, 'submitSchedds', {LOCAL_SCHEDD: 1})
+        # ads of the remote schedds located in the pool, with the time they were located
+        self.scheddAds = {}
+        self.scheddLocateInterval = getattr(config.BossAir, 'scheddLocateInterval', 3600)
+
+        # incremental job tracking per schedd, with a full query every fullTrackInterval seconds
+        self.jobTrackers = {}
+        self.fullTrackInterval = getattr(config.BossAir, 'fullTrackInterval', 3600)
+        self.trackTimeMargin = getattr(config.BossAir, 'trackTimeMargin', 60)
+
         if hasattr(config.BossAir, 'condorRequirementsString'):
             self.reqStr = config.BossAir.condorRequirementsString
         else:
@@ -143,11 +174,56 @@ class SimpleCondorPlugin(BasePlugin):
 
         return
 
+    def getSchedd(self, scheddName=LOCAL_SCHEDD):
+        """
+        _getSchedd_
+
+        Return the local schedd or a remote one, located in the pool at most
+        every scheddLocateInterval seconds
+        """
+        if scheddName == LOCAL_SCHEDD:
+            return htcondor.Schedd()
+        scheddAd, locateTime = self.scheddAds.get(scheddName, (None, 0))
+        if time.time() - locateTime > self.scheddLocateInterval:
+            scheddAd = htcondor.Collector().locate(htcondor.DaemonTypes.Schedd, scheddName)
+            self.scheddAds[scheddName] = (scheddAd, time.time())
+        return htcondor.Schedd(scheddAd)
+
+    def getJobTracker(self, scheddName=LOCAL_SCHEDD):
+        """
+        _getJobTracker_
+
+        Return the incremental job tracker of a schedd
+        """
+        if scheddName not in self.jobTrackers:
+            self.jobTrackers[scheddName] = CondorJobTracker("WMAgent_AgentName == %s" % classad.quote(self.agent),
+                                                            self.exitCodeMap(), self.stateMap(),
+                                                            fullQueryInterval=self.fullTrackInterval,
+                                                            margin=self.trackTimeMargin,
+                                                            gridIdPrefix=gridIdPrefix(scheddName))
+        return self.jobTrackers[scheddName]
+
+    @staticmethod
+    def groupBySchedd(jobs):
+        """
+        _groupBySchedd_
+
+        Group jobs by the schedd they were submitted to
+        """
+        jobsBySchedd = {}
+        for job in jobs:
+            scheddName = splitGridId(job['gridid'] or "")[0]
+            jobsBySchedd.setdefault(scheddName, []).append(job)
+        return jobsBySchedd
+
     def submit(self, jobs, info=None):
         """
         _submit_
 
         Submits jobs to the condor queue
+
+        The submit requests are built while the previous batches are
+        being queued, in as many schedds as configured, see CondorScheddPool.
         """
         successfulJobs = []
         failedJobs = []
@@ -156,35 +232,39 @@ class SimpleCondorPlugin(BasePlugin):
             # Then was have nothing to do
             return successfulJobs, failedJobs
 
-        schedd = htcondor.Schedd()
-
-        # Submit the jobs
-        for jobsReady in grouper(jobs, self.jobsPerSubmit):
-
-            (sub, jobParams) = self.createSubmitRequest(jobsReady)
-
-            logging.debug("Start: Submitting %d jobs using Condor Python Submit", len(jobParams))
+        schedds = {}
+        for scheddName, concurrency in self.submitSchedds.items():
             try:
-                with schedd.transaction() as txn:
-                    submitRes = sub.queue_with_itemdata(txn, 1, iter(jobParams))
-                    clusterId = submitRes.cluster()
+                schedds[scheddName] = (self.getSchedd(scheddName), concurrency)
             except Exception as ex:
+                logging.error("Failed to locate schedd %s, not submitting to it: %s", scheddName, str(ex))
+
+        # Submit the jobs
+        pipeline = SubmitPipeline(schedds, self.createSubmitRequest)
+        for batch in pipeline.run(grouper(jobs, self.jobsPerSubmit)):
+            if batch.error is not None:
                 logging.error("SimpleCondorPlugin job submission failed.")
-                logging.exception(str(ex))
+                logging.error("Failed to submit %d jobs: %s", len(batch.jobs), str(batch.error))
                 logging.error("Moving on the the next batch of jobs and/or cycle....")
 
                 condorErrorReport = Report()
-                condorErrorReport.addError("JobSubmit", 61202, "CondorError", str(ex))
-                for job in jobsReady:
+                condorErrorReport.addError("JobSubmit", 61202, "CondorError", str(batch.error))
+                for job in batch.jobs:
                     job['fwjr'] = condorErrorReport
                     failedJobs.append(job)
             else:
-                logging.debug("Job submission to condor succeeded, clusterId is %s", clusterId)
-                for index, job in enumerate(jobsReady):
-                    job['gridid'] = "%s.%s" % (clusterId, index)
+                logging.debug("Job submission to condor schedd %s succeeded, clusterId is %s",
+                              batch.scheddName, batch.clusterId)
+                for index, job in enumerate(batch.jobs):
+                    job['gridid'] = makeGridId(batch.scheddName, batch.clusterId, index)
                     job['status'] = 'Idle'
                     successfulJobs.append(job)
 
+        for scheddName, stats in pipeline.stats.items():
+            if stats['jobs']:
+                logging.info("Submitted %d jobs in %d transactions to schedd %s at %.1f jobs/sec",
+                             stats['jobs'], stats['batches'], scheddName, stats['jobs'] / max(stats['time'], 1e-6))
+
         # We must return a list of jobs successfully submitted and a list of jobs failed
         logging.info("Done submitting jobs for this cycle in SimpleCondorPlugin")
         return successfulJobs, failedJobs
@@ -198,8 +278,10 @@ class SimpleCondorPlugin(BasePlugin):
         First, the total number of jobs still running
         Second, the jobs that need to be changed
         Third, the jobs that need to be completed
+
+        Only the jobs that changed status since the previous cycle are
+        retrieved from the schedd, see CondorJobTracker.
         """
-        jobInfo = {}
         changeList = []
         completeList = []
         runningList = []
@@ -207,58 +289,20 @@ class SimpleCondorPlugin(BasePlugin):
         # get info about all active and recent jobs
         logging.debug("SimpleCondorPlugin is going to track %s jobs", len(jobs))
 
-        schedd = htcondor.Schedd()
-
         logging.debug("Start: Retrieving classAds using Condor Python XQuery")
-        try:
-            itobj = schedd.xquery("WMAgent_AgentName == %s" % classad.quote(self.agent),
-                                  ['ClusterId', 'ProcId', 'JobStatus', 'MachineAttrGLIDEIN_CMSSite0'])
-            for jobAd in itobj:
-                gridId = "%s.%s" % (jobAd['ClusterId'], jobAd['ProcId'])
-                jobStatus = SimpleCondorPlugin.exitCodeMap().get(jobAd.get('JobStatus'), 'Unknown')
-                location = jobAd.get('MachineAttrGLIDEIN_CMSSite0', None)
-                jobInfo[gridId] = (jobStatus, location)
-        except Exception as ex:
-            logging.error("Query to condor schedd failed in SimpleCondorPlugin.")
-            logging.error("Returning empty lists for all job types...")
-            logging.exception(ex)
-            return runningList, changeList, completeList
-
-        logging.debug("Finished retrieving %d classAds from Condor", len(jobInfo))
-
-        # now go over the jobs and see what we have
-        for job in jobs:
-
-            # if the schedd doesn't know a job, consider it complete
-            # doing any further checks is not cost effective
-            if job['gridid'] not in jobInfo:
-                (newStatus, location) = ('Completed', None)
-            else:
-                (newStatus, location) = jobInfo[job['gridid']]
-
-            # check for status changes
-            if newStatus != job['status']:
-
-                # update location info for Idle->Running transition
-                if newStatus == 'Running' and job['status'] == 'Idle':
-                    if location:
-                        job['location'] = location
-                        logging.debug("JobAdInfo: Job location for jobid=%i gridid=%s changed to %s", job['jobid'],
-                                      job['gridid'], location)
-
-                job['status'] = newStatus
-                job['status_time'] = int(time.time())
-                logging.debug("JobAdInfo: Job status for jobid=%i gridid=%s changed to %s", job['jobid'], job['gridid'],
-                              job['status'])
-                changeList.append(job)
-
-            job['globalState'] = SimpleCondorPlugin.stateMap().get(newStatus)
-
-            # stop tracking finished jobs
-            if job['globalState'] in ['Complete', 'Error']:
-                completeList.append(job)
-            else:
-                runningList.append(job)
+        for scheddName, scheddJobs in self.groupBySchedd(jobs).items():
+            try:
+                schedd = self.getSchedd(scheddName)
+                localRunning, localChanges, localCompletes = self.getJobTracker(scheddName).track(schedd,
+                                                                                                 scheddJobs)
+            except Exception as ex:
+                logging.error("Query to condor schedd %s failed in SimpleCondorPlugin.", scheddName)
+                logging.error("Skipping its %d jobs in this cycle...", len(scheddJobs))
+                logging.exception(ex)
+                continue
+            runningList.extend(localRunning)
+            changeList.extend(localChanges)
+            completeList.extend(localCompletes)
 
         logging.debug("SimpleCondorPlugin tracking : %i/%i/%i (Executing/Changing/Complete)",
                       len(runningList), len(changeList), len(completeList))
@@ -299,9 +343,10 @@ class SimpleCondorPlugin(BasePlugin):
                 logOutput = 'Could not find jobReport\n'
 
                 if os.path.isdir(job['cache_dir']):
-                    condorErr = "condor.%s.err" % job['gridid']
-                    condorOut = "condor.%s.out" % job['gridid']
-                    condorLog = "condor.%s.log" % job['gridid']
+                    condorJobId = splitGridId(job['gridid'])[1]
+                    condorErr = "condor.%s.err" % condorJobId
+                    condorOut = "condor.%s.out" % condorJobId
+                    condorLog = "condor.%s.log" % condorJobId
                     exitCode = 99303
                     exitType = "NoJobReport"
                     for condorFile in [condorErr, condorOut, condorLog]:
@@ -368,64 +413,111 @@ class SimpleCondorPlugin(BasePlugin):
         Parameters:    excludeSite = False when moving to Normal
                        excludeSite = True when moving to Down, Draining or Aborted
         """
-        sd = htcondor.Schedd()
-        jobIdToKill = []
-        jobtokill = []
-        origSiteLists = set()
+        jobtokill, dummyFailedJobs = self.bulkUpdateSiteInformation(jobs, siteName, excludeSite)
 
-        try:
-            itobj = sd.xquery('WMAgent_AgentName =?= %s && JobStatus =?= 1' % classad.quote(self.agent),
-                              ['WMAgent_JobID', 'DESIRED_Sites', 'ExtDESIRED_Sites'])
-
-            for jobAd in itobj:
-                jobAdId = jobAd.get('WMAgent_JobID')
-                desiredSites = jobAd.get('DESIRED_Sites')
-                extDesiredSites = jobAd.get('ExtDESIRED_Sites')
-                if excludeSite and siteName == desiredSites:
-                    jobIdToKill.append(jobAdId)
-                else:
-                    origSiteLists.add((desiredSites, extDesiredSites))
-            logging.info("Set of %d site list condor combinations", len(origSiteLists))
-        except Exception as ex:
-            msg = "Failed to query condor schedd: %s" % str(ex)
-            logging.exception(msg)
-            return jobtokill
-
-        with sd.transaction() as dummyTxn:
-            for siteStrings in origSiteLists:
-                desiredList = set([site.strip() for site in siteStrings[0].split(",")])
-                extDesiredList = set([site.strip() for site in siteStrings[1].split(",")])
-
-                if excludeSite and siteName not in desiredList:
-                    continue
-                elif not excludeSite and (siteName in desiredList or siteName not in extDesiredList):
-                    continue
-                elif excludeSite:
-                    desiredList.remove(siteName)
-                    extDesiredList.add(siteName)
-                else:  # well, then include
-                    desiredList.add(siteName)
-                    extDesiredList.remove(siteName)
-
-                # now put it back in the string format expected by condor
-                desiredListStr = ",".join(desiredList)
-                extDesiredListStr = ",".join(extDesiredList)
+        return jobtokill
 
-                try:
-                    sd.edit('DESIRED_Sites =?= %s && ExtDESIRED_Sites =?= %s' % (classad.quote(siteStrings[0]),
-                                                                                 classad.quote(siteStrings[1])),
-                            "DESIRED_Sites", classad.quote(str(desiredListStr)))
-                    sd.edit('DESIRED_Sites =?= %s && ExtDESIRED_Sites =?= %s' % (classad.quote(siteStrings[0]),
-                                                                                 classad.quote(siteStrings[1])),
-                            "ExtDESIRED_Sites", classad.quote(str(extDesiredListStr)))
-                except RuntimeError as ex:
-                    msg = 'Failed to condor edit job sites. Could be that no jobs were in condor anymore: %s' % str(ex)
-                    logging.warning(msg)
+    def bulkUpdateSiteInformation(self, jobs, siteName, excludeSite):
+        """
+        _bulkUpdateSiteInformation_
+
+        Same as updateSiteInformation, but also reporting the jobs whose site
+        lists could not be updated. Returns a tuple with the jobs to kill and
+        the failed jobs; if a schedd could not be queried at all, every job is
+        reported as failed since there is no way to tell which ones were there.
+        """
+        jobIdToKill = set()
+        failedJobIds = set()
+        scheddFailed = False
+        for scheddName in self.submitSchedds:
+            try:
+                sd = self.getSchedd(scheddName)
+                scheddToKill, scheddFailedIds = self._updateScheddSiteInformation(sd, siteName, excludeSite)
+            except Exception as ex:
+                logging.error("Failed to update the site lists of the jobs in schedd %s: %s", scheddName, str(ex))
+                scheddFailed = True
+                continue
+            jobIdToKill.update(scheddToKill)
+            failedJobIds.update(scheddFailedIds)
 
         # now update the list of jobs to be killed
         jobtokill = [job for job in jobs if job['id'] in jobIdToKill]
+        failedJobs = [job for job in jobs if scheddFailed or job['id'] in failedJobIds]
+        if failedJobs:
+            logging.warning("Failed to update the site lists of %d jobs for site %s", len(failedJobs), siteName)
 
-        return jobtokill
+        return jobtokill, failedJobs
+
+    def _updateScheddSiteInformation(self, sd, siteName, excludeSite):
+        """
+        _updateScheddSiteInformation_
+
+        Update the sites of the Idle jobs of a single schedd, with one edit
+        per distinct combination of site lists, all in a single transaction.
+        Returns the ids of the jobs that have nowhere to run anymore and the
+        ids of the jobs whose site lists could not be edited.
+        """
+        jobIdToKill = set()
+        jobIdsBySiteLists = {}
+
+        itobj = sd.xquery('WMAgent_AgentName =?= %s && JobStatus =?= 1' % classad.quote(self.agent),
+                          ['WMAgent_JobID', 'DESIRED_Sites', 'ExtDESIRED_Sites'])
+
+        for jobAd in itobj:
+            if jobAd.get('WMAgent_JobID') is None:
+                # not a job of ours, e.g. from other submitters or older agents
+                continue
+            jobAdId = int(jobAd.get('WMAgent_JobID'))
+            desiredSites = jobAd.get('DESIRED_Sites')
+            extDesiredSites = jobAd.get('ExtDESIRED_Sites')
+            if excludeSite and siteName == desiredSites:
+                jobIdToKill.add(jobAdId)
+            else:
+                jobIdsBySiteLists.setdefault((desiredSites, extDesiredSites), []).append(jobAdId)
+        logging.info("Set of %d site list condor combinations", len(jobIdsBySiteLists))
+
+        edits = []
+        for siteStrings in jobIdsBySiteLists:
+            desiredList = set([site.strip() for site in siteStrings[0].split(",")])
+            extDesiredList = set([site.strip() for site in siteStrings[1].split(",")])
+
+            if excludeSite and siteName not in desiredList:
+                continue
+            elif not excludeSite and (siteName in desiredList or siteName not in extDesiredList):
+                continue
+            elif excludeSite:
+                desiredList.remove(siteName)
+                extDesiredList.add(siteName)
+            else:  # well, then include
+                desiredList.add(siteName)
+                extDesiredList.remove(siteName)
+
+            # now put it back in the string format expected by condor
+            edits.append((siteStrings, ",".join(desiredList), ",".join(extDesiredList)))
+
+        if not edits:
+            return jobIdToKill, set()
+
+        failedJobIds = set()
+        try:
+            with scheddTransaction(sd) as dummyTxn:
+                for siteStrings, desiredListStr, extDesiredListStr in edits:
+                    constraint = 'DESIRED_Sites =?= %s && ExtDESIRED_Sites =?= %s' % (classad.quote(siteStrings[0]),
+                                                                                      classad.quote(siteStrings[1]))
+                    try:
+                        sd.edit(constraint, "DESIRED_Sites", classad.quote(str(desiredListStr)))
+                        sd.edit(constraint, "ExtDESIRED_Sites", classad.quote(str(extDesiredListStr)))
+                    except RuntimeError as ex:
+                        msg = 'Failed to condor edit job sites. Could be that no jobs were in condor anymore: %s' % str(ex)
+                        logging.warning(msg)
+                        failedJobIds.update(jobIdsBySiteLists[siteStrings])
+        except Exception as ex:
+            # the transaction wasn't committed, none of the edits went through
+            logging.error("Failed to commit the site list edits of %d combinations: %s", len(edits), str(ex))
+            for siteStrings, _, _ in edits:
+                failedJobIds.update(jobIdsBySiteLists[siteStrings])
+
+        return jobIdToKill, failedJobIds
 
     def kill(self, jobs, raiseEx=False):
         """
@@ -436,17 +528,45 @@ class SimpleCondorPlugin(BasePlugin):
         """
         logging.info("Killing %i jobs from the queue", len(jobs))
 
-        schedd = htcondor.Schedd()
-        gridIds = [job['gridid'] for job in jobs]
-        try:
-            schedd.act(htcondor.JobAction.Remove, gridIds)
-        except RuntimeError:
-            logging.warn("Error while killing jobs on the schedd: %s", gridIds)
-            if raiseEx:
-                raise
+        failedJobs = self.bulkKill(jobs)
+        if failedJobs and raiseEx:
+            raise RuntimeError("Failed to kill %d jobs in some of the schedds" % len(failedJobs))
 
         return
 
+    def bulkKill(self, jobs):
+        """
+        _bulkKill_
+
+        Remove jobs from their schedds with one command per schedd (per
+        MAX_CONSTRAINT_TERMS ranges of ProcIds actually), selecting them by
+        a constraint on their ClusterId and ProcId ranges.
+        Returns the jobs which could not be removed.
+        """
+        failedJobs = []
+        for scheddName, scheddJobs in self.groupBySchedd(jobs).items():
+            jobsByCondorId = dict((splitGridId(job['gridid'])[1], job) for job in scheddJobs)
+            try:
+                schedd = self.getSchedd(scheddName)
+            except Exception as ex:
+                logging.error("Failed to locate schedd %s, not killing its %d jobs: %s",
+                              scheddName, len(scheddJobs), str(ex))
+                failedJobs.extend(scheddJobs)
+                continue
+
+            for constraint, condorIds in jobIdConstraints(jobsByCondorId):
+                try:
+                    result = schedd.act(htcondor.JobAction.Remove, constraint)
+                    numErrors = int(result.get('TotalError', 0)) + int(result.get('TotalPermissionDenied', 0))
+                    if numErrors:
+                        raise RuntimeError("%d jobs could not be removed" % numErrors)
+                except Exception as ex:
+                    logging.warning("Error while killing %d jobs on the schedd %s: %s", len(condorIds),
+                                    scheddName, str(ex))
+                    failedJobs.extend(jobsByCondorId[condorId] for condorId in condorIds)
+
+        return failedJobs
+
     def killWorkflowJobs(self, workflow):
         """
         _killWorkflowJobs_
@@ -455,15 +575,30 @@ class SimpleCondorPlugin(BasePlugin):
         """
         logging.info("Going to remove all the jobs for workflow %s", workflow)
 
-        schedd = htcondor.Schedd()
-
-        try:
-            schedd.act(htcondor.JobAction.Remove, "WMAgent_RequestName == %s" % classad.quote(str(workflow)))
-        except RuntimeError:
-            logging.warn("Error while killing jobs on the schedd: WMAgent_RequestName=%s", workflow)
+        self.bulkKillWorkflows([workflow])
 
         return
 
+    def bulkKillWorkflows(self, workflows):
+        """
+        _bulkKillWorkflows_
+
+        Remove all the jobs of several workflows with a single command per
+        schedd, returns the list of schedds where the removal failed.
+        """
+        failedSchedds = []
+        for scheddName in self.submitSchedds:
+            try:
+                schedd = self.getSchedd(scheddName)
+                for constraint in attributeConstraints('WMAgent_RequestName', workflows):
+                    schedd.act(htcondor.JobAction.Remove, constraint)
+            except Exception:
+                logging.warn("Error while killing jobs on the schedd %s: WMAgent_RequestName in %s",
+                             scheddName, workflows)
+                failedSchedds.append(scheddName)
+
+        return failedSchedds
+
     def updateJobInformation(self, workflow, task, **kwargs):
         """
         _updateJobInformation_
@@ -474,141 +609,195 @@ class SimpleCondorPlugin(BasePlugin):
         The currently supported changes are only priority for which both the task (taskPriority)
         and workflow priority (requestPriority) must be provided.
         """
-        schedd = htcondor.Schedd()
-
         if 'taskPriority' in kwargs and 'requestPriority' in kwargs:
-            newPriority = int(kwargs['requestPriority']) + int(kwargs['taskPriority'] * self.maxTaskPriority)
+            self.bulkUpdateJobInformation([dict(kwargs, workflow=workflow, task=task)])
+
+        return
+
+    def bulkUpdateJobInformation(self, updates):
+        """
+        _bulkUpdateJobInformation_
+
+        Update the priority of the jobs of several workflows and tasks, given
+        as a list of dictionaries with the workflow, task, requestPriority and
+        taskPriority keys. The tasks getting the same priority are edited
+        together, in a single transaction per schedd.
+        Returns the list of schedds where the update failed.
+        """
+        tasksByPriority = {}
+        for update in updates:
+            newPriority = int(update['requestPriority']) + int(update['taskPriority'] * self.maxTaskPriority)
+            constraint = "(WMAgent_SubTaskName =?= %s" % classad.quote(str(update['task']))
+            constraint += " && WMAgent_RequestName =?= %s)" % classad.quote(str(update['workflow']))
+            tasksByPriority.setdefault(newPriority, []).append(constraint)
+
+        failedSchedds = []
+        for scheddName in self.submitSchedds:
             try:
-                constraint = "WMAgent_SubTaskName =?= %s" % classad.quote(str(task))
-                constraint += " && WMAgent_RequestName =?= %s" % classad.quote(str(workflow))
-                constraint += " && JobPrio =!= %d" % newPriority
-                schedd.edit(constraint, 'JobPrio', classad.Literal(newPriority))
+                schedd = self.getSchedd(scheddName)
+                with scheddTransaction(schedd) as dummyTxn:
+                    for newPriority, taskConstraints in tasksByPriority.items():
+                        constraint = "(%s) && JobPrio =!= %d" % (" || ".join(taskConstraints), newPriority)
+                        schedd.edit(constraint, 'JobPrio', classad.Literal(newPriority))
             except Exception as ex:
-                logging.error("Failed to update JobPrio for WMAgent_SubTaskName=%s", task)
+                logging.error("Failed to update JobPrio of %d tasks in schedd %s", len(updates), scheddName)
                 logging.exception(ex)
+                failedSchedds.append(scheddName)
 
-        return
+        return failedSchedds
 
+    def _quotedList(self, values):
+        """
+        _quotedList_
+
+        Return the quoted, sorted and comma separated list of values.
+        Memoized since the same site lists repeat over most jobs.
+        """
+        key = tuple(values)
+        if key not in self.quotedLists:
+            if len(self.quotedLists) >= self.maxCachedTemplates:
+                self.quotedLists.clear()
+            self.quotedLists[key] = classad.quote(str(','.join(sorted(values))))
+        return self.quotedLists[key]
+
+    def getJobTemplate(self, job):
+        """
+        _getJobTemplate_
+
+        Return the submit parameters shared by all the jobs of the same
+        workflow, task and resource shape, which are computed only once.
+        """
+        key = tuple(tuple(value) if isinstance(value, list) else value
+                    for value in (job.get(field) for field in JOB_TEMPLATE_FIELDS))
+        if key in self.jobTemplates:
+            return self.jobTemplates[key]
+
+        undefined = 'UNDEFINED'
+        ad = {}
+
+        # Dictionary keys need to be consistent across all jobs within the same
+        # clusterId when working with queue_with_itemdata()
+        # Initialize 'Requirements' to an empty string for all jobs.
+        # See issue: https://htcondor-wiki.cs.wisc.edu/index.cgi/tktview?tn=7715
+        ad['Requirements'] = ''
+        # Do not define custom Requirements for Volunteer resources
+        if self.reqStr is not None:
+            ad['Requirements'] = self.reqStr
+
+        ad['My.x509userproxy'] = classad.quote(self.x509userproxy)
+        ad['My.WMAgent_RequestName'] = classad.quote(job['request_name'])
+        match = re.compile("^[a-zA-Z0-9_]+_([a-zA-Z0-9]+)-").match(job['request_name'])
+        if match:
+            ad['My.CMSGroups'] = classad.quote(match.groups()[0])
+        else:
+            ad['My.CMSGroups'] = undefined
+        ad['My.WMAgent_SubTaskName'] = classad.quote(job['task_name'])
+        ad['My.CMS_JobType'] = classad.quote(job['task_type'])
+        ad['My.CMS_Type'] = classad.quote(activityToType(job['activity']))
+
+        # Handling for AWS, cloud and opportunistic resources
+        ad['My.AllowOpportunistic'] = str(job.get('allowOpportunistic', False))
+        if job.get('inputDataset'):
+            ad['My.DESIRED_CMSDataset'] = classad.quote(job['inputDataset'])
+        else:
+            ad['My.DESIRED_CMSDataset'] = undefined
+        # HighIO and repack jobs
+        ad['My.Requestioslots'] = str(1 if job['task_type'] in ["Merge", "Cleanup", "LogCollect"] else 0)
+        ad['My.RequestRepackslots'] = str(1 if job['task_type'] == 'Repack' else 0)
+        # Performance and resource estimates (including JDL magic tweaks)
+        origCores = job.get('numberOfCores', 1)
+        estimatedMins = int(job['estimatedJobTime'] / 60.0) if job.get('estimatedJobTime') else 12 * 60
+        estimatedMinsSingleCore = estimatedMins * origCores
+        # For now, assume a 15 minute job startup overhead -- condor will round this up further
+        ad['My.EstimatedSingleCoreMins'] = str(estimatedMinsSingleCore)
+        ad['My.OriginalMaxWallTimeMins'] = str(estimatedMins)
+        ad['My.MaxWallTimeMins'] = 'WMCore_ResizeJob ? (EstimatedSingleCoreMins/RequestCpus + 15) : OriginalMaxWallTimeMins'
+        requestMemory = int(job['estimatedMemoryUsage']) if job.get('estimatedMemoryUsage', None) else 1000
+        ad['My.OriginalMemory'] = str(requestMemory)
+        ad['My.ExtraMemory'] = str(self.extraMem)
+        ad['request_memory'] = 'OriginalMemory + ExtraMemory * (WMCore_ResizeJob ? (RequestCpus-OriginalCpus) : 0)'
+        requestDisk = int(job['estimatedDiskUsage']) if job.get('estimatedDiskUsage', None) else 20 * 1000 * 1000 * origCores
+        ad['request_disk'] = str(requestDisk)
+        # Set up JDL for multithreaded jobs.
+        # By default, RequestCpus will evaluate to whatever CPU request was in the workflow.
+        # If the job is labelled as resizable, then the logic is more complex:
+        # - If the job is running in a slot with N cores, this should evaluate to N
+        # - If the job is being matched against a machine, match all available CPUs, provided
+        # they are between min and max CPUs.
+        # - Otherwise, just use the original CPU count.
+        ad['My.MinCores'] = str(job.get('minCores', max(1, origCores / 2)))
+        ad['My.MaxCores'] = str(max(int(job.get('maxCores', origCores)), origCores))
+        ad['My.OriginalCpus'] = str(origCores)
+        # Prefer slots that are closest to our MaxCores without going over.
+        # If the slot size is _greater_ than our MaxCores, we prefer not to
+        # use it - we might unnecessarily fragment the slot.
+        ad['Rank'] = 'isUndefined(Cpus) ? 0 : ifThenElse(Cpus > MaxCores, -Cpus, Cpus)'
+        # Record the number of CPUs utilized at match time.  We'll use this later
+        # for monitoring and accounting.  Defaults to 0; once matched, it'll
+        # put an attribute in the job  MATCH_EXP_JOB_GLIDEIN_Cpus = 4
+        ad['My.JOB_GLIDEIN_Cpus'] = classad.quote("$$(Cpus:0)")
+        # Make sure the resize request stays within MinCores and MaxCores.
+        ad['My.RequestResizedCpus'] = '(Cpus>MaxCores) ? MaxCores : ((Cpus < MinCores) ? MinCores : Cpus)'
+        # If the job is running, then we should report the matched CPUs in RequestCpus - but only if there are sane
+        # values.  Otherwise, we just report the original CPU request
+        ad['My.JobCpus'] = ('((JobStatus =!= 1) && (JobStatus =!= 5) && !isUndefined(MATCH_EXP_JOB_GLIDEIN_Cpus) '
+                            '&& (int(MATCH_EXP_JOB_GLIDEIN_Cpus) isnt error)) ? int(MATCH_EXP_JOB_GLIDEIN_Cpus) : OriginalCpus')
+        # Cpus is taken from the machine ad - hence it is only defined when we are doing negotiation.
+        # Otherwise, we use either the cores in the running job (if available) or the original cores.
+        ad['request_cpus'] = 'WMCore_ResizeJob ? (!isUndefined(Cpus) ? RequestResizedCpus : JobCpus) : OriginalCpus'
+        ad['My.WMCore_ResizeJob'] = str(job.get('resizeJob', False))
+        taskPriority = int(job.get('taskPriority', 1))
+        priority = int(job.get('wf_priority', 0))
+        ad['My.JobPrio'] = str(int(priority + taskPriority * 1))
+        ad['My.PostJobPrio2'] = str(int(-1 * job['task_id']))
+        # Add OS requirements for jobs
+        requiredOSes = self.scramArchtoRequiredOS(job.get('scramArch'))
+        ad['My.REQUIRED_OS'] = classad.quote(requiredOSes)
+        cmsswVersions = ','.join(job.get('swVersion'))
+        ad['My.CMSSW_Versions'] = classad.quote(cmsswVersions)
+
+        if len(self.jobTemplates) >= self.maxCachedTemplates:
+            self.jobTemplates.clear()
+        self.jobTemplates[key] = ad
+        return ad
 
     def getJobParameters(self, jobList):
         """
         _getJobParameters_
 
         Return a list of dictionaries with submit parameters per job.
+        Only the parameters specific to each job are computed here, the
+        rest comes from the template of its workflow/task/resource shape.
         """
 
         undefined = 'UNDEFINED'
         jobParameters = []
 
         for job in jobList:
-            ad = {}
+            ad = dict(self.getJobTemplate(job))
 
             ad['initial_Dir'] = job['cache_dir']
             ad['transfer_input_files'] = "%s,%s/%s,%s" % (job['sandbox'], job['packageDir'],
-                                                   'JobPackage.pkl', self.unpacker)
+                                                          'JobPackage.pkl', self.unpacker)
             ad['Arguments'] = "%s %i %s" % (os.path.basename(job['sandbox']), job['id'], job["retry_count"])
             ad['transfer_output_files'] = "Report.%i.pkl,wmagentJob.log" % job["retry_count"]
 
-            # Dictionary keys need to be consistent across all jobs within the same 
-            # clusterId when working with queue_with_itemdata()
-            # Initialize 'Requirements' to an empty string for all jobs.
-            # See issue: https://htcondor-wiki.cs.wisc.edu/index.cgi/tktview?tn=7715 
-            ad['Requirements'] = ''
-            # Do not define custom Requirements for Volunteer resources
-            if self.reqStr is not None:
-                ad['Requirements'] = self.reqStr
-
-            ad['My.x509userproxy'] = classad.quote(self.x509userproxy)
-            sites = ','.join(sorted(job.get('possibleSites')))
-            ad['My.DESIRED_Sites'] = classad.quote(str(sites))
-            sites = ','.join(sorted(job.get('potentialSites')))
-            ad['My.ExtDESIRED_Sites'] = classad.quote(str(sites))
+            ad['My.DESIRED_Sites'] = self._quotedList(job.get('possibleSites'))
+            ad['My.ExtDESIRED_Sites'] = self._quotedList(job.get('potentialSites'))
             ad['My.CMS_JobRetryCount'] = str(job['retry_count'])
-            ad['My.WMAgent_RequestName'] = classad.quote(job['request_name'])
-            match = re.compile("^[a-zA-Z0-9_]+_([a-zA-Z0-9]+)-").match(job['request_name'])
-            if match:
-                ad['My.CMSGroups'] = classad.quote(match.groups()[0])
-            else:
-                ad['My.CMSGroups'] = undefined
             ad['My.WMAgent_JobID'] = str(job['jobid'])
-            ad['My.WMAgent_SubTaskName'] = classad.quote(job['task_name'])
-            ad['My.CMS_JobType'] = classad.quote(job['task_type'])
-            ad['My.CMS_Type'] = classad.quote(activityToType(job['activity']))
-     
-            # Handling for AWS, cloud and opportunistic resources
-            ad['My.AllowOpportunistic'] = str(job.get('allowOpportunistic', False))
-            if job.get('inputDataset'):
-                ad['My.DESIRED_CMSDataset'] = classad.quote(job['inputDataset'])
-            else:
-                ad['My.DESIRED_CMSDataset'] = undefined
             if job.get('inputDatasetLocations'):
-                sites = ','.join(sorted(job['inputDatasetLocations']))
-                ad['My.DESIRED_CMSDataLocations'] = classad.quote(str(sites))
+                ad['My.DESIRED_CMSDataLocations'] = self._quotedList(job['inputDatasetLocations'])
             else:
                 ad['My.DESIRED_CMSDataLocations'] = undefined
             if job.get('inputPileup'):
-                cmsPileups=','.join(sorted(job['inputPileup']))
-                ad['My.DESIRED_CMSPileups'] = classad.quote(str(cmsPileups))
+                ad['My.DESIRED_CMSPileups'] = self._quotedList(job['inputPileup'])
             else:
                 ad['My.DESIRED_CMSPileups'] = undefined
-            # HighIO and repack jobs
-            ad['My.Requestioslots'] = str(1 if job['task_type'] in ["Merge", "Cleanup", "LogCollect"] else 0)
-            ad['My.RequestRepackslots'] = str(1 if job['task_type'] == 'Repack' else 0)
-            # Performance and resource estimates (including JDL magic tweaks)
-            origCores = job.get('numberOfCores', 1)
-            estimatedMins = int(job['estimatedJobTime'] / 60.0) if job.get('estimatedJobTime') else 12 * 60
-            estimatedMinsSingleCore = estimatedMins * origCores
-            # For now, assume a 15 minute job startup overhead -- condor will round this up further
-            ad['My.EstimatedSingleCoreMins'] = str(estimatedMinsSingleCore)
-            ad['My.OriginalMaxWallTimeMins'] = str(estimatedMins)
-            ad['My.MaxWallTimeMins'] = 'WMCore_ResizeJob ? (EstimatedSingleCoreMins/RequestCpus + 15) : OriginalMaxWallTimeMins'
-            requestMemory = int(job['estimatedMemoryUsage']) if job.get('estimatedMemoryUsage', None) else 1000
-            ad['My.OriginalMemory'] = str(requestMemory)
-            ad['My.ExtraMemory'] = str(self.extraMem)
-            ad['request_memory'] = 'OriginalMemory + ExtraMemory * (WMCore_ResizeJob ? (RequestCpus-OriginalCpus) : 0)'
-            requestDisk = int(job['estimatedDiskUsage']) if job.get('estimatedDiskUsage', None) else 20 * 1000 * 1000 * origCores
-            ad['request_disk'] = str(requestDisk)
-            # Set up JDL for multithreaded jobs.
-            # By default, RequestCpus will evaluate to whatever CPU request was in the workflow.
-            # If the job is labelled as resizable, then the logic is more complex:
-            # - If the job is running in a slot with N cores, this should evaluate to N
-            # - If the job is being matched against a machine, match all available CPUs, provided
-            # they are between min and max CPUs.
-            # - Otherwise, just use the original CPU count.
-            ad['My.MinCores'] = str(job.get('minCores', max(1, origCores / 2)))
-            ad['My.MaxCores'] = str(max(int(job.get('maxCores', origCores)), origCores))
-            ad['My.OriginalCpus'] = str(origCores)
-            # Prefer slots that are closest to our MaxCores without going over.
-            # If the slot size is _greater_ than our MaxCores, we prefer not to
-            # use it - we might unnecessarily fragment the slot.
-            ad['Rank'] = 'isUndefined(Cpus) ? 0 : ifThenElse(Cpus > MaxCores, -Cpus, Cpus)'
-            # Record the number of CPUs utilized at match time.  We'll use this later
-            # for monitoring and accounting.  Defaults to 0; once matched, it'll
-            # put an attribute in the job  MATCH_EXP_JOB_GLIDEIN_Cpus = 4
-            ad['My.JOB_GLIDEIN_Cpus'] = classad.quote("$$(Cpus:0)")
-            # Make sure the resize request stays within MinCores and MaxCores.
-            ad['My.RequestResizedCpus'] = '(Cpus>MaxCores) ? MaxCores : ((Cpus < MinCores) ? MinCores : Cpus)'
-            # If the job is running, then we should report the matched CPUs in RequestCpus - but only if there are sane
-            # values.  Otherwise, we just report the original CPU request
-            ad['My.JobCpus'] = ('((JobStatus =!= 1) && (JobStatus =!= 5) && !isUndefined(MATCH_EXP_JOB_GLIDEIN_Cpus) '
-                              '&& (int(MATCH_EXP_JOB_GLIDEIN_Cpus) isnt error)) ? int(MATCH_EXP_JOB_GLIDEIN_Cpus) : OriginalCpus')
-            # Cpus is taken from the machine ad - hence it is only defined when we are doing negotiation.
-            # Otherwise, we use either the cores in the running job (if available) or the original cores.
-            ad['request_cpus'] = 'WMCore_ResizeJob ? (!isUndefined(Cpus) ? RequestResizedCpus : JobCpus) : OriginalCpus'
-            ad['My.WMCore_ResizeJob'] = str(job.get('resizeJob', False))
-            taskPriority = int(job.get('taskPriority', 1))
-            priority = int(job.get('wf_priority', 0))
-            ad['My.JobPrio'] = str(int(priority + taskPriority * 1))
             ad['My.PostJobPrio1'] = str(int(-1 * len(job.get('potentialSites', []))))
-            ad['My.PostJobPrio2'] = str(int(-1 * job['task_id']))
-            # Add OS requirements for jobs
-            requiredOSes = self.scramArchtoRequiredOS(job.get('scramArch'))
-            ad['My.REQUIRED_OS'] = classad.quote(requiredOSes)
-            cmsswVersions = ','.join(job.get('swVersion'))
-            ad['My.CMSSW_Versions'] = classad.quote(cmsswVersions)
-     
-            jobParameters.append(ad)    
-             
+
+            jobParameters.append(ad)
+
         return jobParameters
 
 
@@ -648,6 +837,10 @@ class SimpleCondorPlugin(BasePlugin):
         sub['My.CMS_WMTool'] = classad.quote("WMAgent")
         sub['My.CMS_SubmissionTool'] = classad.quote("WMAgent")
 
+        if self.sandboxCacheDir:
+            sub['environment'] = '"WMAGENT_SANDBOX_CACHE=%s WMAGENT_SANDBOX_CACHE_SIZE=%d"' % (self.sandboxCacheDir,
+                                                                                               self.sandboxCacheSize)
+
         jobParameters = self.getJobParameters(jobList)
        
         return sub, jobParameters
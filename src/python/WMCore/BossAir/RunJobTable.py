@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+_RunJobTable_
+
+In-process table of the active RunJobs, indexed by runjob id, wmbs id,
+grid id and status. It's loaded from the database once by BossAirAPI and
+then kept up to date in place, such that tracking cycles don't need to
+rebuild every RunJob from the database.
+"""
+
+from collections import defaultdict
+
+# fields of a RunJob that can be updated from a partial copy of it
+UPDATABLE_FIELDS = ['status', 'status_time', 'location', 'retry_count', 'globalState']
+
+
+class RunJobTable(object):
+    """
+    _RunJobTable_
+
+    The RunJob objects are owned by the table: the BossAir plugins receive
+    them as they are and may modify them in place, in which case reindex()
+    must be called for those whose gridid or status changed.
+    """
+
+    def __init__(self, runJobs=None):
+        self.jobs = {}
+        self.byJobID = defaultdict(set)
+        self.byGridID = {}
+        self.byStatus = defaultdict(set)
+        # index values per runjob id, to update the indexes on changes
+        self._indexed = {}
+
+        self.add(runJobs or [])
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __contains__(self, runJobID):
+        return runJobID in self.jobs
+
+    def ids(self):
+        """
+        _ids_
+
+        Set of runjob ids in the table
+        """
+        return set(self.jobs)
+
+    def _unindex(self, runJobID):
+        jobId, gridId, status = self._indexed.pop(runJobID)
+        self.byJobID[jobId].discard(runJobID)
+        if not self.byJobID[jobId]:
+            del self.byJobID[jobId]
+        if self.byGridID.get(gridId) == runJobID:
+            del self.byGridID[gridId]
+        self.byStatus[status].discard(runJobID)
+        if not self.byStatus[status]:
+            del self.byStatus[status]
+
+    def _index(self, runJob):
+        runJobID = runJob['id']
+        self._indexed[runJobID] = (runJob['jobid'], runJob['gridid'], runJob['status'])
+        self.byJobID[runJob['jobid']].add(runJobID)
+        if runJob['gridid'] is not None:
+            self.byGridID[runJob['gridid']] = runJobID
+        self.byStatus[runJob['status']].add(runJobID)
+
+    def add(self, runJobs):
+        """
+        _add_
+
+        Add (or replace) RunJobs in the table
+        """
+        for runJob in runJobs:
+            if runJob['id'] in self.jobs:
+                self._unindex(runJob['id'])
+            self.jobs[runJob['id']] = runJob
+            self._index(runJob)
+        return
+
+    def remove(self, runJobIDs):
+        """
+        _remove_
+
+        Remove RunJobs from the table given their ids, unknown ids are ignored
+        """
+        for runJobID in runJobIDs:
+            if self.jobs.pop(runJobID, None) is not None:
+                self._unindex(runJobID)
+        return
+
+    def reindex(self, runJobs):
+        """
+        _reindex_
+
+        Update the indexes of RunJobs of the table modified in place
+        """
+        for runJob in runJobs:
+            if self.jobs.get(runJob['id']) is runJob and \
+                    self._indexed[runJob['id']] != (runJob['jobid'], runJob['gridid'], runJob['status']):
+                self._unindex(runJob['id'])
+                self._index(runJob)
+        return
+
+    def update(self, runJobs):
+        """
+        _update_
+
+        Copy the updatable fields of other RunJob instances into the
+        RunJobs of the table with the same id
+        """
+        changedJobs = []
+        for runJob in runJobs:
+            tableJob = self.jobs.get(runJob['id'])
+            if tableJob is None or tableJob is runJob:
+                continue
+            for field in UPDATABLE_FIELDS:
+                if runJob.get(field) is not None:
+                    tableJob[field] = runJob[field]
+            changedJobs.append(tableJob)
+        self.reindex(changedJobs)
+        return
+
+    def get(self, runJobID):
+        """
+        _get_
+
+        RunJob by runjob id, None if unknown
+        """
+        return self.jobs.get(runJobID)
+
+    def getByJobID(self, jobId):
+        """
+        _getByJobID_
+
+        List of RunJobs of a wmbs job, normally only one is active
+        """
+        return [self.jobs[runJobID] for runJobID in self.byJobID.get(jobId, [])]
+
+    def getByGridID(self, gridId):
+        """
+        _getByGridID_
+
+        RunJob by grid id, None if unknown
+        """
+        return self.jobs.get(self.byGridID.get(gridId))
+
+    def getByStatus(self, status):
+        """
+        _getByStatus_
+
+        List of RunJobs in a given status
+        """
+        return [self.jobs[runJobID] for runJobID in self.byStatus.get(status, [])]
+
+    def listJobs(self, runJobIDs=None, wmbsIDs=None):
+        """
+        _listJobs_
+
+        List the RunJobs in the table, optionally only those with the given
+        runjob ids and/or wmbs ids
+        """
+        if not runJobIDs and not wmbsIDs:
+            return list(self.jobs.values())
+
+        selected = set(self.jobs)
+        if runJobIDs:
+            selected &= set(runJobIDs)
+        if wmbsIDs:
+            selected &= set().union(*[self.byJobID.get(jobId, set()) for jobId in wmbsIDs])
+        return [self.jobs[runJobID] for runJobID in sorted(selected)]
@@ -24,7 +24,6 @@ import copy
 import itertools
 import json
 import re
-import urllib.request
 from contextlib import closing
 
 class LumiList(object):
@@ -68,6 +67,8 @@ class LumiList(object):
                 self.compactList = json.load(jsonFile)
         elif url:
             self.url = url
+            # slow to import, only needed here
+            import urllib.request
             with closing(urllib.request.urlopen(url)) as jsonFile:
                 self.compactList = json.load(jsonFile)
         elif lumis:
@@ -18,12 +18,14 @@ import urllib.request, urllib.parse, urllib.error
 
 import base64
 import hashlib
+import json
 import logging
 import re
 import time
 import traceback
 from datetime import datetime
 from http.client import HTTPException
+from multiprocessing.pool import ThreadPool
 
 from Utils.IteratorTools import grouper, nestedDictUpdate
 from WMCore.Services.Requests import JSONRequests
@@ -83,6 +85,81 @@ class Document(dict):
         return jsonDict
 
 
+class CouchRowDecoder(object):
+    """
+    Incremental decoder of couch responses sending one row per line: views
+    and _all_docs ({"total_rows":...,"rows":[ then a line per row, then ]})
+    and lists sending a JSON array one element per line, also the normal
+    _changes feed ({"results":[ then a line per change). The other keys of
+    the response go to the header attribute. Responses laid out otherwise,
+    e.g. errors, are decoded once complete.
+    """
+
+    def __init__(self, loads=json.loads):
+        """
+        loads is the function decoding the JSON text of a row
+        """
+        self.loads = loads
+        self.header = {}
+
+    @staticmethod
+    def _lines(chunks):
+        """
+        Yield the lines of the body as soon as they are complete
+        """
+        pending = []
+        for chunk in chunks:
+            lines = chunk.split(b"\n")
+            if len(lines) == 1:
+                pending.append(chunk)
+                continue
+            pending.append(lines[0])
+            yield b"".join(pending)
+            for line in lines[1:-1]:
+                yield line
+            pending = [lines[-1]]
+        yield b"".join(pending)
+
+    def decode(self, chunks):
+        """
+        Yield the rows of the response body given in chunks of bytes, each
+        row as soon as its line is received
+        """
+        lines = self._lines(chunks)
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.endswith(b"["):
+                if line != b"[":
+                    # drop the (empty) list of the rows, "rows" or "results"
+                    header = self.loads((line + b"]}").decode("utf-8"))
+                    self.header = dict((k, v) for k, v in viewitems(header) if v != [])
+                break
+            # not a row per line, decode the whole body
+            data = self.loads(b"\n".join([line] + list(lines)).decode("utf-8"))
+            if isinstance(data, dict):
+                rows = data.pop("rows", data.pop("results", []))
+                self.header = data
+            else:
+                rows = data if isinstance(data, list) else [data]
+            for row in rows:
+                yield row
+            return
+
+        for line in lines:
+            line = line.strip()
+            if line.startswith(b"]"):
+                # end of the rows, maybe followed by more keys: ],"update_seq":...}
+                trailer = b"\n".join([line[1:]] + list(lines)).strip()
+                if trailer.startswith(b","):
+                    self.header.update(self.loads((b"{" + trailer[1:]).decode("utf-8")))
+                return
+            line = line.strip(b",")
+            if line:
+                yield self.loads(line.decode("utf-8"))
+
+
 class CouchDBRequests(JSONRequests):
     """
     CouchDB has two non-standard HTTP calls, implement them here for
@@ -131,6 +208,22 @@ class CouchDBRequests(JSONRequests):
 
         return result
 
+    def streamRequest(self, uri=None, data=None, type='GET', incoming_headers=None,
+                      encode=True, contentType=None):
+        """
+        Make the request like makeRequest, but yield the undecoded body in
+        chunks as they arrive. Never cached.
+        """
+        incoming_headers = incoming_headers or {}
+        incoming_headers.update({'Cache-Control': 'no-cache'})
+        try:
+            for chunk in JSONRequests.streamRequest(self, uri, data, type, incoming_headers,
+                                                    encode, contentType):
+                yield chunk
+        except HTTPException as e:
+            self.checkForCouchError(getattr(e, "status", None),
+                                    getattr(e, "reason", None), data)
+
     def checkForCouchError(self, status, reason, data=None, result=None):
         """
         _checkForCouchError_
@@ -493,6 +586,24 @@ class Database(CouchDBRequests):
         self.last_seq = data['last_seq']
         return data
 
+    def iterChanges(self, since=-1, limit=None, include_docs=False):
+        """
+        Iterate over the changes since sequence number, decoding them as
+        they arrive. Store the last sequence value to self.last_seq once
+        they are all read. If the since is negative use self.last_seq.
+        """
+        if since == -1:
+            since = self.last_seq
+        options = {'since': since}
+        if limit:
+            options['limit'] = limit
+        if include_docs:
+            options['include_docs'] = 'true'
+        decoder = CouchRowDecoder(self.decode)
+        for row in decoder.decode(self.streamRequest('/%s/_changes' % self.name, options)):
+            yield row
+        self.last_seq = decoder.header.get('last_seq', self.last_seq)
+
     def purge(self, data):
         return self.post('/%s/_purge' % self.name, data)
 
@@ -550,6 +661,125 @@ class Database(CouchDBRequests):
         else:
             return retval
 
+    def iterView(self, design, view, options=None, keys=None, pageSize=1000, threads=1):
+        """
+        Iterate over the rows of a view, like loadView but fetching at most
+        pageSize rows (or keys) per request, so that neither Couch nor the
+        client hold the whole result at once.
+
+        Without keys, pages follow each other from the key and document id
+        of the first row of the next page (startkey/startkey_docid), not
+        with skip, which couch has to walk through. The startkey, endkey,
+        descending and limit options are honoured. With keys, they are
+        fetched in partitions of pageSize keys, threads partitions at a time.
+        Rows are yielded in the order loadView would return them.
+        """
+        uri = '/%s/_design/%s/_view/%s' % (self.name, design, view)
+        return self._iterRows(uri, options, keys, pageSize, threads)
+
+    def iterAllDocs(self, options=None, keys=None, pageSize=1000, threads=1):
+        """
+        Iterate over the rows of _all_docs, paginated like iterView
+        """
+        return self._iterRows('/%s/_all_docs' % self.name, options, keys, pageSize, threads)
+
+    def _fetchRows(self, uri, options, keys=None, loads=None):
+        """
+        Yield the rows of one view request as they are received
+        """
+        encodedOptions = {}
+        for k, v in viewitems(options):
+            # stale can't be encoded, see loadView
+            encodedOptions[k] = v if k == "stale" else self.encode(v)
+        if keys:
+            if encodedOptions:
+                uri = '%s?%s' % (uri, urllib.parse.urlencode(encodedOptions))
+            chunks = self.streamRequest(uri, {'keys': keys}, 'POST')
+        else:
+            chunks = self.streamRequest(uri, encodedOptions)
+        decoder = CouchRowDecoder(loads or self.decode)
+        for row in decoder.decode(chunks):
+            yield row
+        if 'error' in decoder.header:
+            raise RuntimeError("Error in CouchDB: viewError '%s' reason '%s'" % \
+                               (decoder.header['error'], decoder.header['reason']))
+
+    def _iterRows(self, uri, options, keys, pageSize, threads):
+        """
+        Dispatch to the paging on keys or on the view range
+        """
+        options = dict(options or {})
+        if keys:
+            partitions = [keys[i:i + pageSize] for i in range(0, len(keys), pageSize)]
+            return self._iterKeyPartitions(uri, options, partitions, threads)
+        return self._iterPages(uri, options, pageSize)
+
+    def _iterPages(self, uri, options, pageSize):
+        """
+        Yield the rows of a view range, one page at a time
+        """
+        def sameRow(row, other):
+            return row['key'] == other['key'] and row.get('id') == other.get('id')
+
+        if 'key' in options:
+            options['startkey'] = options['endkey'] = options.pop('key')
+        limit = options.pop('limit', None)
+        skip = 0
+        while limit is None or limit > 0:
+            pageLimit = pageSize if limit is None else min(pageSize, limit)
+            # one more row than needed gives where the next page starts
+            options['limit'] = pageLimit + 1
+            count, run, lastRow, nextRow = 0, 0, None, None
+            for row in self._fetchRows(uri, options):
+                if count == pageLimit:
+                    nextRow = row
+                    break
+                # rows of the same key and document, when a document emits
+                # a key several times
+                run = run + 1 if lastRow is not None and sameRow(row, lastRow) else 1
+                lastRow = row
+                count += 1
+                yield row
+            if nextRow is None:
+                return
+            if limit is not None:
+                limit -= pageLimit
+
+            options['startkey'] = nextRow['key']
+            if 'id' in nextRow:
+                options['startkey_docid'] = nextRow['id']
+            # the next page starts at the first of the rows like nextRow, skip
+            # those already yielded, on the previous pages too if the whole
+            # page is made of them
+            if not sameRow(lastRow, nextRow):
+                run = 0
+            skip = run + skip if run == count else run
+            options['skip'] = skip
+
+    def _iterKeyPartitions(self, uri, options, partitions, threads):
+        """
+        Yield the rows for each partition of the keys, fetching up to threads
+        partitions concurrently
+        """
+        if threads <= 1 or len(partitions) == 1:
+            for partition in partitions:
+                for row in self._fetchRows(uri, options, partition):
+                    yield row
+            return
+
+        pool = ThreadPool(min(threads, len(partitions)))
+        try:
+            for i in range(0, len(partitions), threads):
+                results = pool.map(lambda partition: list(self._fetchRows(uri, options, partition)),
+                                   partitions[i:i + threads], chunksize=1)
+                for rows in results:
+                    for row in rows:
+                        yield row
+                del results
+        finally:
+            pool.close()
+            pool.join()
+
     def loadList(self, design, list, view, options=None, keys=None):
         """
         Load data from a list function. This returns data that hasn't been
@@ -580,6 +810,15 @@ class Database(CouchDBRequests):
 
         return retval
 
+    def iterList(self, design, list, view, options=None, keys=None):
+        """
+        Iterate over the output of a list function sending a JSON array one
+        element per line, decoding each element as soon as it is received,
+        instead of returning the whole undecoded output like loadList.
+        """
+        uri = '/%s/_design/%s/_list/%s/%s' % (self.name, design, list, view)
+        return self._fetchRows(uri, options or {}, keys, loads=json.loads)
+
     def getDoc(self, docName):
         """
         Return a single document from the database.
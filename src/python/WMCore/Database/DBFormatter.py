@@ -12,10 +12,31 @@ import datetime
 import time
 import types
 
+from future.utils import with_metaclass
+
+from Utils.Timers import countCalls
 from WMCore.DataStructs.WMObject import WMObject
 
 
-class DBFormatter(WMObject):
+class CountedDAO(type):
+    """
+    Metaclass wrapping the execute method of every DAO class once, when the
+    class is created, such that its calls are accounted under the module of
+    the class in the process wide call counter when it's enabled
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(CountedDAO, cls).__init__(name, bases, attrs)
+        for klass in cls.__mro__:
+            if 'execute' in klass.__dict__:
+                execute = klass.__dict__['execute']
+                # inherited methods are wrapped again under this class module
+                execute = getattr(execute, '__wrapped__', execute)
+                cls.execute = countCalls("DAO", cls.__module__, execute)
+                break
+
+
+class DBFormatter(with_metaclass(CountedDAO, WMObject)):
     def __init__(self, logger, dbinterface):
         """
         The class holds a connection to the database in self.dbi. This is a
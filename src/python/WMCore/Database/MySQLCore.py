@@ -6,6 +6,7 @@ Handle bind variable parsing for MySQL.
 """
 
 import copy
+import re
 
 from WMCore.Database.DBCore import DBInterface
 from WMCore.Database.ResultSet import ResultSet
@@ -58,6 +59,9 @@ class MySQLInterface(DBInterface):
         :bind_name becomes %s.
 
         See: http://www.devshed.com/c/a/Python/MySQL-Connectivity-With-Python/5/
+
+        Binds that already are tuples are positional, in the order of the
+        bind variables in the sql, and are passed through unchanged.
         """
         if origBindsList == None:
             return origSQL, None
@@ -65,6 +69,9 @@ class MySQLInterface(DBInterface):
         origBindsList = self.makelist(origBindsList)
         origBind = origBindsList[0]
 
+        if isinstance(origBind, tuple):
+            return re.sub(r":[A-Za-z_]\w*", "%s", origSQL), origBindsList
+
         bindVarPositionList = []
         updatedSQL = copy.copy(origSQL)
 
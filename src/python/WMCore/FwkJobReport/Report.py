@@ -1427,6 +1427,21 @@ class Report(object):
 
         return
 
+    def setStepPSS(self, stepName, minimum, maximum, average):
+        """
+        _setStepPSS_
+
+        Set the Performance PSS information
+        """
+
+        reportStep = self.retrieveStep(stepName)
+        reportStep.performance.section_('PSSMemory')
+        reportStep.performance.PSSMemory.min = minimum
+        reportStep.performance.PSSMemory.max = maximum
+        reportStep.performance.PSSMemory.average = average
+
+        return
+
     def setStepPMEM(self, stepName, minimum, maximum, average):
         """
         _setStepPMEM_
@@ -17,6 +17,7 @@ import io
 import logging
 import mmap
 import re
+from functools import lru_cache
 
 from urllib.parse import urlparse, urlunparse
 
@@ -65,6 +66,11 @@ CONDOR_LOG_FILTER_REGEXP = re.compile(r"%s|%s" % (CONDOR_LOG_REASON_FILTER, COND
                                       re.DOTALL)
 
 
+DBSUSER_RES = [r'^/[a-zA-Z][a-zA-Z0-9/\=\s()\']*\=[a-zA-Z0-9/\=\.\-_/#:\s\']*$',
+               r'^[a-zA-Z0-9/][a-zA-Z0-9/\.\-_\']*$',
+               r'^[a-zA-Z0-9/][a-zA-Z0-9/\.\-_]*@[a-zA-Z0-9/][a-zA-Z0-9/\.\-_]*$']
+
+
 def DBSUser(candidate):
     """
     create_by and last_modified_by in DBS are in several formats. The major ones are:
@@ -74,26 +80,7 @@ def DBSUser(candidate):
     """
     if candidate == '' or not candidate:
         return candidate
-    r1 = r'^/[a-zA-Z][a-zA-Z0-9/\=\s()\']*\=[a-zA-Z0-9/\=\.\-_/#:\s\']*$'
-    r2 = r'^[a-zA-Z0-9/][a-zA-Z0-9/\.\-_\']*$'
-    r3 = r'^[a-zA-Z0-9/][a-zA-Z0-9/\.\-_]*@[a-zA-Z0-9/][a-zA-Z0-9/\.\-_]*$'
-
-    errorMsg = "DBSUser candidate: %s doesn't match any of the following regular expressions:\n" % candidate
-    try:
-        return check(r1, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % r1
-
-    try:
-        return check(r2, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % r2
-
-    try:
-        return check(r3, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % r3
-        raise AssertionError(errorMsg)
+    return checkAny(DBSUSER_RES, candidate, "DBSUser")
 
 
 def searchblock(candidate):
@@ -343,6 +330,30 @@ def hnName(candidate):
     return check(validName, candidate)
 
 
+_LFN_RE1 = '/([a-z]+)/([a-z0-9]+)/(%(era)s)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root' % lfnParts
+_LFN_RE2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
+_LFN_RE3 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(procDS)s/%(version)s/%(counter)s/%(root)s' % lfnParts
+_LFN_RE4 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts
+
+_OLD_STYLE_TIER0_LFN = '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts
+_TIER0_LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts
+
+_STORE_MC_LFN = '/store/mc/(%(era)s)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root' % lfnParts
+
+_STORE_RESULTS2_LFN = '/store/results/%(physics_group)s/%(primDS)s/%(procDS)s/%(primDS)s/%(tier)s/%(procDS)s/%(counter)s/%(root)s' % lfnParts
+
+_STORE_RESULT_ROOT_PART = '%(counter)s/%(root)s' % lfnParts
+_STORE_RESULTS_LFN = "%s/%s" % (STORE_RESULTS_LFN, _STORE_RESULT_ROOT_PART)
+
+_LHE_LFN1 = '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}'
+# This is for future lhe LFN structure. Need to be tested.
+_LHE_LFN2 = '/store/lhe/%(era)s/%(primDS)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts
+
+# in the order they are tried
+LFN_RES = [_LFN_RE1, _LFN_RE2, _LFN_RE3, _LFN_RE4, _TIER0_LFN, _OLD_STYLE_TIER0_LFN, _STORE_MC_LFN,
+           _LHE_LFN1, _LHE_LFN2, _STORE_RESULTS2_LFN, _STORE_RESULTS_LFN]
+
+
 def lfn(candidate):
     """
     Should be of the following form:
@@ -355,82 +366,16 @@ def lfn(candidate):
 
     Add for LHE files: /data/lhe/...
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/(%(era)s)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root' % lfnParts
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
-    regexp3 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(procDS)s/%(version)s/%(counter)s/%(root)s' % lfnParts
-    regexp4 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts
-
-    oldStyleTier0LFN = '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts
-
-    storeMcLFN = '/store/mc/(%(era)s)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root' % lfnParts
-
-    storeResults2LFN = '/store/results/%(physics_group)s/%(primDS)s/%(procDS)s/%(primDS)s/%(tier)s/%(procDS)s/%(counter)s/%(root)s' % lfnParts
-
-    storeResultRootPart = '%(counter)s/%(root)s' % lfnParts
-    storeResultsLFN = "%s/%s" % (STORE_RESULTS_LFN, storeResultRootPart)
-
-    lheLFN1 = '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}'
-    # This is for future lhe LFN structure. Need to be tested.
-    lheLFN2 = '/store/lhe/%(era)s/%(primDS)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts
-
-    errorMsg = "LFN candidate: %s doesn't match any of the following regular expressions:\n" % candidate
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp1
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp2
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp3
+    return checkAny(LFN_RES, candidate, "LFN")
 
-    try:
-        return check(regexp4, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp4
 
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % tier0LFN
+_LFNBASE_RE1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)'
+_LFNBASE_RE2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}'
+_LFNBASE_RE3 = '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(procDS)s/%(version)s' % lfnParts
 
-    try:
-        return check(oldStyleTier0LFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % oldStyleTier0LFN
+_TIER0_LFNBASE = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts
 
-    try:
-        return check(storeMcLFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % storeMcLFN
-
-    try:
-        return check(lheLFN1, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % lheLFN1
-
-    try:
-        return check(lheLFN2, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % lheLFN2
-
-    try:
-        return check(storeResults2LFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % storeResults2LFN
-
-    try:
-        return check(storeResultsLFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % storeResultsLFN
-        raise AssertionError(errorMsg)
+LFNBASE_RES = [_LFNBASE_RE1, _LFNBASE_RE2, _LFNBASE_RE3, _TIER0_LFNBASE, STORE_RESULTS_LFN]
 
 
 def lfnBase(candidate):
@@ -438,39 +383,7 @@ def lfnBase(candidate):
     As lfn above, but for doing the lfnBase
     i.e., for use in spec generation and parsing
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)'
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}'
-    regexp3 = '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(procDS)s/%(version)s' % lfnParts
-
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts
-
-    errorMsg = "LFN candidate: %s doesn't match any of the following regular expressions:\n" % candidate
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp1
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp2
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % regexp3
-
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % tier0LFN
-
-    try:
-        return check(STORE_RESULTS_LFN, candidate)
-    except AssertionError:
-        errorMsg += "  %s\n" % STORE_RESULTS_LFN
-        raise AssertionError(errorMsg)
+    return checkAny(LFNBASE_RES, candidate, "LFN")
 
 
 def userLfn(candidate):
@@ -518,15 +431,43 @@ def validateUrl(candidate):
     return check(regex_url, candidate)
 
 
+@lru_cache(maxsize=1024)
+def compileRegexp(regexp):
+    """
+    _compileRegexp_
+
+    Return the compiled regular expression of a pattern, compiling it only
+    the first time it is used
+    """
+    return re.compile(regexp)
+
+
 def check(regexp, candidate, maxLength=None):
     if maxLength is not None:
         assert len(candidate) <= maxLength, \
             "%s is longer than max length (%s) allowed" % (candidate, maxLength)
-    assert re.compile(regexp).match(candidate) is not None, \
+    compiled = compileRegexp(regexp)
+    assert compiled.match(candidate) is not None, \
         "'%s' does not match regular expression %s" % (candidate, regexp)
     return True
 
 
+def checkAny(regexps, candidate, label):
+    """
+    _checkAny_
+
+    Check the candidate matches one of the regular expressions, tried in
+    turn. Otherwise the error message lists them all.
+    """
+    for regexp in regexps:
+        compiled = compileRegexp(regexp)
+        if compiled.match(candidate) is not None:
+            return True
+    errorMsg = "%s candidate: %s doesn't match any of the following regular expressions:\n" % (label, candidate)
+    errorMsg += "".join("  %s\n" % regexp for regexp in regexps)
+    raise AssertionError(errorMsg)
+
+
 def parseLFN(candidate):
     """
     _parseLFN_
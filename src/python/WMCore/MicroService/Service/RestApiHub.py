@@ -11,6 +11,7 @@ from __future__ import print_function, division
 import cherrypy
 
 # WMCore modules
+from Utils.RateLimiter import rateLimiterFromConfig
 from WMCore.Configuration import Configuration
 from WMCore.REST.Server import RESTApi
 from WMCore.MicroService.Service.Data import Data
@@ -31,6 +32,8 @@ class RestApiHub(RESTApi):
 
         cherrypy.log("MicroService entire configuration:\n%s" % Configuration.getInstance())
         cherrypy.log("MicroService REST configuration subset:\n%s" % config)
+        # per user and API quotas, if configured
+        self.rate_limiter = rateLimiterFromConfig(config, "microservice")
 
         self._add({"status": Data(app, self, config, mount),
                    "info": Data(app, self, config, mount)})
@@ -12,6 +12,7 @@ from traceback import format_exc
 
 import cherrypy
 
+from Utils.Utilities import encodeUnicodeToBytes
 from WMCore.REST.Error import RESTError, ExecutionError, report_rest_error
 
 try:
@@ -19,6 +20,50 @@ try:
 except ImportError:
     from cherrypy.lib import http as httputil
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+#: Encoder of the standard library, created once for all the responses.
+_json_encode = json.JSONEncoder().encode
+
+def _orjson_encode(obj):
+    """Render `obj` with orjson, falling back to the standard library for
+    the few values orjson refuses, e.g. integers beyond 64 bits."""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:
+        return _json_encode(obj)
+
+def _ujson_encode(obj):
+    """Render `obj` with ujson, falling back to the standard library."""
+    try:
+        return ujson.dumps(obj, escape_forward_slashes=False)
+    except (TypeError, OverflowError):
+        return _json_encode(obj)
+
+def json_encoder(name='json'):
+    """Return a function rendering an object into a JSON string using the
+    `name` library: 'json' for the standard library, 'orjson', 'ujson', or
+    'fast' for the fastest of them available. The fast libraries only differ
+    from the standard one by not adding spaces after separators and not
+    escaping non-ASCII characters, so APIs have to opt in to use them."""
+    if name == 'fast':
+        name = (orjson and 'orjson') or (ujson and 'ujson') or 'json'
+    if name == 'orjson' and orjson:
+        return _orjson_encode
+    elif name == 'ujson' and ujson:
+        return _ujson_encode
+    elif name == 'json':
+        return _json_encode
+    raise ValueError("JSON encoder '%s' is not available" % name)
+
 def vary_by(header):
     """Add 'Vary' header for `header`."""
     varies = cherrypy.response.headers.get('Vary', '')
@@ -207,7 +252,7 @@ class JSONFormat(RESTFormat):
     must inspect the X-REST-Status trailer header to find out if it got the
     complete output. No ETag header is generated in case of an exception.
 
-    The ETag generation is deterministic only if `cjson.encode()` output is
+    The ETag generation is deterministic only if the JSON encoder output is
     deterministic for the input. Beware in particular the key order for a
     dict is arbitrary and may differ for two semantically identical dicts.
 
@@ -230,38 +275,67 @@ class JSONFormat(RESTFormat):
     dictionary and an array ("``{key: [``"), one line of JSON rendering of
     each object in `stream`, with the first line starting with exactly one
     space and second and subsequent lines starting with a comma, and one
-    final trailer line consisting of "``]}``". Each line is generated as a
-    HTTP transfer chunk. This format is fixed so readers can be constructed
-    to read and parse the stream incrementally one line at a time,
-    facilitating maximum throughput processing of the response."""
+    final trailer line consisting of "``]}``". This format is fixed so
+    readers can be constructed to read and parse the stream incrementally
+    one line at a time, facilitating maximum throughput processing of the
+    response.
+
+    Lines are coalesced into HTTP transfer chunks of about `chunk_size`
+    bytes, a chunk always holding complete lines; a `chunk_size` of zero
+    generates one chunk per line. Objects are rendered by the `encoder`
+    JSON library, by default the standard library; an API can opt in to a
+    faster one with e.g. ``JSONFormat(encoder='fast')`` (cf. `json_encoder()`)."""
+
+    def __init__(self, encoder='json', chunk_size=64 * 1024):
+        self.encode = json_encoder(encoder)
+        self.chunk_size = chunk_size
 
     def stream_chunked(self, stream, etag, preamble, trailer):
         """Generator for actually producing the output."""
         comma = " "
+        encode = self.encode
+        chunk_size = self.chunk_size
+        pending = []
+        npending = 0
 
         try:
             if preamble:
-                etag.update(preamble)
-                yield preamble
+                pending.append(preamble)
+                npending = len(preamble)
+                if npending >= chunk_size:
+                    etag.update(preamble)
+                    yield preamble
+                    pending = []
+                    npending = 0
 
             try:
                 for obj in stream:
-                    chunk = comma + json.dumps(obj) + "\n"
-                    etag.update(chunk)
-                    yield chunk
+                    line = comma + encode(obj) + "\n"
+                    pending.append(line)
+                    npending += len(line)
                     comma = ","
+                    if npending >= chunk_size:
+                        chunk = "".join(pending)
+                        pending = []
+                        npending = 0
+                        etag.update(chunk)
+                        yield chunk
             except GeneratorExit:
                 etag.invalidate()
                 trailer = None
+                pending = None
                 raise
             except Exception as exp:
-                print("ERROR, json.dumps failed to serialize %s, type %s\nException: %s" \
+                print("ERROR, json encoding failed to serialize %s, type %s\nException: %s" \
                         % (obj, type(obj), str(exp)))
                 raise
             finally:
                 if trailer:
-                    etag.update(trailer)
-                    yield trailer
+                    pending.append(trailer)
+                if pending:
+                    chunk = "".join(pending)
+                    etag.update(chunk)
+                    yield chunk
 
             cherrypy.response.headers["X-REST-Status"] = 100
         except RESTError as e:
@@ -435,7 +509,7 @@ class DigestETag(object):
     def update(self, val):
         """Process response data `val`."""
         if self.digest:
-            self.digest.update(val)
+            self.digest.update(encodeUnicodeToBytes(val))
 
     def value(self):
         """Return ETag header value for current input."""
@@ -473,17 +547,18 @@ def _stream_compress_deflate(reply, compress_level, max_chunk):
     npending = 0
     pending = []
     for chunk in reply:
+        chunk = encodeUnicodeToBytes(chunk)
         pending.append(chunk)
         npending += len(chunk)
         if npending >= max_chunk:
-            part = z.compress("".join(pending)) + z.flush(zlib.Z_FULL_FLUSH)
+            part = z.compress(b"".join(pending)) + z.flush(zlib.Z_FULL_FLUSH)
             pending = []
             npending = 0
             yield part
 
     # Crank the compressor one more time for remaining output.
     if npending:
-        yield z.compress("".join(pending)) + z.flush(zlib.Z_FINISH)
+        yield z.compress(b"".join(pending)) + z.flush(zlib.Z_FINISH)
 
 # : Stream compression methods.
 _stream_compressor = {
@@ -491,6 +566,15 @@ _stream_compressor = {
   'deflate': _stream_compress_deflate
 }
 
+def stream_encoding(available, compress_level):
+    """Return the compression method `stream_compress()` uses for the current
+    request given the `available` methods and `compress_level`, None if the
+    response is not compressed."""
+    for enc in cherrypy.request.headers.elements('Accept-Encoding'):
+        if enc.value in available and enc.value in _stream_compressor and compress_level > 0:
+            return enc.value
+    return None
+
 def stream_compress(reply, available, compress_level, max_chunk):
     """If compression has been requested via Accept-Encoding request header,
     and is granted for this response via `available` compression methods,
@@ -500,20 +584,16 @@ def stream_compress(reply, available, compress_level, max_chunk):
     The `compression_level` tells how hard to compress, zero disables the
     compression entirely."""
 
-    global _stream_compressor
-    for enc in cherrypy.request.headers.elements('Accept-Encoding'):
-        if enc.value not in available:
-            continue
-
-        elif enc.value in _stream_compressor and compress_level > 0:
-            # Add 'Vary' header for 'Accept-Encoding'.
-            vary_by('Accept-Encoding')
+    enc = stream_encoding(available, compress_level)
+    if enc:
+        # Add 'Vary' header for 'Accept-Encoding'.
+        vary_by('Accept-Encoding')
 
-            # Compress contents at original chunk boundaries.
-            if 'Content-Length' in cherrypy.response.headers:
-                del cherrypy.response.headers['Content-Length']
-            cherrypy.response.headers['Content-Encoding'] = enc.value
-            return _stream_compressor[enc.value](reply, compress_level, max_chunk)
+        # Compress contents at original chunk boundaries.
+        if 'Content-Length' in cherrypy.response.headers:
+            del cherrypy.response.headers['Content-Length']
+        cherrypy.response.headers['Content-Encoding'] = enc
+        return _stream_compressor[enc](reply, compress_level, max_chunk)
 
     return reply
 
@@ -545,7 +625,7 @@ def _etag_tail(head, tail, etag):
     if etagval:
         cherrypy.response.headers["ETag"] = etagval
 
-def stream_maybe_etag(size_limit, etag, reply):
+def stream_maybe_etag(size_limit, etag, reply, on_buffered=None):
     """Maybe generate ETag header for the response, and handle If-Match
     and If-None-Match request headers. Consumes the reply until at most
     `size_limit` bytes. If the response fits into that size, adds the
@@ -563,7 +643,11 @@ def stream_maybe_etag(size_limit, etag, reply):
 
     Note that if this function is fed the output from `stream_compress()`
     as it normally would be, the `size_limit` constrains the compressed
-    size, and chunk boundaries correspond to compressed chunks."""
+    size, and chunk boundaries correspond to compressed chunks.
+
+    If `on_buffered` is given, it is called with the body and the ETag value
+    of a successful fully buffered response, before matching the ETag, e.g.
+    to keep the response in a cache."""
 
     req = cherrypy.request
     res = cherrypy.response
@@ -606,12 +690,17 @@ def stream_maybe_etag(size_limit, etag, reply):
     # The original stream generator must guarantee that if it fails it resets
     # the 'etag' value, even if the error handlers above didn't run.
     etagval = etag.value()
+    if result and isinstance(result[0], bytes):
+        result = b"".join(encodeUnicodeToBytes(chunk) for chunk in result)
+    else:
+        result = "".join(result)
+    assert len(result) == size
     if etagval:
         res.headers['ETag'] = etagval
+        if on_buffered:
+            on_buffered(result, etagval)
         _etag_match(res.status or 200, etagval, match, nomatch)
 
     # OK, respond with the buffered reply as a plain string.
     res.headers['Content-Length'] = size
-    result = "".join(result)
-    assert len(result) == size
     return result
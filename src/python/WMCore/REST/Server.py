@@ -3,20 +3,23 @@ from future.utils import viewitems, viewvalues, listvalues
 
 import cherrypy
 import inspect
+import logging
 import os
 import re
 import signal
 import string
 import time
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from functools import wraps
-from threading import Thread, Condition
+from threading import Thread, Condition, Lock
 
 from cherrypy import engine, expose, request, response, HTTPError, HTTPRedirect, tools
 from cherrypy.lib import cpstats
 
+from Utils.RateLimiter import TooManyRequests, requestUser
 from WMCore.REST.Error import *
 from WMCore.REST.Format import *
+from WMCore.REST.Format import _etag_match
 from WMCore.REST.Validation import validate_no_more_input
 
 try:
@@ -41,6 +44,19 @@ _COMPRESSIBLE = ['text/html', 'text/html; charset=utf-8',
 #: arguments either from the query string or body (but not both).
 RESTArgs = namedtuple("RESTArgs", ["args", "kwargs"])
 
+def _make_validator(validation):
+    """Combine the `validation` functions of an API into one function run
+    once per call, which returns the validated safe :obj:`RESTArgs` and
+    refuses calls with input left over after validation."""
+    validation = tuple(validation)
+    def validate(apiobj, method, api, param):
+        safe = RESTArgs([], {})
+        for v in validation:
+            v(apiobj, method, api, param, safe)
+        validate_no_more_input(param)
+        return safe
+    return validate
+
 
 ######################################################################
 ######################################################################
@@ -360,11 +376,77 @@ class RESTFrontPage(object):
 
     @expose
     def stats(self):
-        "Return CherryPy stats dict about underlying service activities"
+        """Return CherryPy stats dict about underlying service activities,
+        including the :class:`~.DBConnectionPoolStats` of database pools."""
         return cpstats.StatsPage().data()
 
 
 
+######################################################################
+######################################################################
+class ResponseCache(object):
+    """Server side cache of complete GET responses.
+
+    Holds the body of fully buffered responses exactly as they were sent,
+    i.e. already formatted and compressed, with their ETag and the response
+    headers to restore, keyed by whatever identifies the response, cf.
+    :meth:`.MiniRESTApi._cache_key`. An entry is valid until it expires, and
+    only as long as the data version it was built from, if any, is current.
+    Least recently used entries are evicted to keep the total body size
+    under `max_size` bytes."""
+
+    #: Response headers kept with the cached bodies.
+    HEADERS = ('Content-Type', 'Content-Encoding', 'Vary', 'Cache-Control',
+               'Expires', 'Pragma', 'X-REST-Status')
+
+    def __init__(self, max_size=128 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, version=None):
+        """Return the valid cache entry for `key` built from data `version`,
+        None if there isn't any."""
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry and (entry["expires"] < time.time() or entry["version"] != version):
+                self._remove(key)
+                entry = None
+            if entry:
+                self._entries[key] = self._entries.pop(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key, body, etag, headers, ttl, version=None):
+        """Keep response `body` with its `etag` and `headers` for `ttl` seconds."""
+        if len(body) > self.max_size:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {"body": body, "etag": etag, "headers": headers,
+                                  "expires": time.time() + ttl, "version": version}
+            self.size += len(body)
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, api=None):
+        """Drop all the entries, or only those of `api`."""
+        with self._lock:
+            for key in list(self._entries):
+                if api is None or key[0] == api:
+                    self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.size -= len(entry["body"])
+
+
 ######################################################################
 ######################################################################
 class MiniRESTApi(object):
@@ -511,6 +593,18 @@ class MiniRESTApi(object):
     These can be tuned per API with ``cherrypy.tools.expires(secs=n)``, or
     ``expires`` and ``expires_opts`` :func:`restcall` keyword arguments.
 
+    APIs whose GET responses are expensive to build but change rarely can
+    also be cached on the server side, by giving them a :attr:`cache_ttl`.
+    Fully buffered responses are then kept in :attr:`response_cache` as
+    sent, formatted and compressed, keyed by the API, validated arguments,
+    output format, compression method and the authorisation scope of the
+    user. Subsequent requests are answered from the cache without calling
+    the API method, with "304 Not Modified" if If-None-Match matches the
+    cached ETag. An entry is used for at most ``cache_ttl`` seconds, and if
+    the API defines ``cache_version``, a callable returning the version of
+    the data it serves, only while that version remains the same. Any PUT,
+    POST or DELETE on the API drops its cached responses.
+
     .. rubric:: Notes
 
     .. note:: Only GET and HEAD requests are allowed to have a query string.
@@ -620,6 +714,27 @@ class MiniRESTApi(object):
        The API can override this value with ``compression_chunk`` keyword
        argument to :func:`restcall`.
 
+    .. attribute:: cache_ttl
+
+       Number, default time in seconds GET responses are kept in the server
+       side :attr:`response_cache`. The default zero disables the cache. The
+       API can override this value with ``cache_ttl`` keyword argument to
+       :func:`restcall`, and define a ``cache_version`` callable returning
+       the current version of its data, and a ``cache_scope`` callable
+       returning the part of ``request.user`` the response depends on; by
+       default responses are shared by the users with the same roles.
+
+    .. attribute:: response_cache
+
+       The :class:`~.ResponseCache` for the responses of this API.
+
+    .. attribute:: rate_limiter
+
+       A :class:`~Utils.RateLimiter.RateLimiter` checking every call of the
+       user, by DN, against the quota of the API, before validating its
+       arguments. Calls over the quota fail with "429 Too Many Requests" and
+       a Retry-After header. The default is None, meaning no limits.
+
     .. attribute:: default_expires
 
        Number, default expire time for GET / HEAD responses in seconds. The
@@ -653,6 +768,9 @@ class MiniRESTApi(object):
         self.methods = {}
         self.default_expires = 3600
         self.default_expires_opts = []
+        self.cache_ttl = 0
+        self.response_cache = ResponseCache()
+        self.rate_limiter = None
 
     def _addAPI(self, method, api, callable, args, validation, **kwargs):
         """Add an API method.
@@ -675,6 +793,9 @@ class MiniRESTApi(object):
           actual arguments to `callable`.
         :arg dict kwargs: Additional key-value pairs to set in the API object.
 
+        The validators are combined here, once, into the ``validate`` function
+        of the API object called for every request.
+
         :returns: Nothing."""
 
         if method not in _METHODS:
@@ -695,13 +816,15 @@ class MiniRESTApi(object):
         if args and not validation:
             raise ValueError("non-empty validation required for api taking arguments")
 
-        apiobj = {"args": args, "validation": validation, "call": callable}
+        apiobj = {"args": args, "validation": validation, "call": callable,
+                  "validate": _make_validator(validation)}
         apiobj.update(**kwargs)
         self.methods[method][api] = apiobj
 
     @expose
     def stats(self):
-        "Return CherryPy stats dict about underlying service activities"
+        """Return CherryPy stats dict about underlying service activities,
+        including the :class:`~.DBConnectionPoolStats` of database pools."""
         return cpstats.StatsPage().data()
 
     @expose
@@ -710,7 +833,8 @@ class MiniRESTApi(object):
 
         This just wraps `args` and `kwargs` into a :class:`RESTArgs` and invokes
         :meth:`_call` enclosed in a try/except which filters all exceptions but
-        :class:`HTTPRedirect` via :func:`~.report_rest_error`.
+        :class:`HTTPRedirect` and :class:`~Utils.RateLimiter.TooManyRequests`
+        via :func:`~.report_rest_error`.
 
         In other words the main function of this wrapper is to ensure run-time
         errors are properly logged and translated to meaningful response status
@@ -724,7 +848,8 @@ class MiniRESTApi(object):
 
         try:
             return self._call(RESTArgs(list(args), kwargs))
-        except HTTPRedirect:
+        except (HTTPRedirect, TooManyRequests):
+            # rate limited calls are logged by the limiter, without a trace
             raise
         except Exception as e:
             report_rest_error(e, format_exc(), True)
@@ -780,6 +905,10 @@ class MiniRESTApi(object):
                 raise APIMethodMismatch(msg)
         apiobj = self.methods[request.method][api]
 
+        # Refuse calls over the rate limit before doing any work for them.
+        if self.rate_limiter:
+            self.rate_limiter.enforce(requestUser(), api)
+
         # Check what format the caller requested. At least one is required; HTTP
         # spec says no "Accept" header means accept anything, but that is too
         # error prone for a REST data interface as that establishes a default we
@@ -798,13 +927,25 @@ class MiniRESTApi(object):
             raise NotAcceptable('Available types: %s' % format_names)
 
         # Validate arguments. May convert arguments too, e.g. str->int.
-        safe = RESTArgs([], {})
-        for v in apiobj['validation']:
-            v(apiobj, request.method, api, param, safe)
-        validate_no_more_input(param)
-
-        # Invoke the method.
-        obj = apiobj['call'](*safe.args, **safe.kwargs)
+        safe = apiobj['validate'](apiobj, request.method, api, param)
+
+        # Answer from the server side cache if possible.
+        cache_ttl = apiobj.get('cache_ttl', self.cache_ttl)
+        cache_key = cache_version = None
+        if cache_ttl and (request.method == 'GET' or request.method == 'HEAD'):
+            cache_version = apiobj.get('cache_version', None)
+            cache_version = cache_version and cache_version()
+            cache_key = self._cache_key(apiobj, api, format, safe)
+            entry = self.response_cache.get(cache_key, cache_version)
+            if entry:
+                return self._cached_reply(entry)
+
+        # Invoke the method. Updates drop the cached responses of the API.
+        try:
+            obj = apiobj['call'](*safe.args, **safe.kwargs)
+        finally:
+            if request.method in ('PUT', 'POST', 'DELETE'):
+                self.response_cache.invalidate(api)
 
         # Add Vary: Accept header.
         vary_by('Accept')
@@ -839,7 +980,44 @@ class MiniRESTApi(object):
                                 apiobj.get('compression', self.compression),
                                 apiobj.get('compression_level', self.compression_level),
                                 apiobj.get('compression_chunk', self.compression_chunk))
-        return stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply)
+        on_buffered = None
+        if cache_key:
+            response.headers['X-REST-Cache'] = 'miss'
+
+            def on_buffered(body, etagval):
+                headers = dict((h, response.headers[h]) for h in ResponseCache.HEADERS if h in response.headers)
+                self.response_cache.put(cache_key, body, etagval, headers, cache_ttl, cache_version)
+
+        return stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply, on_buffered)
+
+    def _cache_key(self, apiobj, api, format, safe):
+        """Return the :attr:`response_cache` key of the current request to
+        `api` with validated arguments `safe`, in `format`."""
+        user = getattr(request, 'user', None) or {}
+        scope = apiobj.get('cache_scope', None)
+        if scope:
+            scope = scope(user)
+        else:
+            scope = dict((role, dict((k, sorted(v)) for k, v in viewitems(authz)))
+                         for role, authz in viewitems(user.get('roles', None) or {}))
+        encoding = stream_encoding(apiobj.get('compression', self.compression),
+                                   apiobj.get('compression_level', self.compression_level))
+        instance = (getattr(request, 'db', None) or {}).get('instance', None)
+        args = json.dumps([instance, safe.args, safe.kwargs, scope], sort_keys=True, default=repr)
+        return (api, format, encoding, args)
+
+    def _cached_reply(self, entry):
+        """Reply with a :attr:`response_cache` entry, or "304 Not Modified" if
+        If-None-Match matches its ETag."""
+        for header, value in viewitems(entry["headers"]):
+            response.headers[header] = value
+        response.headers['ETag'] = entry["etag"]
+        response.headers['X-REST-Cache'] = 'hit'
+        match = [str(x) for x in (request.headers.elements('If-Match') or [])]
+        nomatch = [str(x) for x in (request.headers.elements('If-None-Match') or [])]
+        _etag_match(200, entry["etag"], match, nomatch)
+        response.headers['Content-Length'] = len(entry["body"])
+        return entry["body"]
 
     def _precall(self, param):
         """Point for derived classes to hook into prior to peeking at URL.
@@ -966,6 +1144,160 @@ class RESTApi(MiniRESTApi):
             request.rest_generate_preamble["columns"] = cols
 
 
+######################################################################
+######################################################################
+class DBConnectionPoolStats(object):
+    """Usage statistics of a :class:`~.DBConnectionPool`.
+
+    The counters are updated from the client threads and the pool threads,
+    under a lock. The time `get()` waited for connections is accounted in a
+    histogram with the bucket upper limits in :attr:`WAIT_BUCKETS`, from
+    which the wait time percentiles are estimated. The checkout rate is
+    averaged over the last :attr:`RATE_WINDOW` seconds.
+
+    :meth:`register` publishes the statistics in the CherryPy statistics
+    (:mod:`cherrypy.lib.cpstats`) under "DBConnectionPool", one entry per
+    pool, for the ``stats`` pages of the REST servers.
+
+    .. attribute:: checkouts
+
+       Number of connections handed out by `get()`.
+
+    .. attribute:: timeouts
+
+       Number of `get()` calls which gave up waiting for a connection.
+
+    .. attribute:: errors
+
+       Number of `get()` calls which failed to connect.
+
+    .. attribute:: connects
+
+       Number of connections made to the database.
+
+    .. attribute:: reconnects
+
+       Number of connections found bad and discarded, to be replaced by new
+       ones.
+
+    .. attribute:: disconnects
+
+       Number of connections closed.
+    """
+
+    #: Upper limits in seconds of the wait time histogram buckets.
+    WAIT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)
+
+    #: Seconds over which the checkout rate is averaged.
+    RATE_WINDOW = 60
+
+    def __init__(self):
+        self.lock = Lock()
+        self.label = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.disconnects = 0
+        self.wait_time = 0.
+        self.waits = [0] * (len(self.WAIT_BUCKETS) + 1)
+        self.started = time.time()
+        self._rate = [(0, 0)] * self.RATE_WINDOW
+
+    def count(self, counter):
+        """Increment the counter attribute named `counter`."""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def checkout(self, waited, dbh, err):
+        """Account a `get()` which waited `waited` seconds, and returned the
+        handle `dbh` and error `err`."""
+        bucket = 0
+        while bucket < len(self.WAIT_BUCKETS) and waited > self.WAIT_BUCKETS[bucket]:
+            bucket += 1
+        now = int(time.time())
+        with self.lock:
+            self.waits[bucket] += 1
+            self.wait_time += waited
+            if err:
+                self.errors += 1
+            elif not dbh:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                slot = now % self.RATE_WINDOW
+                second, count = self._rate[slot]
+                self._rate[slot] = (now, (second == now and count) + 1)
+
+    def checkout_rate(self):
+        """Return the connections checked out per second, averaged over the
+        last :attr:`RATE_WINDOW` seconds."""
+        now = int(time.time())
+        with self.lock:
+            total = sum(count for second, count in self._rate if now - second < self.RATE_WINDOW)
+        return float(total) / max(1, min(self.RATE_WINDOW, now - int(self.started)))
+
+    def wait_percentile(self, percent):
+        """Return an estimate of the `percent` percentile of the `get()` wait
+        time, the upper limit of the histogram bucket it falls in. Waits
+        longer than the last bucket are reported as the mean wait time of
+        all the calls, at least the last bucket limit."""
+        with self.lock:
+            total = sum(self.waits)
+            if not total:
+                return 0.
+            rank = total * percent / 100.
+            seen = 0
+            for bucket, count in enumerate(self.waits):
+                seen += count
+                if seen >= rank and count:
+                    break
+            if bucket < len(self.WAIT_BUCKETS):
+                return self.WAIT_BUCKETS[bucket]
+            return max(self.WAIT_BUCKETS[-1], self.wait_time / total)
+
+    def histogram(self):
+        """Return the wait time histogram as a dictionary of bucket upper
+        limit in milliseconds, or "inf", to the number of `get()` calls."""
+        with self.lock:
+            waits = list(self.waits)
+        labels = ["%g" % (limit * 1000) for limit in self.WAIT_BUCKETS] + ["inf"]
+        return dict(zip(labels, waits))
+
+    def register(self, label, pool):
+        """Publish the statistics, and the state of `pool`, in the CherryPy
+        statistics, under the "DBConnectionPool" entry `label`."""
+        pools = logging.statistics.setdefault("DBConnectionPool", {})
+        suffix = 1
+        self.label = label
+        while self.label in pools:
+            suffix += 1
+            self.label = "%s #%d" % (label, suffix)
+        pools[self.label] = {
+            "Checkouts": lambda s: self.checkouts,
+            "Checkouts/Second": lambda s: self.checkout_rate(),
+            "Wait p50": lambda s: self.wait_percentile(50),
+            "Wait p99": lambda s: self.wait_percentile(99),
+            "Wait Histogram (ms)": lambda s: self.histogram(),
+            "Timeouts": lambda s: self.timeouts,
+            "Errors": lambda s: self.errors,
+            "Connects": lambda s: self.connects,
+            "Reconnects": lambda s: self.reconnects,
+            "Disconnects": lambda s: self.disconnects,
+            "In Use": lambda s: len(pool.inuse),
+            "Idle": lambda s: len(pool.idle),
+            "Connecting": lambda s: pool.connecting,
+            "Waiting": lambda s: len(pool.waiting),
+            "Max Connections": pool.dbspec.get("max-connections", None),
+            "Min Connections": pool.dbspec.get("min-connections", 0),
+            "Statement Cache": pool.dbspec.get("stmtcache", 50)}
+
+    def unregister(self):
+        """Remove the statistics from the CherryPy statistics."""
+        logging.statistics.get("DBConnectionPool", {}).pop(self.label, None)
+
+
 ######################################################################
 ######################################################################
 class DBConnectionPool(Thread):
@@ -1026,10 +1358,17 @@ class DBConnectionPool(Thread):
     a new connection each time. The level of overhead can be tuned by
     adjusting condition variable contention (cf. `num_signals`).
 
-    The connections returned to clients are neither garbage collected
-    nor is there a ceiling on a maximum number of connections returned.
-    The client needs to be careful to `put()` as many connections as it
-    received from `get()` to avoid leaking connections.
+    The connections returned to clients are not garbage collected, and
+    unless the pool specification sets ``max-connections`` there is no
+    ceiling on the number of connections returned. The client needs to be
+    careful to `put()` as many connections as it received from `get()` to
+    avoid leaking connections.
+
+    The pool usage is accounted in a :class:`~.DBConnectionPoolStats`,
+    published in the CherryPy statistics served by :meth:`.MiniRESTApi.stats`
+    and :meth:`.RESTFrontPage.stats`: connections checked out per second,
+    percentiles of the time `get()` waited for them, connections made,
+    discarded and timed out requests.
 
     .. rubric:: Pool specifications
 
@@ -1071,7 +1410,26 @@ class DBConnectionPool(Thread):
       if the client loses the handle reference.
 
     ``stmtcache``
-      Optional integer, overrides the default statement cache size 50.
+      Optional integer, overrides the default statement cache size 50 of
+      the Oracle connections. Set once on each new connection; statements
+      executed repeatedly on a pooled connection are parsed only once.
+
+    ``min-connections``
+      Optional integer, number of connections to open as soon as the pool
+      starts and to keep open even if idle, so that bursts of requests
+      after a quiet period do not all wait for new connections. Default 0.
+
+    ``max-connections``
+      Optional integer, maximum number of connections in use or being
+      established at once. Further `get()` calls wait for a connection to
+      be released, up to `connection_wait_time`. Default unlimited.
+
+    ``connect-threads``
+      Optional integer, number of threads establishing and testing
+      connections concurrently, default 2. The worker thread hands them
+      the connection attempts, so releasing connections and handing out
+      the others never waits for a slow connection. Zero makes the worker
+      thread establish the connections itself, one at a time.
 
     ``trace``
       Optional boolean flag, if set enables tracing of database activity
@@ -1179,6 +1537,10 @@ class DBConnectionPool(Thread):
        evidence the default value is not leading to sufficiently fast
        recovery after connections have started to go sour.
 
+    .. attribute:: stats
+
+       The :class:`~.DBConnectionPoolStats` of this pool.
+
     .. attribute:: dbspec
 
        Private, the database specification given to the constructor.
@@ -1226,6 +1588,22 @@ class DBConnectionPool(Thread):
        to protect the access; `logstatus()` method provides the means to
        log the queue state safely in the worker thread.
 
+    .. attribute:: waiting
+
+       Private, list of connection requests waiting for a connection to be
+       released when ``max-connections`` are in use. Accessed only in the
+       worker thread.
+
+    .. attribute:: connecting
+
+       Private, number of connections being established by the connection
+       threads. Accessed only in the worker thread.
+
+    .. attribute:: connq
+
+       Private, list of connection attempts for the connection threads,
+       access to which is protected by `sigconn`.
+
     .. rubric:: Constructor
 
     The constructor automatically attaches this object to the cherrypy
@@ -1233,6 +1611,8 @@ class DBConnectionPool(Thread):
     quits, respectively. The pool does not attempt to connect to the
     database on construction, only on the first call to `get()`, so it's
     safe to create the pool even if network or database are unavailable.
+    If the specification sets ``min-connections``, the worker thread makes
+    them once started.
 
     :arg dict dbspec: Connection specification as described above.
     :arg str id: Identifier used to label trace connection messages for
@@ -1247,13 +1627,19 @@ class DBConnectionPool(Thread):
         Thread.__init__(self, name=self.__class__.__name__)
         self.sigready = [Condition() for _ in range(0, self.num_signals)]
         self.sigqueue = Condition()
+        self.sigconn = Condition()
         self.queue = []
         self.idle = []
         self.inuse = []
+        self.waiting = []
+        self.connecting = 0
+        self.connq = []
         if type in dbspec and dbspec['type'].__name__ == 'MySQLdb':
             dbspec['dsn'] = dbspec['db']
         self.dbspec = dbspec
         self.id = id
+        self.stats = DBConnectionPoolStats()
+        self.stats.register("%s@%s %s" % (dbspec.get("user"), dbspec.get("dsn"), id), self)
         engine.subscribe("start", self.start, 100)
         engine.subscribe("stop", self.stop, 100)
 
@@ -1302,6 +1688,7 @@ class DBConnectionPool(Thread):
         self.queue.insert(0, (None, None))
         self.sigqueue.notifyAll()
         self.sigqueue.release()
+        self.stats.unregister()
 
     def get(self, id, module):
         """Get a new connection from the pool, identified to server side and
@@ -1318,7 +1705,8 @@ class DBConnectionPool(Thread):
         If the worker thread does not respond in `connection_wait_time`, the
         method gives up and indicates the database is not available. When
         that happens, the worker thread will still attempt to complete the
-        connection, but will then discard it.
+        connection, but will then discard it. The time waited is recorded
+        in :attr:`stats`.
 
         :arg str id:     Identification string for this connection request.
                          This will set the ``clientinfo`` and ``action``
@@ -1350,7 +1738,7 @@ class DBConnectionPool(Thread):
         self.sigqueue.release()
 
         sigready.acquire()
-        now = time.time()
+        start = now = time.time()
         until = now + self.connection_wait_time
         while True:
             dbh = arg["handle"]
@@ -1361,6 +1749,7 @@ class DBConnectionPool(Thread):
             sigready.wait(until - now)
             now = time.time()
         sigready.release()
+        self.stats.checkout(now - start, dbh, err)
         return dbh, err
 
     def put(self, dbh, bad=False):
@@ -1393,6 +1782,8 @@ class DBConnectionPool(Thread):
                        instead of queuing it for reuse.
         :returns: Nothing."""
 
+        if bad:
+            self.stats.count("reconnects")
         self.sigqueue.acquire()
         self.queue.insert(0, ((bad and self._disconnect) or self._release, dbh))
         self.sigqueue.notifyAll()
@@ -1401,6 +1792,26 @@ class DBConnectionPool(Thread):
     def run(self):
         """Run the connection management thread."""
 
+        # Start the connection threads, and the initial connections.
+        connectors = [Thread(target=self._connector, name="%s-connect-%d" % (self.name, n))
+                      for n in range(self.dbspec.get("connect-threads", 2))]
+        for connector in connectors:
+            connector.daemon = True
+            connector.start()
+        self._warmup()
+
+        try:
+            self._run()
+        finally:
+            self.sigconn.acquire()
+            self.connq.extend([None] * len(connectors))
+            self.sigconn.notifyAll()
+            self.sigconn.release()
+
+    def _run(self):
+        """Process requests in the connection management thread until told
+        to quit."""
+
         # Run forever, pulling work from "queue". Round wake-ups scheduled
         # from timeouts to five-second quantum to maximise the amount of
         # work done per round of clean-up and reducing wake-ups.
@@ -1408,8 +1819,11 @@ class DBConnectionPool(Thread):
         while True:
             # Whatever reason we woke up, even if sporadically, process any
             # pending requests first.
+            # Requests queued before we got here, e.g. at start up or by the
+            # connection threads, do not need waiting for.
             self.sigqueue.acquire()
-            self.sigqueue.wait(max(next, 5))
+            if not self.queue:
+                self.sigqueue.wait(max(next, 5))
             while self.queue:
                 # Take next action and execute it. "None" means quit. Release
                 # the queue lock while executing actions so callers can add
@@ -1419,6 +1833,7 @@ class DBConnectionPool(Thread):
                 self.sigqueue.release()
                 if action:
                     action(arg)
+                    self._dispatch()
                 else:
                     return
                 self.sigqueue.acquire()
@@ -1428,21 +1843,32 @@ class DBConnectionPool(Thread):
             # next wake-up as the earliest expire time, but note that it
             # gets rounded to minimum five seconds above to scheduling a
             # separate wake-up for every handle. Note that we may modify
-            # 'idle' while traversing it, so need to clone it first.
+            # 'idle' while traversing it, so need to clone it first. Keep
+            # the minimum number of connections open.
             now = time.time()
             next = self.wakeup_period
             for old in self.idle[:]:
                 if old["expires"] <= now:
-                    self.idle.remove(old)
-                    self._disconnect(old)
-                else:
-                    next = min(next, old["expires"] - now)
+                    if self._numconnections() <= self.dbspec.get("min-connections", 0):
+                        old["expires"] = now + self.dbspec["timeout"]
+                    else:
+                        self.idle.remove(old)
+                        self._disconnect(old)
+                next = min(next, old["expires"] - now)
+            self._warmup()
 
     def _status(self, *args):
         """Action handler to dump the queue status."""
+        stats = self.stats
         cherrypy.log("DATABASE CONNECTIONS: %s@%s %s: timeout=%d inuse=%d idle=%d"
+                     " connecting=%d waiting=%d checkouts=%d/%.1fs wait p50=%.3fs p99=%.3fs"
+                     " timeouts=%d connects=%d reconnects=%d"
                      % (self.dbspec["user"], self.dbspec["dsn"], self.id,
-                        self.dbspec["timeout"], len(self.inuse), len(self.idle)))
+                        self.dbspec["timeout"], len(self.inuse), len(self.idle),
+                        self.connecting, len(self.waiting), stats.checkouts,
+                        stats.checkout_rate(), stats.wait_percentile(50),
+                        stats.wait_percentile(99), stats.timeouts,
+                        stats.connects, stats.reconnects))
 
     def _error(self, title, rest, err, where):
         """Internal helper to generate error message somewhat similar to
@@ -1460,13 +1886,83 @@ class DBConnectionPool(Thread):
         for line in where.rstrip().split("\n"):
             cherrypy.log("  " + line)
 
+    def _numconnections(self):
+        """Return the number of connections open or being established."""
+        return len(self.idle) + len(self.inuse) + self.connecting
+
+    def _warmup(self):
+        """Start making connections up to the ``min-connections`` of the pool
+        specification, to be kept idle until used."""
+        for _ in range(self.dbspec.get("min-connections", 0) - self._numconnections()):
+            self._start({"error": None, "handle": None, "signal": None, "abandoned": True,
+                         "id": "warm-up", "module": self.id, "warmup": True}, None)
+
+    def _dispatch(self):
+        """Start the connection requests waiting for one to be released, as
+        far as ``max-connections`` allows."""
+        limit = self.dbspec.get("max-connections", None)
+        while self.waiting and (not limit or len(self.inuse) + self.connecting < limit):
+            req = self.waiting.pop(0)
+            if not req["abandoned"]:
+                self._start(req, (self.idle and self.idle.pop()) or None)
+
     def _connect(self, req):
-        """Action handler to fulfill a connection request."""
+        """Action handler to fulfill a connection request. Requests already
+        abandoned by the caller are dropped, and those over the pool limit
+        wait for a connection to be released."""
+        if req["abandoned"]:
+            return
+        limit = self.dbspec.get("max-connections", None)
+        if limit and len(self.inuse) + self.connecting >= limit:
+            self.waiting.append(req)
+            return
+
+        # Take next idle connection, or make a new one if none exist.
+        self._start(req, (self.idle and self.idle.pop()) or None)
+
+    def _start(self, req, dbh):
+        """Helper function to establish and test the connection `dbh`, or a
+        new one if None, for the request `req`. The work is handed to the
+        connection threads if any, otherwise done right here."""
+        self.connecting += 1
+        if self.dbspec.get("connect-threads", 2):
+            self.sigconn.acquire()
+            self.connq.append((req, dbh))
+            self.sigconn.notify()
+            self.sigconn.release()
+        else:
+            self._connected((req, self._establish(req, dbh)))
+
+    def _connector(self):
+        """Run a connection thread, establishing connections and passing them
+        back to the worker thread."""
+        while True:
+            self.sigconn.acquire()
+            while not self.connq:
+                self.sigconn.wait()
+            work = self.connq.pop(0)
+            self.sigconn.release()
+            if not work:
+                return
+
+            req, dbh = work
+            result = self._establish(req, dbh)
+            self.sigqueue.acquire()
+            self.queue.insert(0, (self._connected, (req, result)))
+            self.sigqueue.notifyAll()
+            self.sigqueue.release()
+
+    def _establish(self, req, dbh):
+        """Helper function to establish and test a connection for the request
+        `req`, starting with the idle connection `dbh` if not None. Runs in
+        a connection thread, or the worker thread, and must not touch the
+        pool lists. Returns a `(HANDLE, ERROR)` tuple as for `get()`."""
         s = self.dbspec
-        dbh, err = None, None
+        err = None
+        idle = dbh
 
         # If tracing, issue log line that identifies this connection series.
-        trace = s["trace"] and ("RESTSQL:" + "".join(random.sample(string.letters, 12)))
+        trace = s["trace"] and ("RESTSQL:" + "".join(random.sample(string.ascii_letters, 12)))
         trace and cherrypy.log("%s ENTER %s@%s %s (%s) inuse=%d idle=%d" %
                                (trace, s["user"], s["dsn"], self.id, req["id"],
                                 len(self.inuse), len(self.idle)))
@@ -1474,10 +1970,10 @@ class DBConnectionPool(Thread):
         # Attempt to connect max_tries times.
         for _ in range(0, self.max_tries):
             try:
-                # Take next idle connection, or make a new one if none exist.
-                # Then test and prepare that connection, linking it in trace
-                # output to any previous uses of the same object.
-                dbh = (self.idle and self.idle.pop()) or self._new(s, trace)
+                # Use the given connection, or make a new one. Then test and
+                # prepare that connection, linking it in trace output to any
+                # previous uses of the same object.
+                dbh = dbh or self._new(s, trace)
                 assert dbh["pool"] == self
                 assert dbh["connection"]
                 prevtrace = dbh["trace"]
@@ -1495,9 +1991,26 @@ class DBConnectionPool(Thread):
                 # a little verbose, but it's more useful to have all the errors.
                 err = (e, format_exc())
                 self._error("CONNECT", "", *err)
-                dbh and self._disconnect(dbh)
+                if dbh:
+                    if dbh is idle:
+                        self.stats.count("reconnects")
+                    self._close(dbh)
                 dbh = None
 
+        return dbh, err
+
+    def _connected(self, arg):
+        """Action handler for a connection attempt completed by `_establish()`.
+        Returns the result to the caller, and records the connection into the
+        'inuse' list. Warm-up connections go to the 'idle' list."""
+        req, (dbh, err) = arg
+        self.connecting -= 1
+        if req.get("warmup"):
+            if dbh:
+                dbh["expires"] = time.time() + self.dbspec["timeout"]
+                self.idle.append(dbh)
+            return
+
         # Return the result, and see if the caller abandoned this attempt.
         req["signal"].acquire()
         req["error"] = err
@@ -1516,21 +2029,22 @@ class DBConnectionPool(Thread):
             self._disconnect(dbh)
 
     def _new(self, s, trace):
-        """Helper function to create a new connection with `trace` identifier."""
+        """Helper function to create a new connection with `trace` identifier.
+        Sets the Oracle statement cache size once for the connection."""
         trace and cherrypy.log("%s instantiating a new connection" % trace)
         ret = {"pool": self, "trace": trace, "type": s["type"]}
         if s['type'].__name__ == 'MySQLdb':
             ret.update({"connection": s["type"].connect(s['host'], s["user"], s["password"], s["db"], int(s["port"]))})
         else:
             ret.update({"connection": s["type"].connect(s["user"], s["password"], s["dsn"], threaded=True)})
+            ret["connection"].stmtcachesize = s.get("stmtcache", 50)
+        self.stats.count("connects")
 
         return ret
 
     def _test(self, s, prevtrace, trace, req, dbh):
         """Helper function to prepare and test an existing connection object."""
-        # Set statement cache. Default is 50 statments but spec can override.
         c = dbh["connection"]
-        c.stmtcachesize = s.get("stmtcache", 50)
 
         # Emit log message to identify this connection object. If it was
         # previously used for something else, log that too for detailed
@@ -1545,7 +2059,7 @@ class DBConnectionPool(Thread):
                       " (previously %s)" % prevtrace.split(":")[1]) or "")
         trace and cherrypy.log("%s%s connected, client: %s, server: %s, stmtcache: %d"
                                % (trace, prevtrace, client_version,
-                                  version, c.stmtcachesize))
+                                  version, getattr(c, "stmtcachesize", 0)))
 
         # Set the target schema and identification attributes on this one.
         c.current_schema = s["schema"]
@@ -1643,6 +2157,14 @@ class DBConnectionPool(Thread):
             except ValueError:
                 pass
 
+            self._close(dbh)
+        except Exception as e:
+            self._error("DISCONNECT", " (ignored)", e, format_exc())
+
+    def _close(self, dbh):
+        """Helper function to close the connection of a handle which is in
+        neither 'inuse' nor 'idle' list."""
+        try:
             # Close the connection.
             s = self.dbspec
             trace = dbh["trace"]
@@ -1652,6 +2174,7 @@ class DBConnectionPool(Thread):
             # Remove references to connection object as much as possible.
             del dbh["connection"]
             dbh["connection"] = None
+            self.stats.count("disconnects")
 
             # Note trace that this is now gone.
             trace and cherrypy.log("%s DISCONNECTED %s@%s timeout=%d inuse=%d idle=%d"
@@ -2359,6 +2882,9 @@ def restcall(func=None, args=None, generate="result", **kwargs):
     compression         "Accept-Encoding" methods, empty disables compression.
     compression_level   ZLIB compression level for output (0 .. 9).
     compression_chunk   Approximate amount of output to compress at once.
+    cache_ttl           Seconds to keep GET responses in the server cache.
+    cache_version       Callable returning the version of the data served.
+    cache_scope         Callable returning the user info responses depend on.
     =================== ======================================================
 
     :returns: The original function suitably enriched with attributes if
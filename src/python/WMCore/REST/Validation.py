@@ -1,11 +1,14 @@
 from builtins import str, bytes
-from past.builtins import basestring
 
 from WMCore.REST.Error import *
 import math
 import re
 import numbers
 
+# Faster to check than past.builtins.basestring, which goes through a
+# python level isinstance hook on every argument.
+_strtypes = (str, bytes)
+
 def return_message(main_err, custom_err):
     if custom_err:
         return custom_err
@@ -21,7 +24,7 @@ def _arglist(argname, kwargs):
         return val
 
 def _check_rx(argname, val, custom_err = None):
-    if not isinstance(val, basestring):
+    if not isinstance(val, _strtypes):
         raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
     try:
         return re.compile(val)
@@ -38,7 +41,7 @@ def _check_str(argname, val, rx, custom_err = None):
             val = bytes(val, "utf-8")
         except:
             raise InvalidParameter(return_message("Invalid '%s' parameter %s %s" % (argname, val, type(val)), custom_err))
-    if not isinstance(val, basestring) or not rx.match(val):
+    if not isinstance(val, _strtypes) or not rx.match(val):
         raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
     return val
 
@@ -48,12 +51,36 @@ def _check_ustr(argname, val, rx, custom_err = None):
             val = str(val, "utf-8")
         except:
             raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
-    if not isinstance(val, basestring) or not rx.match(val):
+    if not isinstance(val, _strtypes) or not rx.match(val):
         raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
     return val
 
+def _check_strlist(argname, vals, rx, custom_err = None):
+    """Bulk `_check_str` of all the values of a list argument."""
+    try:
+        safe = [bytes(v, "utf-8") if isinstance(v, str) else v for v in vals]
+        match = rx.match
+        if all(isinstance(v, bytes) and match(v) for v in safe):
+            return safe
+    except:
+        pass
+    # Report the first bad value as `_check_str` does.
+    return [_check_str(argname, v, rx, custom_err) for v in vals]
+
+def _check_ustrlist(argname, vals, rx, custom_err = None):
+    """Bulk `_check_ustr` of all the values of a list argument."""
+    try:
+        safe = [str(v, "utf-8") if isinstance(v, bytes) else v for v in vals]
+        match = rx.match
+        if all(isinstance(v, str) and match(v) for v in safe):
+            return safe
+    except:
+        pass
+    # Report the first bad value as `_check_ustr` does.
+    return [_check_ustr(argname, v, rx, custom_err) for v in vals]
+
 def _check_num(argname, val, bare, minval, maxval, custom_err = None):
-    if not isinstance(val, numbers.Integral) and (not isinstance(val, basestring) or (bare and not val.isdigit())):
+    if not isinstance(val, numbers.Integral) and (not isinstance(val, _strtypes) or (bare and not val.isdigit())):
         raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
     try:
         n = int(val)
@@ -65,8 +92,21 @@ def _check_num(argname, val, bare, minval, maxval, custom_err = None):
     except:
         raise InvalidParameter(return_message("Invalid '%s' parameter" % argname, custom_err))
 
+def _check_numlist(argname, vals, bare, minval, maxval, custom_err = None):
+    """Bulk `_check_num` of all the values of a list argument."""
+    try:
+        nums = [v if type(v) is int else int(v) for v in vals
+                if type(v) is int or (isinstance(v, _strtypes) and (not bare or v.isdigit()))]
+        if len(nums) == len(vals) and (not nums or ((minval == None or min(nums) >= minval)
+                                                    and (maxval == None or max(nums) <= maxval))):
+            return nums
+    except:
+        pass
+    # Report the first bad value as `_check_num` does.
+    return [_check_num(argname, v, bare, minval, maxval, custom_err) for v in vals]
+
 def _check_real(argname, val, special, minval, maxval, custom_err = None):
-    if not isinstance(val, numbers.Number) and not isinstance(val, basestring):
+    if not isinstance(val, numbers.Number) and not isinstance(val, _strtypes):
         raise InvalidParameter(return_message("Incorrect '%s' parameter" % argname, custom_err))
     try:
         n = float(val)
@@ -93,6 +133,11 @@ def _validate_all(argname, param, safe, checker, *args):
     if argname in param.kwargs:
         del param.kwargs[argname]
 
+def _validate_bulk(argname, param, safe, checker, *args):
+    safe.kwargs[argname] = checker(argname, _arglist(argname, param.kwargs), *args)
+    if argname in param.kwargs:
+        del param.kwargs[argname]
+
 def validate_rx(argname, param, safe, optional = False, custom_err = None):
     """Validates that an argument is a valid regexp.
 
@@ -217,7 +262,7 @@ def validate_strlist(argname, param, safe, rx, custom_err = None):
 
     Note that an array of zero length is accepted, meaning there were no
     `argname` parameters at all in `param.kwargs`."""
-    _validate_all(argname, param, safe, _check_str, rx, custom_err)
+    _validate_bulk(argname, param, safe, _check_strlist, rx, custom_err)
 
 def validate_ustrlist(argname, param, safe, rx, custom_err = None):
     """Validates that an argument is an array of strings, each of which
@@ -236,7 +281,7 @@ def validate_ustrlist(argname, param, safe, rx, custom_err = None):
 
     Note that an array of zero length is accepted, meaning there were no
     `argname` parameters at all in `param.kwargs`."""
-    _validate_all(argname, param, safe, _check_ustr, rx, custom_err)
+    _validate_bulk(argname, param, safe, _check_ustrlist, rx, custom_err)
 
 def validate_numlist(argname, param, safe, bare=False, minval=None, maxval=None, custom_err = None):
     """Validates that an argument is an array of integers, as checked by
@@ -251,7 +296,7 @@ def validate_numlist(argname, param, safe, bare=False, minval=None, maxval=None,
 
     Note that an array of zero length is accepted, meaning there were no
     `argname` parameters at all in `param.kwargs`."""
-    _validate_all(argname, param, safe, _check_num, bare, minval, maxval, custom_err)
+    _validate_bulk(argname, param, safe, _check_numlist, bare, minval, maxval, custom_err)
 
 def validate_reallist(argname, param, safe, special=False, minval=None, maxval=None, custom_err = None):
     """Validates that an argument is an array of integers, as checked by
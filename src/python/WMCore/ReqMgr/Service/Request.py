@@ -208,31 +208,20 @@ class Request(RESTEntity):
                 msg = str(ex)
             raise InvalidSpecParameterValue(msg)
 
-    def _maskResult(self, mask, result):
+    def _resolveMask(self, mask):
         """
-        If a mask of parameters was provided in the query string, then filter
-        the request key/values accordingly.
-        :param mask: a list of strings (keys of the request dictionary)
-        :param result: a dict key'ed by the request name, with the whole
-            request dictionary as a value
-        :return: updates the result object in place and returns it (dict)
+        Return the list of request keys to keep, expanding the DAS mask
         """
-
         if len(mask) == 1 and mask[0] == "DAS":
             mask = ReqMgrConfigDataCache.getConfig("DAS_RESULT_FILTER")["filter_list"]
+        return mask
 
-        if len(mask) > 0:
-            maskedResult = {}
-            for reqName, reqDict in result.items():
-                reqInfo = RequestInfo(reqDict)
-                maskedResult.setdefault(reqName, {})
-                for maskKey in mask:
-                    foundValue = reqInfo.get(maskKey, None)
-                    maskedResult[reqName].update({maskKey: foundValue})
-
-            return maskedResult
-        else:
-            return result
+    def _maskRequest(self, mask, reqDict):
+        """
+        Return a dict with only the mask keys of a request dictionary
+        """
+        reqInfo = RequestInfo(reqDict)
+        return dict((maskKey, reqInfo.get(maskKey, None)) for maskKey in mask)
 
     @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
     def get(self, **kwargs):
@@ -280,73 +269,48 @@ class Request(RESTEntity):
         if nostale:
             self.reqmgr_db_service._setNoStale()
 
-        request_info = []
+        view_queries = []
         queryMatched = False  # flag to avoid calling the same view twice
         if len(kwargs) == 2:
             if status and team:
                 query_keys = [[t, s] for t in team for s in status]
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("byteamandstatus",
-                                                                                 option, query_keys))
+                view_queries.append(("byteamandstatus", query_keys))
                 queryMatched = True
             elif status and request_type:
                 query_keys = [[s, rt] for rt in request_type for s in status]
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("requestsbystatusandtype",
-                                                                                 option, query_keys))
+                view_queries.append(("requestsbystatusandtype", query_keys))
                 queryMatched = True
             elif status and requestor:
                 query_keys = [[s, r] for r in requestor for s in status]
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bystatusandrequestor",
-                                                                                 option, query_keys))
+                view_queries.append(("bystatusandrequestor", query_keys))
                 queryMatched = True
         elif len(kwargs) == 3:
             if status and request_type and requestor:
                 query_keys = [[s, rt, req] for s in status for rt in request_type for req in requestor]
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bystatusandtypeandrequestor",
-                                                                                 option, query_keys))
+                view_queries.append(("bystatusandtypeandrequestor", query_keys))
                 queryMatched = True
 
         # anything else that hasn't matched the query combination above
         if not queryMatched:
-            if status:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bystatus",
-                                                                                 option, status))
-            if name:
-                request_info.append(self.reqmgr_db_service.getRequestByNames(name))
-            if request_type:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bytype",
-                                                                                 option, request_type))
-            if prep_id:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("byprepid",
-                                                                                 option, prep_id))
-            if inputdataset:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("byinputdataset",
-                                                                                 option, inputdataset))
-            if outputdataset:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("byoutputdataset",
-                                                                                 option, outputdataset))
-            if date_range:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bydate",
-                                                                                 option, date_range))
-            if campaign:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bycampaign",
-                                                                                 option, campaign))
-            if mc_pileup:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bymcpileup",
-                                                                                 option, mc_pileup))
-            if data_pileup:
-                request_info.append(self.reqmgr_db_service.getRequestByCouchView("bydatapileup",
-                                                                                 option, data_pileup))
-
-        # get the intersection of the request data
-        result = self._intersection_of_request_info(request_info)
+            for view, query_keys in [("bystatus", status), ("bytype", request_type), ("byprepid", prep_id),
+                                     ("byinputdataset", inputdataset), ("byoutputdataset", outputdataset),
+                                     ("bydate", date_range), ("bycampaign", campaign),
+                                     ("bymcpileup", mc_pileup), ("bydatapileup", data_pileup)]:
+                if query_keys:
+                    view_queries.append((view, query_keys))
+
+        # the views only give the request names, only the requests matching
+        # all of them (and the names, if any) are fetched, already masked
+        mask = self._resolveMask(mask)
+        docFilter = (lambda reqDict: self._maskRequest(mask, reqDict)) if mask else None
+        result = self.reqmgr_db_service.getRequestByCouchViews(view_queries, requestNames=name,
+                                                               detail=option["include_docs"], docFilter=docFilter)
 
         if not result:
             return []
 
-        result = self._maskResult(mask, result)
-
         if not option["include_docs"]:
-            return result.keys()
+            return result
 
         # set the return format. default format has request name as a key
         # if is set to one it returns list of dictionary with RequestName field.
@@ -356,19 +320,6 @@ class Request(RESTEntity):
             response_list = [result]
         return rows(response_list)
 
-    def _intersection_of_request_info(self, request_info):
-        requests = {}
-        if len(request_info) < 1:
-            return requests
-
-        request_key_set = set(request_info[0].keys())
-        for info in request_info:
-            request_key_set = set(request_key_set) & set(info.keys())
-        # TODO: need to assume some data maight not contains include docs
-        for request_name in request_key_set:
-            requests[request_name] = request_info[0][request_name]
-        return requests
-
     def _retrieveResubmissionChildren(self, request_name):
         """
         Fetches all the direct children requests from CouchDB.
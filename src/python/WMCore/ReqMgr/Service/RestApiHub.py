@@ -45,6 +45,10 @@ class RestApiHub(RESTApi):
         cherrypy.log("ReqMgr entire configuration:\n%s" % Configuration.getInstance())
         cherrypy.log("ReqMgr REST hub configuration subset:\n%s" % config)
 
+        # GET responses can be served from the server side cache, for at most
+        # this many seconds, or until updated through this server
+        self.cache_ttl = getattr(config, "response_cache_ttl", 0)
+
         # Makes raw format as default
         # self.formats.insert(0, ('application/raw', RawFormat()))
         self._add({"about": Info(app, IndividualCouchManager(config), config, mount),
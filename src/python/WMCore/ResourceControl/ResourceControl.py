@@ -5,6 +5,7 @@ _ResourceControl_
 Library from manipulating and querying the resource control database.
 """
 
+import logging
 import time
 from WMCore.BossAir.BossAirAPI import BossAirAPI
 from WMCore.DAOFactory import DAOFactory
@@ -77,10 +78,16 @@ class ResourceControl(WMConnectionBase):
 
         if jobInfo:
             bossAir = BossAirAPI(self.config)
-            jobtokill = bossAir.updateSiteInformation(jobInfo, siteName, state in state2ExitCode)
+            jobtokill, failedJobs = bossAir.bulkUpdateSiteInformation(jobInfo, siteName, state in state2ExitCode)
+            if failedJobs:
+                logging.warning("Failed to update the site lists of %d jobs for site %s",
+                                len(failedJobs), siteName)
 
             ercode = state2ExitCode.get(state, 71300)
-            bossAir.kill(jobtokill, errorCode=ercode)
+            failedIDs = bossAir.bulkKill(jobtokill, errorCode=ercode)
+            if failedIDs:
+                logging.warning("Failed to kill %d jobs with nowhere to run after site %s went %s",
+                                len(failedIDs), siteName, state)
 
         # only now that jobs were updated by the plugin, we flip the site state
         setStateAction = self.wmbsDAOFactory(classname="Locations.SetState")
@@ -52,7 +52,11 @@ import random
 import copy
 import os
 
-from types import LongType
+try:
+    from types import LongType
+except ImportError:
+    # Python 3 has a single int type
+    LongType = int
 
 from WMCore.Services.Dashboard import ProcInfo
 from WMCore.Services.Dashboard.Logger import Logger
@@ -963,8 +967,9 @@ class ApMon(object):
     __valueTypes = {
         type("string"): 0,  # XDR_STRING(see ApMon.h from C/C++ ApMon version)
         type(1): 2, 		# XDR_INT32
-        LongType: 5,		# send longs as doubles (Problem with Python 3 since long is same as int)
         type(1.0): 5}		# XDR_REAL64
+    if LongType is not int:
+        __valueTypes[LongType] = 5  # send longs as doubles
 
     __packFunctions = {
         0: xdrlib.Packer.pack_string,
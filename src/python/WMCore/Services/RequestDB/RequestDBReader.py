@@ -1,5 +1,7 @@
 from builtins import str, bytes, object
+import threading
 import time
+from multiprocessing.pool import ThreadPool
 
 from WMCore.Database.CMSCouch import CouchServer, Database
 from WMCore.Lexicon import splitCouchServiceURL, sanitizeURL
@@ -27,6 +29,10 @@ class RequestDBReader(object):
             self.couchDB = self.couchServer.connectDatabase(self.dbName, False)
         self.couchapp = couchapp
         self.defaultStale = {"stale": "update_after"}
+        # connections used by the query planner threads
+        self._threadDB = threading.local()
+        self.maxConcurrentQueries = 4
+        self.docBatchSize = 1000
 
     def setDefaultStaleOptions(self, options):
         if not options:
@@ -237,6 +243,128 @@ class RequestDBReader(object):
         requestInfo = self._formatCouchData(data, returnDict=returnDict)
         return requestInfo
 
+    def _getThreadDB(self):
+        """
+        The Database object is not thread safe, every planner thread uses
+        its own connection
+        """
+        if getattr(self._threadDB, "couchDB", None) is None:
+            self._threadDB.couchDB = self.couchServer.connectDatabase(self.dbName, False)
+        return self._threadDB.couchDB
+
+    def _getViewIDs(self, viewQuery):
+        """
+        Return the set of document ids matching a (view, keys) query, without
+        fetching the documents
+        """
+        view, keys = viewQuery
+        if keys and isinstance(keys, (str, bytes)):
+            keys = [keys]
+        options = self.setDefaultStaleOptions({"include_docs": False})
+        data = self._getThreadDB().loadView(self.couchapp, view, options, keys)
+        return set(row["id"] for row in data["rows"])
+
+    def _getDocsByIDs(self, ids, detail, docFilter):
+        """
+        Fetch a batch of documents through _all_docs, skipping the missing
+        and deleted ones, and apply docFilter to the documents
+        """
+        data = self._getThreadDB().allDocs({"include_docs": detail}, ids)
+        result = {}
+        for row in data["rows"]:
+            if "error" in row or row["value"].get("deleted"):
+                continue
+            if detail:
+                doc = row["doc"]
+                self._filterCouchInfo(doc)
+                result[row["id"]] = docFilter(doc) if docFilter else doc
+            else:
+                result[row["id"]] = row["value"]
+        return result
+
+    def getRequestByCouchViews(self, viewQueries, requestNames=None, detail=True, docFilter=None):
+        """
+        _getRequestByCouchViews_
+
+        Query planner for the requests matching all the given conditions.
+        viewQueries is a list of (view, keys) tuples, requestNames an optional
+        list of request names the result must be in.
+
+        Views are queried concurrently for the document ids only, the id sets
+        are intersected starting from the smallest one and only the surviving
+        documents are fetched, in batches through _all_docs. docFilter is applied
+        to every document as it is fetched, e.g. to keep only some of its keys.
+
+        Returns a dict of request documents keyed by request name, or the list
+        of request names if detail is False. Like getRequestByNames, a single
+        request name that doesn't exist raises CouchNotFoundError.
+        """
+        if isinstance(requestNames, (str, bytes)):
+            requestNames = [requestNames]
+        if requestNames and len(requestNames) == 1:
+            # read on its own, the request must exist, whatever the views say
+            requestInfo = self._getRequestByName(requestNames[0], detail=True)
+            for viewQuery in viewQueries:
+                if not requestInfo:
+                    break
+                requestInfo = dict((name, doc) for name, doc in requestInfo.items()
+                                   if name in self._getViewIDs(viewQuery))
+            if not detail:
+                return list(requestInfo)
+            if docFilter:
+                requestInfo = dict((name, docFilter(doc)) for name, doc in requestInfo.items())
+            return requestInfo
+        if not viewQueries and not requestNames:
+            return {} if detail else []
+        if len(viewQueries) == 1 and not requestNames:
+            # nothing to intersect, the view gives the documents straight away
+            view, keys = viewQueries[0]
+            requestInfo = self.getRequestByCouchView(view, {"include_docs": detail}, keys)
+            if not detail:
+                return list(requestInfo)
+            if docFilter:
+                requestInfo = dict((name, docFilter(doc)) for name, doc in requestInfo.items())
+            return requestInfo
+
+        pool = None
+        try:
+            idSets = [set(requestNames)] if requestNames else []
+            if len(viewQueries) > 1:
+                pool = ThreadPool(min(self.maxConcurrentQueries, len(viewQueries)))
+                idSets.extend(pool.map(self._getViewIDs, viewQueries, chunksize=1))
+            else:
+                idSets.extend(self._getViewIDs(viewQuery) for viewQuery in viewQueries)
+
+            idSets.sort(key=len)
+            requestIDs = idSets[0]
+            for idSet in idSets[1:]:
+                if not requestIDs:
+                    break
+                requestIDs = requestIDs & idSet
+
+            # ids coming from the views only exist already
+            if not detail and viewQueries:
+                return list(requestIDs)
+
+            requestIDs = sorted(requestIDs)
+            batches = [requestIDs[i:i + self.docBatchSize] for i in range(0, len(requestIDs), self.docBatchSize)]
+            if len(batches) > 1:
+                pool = pool or ThreadPool(self.maxConcurrentQueries)
+                results = pool.map(lambda ids: self._getDocsByIDs(ids, detail, docFilter), batches, chunksize=1)
+            else:
+                results = [self._getDocsByIDs(ids, detail, docFilter) for ids in batches]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        requestInfo = {}
+        for result in results:
+            requestInfo.update(result)
+        if detail:
+            return requestInfo
+        return list(requestInfo)
+
     def getStatusAndTypeByRequest(self, requestNames):
         if isinstance(requestNames, (str, bytes)):
             requestNames = [requestNames]
@@ -26,6 +26,7 @@ import socket
 import stat
 import sys
 import tempfile
+import time
 import traceback
 import types
 
@@ -35,6 +36,8 @@ from http.client import HTTPException
 from json import JSONEncoder, JSONDecoder
 
 from Utils.CertTools import getKeyCertFromEnv, getCAPathFromEnv
+from Utils.Timers import callCounter
+from Utils.Utilities import decodeBytesToUnicode
 from WMCore.Algorithms import Permissions
 from WMCore.Lexicon import sanitizeURL
 from WMCore.WMException import WMException
@@ -155,14 +158,43 @@ class Requests(dict):
 
         # both httpib2/pycurl require absolute url
         uri = self['host'] + uri
+        startTime = time.time()
         if self.pycurl:
             result, response = self.makeRequest_pycurl(uri, data, verb, headers)
         else:
             result, response = self.makeRequest_httplib(uri, data, verb, headers)
+        if callCounter.enabled:
+            callCounter.record("HTTP", "%s %s" % (verb, sanitizeURL(self["host"])["url"]), time.time() - startTime)
 
         result = self.decodeResult(result, decoder)
         return result, response.status, response.reason, response.fromcache
 
+    def streamRequest(self, uri=None, data=None, verb='GET', incoming_headers=None,
+                      encoder=True, contentType=None):
+        """
+        Like makeRequest, but yield the raw body in chunks as they arrive
+        instead of returning it decoded. Only pycurl streams, with httplib2
+        the body comes in one chunk.
+        """
+        data = data or {}
+        incoming_headers = incoming_headers or {}
+        data, headers = self.encodeParams(data, verb, incoming_headers, encoder, contentType)
+
+        uri = self['host'] + uri
+        startTime = time.time()
+        if self.pycurl:
+            ckey, cert = self.getKeyCert()
+            capath = self.getCAPath()
+            headers["Accept-Encoding"] = "gzip,deflate,identity"
+            for chunk in self.reqmgr.stream(uri, data, headers, verb=verb,
+                                            ckey=ckey, cert=cert, capath=capath):
+                yield chunk
+        else:
+            result, _ = self.makeRequest_httplib(uri, data, verb, headers)
+            yield result
+        if callCounter.enabled:
+            callCounter.record("HTTP", "%s %s" % (verb, sanitizeURL(self["host"])["url"]), time.time() - startTime)
+
     def makeRequest_pycurl(self, uri, data, verb, headers):
         """
         Make HTTP(s) request via pycurl library. Stay complaint with
@@ -557,7 +589,7 @@ class JSONRequests(Requests):
         if data:
             decoder = JSONDecoder()
             thunker = JSONThunker()
-            data = decoder.decode(data)
+            data = decoder.decode(decodeBytesToUnicode(data))
             unthunked = thunker.unthunk(data)
             return unthunked
         return {}
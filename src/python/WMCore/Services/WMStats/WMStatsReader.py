@@ -4,7 +4,7 @@ from builtins import object
 from future.utils import viewitems
 
 import logging
-from Utils.IteratorTools import nestedDictUpdate, grouper
+from Utils.IteratorTools import nestedDictUpdate
 from WMCore.Database.CMSCouch import CouchServer
 from WMCore.Lexicon import splitCouchServiceURL, sanitizeURL
 from WMCore.Services.RequestDB.RequestDBReader import RequestDBReader
@@ -85,6 +85,9 @@ class WMStatsReader(object):
         self.couchDB = self.couchServer.connectDatabase(self.dbName, False)
         self.couchapp = appName
         self.defaultStale = {"stale": "update_after"}
+        # rows (or keys) per view request, and key partitions fetched concurrently
+        self.viewPageSize = 5000
+        self.viewThreads = 4
 
     def setDefaultStaleOptions(self, options):
         if not options:
@@ -114,6 +117,18 @@ class WMStatsReader(object):
             keys = [keys]
         return self.couchDB.loadView(self.couchapp, view, options, keys)
 
+    def _iterCouchView(self, view, options, keys=None):
+        """
+        Like _getCouchView, but iterate over the rows fetched page by page
+        """
+        keys = keys or []
+        options = self.setDefaultStaleOptions(options)
+
+        if keys and isinstance(keys, str):
+            keys = [keys]
+        return self.couchDB.iterView(self.couchapp, view, options, keys,
+                                     pageSize=self.viewPageSize, threads=self.viewThreads)
+
     def _formatCouchData(self, data, key="id"):
         result = {}
         for row in data['rows']:
@@ -188,12 +203,13 @@ class WMStatsReader(object):
         options = {}
         options["reduce"] = True
         options["group"] = True
-        result = self._getCouchView("requestAgentUrl", options)
+        rows = self._iterCouchView("requestAgentUrl", options)
 
         if filterRequest is None:
-            keys = [row['key'] for row in result["rows"]]
+            keys = [row['key'] for row in rows]
         else:
-            keys = [row['key'] for row in result["rows"] if row['key'][0] in filterRequest]
+            filterRequest = set(filterRequest)
+            keys = [row['key'] for row in rows if row['key'][0] in filterRequest]
         return keys
 
     def _getLatestJobInfo(self, keys):
@@ -215,16 +231,8 @@ class WMStatsReader(object):
         options = {}
         options["include_docs"] = True
         options["reduce"] = False
-        finalResults = {}
-        # magic number: 5000 keys (need to check which number is optimal)
-        for sliceKeys in grouper(keys, 5000):
-            self.logger.info("Querying latestRequest with %d keys", len(sliceKeys))
-            result = self._getCouchView("latestRequest", options, sliceKeys)
-            if not finalResults and result:
-                finalResults = result
-            elif result.get('rows'):
-                finalResults['rows'].extend(result['rows'])
-        return finalResults
+        self.logger.info("Querying latestRequest with %d keys, %d per request", len(keys), self.viewPageSize)
+        return {'rows': list(self._iterCouchView("latestRequest", options, keys))}
 
     def _getAllDocsByIDs(self, ids, include_docs=True):
         """
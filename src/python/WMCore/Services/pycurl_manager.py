@@ -52,12 +52,14 @@ import os
 import re
 import subprocess
 import sys
+import time
 import pycurl
+from collections import deque
 from io import BytesIO
 import http.client
 from urllib.parse import urlencode
 
-from Utils.Utilities import encodeUnicodeToBytes
+from Utils.Utilities import encodeUnicodeToBytes, decodeBytesToUnicode
 
 class ResponseHeader(object):
     """ResponseHeader parses HTTP response header"""
@@ -267,7 +269,7 @@ class RequestHandler(object):
         Parse response header.
         This method can be overwritten.
         """
-        return ResponseHeader(header)
+        return ResponseHeader(decodeBytesToUnicode(header, errors="replace"))
 
     def request(self, url, params, headers=None, verb='GET',
                 verbose=0, ckey=None, cert=None, capath=None,
@@ -305,6 +307,70 @@ class RequestHandler(object):
         hbuf.flush()
         return header, data
 
+    def stream(self, url, params, headers=None, verb='GET',
+               ckey=None, cert=None, capath=None,
+               doseq=True, encode=False, cainfo=None, cookie=None):
+        """
+        Fetch data for given set of parameters, yielding the body in chunks
+        as curl receives them instead of returning it at once. Error
+        responses raise the same HTTPException as request, once complete.
+        The transfer times out after timeout seconds without data, not
+        counting the time the caller takes between chunks.
+        """
+        curl = pycurl.Curl()
+        _, hbuf = self.set_opts(curl, url, params, headers, ckey, cert, capath,
+                                None, verb, doseq, encode, cainfo, cookie)
+        chunks = deque()
+        curl.setopt(pycurl.WRITEFUNCTION, chunks.append)
+        curl.setopt(pycurl.TIMEOUT, 0)
+        multi = pycurl.CurlMulti()
+        multi.add_handle(curl)
+        try:
+            status = None
+            numHandles = 1
+            lastData = time.time()
+            while numHandles:
+                ret, numHandles = multi.perform()
+                if ret == pycurl.E_CALL_MULTI_PERFORM:
+                    continue
+                if chunks:
+                    lastData = time.time()
+                    if status is None:
+                        # curl skips the body of followed redirects
+                        status = curl.getinfo(pycurl.RESPONSE_CODE)
+                    if status < 300:
+                        while chunks:
+                            yield chunks.popleft()
+                        lastData = time.time()
+                elif time.time() - lastData > self.timeout:
+                    raise pycurl.error(pycurl.E_OPERATION_TIMEDOUT,
+                                       "No data received for %s seconds" % self.timeout)
+                if numHandles:
+                    multi.select(1.0)
+            _, _, failed = multi.info_read()
+            if failed:
+                raise pycurl.error(failed[0][1], failed[0][2])
+
+            header = self.parse_header(hbuf.getvalue())
+            if header.status >= 300:
+                msg = 'url=%s, code=%s, reason=%s, headers=%s' \
+                      % (url, header.status, header.reason, header.header)
+                exc = http.client.HTTPException(msg)
+                setattr(exc, 'req_data', params)
+                setattr(exc, 'req_headers', headers)
+                setattr(exc, 'url', url)
+                setattr(exc, 'result', b''.join(chunks))
+                setattr(exc, 'status', header.status)
+                setattr(exc, 'reason', header.reason)
+                setattr(exc, 'headers', header.header)
+                raise exc
+            while chunks:
+                yield chunks.popleft()
+        finally:
+            multi.remove_handle(curl)
+            multi.close()
+            curl.close()
+
     def getdata(self, url, params, headers=None, verb='GET',
                 verbose=0, ckey=None, cert=None, doseq=True,
                 encode=False, decode=False, cookie=None):
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+_LogArchiveCollector_
+
+Collect logArchive tarballs into a single tar file, staging them in
+concurrently with a StageInMgr and adding each of them to the archive as
+soon as it arrives, in arrival order.
+
+The number of staged in files not yet in the archive is bounded by a fixed
+number of staging slots: a transfer only starts once it got a slot, and the
+slot is given back when the file has been added to the archive and removed
+from local disk. The archive itself is written from the calling thread,
+with a fixed size copy buffer.
+"""
+from __future__ import division, print_function
+
+import logging
+import os
+import threading
+import time
+from builtins import object
+from queue import Empty, Queue
+
+from WMCore.Storage.StageOutError import StageOutFailure
+
+
+class LogArchiveCollector(object):
+    """
+    _LogArchiveCollector_
+
+    Stage in and archive a list of LFNs, keeping the throughput statistics
+    of the last run in self.stats
+    """
+
+    def __init__(self, stageInMgr, maxConcurrency=8, maxStagedFiles=None, bufferSize=1024 * 1024):
+        self.stageInMgr = stageInMgr
+        self.maxConcurrency = maxConcurrency
+        # staging slots, at least one per transfer
+        self.maxStagedFiles = max(maxStagedFiles or 2 * maxConcurrency, maxConcurrency)
+        self.bufferSize = bufferSize
+        # the only buffer files are read into, the archive is written by a single thread
+        self.copyBuffer = memoryview(bytearray(bufferSize))
+        self.stats = {}
+
+    @staticmethod
+    def _localCopy(lfn):
+        """
+        _localCopy_
+
+        Return where the StageInMgr puts the local copy of an LFN
+        """
+        return os.path.join(os.getcwd(), os.path.basename(lfn))
+
+    def _removeLocalCopy(self, lfn, localPfn=None):
+        """
+        _removeLocalCopy_
+
+        Remove the local, maybe partial, copy of an LFN if there
+        """
+        localPfn = localPfn or self._localCopy(lfn)
+        try:
+            if os.path.isfile(localPfn):
+                os.remove(localPfn)
+        except OSError as ex:
+            logging.warning("Unable to remove the local copy %s: %s", localPfn, str(ex))
+
+    def _stageIn(self, lfns, slots, results, cancelled):
+        """
+        _stageIn_
+
+        Worker thread: stage in LFNs until there are no more, putting
+        (lfn, localPfn, error) tuples into the results queue. Files
+        arriving once the collection was cancelled are removed instead.
+        """
+        while not cancelled.is_set():
+            try:
+                lfn = lfns.get(block=False)
+            except Empty:
+                return
+            slots.acquire()
+            try:
+                localPfn = self.stageInMgr(LFN=lfn)['PFN']
+            except Exception as ex:
+                slots.release()
+                # do not leave partially staged in files behind
+                self._removeLocalCopy(lfn)
+                results.put((lfn, None, ex))
+                continue
+            if cancelled.is_set():
+                self._removeLocalCopy(lfn, localPfn)
+                slots.release()
+                return
+            results.put((lfn, localPfn, None))
+
+    def _addFile(self, tarFile, localPfn, arcname):
+        """
+        _addFile_
+
+        Add a local file to the tar file, return its size
+        """
+        tarInfo = tarFile.gettarinfo(name=localPfn, arcname=arcname)
+        with open(localPfn, 'rb') as fd:
+            tarFile.addfile(tarInfo, _BufferedReader(fd, self.copyBuffer))
+        return tarInfo.size
+
+    def __call__(self, tarFile, lfns, arcname=None, timeout=None, joinTimeout=60):
+        """
+        _operator()_
+
+        Stage in the LFNs and add them to the open tar file, under the name
+        returned by arcname(localPfn) (basename by default). Every local copy
+        is removed once it is in the archive.
+
+        If timeout is given, give up when no file arrived for that many
+        seconds, the missing LFNs being reported as failed. The transfers
+        in progress are then given up to joinTimeout seconds to finish, and
+        all their local copies, complete or partial, are removed.
+
+        Returns the set of archived LFNs and the dictionary of the failed
+        LFNs with their errors.
+        """
+        arcname = arcname or os.path.basename
+        lfns = list(lfns)
+        if hasattr(tarFile, 'copybufsize'):
+            # copy the files in chunks of the size of our buffer
+            tarFile.copybufsize = self.bufferSize
+
+        lfnQueue = Queue()
+        for lfn in lfns:
+            lfnQueue.put(lfn)
+        results = Queue()
+        slots = threading.Semaphore(self.maxStagedFiles)
+        cancelled = threading.Event()
+
+        startTime = time.time()
+        workers = []
+        for _ in range(min(self.maxConcurrency, len(lfns))):
+            worker = threading.Thread(target=self._stageIn, args=(lfnQueue, slots, results, cancelled))
+            # don't let hanging transfers block the job exit
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        archived = set()
+        failed = {}
+        totalSize = 0
+        for _ in range(len(lfns)):
+            try:
+                lfn, localPfn, error = results.get(timeout=timeout)
+            except Empty:
+                logging.error("No logArchive staged in for %s secs, giving up", timeout)
+                break
+            if error is not None:
+                logging.error("Unable to stage in logArchive %s: %s", lfn, str(error))
+                failed[lfn] = error
+                continue
+            try:
+                totalSize += self._addFile(tarFile, localPfn, arcname(localPfn))
+                archived.add(lfn)
+            except (IOError, OSError) as ex:
+                logging.error("Unable to add logArchive %s to the tar file: %s", lfn, str(ex))
+                failed[lfn] = StageOutFailure("Unable to archive the staged in file", LFN=lfn,
+                                              PFN=localPfn, ExceptionDetail=str(ex))
+            finally:
+                if os.path.isfile(localPfn):
+                    os.remove(localPfn)
+                slots.release()
+
+        # after a timeout, stop the workers and clean up what they staged in
+        cancelled.set()
+        deadline = time.time() + joinTimeout
+        for worker in workers:
+            worker.join(max(deadline - time.time(), 0))
+        while True:
+            try:
+                lfn, localPfn, error = results.get(block=False)
+            except Empty:
+                break
+            if localPfn:
+                self._removeLocalCopy(lfn, localPfn)
+        for lfn in lfns:
+            if lfn not in failed and lfn not in archived:
+                failed[lfn] = StageOutFailure("Timeout while staging in logArchives", LFN=lfn)
+                self._removeLocalCopy(lfn)
+        if any(worker.is_alive() for worker in workers):
+            logging.warning("Some logArchive stage ins are still hanging, giving up on them")
+
+        elapsed = max(time.time() - startTime, 1e-6)
+        self.stats = {'files': len(archived), 'failed': len(failed), 'bytes': totalSize, 'time': elapsed,
+                      'filesPerSec': len(archived) / elapsed, 'MBPerSec': totalSize / 1e6 / elapsed}
+        logging.info("Archived %d logArchives (%d failed), %.1f MB in %.1f secs: %.1f files/s, %.2f MB/s",
+                     len(archived), len(failed), totalSize / 1e6, elapsed,
+                     self.stats['filesPerSec'], self.stats['MBPerSec'])
+        return archived, failed
+
+
+class _BufferedReader(object):
+    """
+    _BufferedReader_
+
+    File wrapper reading into a preallocated buffer, so that copying a file
+    into the archive does not allocate memory for its content. The data
+    returned by read is only valid until the next call.
+    """
+
+    def __init__(self, fd, buffer):
+        self.fd = fd
+        self.buffer = buffer
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > len(self.buffer):
+            size = len(self.buffer)
+        numRead = self.fd.readinto(self.buffer[:size])
+        return self.buffer[:numRead]
@@ -10,10 +10,16 @@ use this class as a basic API
 from __future__ import print_function
 
 import logging
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+
 # If we don't import them, they cannot be ever used (bad PyCharm!)
 import WMCore.Storage.Backends
 import WMCore.Storage.Plugins
 
+from Utils.FileTools import calculateAdler32
+from WMCore.Algorithms.Alarm import Alarm
 from WMCore.Services.Dashboard.DashboardAPI import stageoutPolicyReport
 from WMCore.Storage.DeleteMgr import DeleteMgr
 from WMCore.Storage.Registry import retrieveStageOutImpl
@@ -60,6 +66,12 @@ class StageOutMgr:
         self.numberOfRetries = 3
         self.retryPauseTime = 600
 
+        # stageOutFiles settings: number of transfers run at the same time
+        # and whether the local files are checked against their adler32,
+        # off by default since it reads every file once more
+        self.maxConcurrentTransfers = 4
+        self.validateChecksums = False
+
         from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig
 
         #  //
@@ -76,6 +88,11 @@ class StageOutMgr:
 
         self.failed = {}
         self.completedFiles = {}
+        # set when stageOutFiles is interrupted, transfers completing
+        # afterwards delete their file
+        self.aborted = False
+        # protects failed, completedFiles and aborted, updated by concurrent transfers
+        self.lock = threading.Lock()
         return
 
     def initialiseSiteConf(self):
@@ -204,7 +221,8 @@ class StageOutMgr:
                 fileToStage['PFN'] = pfn
                 fileToStage['PNN'] = self.siteCfg.localStageOut['phedex-node']
                 fileToStage['StageOutCommand'] = self.siteCfg.localStageOut['command']
-                self.completedFiles[fileToStage['LFN']] = fileToStage
+                with self.lock:
+                    self.completedFiles[fileToStage['LFN']] = fileToStage
 
                 logging.info("===> Stage Out Successful: %s", fileToStage)
                 fileToStage = stageoutPolicyReport(fileToStage, None, None, 'LOCAL', 0)
@@ -235,9 +253,9 @@ class StageOutMgr:
                 fileToStage['PNN'] = fallback['phedex-node']
                 fileToStage['StageOutCommand'] = fallback['command']
                 logging.info("attempting fallback")
-                self.completedFiles[fileToStage['LFN']] = fileToStage
-                if lfn in self.failed:
-                    del self.failed[lfn]
+                with self.lock:
+                    self.completedFiles[fileToStage['LFN']] = fileToStage
+                    self.failed.pop(lfn, None)
 
                 logging.info("===> Stage Out Successful: %s", fileToStage)
                 fileToStage = stageoutPolicyReport(fileToStage, None, None, 'FALLBACK', 0)
@@ -250,6 +268,105 @@ class StageOutMgr:
 
         raise lastException
 
+    def stageOutFiles(self, filesToStage, maxConcurrency=None):
+        """
+        _stageOutFiles_
+
+        Stage out a list of files, running up to maxConcurrency (default
+        self.maxConcurrentTransfers) transfers at the same time. Every file
+        goes through the local stage out and the fallbacks like with __call__,
+        its StageOutReport listing the attempts in the order they were made.
+
+        Failed files are kept in self.failed and do not stop the others.
+        Returns the list of (fileToStage, exception) in the order of the
+        input files, exception being None for the successful ones.
+
+        If interrupted, e.g. by an Alarm, the manager is marked as aborted:
+        the transfers not started yet are dropped and the ones still running
+        delete their file when they complete.
+        """
+        filesToStage = list(filesToStage)
+        maxConcurrency = min(maxConcurrency or self.maxConcurrentTransfers, len(filesToStage))
+        pool = None
+        try:
+            if maxConcurrency <= 1:
+                results = [self._stageOutFile(fileToStage) for fileToStage in filesToStage]
+            else:
+                logging.info("===> Staging out %d files with %d concurrent transfers",
+                             len(filesToStage), maxConcurrency)
+                pool = ThreadPool(maxConcurrency)
+                # map keeps the input order
+                results = pool.map(self._stageOutFile, filesToStage, chunksize=1)
+        except BaseException:
+            # e.g. the Alarm of a hung transfer, the running transfers cannot
+            # be stopped so don't wait for them, they clean up after themselves
+            with self.lock:
+                self.aborted = True
+            if pool is not None:
+                pool.terminate()
+            raise
+        if pool is not None:
+            pool.close()
+            pool.join()
+        return list(zip(filesToStage, results))
+
+    def _stageOutFile(self, fileToStage):
+        """
+        _stageOutFile_
+
+        Validate and stage out a single file, returning the exception
+        raised by the stage out, None if it succeeded
+        """
+        lfn = fileToStage['LFN']
+        try:
+            if self.aborted:
+                raise StageOutFailure("Stage out aborted", LFN=lfn)
+            if self.validateChecksums:
+                self.checkLocalChecksum(fileToStage)
+            self(fileToStage)
+        except Alarm:
+            # interrupts the transfers run in the main thread
+            raise
+        except Exception as ex:
+            logging.error("===> Stage Out Failure for file %s: %s", lfn, str(ex))
+            with self.lock:
+                self.failed[lfn] = ex
+            return ex
+
+        lateFile = None
+        with self.lock:
+            # completed after cleanSuccessfulStageOuts took the files to delete
+            if self.aborted and lfn in self.completedFiles:
+                lateFile = self.completedFiles.pop(lfn)
+                lateError = StageOutFailure("Stage out completed after it was aborted", LFN=lfn)
+                self.failed[lfn] = lateError
+        if lateFile is not None:
+            logging.error("===> Stage out of %s completed after it was aborted", lfn)
+            self.deleteStagedOutFile(lfn, lateFile)
+            return lateError
+        return None
+
+    @staticmethod
+    def checkLocalChecksum(fileToStage):
+        """
+        _checkLocalChecksum_
+
+        Make sure the local file to stage out matches the adler32 checksum
+        given in its Checksums, if any, so that a corrupted file is never
+        transferred. Files that are not local are not checked.
+        """
+        expected = (fileToStage.get('Checksums') or {}).get('adler32')
+        localPfn = fileToStage['PFN']
+        if not expected or not os.path.isfile(localPfn):
+            return
+        adler32 = calculateAdler32(localPfn)
+        if int(adler32, 16) != int(str(expected), 16):
+            fileToStage['StageOutReport'] = []
+            msg = "Checksum mismatch for the local file %s: adler32 %s instead of %s" % (localPfn, adler32,
+                                                                                        expected)
+            raise StageOutFailure(msg, LFN=fileToStage['LFN'], InputPFN=localPfn)
+        return
+
     def fallbackStageOut(self, lfn, localPfn, fbParams, checksums):
         """
         _fallbackStageOut_
@@ -339,20 +456,32 @@ class StageOutMgr:
 
 
         """
-        for lfn, fileInfo in self.completedFiles.items():
-            pfn = fileInfo['PFN']
-            command = fileInfo['StageOutCommand']
-            msg = "Cleaning out file: %s\n" % lfn
-            msg += "Removing PFN: %s" % pfn
-            msg += "Using command implementation: %s\n" % command
-            logging.info(msg)
-            delManager = DeleteMgr(**self.overrideConf)
-            try:
-                delManager.deletePFN(pfn, lfn, command)
-            except StageOutFailure as ex:
-                msg = "Failed to cleanup staged out file after error:"
-                msg += " %s\n%s" % (lfn, str(ex))
-                logging.error(msg)
+        with self.lock:
+            completedFiles = self.completedFiles
+            self.completedFiles = {}
+        for lfn, fileInfo in completedFiles.items():
+            self.deleteStagedOutFile(lfn, fileInfo)
+
+    def deleteStagedOutFile(self, lfn, fileInfo):
+        """
+        _deleteStagedOutFile_
+
+        Delete a file staged out by this manager
+
+        """
+        pfn = fileInfo['PFN']
+        command = fileInfo['StageOutCommand']
+        msg = "Cleaning out file: %s\n" % lfn
+        msg += "Removing PFN: %s" % pfn
+        msg += "Using command implementation: %s\n" % command
+        logging.info(msg)
+        delManager = DeleteMgr(**self.overrideConf)
+        try:
+            delManager.deletePFN(pfn, lfn, command)
+        except StageOutFailure as ex:
+            msg = "Failed to cleanup staged out file after error:"
+            msg += " %s\n%s" % (lfn, str(ex))
+            logging.error(msg)
 
     def searchTFC(self, lfn):
         """
@@ -41,6 +41,59 @@ from WMCore.Algorithms.ParseXMLFile import xmlFileToNode
 
 _TFCArgSplit = re.compile("\?protocol=")
 
+# $1, $2... references in the result of a rule
+_ResultReference = re.compile(r"\$(\d)")
+
+
+def _compileResult(result):
+    """
+    _compileResult_
+
+    Turn the result of a rule into a str.format template, returned along
+    with the number of path parts it references and the result itself
+    """
+    template = result.replace("{", "{{").replace("}", "}}")
+    numParts = 0
+    for ref in set(_ResultReference.findall(result)):
+        if ref != "0":
+            template = template.replace("$" + ref, "{%d}" % (int(ref) - 1))
+            numParts = max(numParts, int(ref))
+    return template, numParts, result
+
+
+def _applyRules(rules, path):
+    """
+    _applyRules_
+
+    Return the result of the first of the compiled rules matching the path,
+    None if none matches. A rule matches if its expression matches the path,
+    or for chained rules, if its expression is found in the result of the
+    rules of the chained protocol. $1, $2... in the result are replaced by
+    the non empty parts of the path split by the expression.
+    """
+    for regex, (template, numParts, result), chainRules in rules:
+        if chainRules is None:
+            match = regex.match(path)
+            if match is None:
+                continue
+            subject = path
+        else:
+            subject = _applyRules(chainRules, path)
+            match = regex.search(subject) if subject else None
+            if match is None:
+                continue
+        # the parts of regex.split(subject, 1)
+        splitList = [split for split in (subject[:match.start()],) + match.groups() + (subject[match.end():],)
+                     if split]
+        if numParts <= len(splitList):
+            return template.format(*splitList)
+        # references to missing parts are left as they are
+        for split in range(len(splitList)):
+            result = result.replace("$" + str(split + 1), splitList[split])
+        return result
+
+    return None
+
 
 class TrivialFileCatalog(dict):
     """
@@ -48,6 +101,12 @@ class TrivialFileCatalog(dict):
 
     Object that can map LFNs to PFNs based on contents of a Trivial
     File Catalog
+
+    The mappings are compiled on the first match: grouped by protocol, in
+    their original order, with the rules of the chained protocol resolved
+    into a direct reference and their results split around the $N
+    references. Matching a path then only runs the expressions of the
+    rules of its protocol chain, and fills in the result.
     """
 
     def __init__(self):
@@ -55,6 +114,7 @@ class TrivialFileCatalog(dict):
         self['lfn-to-pfn'] = []
         self['pfn-to-lfn'] = []
         self.preferredProtocol = None  # attribute for preferred protocol
+        self.compiledRules = {}
 
     def addMapping(self, protocol, match, result,
                    chain=None, mapping_type='lfn-to-pfn'):
@@ -71,40 +131,38 @@ class TrivialFileCatalog(dict):
         entry.setdefault("result", result)
         entry.setdefault("chain", chain)
         self[mapping_type].append(entry)
+        # the compiled rules are no longer valid
+        self.compiledRules = {}
+
+    def _compileRules(self, style):
+        """
+        _compileRules_
 
-    def _doMatch(self, protocol, path, style, caller):
+        Return a dictionary of protocol to the list of (expression, compiled
+        result, chained protocol rules) of the mappings of the given style
+        """
+        rulesByProtocol = {}
+        for mapping in self[style]:
+            chainRules = None
+            if mapping['chain'] is not None:
+                # the same list is filled in below if the chained protocol comes later
+                chainRules = rulesByProtocol.setdefault(mapping['chain'], [])
+            rulesByProtocol.setdefault(mapping['protocol'], []).append((mapping['path-match-expr'],
+                                                                        _compileResult(mapping['result']),
+                                                                        chainRules))
+        return rulesByProtocol
+
+    def _doMatch(self, protocol, path, style):
         """
         Generalised way of building up the mappings.
-        caller is the method from there this method was called, it's used
-        for resolving chained rules
 
         Return None if no match
 
         """
-        for mapping in self[style]:
-            if mapping['protocol'] != protocol:
-                continue
-            if mapping['path-match-expr'].match(path) or mapping["chain"] != None:
-                if mapping["chain"] != None:
-                    oldpath = path
-                    path = caller(mapping["chain"], path)
-                    if not path:
-                        continue
-                splitList = []
-                if len(mapping['path-match-expr'].split(path, 1)) > 1:
-                    for split in range(len(mapping['path-match-expr'].split(path, 1))):
-                        s = mapping['path-match-expr'].split(path, 1)[split]
-                        if s:
-                            splitList.append(s)
-                else:
-                    path = oldpath
-                    continue
-                result = mapping['result']
-                for split in range(len(splitList)):
-                    result = result.replace("$" + str(split + 1), splitList[split])
-                return result
-
-        return None
+        compiledRules = self.compiledRules.get(style)
+        if compiledRules is None:
+            compiledRules = self.compiledRules[style] = self._compileRules(style)
+        return _applyRules(compiledRules.get(protocol, []), path)
 
     def matchLFN(self, protocol, lfn):
         """
@@ -116,7 +174,7 @@ class TrivialFileCatalog(dict):
         Return None if no match
 
         """
-        result = self._doMatch(protocol, lfn, "lfn-to-pfn", self.matchLFN)
+        result = self._doMatch(protocol, lfn, "lfn-to-pfn")
         return result
 
     def matchPFN(self, protocol, pfn):
@@ -129,7 +187,7 @@ class TrivialFileCatalog(dict):
         Return None if no match
 
         """
-        result = self._doMatch(protocol, pfn, "pfn-to-lfn", self.matchPFN)
+        result = self._doMatch(protocol, pfn, "pfn-to-lfn")
         return result
 
     def getXML(self):
@@ -11,44 +11,86 @@ from WMCore.Database.DBFormatter import DBFormatter
 from builtins import str, bytes
 
 class AddRunLumi(DBFormatter):
-    sql = """INSERT IGNORE wmbs_file_runlumi_map (fileid, run, lumi, num_events)
-            select id, :run, :lumi, :num_events from wmbs_file_details
-            where lfn = :lfn"""
+    """
+    _AddRunLumi_
 
-    def getBinds(self, filename=None, runs=None):
+    Insert the run/lumi information of one or many files. The file ids
+    are resolved once per LFN, such that the insert itself does not need
+    a subquery on wmbs_file_details for every single lumi section. The
+    lumi binds are positional tuples, in the order of the sql bind
+    variables, instead of one dictionary per lumi section.
+    """
+    fileIDSQL = """SELECT id, lfn FROM wmbs_file_details WHERE lfn = :lfn"""
 
-        binds = []
+    sql = """INSERT IGNORE INTO wmbs_file_runlumi_map (fileid, run, lumi, num_events)
+               VALUES (:fileid, :run, :lumi, :num_events)"""
 
+    # number of lumi binds sent to the database per processData call
+    batchSize = 10000
+
+    def getLFNRuns(self, filename=None, runs=None):
+        """
+        _getLFNRuns_
+
+        Normalize the input arguments into a list of (lfn, runs) tuples.
+        """
         if isinstance(filename, list):
+            lfnRuns = []
             for entry in filename:
-                binds.extend(self.getBinds(filename=entry['lfn'], runs=entry['runs']))
-            return binds
+                lfnRuns.extend(self.getLFNRuns(filename=entry['lfn'], runs=entry['runs']))
+            return lfnRuns
 
         if isinstance(filename, (str, bytes)):
             lfn = filename
         elif isinstance(filename, dict):
-            lfn = filename('lfn')
+            lfn = filename['lfn']
         else:
             raise Exception("Type of filename argument is not allowed: %s" \
                             % type(filename))
 
-        if isinstance(runs, set):
-            for run in runs:
-                for lumi in run:
-                    binds.append({'lfn': lfn,
-                                  'run': run.run,
-                                  'lumi': lumi,
-                                  'num_events': run.getEventsByLumi(lumi)})
-        else:
+        if not isinstance(runs, set):
             raise Exception("Type of runs argument is not allowed: %s" \
                             % type(runs))
-        return binds
+        return [(lfn, runs)]
+
+    def getFileIDs(self, lfns, conn=None, transaction=False):
+        """
+        _getFileIDs_
+
+        Return a dictionary mapping every LFN to its file id. LFNs not yet
+        available in wmbs_file_details are left out.
+        """
+        binds = [{'lfn': lfn} for lfn in lfns]
+        if not binds:
+            return {}
+        result = self.dbi.processData(self.fileIDSQL, binds, conn=conn,
+                                      transaction=transaction)
+        return dict((row['lfn'], int(row['id'])) for row in self.formatDict(result))
+
+    def getBinds(self, lfnRuns, fileIDs):
+        """
+        _getBinds_
+
+        Yield one (fileid, run, lumi, num_events) bind per lumi section of
+        the (lfn, runs) tuples, skipping the lumis of files without id.
+        """
+        for lfn, runSet in lfnRuns:
+            if lfn not in fileIDs:
+                continue
+            fileID = fileIDs[lfn]
+            for run in runSet:
+                for lumi in run:
+                    yield (fileID, run.run, lumi, run.getEventsByLumi(lumi))
 
     def format(self, result):
         return True
 
     def execute(self, file=None, runs=None, conn=None, transaction=False):
-        for sliceBinds in grouper(self.getBinds(file, runs), 10000):
-            result = self.dbi.processData(self.sql, sliceBinds, conn=conn,
-                                          transaction=transaction)
-        return self.format(result)
+        lfnRuns = self.getLFNRuns(file, runs)
+        fileIDs = self.getFileIDs(set(lfn for lfn, _ in lfnRuns),
+                                  conn=conn, transaction=transaction)
+
+        for sliceBinds in grouper(self.getBinds(lfnRuns, fileIDs), self.batchSize):
+            self.dbi.processData(self.sql, sliceBinds, conn=conn,
+                                 transaction=transaction)
+        return self.format(None)
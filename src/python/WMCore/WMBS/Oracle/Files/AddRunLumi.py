@@ -9,12 +9,10 @@ class AddRunLumi(AddRunLumiMySQL):
 
     overwirtes MySQL Files.AddRunLumi.sql to use in oracle.
 
-    To Check: might not need to overwrite if modifiy MySQL.Files.AddRunLumi.sql
-    a bit to work with both
+    Duplicate (fileid, run, lumi) rows are skipped through the primary key
+    index, so no correlated subquery is needed per lumi section. The
+    positional binds are bound in the order of the bind variables.
     """
-    sql = """INSERT INTO wmbs_file_runlumi_map (fileid, run, lumi, num_events)
-                SELECT wfd.id, :run, :lumi, :num_events FROM wmbs_file_details wfd WHERE lfn = :lfn
-                  AND NOT EXISTS (SELECT fileid FROM wmbs_file_runlumi_map wfrm2
-                                   WHERE wfrm2.fileid = wfd.id
-                                   AND wfrm2.run = :run
-                                   AND wfrm2.lumi = :lumi)"""
+    sql = """INSERT /*+ IGNORE_ROW_ON_DUPKEY_INDEX (wmbs_file_runlumi_map (fileid, run, lumi)) */
+               INTO wmbs_file_runlumi_map (fileid, run, lumi, num_events)
+               VALUES (:fileid, :run, :lumi, :num_events)"""
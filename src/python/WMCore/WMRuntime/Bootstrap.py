@@ -3,9 +3,13 @@
 _TaskSpace_
 
 Frontend module for setting up TaskSpace & StepSpace areas within a job.
+
+This is the first module imported by every job, so it only imports what
+the job wrapper needs upfront: the rest of WMCore is imported by the
+functions using it. The module and import time budget is enforced by
+WMCore_t.WMRuntime_t.Bootstrap_t
 """
 
-import inspect
 import logging
 import os
 import os.path
@@ -15,14 +19,7 @@ import sys
 import threading
 from logging.handlers import RotatingFileHandler
 
-import WMCore.FwkJobReport.Report as Report
-from WMCore.DataStructs.JobPackage import JobPackage
-from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig, SiteConfigError
 from WMCore.WMException import WMException
-from WMCore.WMRuntime import StepSpace
-from WMCore.WMRuntime import TaskSpace
-from WMCore.WMRuntime.Watchdog import Watchdog
-from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 
 
 class BootstrapException(WMException):
@@ -78,6 +75,7 @@ def establishTaskSpace(**args):
     Bootstrap method for the execution dir for a WMTask
 
     """
+    from WMCore.WMRuntime import TaskSpace
     return TaskSpace.TaskSpace(**args)
 
 
@@ -88,6 +86,7 @@ def establishStepSpace(**args):
     Bootstrap method for the execution dir of a WMStep within a WMTask
 
     """
+    from WMCore.WMRuntime import StepSpace
     return StepSpace.StepSpace(**args)
 
 
@@ -109,9 +108,7 @@ def locateWMSandbox():
         msg += str(ex)
         raise BootstrapException(msg)
 
-    wmsandboxLoc = inspect.getsourcefile(WMSandbox)
-    wmsandboxLoc = wmsandboxLoc.replace("__init__.py", "")
-    return wmsandboxLoc
+    return os.path.join(os.path.dirname(os.path.abspath(WMSandbox.__file__)), "")
 
 
 def loadJobDefinition():
@@ -125,6 +122,8 @@ def loadJobDefinition():
     Report names are dependent on the retry_count, but if it fails unpacking the job
     it doesn't know the retry_count and will create the wrong file
     """
+    from WMCore.DataStructs.JobPackage import JobPackage
+
     sandboxLoc = locateWMSandbox()
     package = JobPackage()
     packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
@@ -166,6 +165,8 @@ def loadWorkload():
     Load the Workload from the WMSandbox Area
 
     """
+    from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
+
     sandboxLoc = locateWMSandbox()
     workloadPcl = "%s/WMWorkload.pkl" % sandboxLoc
     with open(workloadPcl, 'r') as handle:
@@ -214,6 +215,9 @@ def createInitialReport(job, reportName):
     Create an initial job report with the base
     information in it.
     """
+    import WMCore.FwkJobReport.Report as Report
+    from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig, SiteConfigError
+
     try:
         siteCfg = loadSiteLocalConfig()
     except SiteConfigError:
@@ -272,6 +276,8 @@ def createErrorReport(exitCode, errorType, errorDetails=None,
     This creates a dummy step called 'CRITICAL' and
     sticks the error in there.
     """
+    import WMCore.FwkJobReport.Report as Report
+    from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig, SiteConfigError
 
     try:
         siteCfg = loadSiteLocalConfig()
@@ -344,6 +350,8 @@ def setupMonitoring(logName):
     Attach it to a thread.
 
     """
+    from WMCore.WMRuntime.Watchdog import Watchdog
+
     try:
         monitor = Watchdog(logPath=logName)
         myThread = threading.currentThread
@@ -15,11 +15,11 @@ import os.path
 import signal
 import time
 
-import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
 import WMCore.FwkJobReport.Report as Report
 from WMCore.WMException import WMException
 from WMCore.WMRuntime.Monitors.DashboardMonitor import getStepPID
 from WMCore.WMRuntime.Monitors.WMRuntimeMonitor import WMRuntimeMonitor
+from WMCore.WMRuntime.Tools.ProcessSampler import ProcessTreeSampler
 from WMCore.WMSpec.Steps.Executor import getStepSpace
 from WMCore.WMSpec.WMStep import WMStepHelper
 
@@ -47,8 +47,9 @@ class PerformanceMonitor(WMRuntimeMonitor):
     """
     _PerformanceMonitor_
 
-    Monitors the performance by pinging ps and
-    recording data regarding the current step
+    Monitors the performance by sampling /proc for the process tree
+    of the current step, see ProcessSampler, and records the statistics
+    in the step performance section of the job report
     """
 
     def __init__(self):
@@ -59,15 +60,9 @@ class PerformanceMonitor(WMRuntimeMonitor):
 
         self.pid = None
         self.uid = os.getuid()
-        self.monitorBase = "ps -p %i -o pid,ppid,rss,pcpu,pmem,cmd -ww | grep %i"
-        self.pssMemoryCommand = "awk '/^Pss/ {pss += $2} END {print pss}' /proc/%i/smaps"
-        self.monitorCommand = None
         self.currentStepSpace = None
         self.currentStepName = None
-
-        self.rss = []
-        self.pcpu = []
-        self.pmem = []
+        self.sampler = None
 
         self.maxPSS = None
         self.softTimeout = None
@@ -125,6 +120,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
         self.stepHelper = WMStepHelper(step)
         self.currentStepName = getStepName(step)
         self.currentStepSpace = None
+        self.sampler = None
 
         if not self.stepHelper.stepType() in self.watchStepTypes:
             self.disableStep = True
@@ -143,12 +139,32 @@ class PerformanceMonitor(WMRuntimeMonitor):
         Package the information and send it off
         """
 
-        if not self.disableStep:
-            # No information to correlate
-            return
+        if not self.disableStep and self.sampler is not None and stepReport is not None:
+            self.reportStatistics(stepReport, getStepName(step))
 
         self.currentStepName = None
         self.currentStepSpace = None
+        self.sampler = None
+
+        return
+
+    def reportStatistics(self, stepReport, stepName):
+        """
+        _reportStatistics_
+
+        Write the min/max/average of the step samples into the performance
+        section of the step report. Memory values are in MB.
+        """
+        summary = self.sampler.summary()
+        if summary is None or stepReport.retrieveStep(stepName) is None:
+            return
+
+        reportSetters = {'rss': stepReport.setStepRSS, 'pss': stepReport.setStepPSS,
+                         'vsize': stepReport.setStepVSize, 'pcpu': stepReport.setStepPCPU,
+                         'pmem': stepReport.setStepPMEM}
+        for field, setter in reportSetters.items():
+            setter(stepName, minimum=summary[field]['min'], maximum=summary[field]['max'],
+                   average=summary[field]['average'])
 
         return
 
@@ -183,38 +199,21 @@ class PerformanceMonitor(WMRuntimeMonitor):
             # Then we have no step PID, we can do nothing
             return
 
-        # Now we run the ps monitor command and collate the data
-        # Gathers RSS, %CPU and %MEM statistics from ps
-        ps_cmd = self.monitorBase % (stepPID, stepPID)
-        stdout, _stderr, _retcode = subprocessAlgos.runCommand(ps_cmd)
-
-        ps_output = stdout.split()
-        if not len(ps_output) > 6:
-            # Then something went wrong in getting the ps data
-            msg = "Error when grabbing output from process ps\n"
-            msg += "output = %s\n" % ps_output
-            msg += "command = %s\n" % ps_cmd
-            logging.error(msg)
-            return
-
-        # run the command to gather PSS memory statistics from /proc/<pid>/smaps
-        smaps_cmd = self.pssMemoryCommand % (stepPID)
-        stdout, _stderr, _retcode = subprocessAlgos.runCommand(smaps_cmd)
+        sampler = self.sampler
+        if sampler is None or sampler.pid != stepPID:
+            sampler = self.sampler = ProcessTreeSampler(stepPID)
 
-        smaps_output = stdout.split()
-        if not len(smaps_output) == 1:
-            # Then something went wrong in getting the smaps data
-            msg = "Error when grabbing output from smaps\n"
-            msg += "output = %s\n" % smaps_output
-            msg += "command = %s\n" % smaps_cmd
-            logging.error(msg)
+        # Gathers PSS, RSS, %CPU and %MEM statistics of the step process tree from /proc
+        sample = sampler.sample()
+        if sample is None:
+            # Then the step process is gone
+            logging.error("Error when sampling /proc for the step process %s", stepPID)
             return
 
-        # smaps also returns data in kiloBytes, let's make it megaBytes
-        # I'm also confused with these megabytes and mebibytes...
-        pss = int(smaps_output[0]) // 1000
+        pss = sample['pss']
 
-        logging.info("PSS: %s; RSS: %s; PCPU: %s; PMEM: %s", smaps_output[0], ps_output[2], ps_output[3], ps_output[4])
+        logging.info("PSS: %s; RSS: %s; PCPU: %s; PMEM: %s; Processes: %s", sample['pss'], sample['rss'],
+                     sample['pcpu'], sample['pmem'], sample['numProcs'])
 
         msg = 'Error in CMSSW step %s\n' % self.currentStepName
         msg += 'Number of Cores: %s\n' % self.numOfCores
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+_ImportProfiler_
+
+Aggregate the python import times of a job run.
+
+Python 3.7+ reports the time spent importing every module on stderr when
+run with -X importtime, or with PYTHONPROFILEIMPORTTIME set in the
+environment, which also covers all the python subprocesses of a job.
+Every process output starts with a header line, followed by lines like:
+
+    import time:       228 |      31662 |   WMCore.WMException
+
+giving the time spent in the module itself and including its imports, in
+microseconds, the indentation of the name being the import depth.
+
+Usage:
+    python ImportProfiler.py [--top N] stderr.log [...]
+    python ImportProfiler.py [--top N] --run <command> [args...]
+"""
+from __future__ import division, print_function
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+_HEADER = re.compile(r'^import time:\s+self \[us\]')
+_ENTRY = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+
+def parseImportTime(lines):
+    """
+    _parseImportTime_
+
+    Parse -X importtime output, return a list of processes, each of them a
+    list of (module, self, cumulative, depth) tuples, times in microseconds.
+    Other lines are ignored.
+    """
+    processes = []
+    current = None
+    for line in lines:
+        if _HEADER.match(line):
+            current = []
+            processes.append(current)
+            continue
+        match = _ENTRY.match(line)
+        if not match:
+            continue
+        if current is None:
+            # output without header, e.g. a truncated log
+            current = []
+            processes.append(current)
+        selfTime, cumulative, indent, module = match.groups()
+        current.append((module, int(selfTime), int(cumulative), (len(indent) - 1) // 2))
+    return processes
+
+
+def summarizeImports(processes, top=20):
+    """
+    _summarizeImports_
+
+    Aggregate parsed processes: number of processes and modules, total
+    import time, the modules taking most time by themselves and the time
+    per top level package, times in seconds.
+    """
+    modules = {}
+    packages = {}
+    totalTime = 0
+    numImports = 0
+    for process in processes:
+        for module, selfTime, cumulative, depth in process:
+            numImports += 1
+            if depth == 0:
+                totalTime += cumulative
+            modules[module] = modules.get(module, 0) + selfTime
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + selfTime
+
+    bySelfTime = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+    byPackage = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {'numProcesses': len(processes),
+            'numImports': numImports,
+            'numModules': len(modules),
+            'totalTime': totalTime / 1e6,
+            'topModules': [(module, usecs / 1e6) for module, usecs in bySelfTime[:top]],
+            'topPackages': [(package, usecs / 1e6) for package, usecs in byPackage[:top]]}
+
+
+def formatSummary(summary):
+    """
+    _formatSummary_
+
+    Human readable report of a summary
+    """
+    lines = ["%d processes imported %d modules (%d distinct) in %.3f secs" %
+             (summary['numProcesses'], summary['numImports'], summary['numModules'], summary['totalTime'])]
+    lines.append("Top packages (self time):")
+    lines.extend("  %8.3f  %s" % (secs, package) for package, secs in summary['topPackages'])
+    lines.append("Top modules (self time):")
+    lines.extend("  %8.3f  %s" % (secs, module) for module, secs in summary['topModules'])
+    return "\n".join(lines)
+
+
+def profileCommand(command, env=None):
+    """
+    _profileCommand_
+
+    Run a command with import time profiling enabled for all its python
+    processes, return its exit code and the parsed processes. The command
+    stderr is consumed by the profiling.
+    """
+    env = dict(env if env is not None else os.environ)
+    env['PYTHONPROFILEIMPORTTIME'] = '1'
+    process = subprocess.Popen(command, env=env, stderr=subprocess.PIPE, universal_newlines=True)
+    _, stderr = process.communicate()
+    return process.returncode, parseImportTime(stderr.splitlines())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate python -X importtime output")
+    parser.add_argument('--top', type=int, default=20, help="number of modules and packages to list")
+    parser.add_argument('--run', action='store_true',
+                        help="run the command given as arguments with import time profiling")
+    parser.add_argument('args', nargs='+', help="stderr log files, or the command to run")
+    args = parser.parse_args(argv)
+
+    if args.run:
+        exitCode, processes = profileCommand(args.args)
+    else:
+        exitCode = 0
+        processes = []
+        for logFile in args.args:
+            with open(logFile, 'r') as fd:
+                processes.extend(parseImportTime(fd))
+    print(formatSummary(summarizeImports(processes, args.top)))
+    return exitCode
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+_ProcessSampler_
+
+Sample the memory and CPU usage of a process tree directly from /proc,
+without forking any command.
+
+For every process in the tree rooted at a given pid:
+ - /proc/<pid>/stat provides the parent pid and the user+system CPU time
+ - /proc/<pid>/status provides VmRSS and VmSize
+ - /proc/<pid>/smaps_rollup provides the PSS (summing /proc/<pid>/smaps
+   on kernels older than 4.14, which don't have it)
+
+Memory values are given in MB (1000 kB) and CPU usage as a percentage of
+one core since the previous sample, 100% per fully busy core.
+"""
+from __future__ import division
+
+import os
+import time
+from collections import deque
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+SAMPLE_FIELDS = ('rss', 'pss', 'vsize', 'pcpu', 'pmem')
+
+
+def _readFile(fileName):
+    with open(fileName, 'r') as fd:
+        return fd.read()
+
+
+def readStat(pid):
+    """
+    _readStat_
+
+    Return the parent pid and the CPU time in clock ticks of a process
+    """
+    stat = _readFile('/proc/%d/stat' % pid)
+    # the command name can contain spaces and parenthesis, skip it
+    fields = stat[stat.rindex(')') + 2:].split()
+    # fields start at the state (3rd field): ppid is 4th, utime 14th, stime 15th
+    return int(fields[1]), int(fields[11]) + int(fields[12])
+
+
+def readStatus(pid):
+    """
+    _readStatus_
+
+    Return the resident and virtual memory of a process, in kB
+    """
+    rss = vsize = 0
+    for line in _readFile('/proc/%d/status' % pid).splitlines():
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1])
+        elif line.startswith('VmSize:'):
+            vsize = int(line.split()[1])
+    return rss, vsize
+
+
+def readPSS(pid):
+    """
+    _readPSS_
+
+    Return the proportional set size of a process, in kB
+    """
+    try:
+        smaps = _readFile('/proc/%d/smaps_rollup' % pid)
+    except IOError:
+        smaps = _readFile('/proc/%d/smaps' % pid)
+    return sum(int(line.split()[1]) for line in smaps.splitlines() if line.startswith('Pss:'))
+
+
+def readMemTotal():
+    """
+    _readMemTotal_
+
+    Return the physical memory of the node, in kB
+    """
+    for line in _readFile('/proc/meminfo').splitlines():
+        if line.startswith('MemTotal:'):
+            return int(line.split()[1])
+    return 0
+
+
+def hasChildrenFiles():
+    """
+    _hasChildrenFiles_
+
+    True if the kernel provides the /proc/<pid>/task/<tid>/children files
+    """
+    return os.path.exists('/proc/%d/task/%d/children' % (os.getpid(), os.getpid()))
+
+
+def listChildren(pid):
+    """
+    _listChildren_
+
+    Return the pids of the direct children of a process, read from its
+    /proc/<pid>/task/<tid>/children files
+    """
+    children = []
+    try:
+        for tid in os.listdir('/proc/%d/task' % pid):
+            children.extend(int(child) for child in _readFile('/proc/%d/task/%s/children' % (pid, tid)).split())
+    except (IOError, OSError):
+        # the process is already gone
+        pass
+    return children
+
+
+def listProcessTree(pid, useChildrenFiles=None):
+    """
+    _listProcessTree_
+
+    Return the pids of a process and all its descendants. Without the
+    children files, the tree is built from the parent pid of every process.
+    """
+    if useChildrenFiles is None:
+        useChildrenFiles = hasChildrenFiles()
+
+    if useChildrenFiles:
+        getChildren = listChildren
+    else:
+        childrenMap = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                childrenMap.setdefault(readStat(int(entry))[0], []).append(int(entry))
+            except (IOError, OSError, ValueError, IndexError):
+                # the process is already gone
+                continue
+        getChildren = lambda parent: childrenMap.get(parent, [])
+
+    tree = [pid]
+    idx = 0
+    while idx < len(tree):
+        tree.extend(getChildren(tree[idx]))
+        idx += 1
+    return tree
+
+
+class ProcessTreeSampler(object):
+    """
+    _ProcessTreeSampler_
+
+    Keeps the last maxSamples samples of a process tree, and the
+    min/max/average of every value over all the samples taken.
+    """
+
+    def __init__(self, pid, maxSamples=1000):
+        self.pid = pid
+        self.samples = deque(maxlen=maxSamples)
+        self.memTotal = readMemTotal()
+        self.useChildrenFiles = hasChildrenFiles()
+        self.lastCPUTime = None
+        self.lastSampleTime = None
+        self.stats = dict((field, {'min': None, 'max': None, 'total': 0.0}) for field in SAMPLE_FIELDS)
+        self.numSamples = 0
+
+    def sample(self):
+        """
+        _sample_
+
+        Take a sample of the process tree, returning a dictionary with the
+        time, number of processes and the SAMPLE_FIELDS values, or None if
+        the main process is gone.
+        """
+        rss = pss = vsize = cpuTicks = numProcs = 0
+        now = time.time()
+        for pid in listProcessTree(self.pid, self.useChildrenFiles):
+            try:
+                procRSS, procVSize = readStatus(pid)
+                procPSS = readPSS(pid)
+                cpuTicks += readStat(pid)[1]
+            except (IOError, OSError, ValueError, IndexError):
+                if pid == self.pid:
+                    return None
+                # a child finished in between
+                continue
+            rss += procRSS
+            vsize += procVSize
+            pss += procPSS
+            numProcs += 1
+
+        cpuTime = cpuTicks / CLOCK_TICKS
+        if self.lastSampleTime is None or now <= self.lastSampleTime:
+            pcpu = 0.0
+        else:
+            # children that finished take their CPU time away, don't go negative
+            pcpu = max(cpuTime - self.lastCPUTime, 0.0) * 100.0 / (now - self.lastSampleTime)
+        self.lastCPUTime = cpuTime
+        self.lastSampleTime = now
+
+        sample = {'time': now, 'numProcs': numProcs,
+                  'rss': rss // 1000, 'pss': pss // 1000, 'vsize': vsize // 1000,
+                  'pcpu': round(pcpu, 1),
+                  'pmem': round(rss * 100.0 / self.memTotal, 1) if self.memTotal else 0.0}
+        self._addSample(sample)
+        return sample
+
+    def _addSample(self, sample):
+        self.samples.append(sample)
+        self.numSamples += 1
+        for field in SAMPLE_FIELDS:
+            stats = self.stats[field]
+            value = sample[field]
+            stats['min'] = value if stats['min'] is None else min(stats['min'], value)
+            stats['max'] = value if stats['max'] is None else max(stats['max'], value)
+            stats['total'] += value
+
+    def summary(self):
+        """
+        _summary_
+
+        Return the min, max and average of every field over all the
+        samples, None if no sample was taken
+        """
+        if not self.numSamples:
+            return None
+        summary = {}
+        for field, stats in self.stats.items():
+            summary[field] = {'min': stats['min'], 'max': stats['max'],
+                              'average': stats['total'] / self.numSamples}
+        return summary
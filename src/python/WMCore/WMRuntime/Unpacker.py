@@ -17,24 +17,52 @@ This will then do the following:
 - drop the package and index into the job area
 - set everything up so that you can just add the job dir to the pythonpath and then call the runtime startup for the WMCore/WMRuntime stuff
 
+Optionally, the sandbox is extracted only once per node into a cache
+directory shared by the jobs of a pilot, keyed by the sha1 of the sandbox
+tarball. Every cache entry is extracted under a lock into a temporary
+directory, made read-only and published by renaming it; a failed extraction
+leaves nothing behind. Jobs get their own writable copy of the cached files,
+which is still much faster than decompressing the sandbox, so that a job
+can't change the cache under the other jobs and evicting an entry never
+breaks a running job. The least recently used entries are evicted when the
+cache goes over its size limit, but the ones that jobs are still copying.
+
+The cache is used when the WMAGENT_SANDBOX_CACHE environment variable or
+--sandboxcache is set, SimpleCondorPlugin sets it for the jobs when
+BossAir.sandboxCacheDir is configured.
+
 """
 from __future__ import print_function
 
+import errno
+import fcntl
 import getopt
+import hashlib
+import json
 import logging
 import os
+import shutil
+import stat
 import sys
 import tarfile
+import tempfile
+import time
 import traceback
 import zipfile
+from contextlib import contextmanager
 
 options = {
     "sandbox=": "WMAGENT_SANDBOX",  # sandbox archive file
     "package=": "WMAGENT_PACKAGE",  # job package pickle file
     "index=": "WMAGENT_INDEX",  # index of job to be run
     "jobname=": "WMAGENT_JOBNAME",  # job name/id
+    "sandboxcache=": "WMAGENT_SANDBOX_CACHE",  # directory of the node sandbox cache
+    "sandboxcachesize=": "WMAGENT_SANDBOX_CACHE_SIZE",  # size limit of the sandbox cache, in MB
 }
 
+# default size limit of the sandbox cache, in bytes
+SANDBOX_CACHE_SIZE = 10 * 1000 * 1000 * 1000
+
 
 def makeErrorReport(jobName, exitCode, message):
     """
@@ -62,13 +90,268 @@ def makeErrorReport(jobName, exitCode, message):
         handle.write(xml)
 
 
-def createWorkArea(sandbox):
+def sandboxHash(sandbox, blockSize=1024 * 1024):
+    """
+    _sandboxHash_
+
+    Return the sha1 of the sandbox tarball, used as cache key
+    """
+    sha1 = hashlib.sha1()
+    with open(sandbox, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(blockSize), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _makeReadOnly(directory):
+    """
+    Remove the write permission of all the files below a directory,
+    directories are left writable so that the tree can be removed
+    """
+    for dirPath, _, fileNames in os.walk(directory):
+        for fileName in fileNames:
+            path = os.path.join(dirPath, fileName)
+            mode = os.lstat(path).st_mode
+            if stat.S_ISREG(mode):
+                os.chmod(path, stat.S_IMODE(mode) & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _treeSize(directory):
+    size = 0
+    for dirPath, _, fileNames in os.walk(directory):
+        size += sum(os.lstat(os.path.join(dirPath, fileName)).st_size for fileName in fileNames)
+    return size
+
+
+def _lockEntry(lockPath, operation):
+    """
+    Open and flock the lock file of a cache entry. Lock files are removed
+    under the exclusive lock, so retry until the file locked is still the
+    one at lockPath.
+    """
+    while True:
+        lockFd = open(lockPath, 'a')
+        try:
+            fcntl.flock(lockFd, operation)
+            if os.fstat(lockFd.fileno()).st_ino == os.stat(lockPath).st_ino:
+                return lockFd
+        except (IOError, OSError) as ex:
+            if ex.errno != errno.ENOENT:
+                lockFd.close()
+                raise
+        lockFd.close()
+
+
+def _extractEntry(sandbox, entryDir):
+    """
+    Extract the sandbox into a new cache entry, the caller holding its
+    exclusive lock. A failed extraction leaves nothing behind in the cache.
+    """
+    metaFile = entryDir + ".meta"
+    tmpDir = tempfile.mkdtemp(prefix=".%s." % os.path.basename(entryDir), dir=os.path.dirname(entryDir))
+    published = False
+    try:
+        startTime = time.time()
+        with tarfile.open(sandbox, "r") as tfile:
+            tfile.extractall(tmpDir)
+        meta = {'extractTime': time.time() - startTime, 'size': _treeSize(tmpDir)}
+        _makeReadOnly(tmpDir)
+        with open(metaFile, 'w') as fd:
+            json.dump(meta, fd)
+        # publish the entry atomically
+        os.rename(tmpDir, entryDir)
+        published = True
+    finally:
+        if not published:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+            for path in (metaFile, entryDir + ".lock"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+@contextmanager
+def extractToCache(sandbox, cacheDir):
+    """
+    _extractToCache_
+
+    Make sure the sandbox is extracted in the cache, yield the cache entry
+    directory and its metadata: size, time it took to extract it and
+    whether it was already there.
+
+    The entry can't be evicted in the with block: users of an entry hold a
+    shared lock on it, extracting or evicting it takes the exclusive lock.
+    """
+    key = sandboxHash(sandbox)
+    entryDir = os.path.join(cacheDir, key)
+    lockPath = entryDir + ".lock"
+
+    extracted = False
+    while True:
+        lockFd = _lockEntry(lockPath, fcntl.LOCK_SH)
+        if os.path.isdir(entryDir):
+            break
+        lockFd.close()
+        # only one job extracts a given sandbox, the others wait for it
+        with _lockEntry(lockPath, fcntl.LOCK_EX):
+            if not os.path.isdir(entryDir):
+                _extractEntry(sandbox, entryDir)
+                extracted = True
+
+    try:
+        # keep track of the last use for the eviction
+        os.utime(entryDir, None)
+        with open(entryDir + ".meta", 'r') as fd:
+            meta = json.load(fd)
+        meta['cached'] = not extracted
+        yield entryDir, meta
+    finally:
+        lockFd.close()
+
+
+def evictFromCache(cacheDir, maxSize, keep=None):
+    """
+    _evictFromCache_
+
+    Remove the least recently used cache entries, but keep and the ones
+    jobs are copying, until the cache is within maxSize bytes. Returns the
+    evicted entries.
+    """
+    entries = []
+    totalSize = 0
+    for name in os.listdir(cacheDir):
+        entryDir = os.path.join(cacheDir, name)
+        if name.startswith('.') or not os.path.isdir(entryDir):
+            continue
+        try:
+            with open(entryDir + ".meta", 'r') as fd:
+                size = json.load(fd)['size']
+            entries.append((os.stat(entryDir).st_mtime, name, size))
+        except (IOError, OSError, ValueError, KeyError):
+            # being evicted by someone else
+            continue
+        totalSize += size
+
+    evicted = []
+    for _, name, size in sorted(entries):
+        if totalSize <= maxSize:
+            break
+        if name == keep:
+            continue
+        entryDir = os.path.join(cacheDir, name)
+        try:
+            lockFd = _lockEntry(entryDir + ".lock", fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError) as ex:
+            if ex.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            # in use by other jobs
+            continue
+        with lockFd:
+            trashDir = None
+            if os.path.isdir(entryDir):
+                # unpublish it atomically first, jobs have their own copy
+                trashDir = tempfile.mkdtemp(prefix=".evicted.", dir=cacheDir)
+                try:
+                    os.rename(entryDir, os.path.join(trashDir, name))
+                except OSError:
+                    os.rmdir(trashDir)
+                    continue
+            for path in (entryDir + ".meta", entryDir + ".lock"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        if trashDir is None:
+            # evicted by someone else
+            continue
+        shutil.rmtree(trashDir, ignore_errors=True)
+        totalSize -= size
+        evicted.append(name)
+    return evicted
+
+
+def copyTree(sourceDir, targetDir):
+    """
+    _copyTree_
+
+    Copy sourceDir into the existing targetDir, with writable copies of the
+    files and copies of the symbolic links. Files already in targetDir are
+    not overwritten, and a failed copy removes everything it created.
+    """
+    created = []
+    try:
+        for dirPath, dirNames, fileNames in os.walk(sourceDir):
+            targetPath = os.path.join(targetDir, os.path.relpath(dirPath, sourceDir))
+            for dirName in dirNames:
+                if os.path.islink(os.path.join(dirPath, dirName)):
+                    fileNames.append(dirName)
+                elif not os.path.isdir(os.path.join(targetPath, dirName)):
+                    os.mkdir(os.path.join(targetPath, dirName))
+                    created.append(os.path.join(targetPath, dirName))
+            for fileName in fileNames:
+                sourcePath = os.path.join(dirPath, fileName)
+                targetFile = os.path.join(targetPath, fileName)
+                if os.path.lexists(targetFile):
+                    raise OSError(errno.EEXIST, "File exists", targetFile)
+                created.append(targetFile)
+                if os.path.islink(sourcePath):
+                    os.symlink(os.readlink(sourcePath), targetFile)
+                else:
+                    shutil.copyfile(sourcePath, targetFile)
+                    os.chmod(targetFile, stat.S_IMODE(os.stat(sourcePath).st_mode) | stat.S_IWUSR)
+    except Exception:
+        for path in reversed(created):
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+        raise
+
+
+def unpackFromCache(sandbox, jobDir, cacheDir, maxCacheSize=SANDBOX_CACHE_SIZE):
+    """
+    _unpackFromCache_
+
+    Unpack the sandbox into the job directory through the cache, logging
+    the time saved by the cache
+    """
+    if not os.path.isdir(cacheDir):
+        try:
+            os.makedirs(cacheDir)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+
+    with extractToCache(sandbox, cacheDir) as (entryDir, meta):
+        startTime = time.time()
+        copyTree(entryDir, jobDir)
+        copyTime = time.time() - startTime
+
+    if meta['cached']:
+        logging.info("Sandbox %s found in the cache, copied in %.2f secs instead of extracting it in %.2f secs: "
+                     "%.2f secs saved", os.path.basename(entryDir), copyTime, meta['extractTime'],
+                     meta['extractTime'] - copyTime)
+    else:
+        logging.info("Sandbox %s extracted into the cache in %.2f secs, copied in %.2f secs",
+                     os.path.basename(entryDir), meta['extractTime'], copyTime)
+        for name in evictFromCache(cacheDir, maxCacheSize, keep=os.path.basename(entryDir)):
+            logging.info("Evicted sandbox %s from the cache", name)
+    return meta
+
+
+def createWorkArea(sandbox, sandboxCache=None, sandboxCacheSize=SANDBOX_CACHE_SIZE):
     """
     _createWorkArea_
 
     Create a job working area containing all the bits and pieces
     needed to bootstrap up and kickstart the job
 
+    If a sandbox cache directory is given, the sandbox is copied from
+    the cache, falling back to extracting it if the cache can't be used.
     """
     currentDir = os.getcwd()
     jobDir = "%s/job" % currentDir
@@ -77,8 +360,15 @@ def createWorkArea(sandbox):
     if not os.path.exists(os.path.join(jobDir, 'StartupScript')):
         os.makedirs(os.path.join(jobDir, 'StartupScript'))
 
-    with tarfile.open(sandbox, "r") as tfile:
-        tfile.extractall(jobDir)
+    if sandboxCache:
+        try:
+            unpackFromCache(sandbox, jobDir, sandboxCache, sandboxCacheSize)
+        except Exception as ex:
+            logging.error("Unable to use the sandbox cache %s, extracting the sandbox: %s", sandboxCache, str(ex))
+            sandboxCache = None
+    if not sandboxCache:
+        with tarfile.open(sandbox, "r") as tfile:
+            tfile.extractall(jobDir)
 
     # need to pull out the startup file from the zipball
     with zipfile.ZipFile(os.path.join(jobDir, 'WMCore.zip'), 'r') as zfile:
@@ -112,14 +402,14 @@ def installPackage(jobArea, jobPackage, jobIndex):
     return
 
 
-def runUnpacker(sandbox, package, jobIndex, jobname):
+def runUnpacker(sandbox, package, jobIndex, jobname, sandboxCache=None, sandboxCacheSize=SANDBOX_CACHE_SIZE):
     """
     Run everything in the unpacker
 
     """
 
     try:
-        jobArea = createWorkArea(sandbox)
+        jobArea = createWorkArea(sandbox, sandboxCache, sandboxCacheSize)
         installPackage(jobArea, package, jobIndex)
         # sys.exit(0)
     except Exception as ex:
@@ -133,6 +423,7 @@ def runUnpacker(sandbox, package, jobIndex, jobname):
 
 if __name__ == '__main__':
 
+    logging.basicConfig(level=logging.INFO)
     try:
         opts, args = getopt.getopt(sys.argv[1:], "", options.keys())
     except getopt.GetoptError as ex:
@@ -145,6 +436,8 @@ if __name__ == '__main__':
     package = os.environ.get('WMAGENT_PACKAGE', None)
     jobIndex = os.environ.get('WMAGENT_INDEX', None)
     jobname = os.environ.get('WMAGENT_JOBNAME', None)
+    sandboxCache = os.environ.get('WMAGENT_SANDBOX_CACHE', None)
+    sandboxCacheSize = os.environ.get('WMAGENT_SANDBOX_CACHE_SIZE', None)
     for opt, arg in opts:
         if opt == "--sandbox":
             sandbox = arg
@@ -154,6 +447,10 @@ if __name__ == '__main__':
             jobIndex = arg
         if opt == "--jobname":
             jobname = arg
+        if opt == "--sandboxcache":
+            sandboxCache = arg
+        if opt == "--sandboxcachesize":
+            sandboxCacheSize = arg
 
     if sandbox is None:
         msg = "No Sandbox provided"
@@ -171,5 +468,11 @@ if __name__ == '__main__':
         logging.error(msg)
         sys.exit(1)
 
+    if sandboxCacheSize:
+        sandboxCacheSize = int(sandboxCacheSize) * 1000 * 1000
+    else:
+        sandboxCacheSize = SANDBOX_CACHE_SIZE
+
     runUnpacker(sandbox=sandbox, package=package,
-                jobIndex=jobIndex, jobname=jobname)
+                jobIndex=jobIndex, jobname=jobname,
+                sandboxCache=sandboxCache, sandboxCacheSize=sandboxCacheSize)
@@ -14,7 +14,6 @@ import os.path
 import threading
 import traceback
 
-from PSetTweaks.WMTweak import resizeResources
 from WMCore.WMException import WMException
 from WMCore.WMFactory import WMFactory
 
@@ -91,6 +90,7 @@ class Watchdog(threading.Thread):
                 if origMaxPSS:
                     resources['memory'] = origMaxPSS
                 # Actually parses the HTCondor runtime
+                from PSetTweaks.WMTweak import resizeResources
                 resizeResources(resources)
                 # We decided to only touch Watchdog settings if the number of cores changed.
                 # (even if this means the watchdog memory is wrong for a slot this size).
@@ -10,10 +10,8 @@ Placeholder for ideas at present....
 """
 from __future__ import print_function
 
-from future.moves.urllib.parse import urlparse
-from future.moves.urllib.request import urlopen, Request
-
 from builtins import object
+from urllib.parse import urlparse
 
 try:
     import cPickle as pickle
@@ -60,13 +58,13 @@ class PersistencyHelper(object):
         # TODO: currently support both loading from file path or url
         # if there are more things to filter may be separate the load function
 
-        # urllib2 needs a scheme - assume local file if none given
+        # assume local file if no scheme given
         if not urlparse(filename)[0]:
-            filename = 'file:' + filename
-            handle = urlopen(Request(filename, headers={"Accept": "*/*"}))
-            self.data = pickle.load(handle)
-            handle.close()
+            with open(filename, 'rb') as handle:
+                self.data = pickle.load(handle)
         elif filename.startswith('file:'):
+            # future.moves is slow to import, only use it for urls
+            from future.moves.urllib.request import urlopen, Request
             handle = urlopen(Request(filename, headers={"Accept": "*/*"}))
             self.data = pickle.load(handle)
             handle.close()
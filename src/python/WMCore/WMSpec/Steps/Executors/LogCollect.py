@@ -16,6 +16,7 @@ import tarfile
 from Utils.IteratorTools import grouper
 from WMCore.Algorithms.Alarm import Alarm, alarmHandler
 from WMCore.Storage.DeleteMgr import DeleteMgr
+from WMCore.Storage.LogArchiveCollector import LogArchiveCollector
 from WMCore.Storage.StageInMgr import StageInMgr
 from WMCore.Storage.StageOutError import StageOutFailure
 from WMCore.Storage.StageOutMgr import StageOutMgr
@@ -65,6 +66,9 @@ class LogCollect(Executor):
         if hasattr(self.step, 'override'):
             overrides = self.step.override.dictionary_()
 
+        # stream the logArchives into the tarball with concurrent stage ins
+        maxConcurrentStageIn = overrides.get('maxConcurrentStageIn', getattr(self.step, 'maxConcurrentStageIn', 0))
+
         # Set wait to over an hour
         waitTime = overrides.get('waitTime', 3600 + (self.step.retryDelay * self.step.retryCount))
 
@@ -101,7 +105,9 @@ class LogCollect(Executor):
         # Supported by any release beyond CMSSW_8_X, however DaviX is broken until CMSSW_10_4_X
         # see: https://github.com/cms-sw/cmssw/issues/25292
         useEdmCopyUtil = True
-        if isCMSSWSupported(cmsswVersion, "CMSSW_10_4_0"):
+        if maxConcurrentStageIn:
+            useEdmCopyUtil = False
+        elif isCMSSWSupported(cmsswVersion, "CMSSW_10_4_0"):
             pass
         elif scramArch.startswith('slc7_amd64_'):
             msg = "CMSSW too old or not fully functional to support edmCopyUtil, using CMSSW_10_4_0 instead"
@@ -148,6 +154,11 @@ class LogCollect(Executor):
                 logging.critical(msg)
                 raise WMExecutionFailure(50513, "ScramSetupFailure", msg)
 
+        if maxConcurrentStageIn:
+            deleteLogArchives = self.streamLogArchives(stageInMgr, tarLocation, maxConcurrentStageIn, waitTime)
+            return self.stageOutLogCollect(castorStageOutMgr, eosStageOutMgr, deleteMgr,
+                                           tarLocation, deleteLogArchives, waitTime)
+
         # iterate through input files
         localLogs = []
         deleteLogArchives = []
@@ -212,6 +223,51 @@ class LogCollect(Executor):
             logging.error(msg)
             raise WMExecutionFailure(60312, "LogCollectError", msg)
 
+        return self.stageOutLogCollect(castorStageOutMgr, eosStageOutMgr, deleteMgr,
+                                       tarLocation, deleteLogArchives, waitTime)
+
+    def streamLogArchives(self, stageInMgr, tarLocation, maxConcurrency, waitTime):
+        """
+        _streamLogArchives_
+
+        Stage in the logArchives with maxConcurrency concurrent transfers,
+        adding each of them to the tarball as soon as it is there, giving
+        up if none arrived in waitTime seconds (a single stage in with all
+        its retries). Return the list of archived input files.
+        """
+        # same layout as the tarballs made from the working directory
+        workingDir = self.step.builder.workingDir.rstrip('/').split('/')
+        arcname = lambda localPfn: os.path.join(workingDir[-2], workingDir[-1], os.path.basename(localPfn))
+
+        collector = LogArchiveCollector(stageInMgr, maxConcurrency=maxConcurrency)
+        logging.info("Streaming %d logArchives with %d concurrent stage ins",
+                     len(self.job["input_files"]), maxConcurrency)
+        with tarfile.open(tarLocation, 'w:') as tarFile:
+            archived, _ = collector(tarFile, [log['lfn'] for log in self.job["input_files"]],
+                                    arcname=arcname, timeout=waitTime)
+
+        deleteLogArchives = []
+        for log in self.job["input_files"]:
+            if log['lfn'] in archived:
+                deleteLogArchives.append(log)
+                self.report.addInputFile(sourceName="logArchives", lfn=log['lfn'])
+            else:
+                self.report.addSkippedFile(log['lfn'], None)
+
+        if not archived:
+            msg = "Unable to copy any logArchives to local disk"
+            logging.error(msg)
+            raise WMExecutionFailure(60312, "LogCollectError", msg)
+        return deleteLogArchives
+
+    def stageOutLogCollect(self, castorStageOutMgr, eosStageOutMgr, deleteMgr,
+                           tarLocation, deleteLogArchives, waitTime):
+        """
+        _stageOutLogCollect_
+
+        Stage out the LogCollect tarball to Castor and EOS, then delete
+        the logArchives it contains
+        """
         # now staging out the LogCollect tarfile
         logging.info("Staging out LogCollect tarfile to Castor and EOS")
         now = datetime.datetime.now()
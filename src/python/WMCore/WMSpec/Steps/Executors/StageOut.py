@@ -5,9 +5,10 @@ _Step.Executor.StageOut_
 Implementation of an Executor for a StageOut step
 
 """
-from __future__ import print_function
+from __future__ import print_function, division
 
 import logging
+import math
 import os
 import os.path
 import signal
@@ -95,6 +96,9 @@ class StageOut(Executor):
             manager = StageOutMgr(**stageOutCall)
             manager.numberOfRetries = self.step.retryCount
             manager.retryPauseTime = self.step.retryDelay
+            manager.maxConcurrentTransfers = overrides.get('maxConcurrentTransfers',
+                                                           manager.maxConcurrentTransfers)
+            manager.validateChecksums = overrides.get('validateChecksums', manager.validateChecksums)
         else:
             # new style
             logging.critical("STAGEOUT IS USING NEW STAGEOUT CODE")
@@ -138,6 +142,7 @@ class StageOut(Executor):
             # So getting all the files should get ONLY the files
             # for that step; or so I hope
             files = stepReport.getAllFileRefsFromStep(step=step)
+            transfers = []
             for fileName in files:
 
                 # make sure the file information is consistent
@@ -191,30 +196,38 @@ class StageOut(Executor):
                                    'PNN': None,
                                    'StageOutCommand': None,
                                    'Checksums': getattr(fileName, 'checksums', None)}
+                transfers.append((fileName, fileForTransfer))
 
+            # the files of the step are staged out concurrently, allowing
+            # waitTime for each round of concurrent transfers
+            if transfers:
+                concurrency = min(getattr(manager, 'maxConcurrentTransfers', 1), len(transfers))
                 signal.signal(signal.SIGALRM, alarmHandler)
-                signal.alarm(waitTime)
+                signal.alarm(waitTime * int(math.ceil(len(transfers) / concurrency)))
                 try:
-                    manager(fileForTransfer)
-                    # Afterwards, the file should have updated info.
-                    filesTransferred.append(fileForTransfer)
-                    fileName.StageOutCommand = fileForTransfer['StageOutCommand']
-                    fileName.location = fileForTransfer['PNN']
-                    fileName.OutputPFN = fileForTransfer['PFN']
+                    results = self.stageOutFiles(manager, [fileForTransfer for _, fileForTransfer in transfers])
                 except Alarm:
                     msg = "Indefinite hang during stageOut of logArchive"
                     logging.error(msg)
                     manager.cleanSuccessfulStageOuts()
                     stepReport.addError(self.stepName, 60403, "StageOutTimeout", msg)
                     # well, if it fails for one file, it fails for the whole job...
-                    break
-                except Exception as ex:
+                    transfers = results = []
+                signal.alarm(0)
+
+                failures = [ex for _, ex in results if ex is not None]
+                if failures:
                     manager.cleanSuccessfulStageOuts()
-                    stepReport.addError(self.stepName, 60307, "StageOutFailure", str(ex))
+                    stepReport.addError(self.stepName, 60307, "StageOutFailure", str(failures[0]))
                     stepReport.persist(reportLocation)
-                    raise
+                    raise failures[0]
 
-                signal.alarm(0)
+                for fileName, fileForTransfer in transfers:
+                    # Afterwards, the file should have updated info.
+                    filesTransferred.append(fileForTransfer)
+                    fileName.StageOutCommand = fileForTransfer['StageOutCommand']
+                    fileName.location = fileForTransfer['PNN']
+                    fileName.OutputPFN = fileForTransfer['PFN']
 
             # Am DONE with report. Persist it
             stepReport.persist(reportLocation)
@@ -224,6 +237,29 @@ class StageOut(Executor):
         logging.info("Transferred %i files", len(filesTransferred))
         return
 
+    @staticmethod
+    def stageOutFiles(manager, filesToStage):
+        """
+        _stageOutFiles_
+
+        Stage out the files with the manager, concurrently if it supports it.
+        Returns the list of (fileToStage, exception) in the order of the
+        files, exception being None for the successful ones. The new stage
+        out code stages the files one by one, stopping at the first failure.
+        """
+        if hasattr(manager, 'stageOutFiles'):
+            return manager.stageOutFiles(filesToStage)
+
+        results = []
+        for fileToStage in filesToStage:
+            try:
+                manager(fileToStage)
+            except Exception as ex:
+                results.append((fileToStage, ex))
+                break
+            results.append((fileToStage, None))
+        return results
+
     def post(self, emulator=None):
         """
         _post_
@@ -33,6 +33,24 @@ class LogCollectStepHelper(CoreHelper):
         self.data.retryCount = 1
         self.data.retryDelay = 0
 
+    def setConcurrentStageIn(self, maxTransfers):
+        """
+        _setConcurrentStageIn_
+
+        Stage in the logArchives with up to maxTransfers concurrent
+        transfers, streaming them into the LogCollect tarball as they
+        arrive instead of copying all of them first. 0 disables it.
+        """
+        self.data.maxConcurrentStageIn = maxTransfers
+
+    def getConcurrentStageIn(self):
+        """
+        _getConcurrentStageIn_
+
+        Maximum number of concurrent logArchive transfers, 0 if disabled
+        """
+        return getattr(self.data, 'maxConcurrentStageIn', 0)
+
     def addOutputDestination(self, lfn):
         """
         Adds an out location to put a tarball of all logs
@@ -85,6 +103,7 @@ class LogCollect(Template):
         step.logcount = 0
         step.retryCount = 3
         step.retryDelay = 300
+        step.maxConcurrentStageIn = 0
         step.application.section_("setup")
         step.application.setup.scramCommand = "scramv1"
         step.application.setup.scramProject = "CMSSW"
@@ -7,6 +7,8 @@ of related tasks.
 """
 from __future__ import print_function
 
+from future.utils import viewitems
+
 from Utils.Utilities import strToBool
 from WMCore.Configuration import ConfigSection
 from WMCore.Lexicon import sanitizeURL
@@ -422,7 +424,7 @@ class WMWorkloadHelper(PersistencyHelper):
         Set the Start policy and its parameters
         """
         self.data.policies.start.policyName = policyName
-        for key, val in params.iteritems():
+        for key, val in viewitems(params):
             setattr(self.data.policies.start, key, val)
 
     def startPolicy(self):
@@ -449,7 +451,7 @@ class WMWorkloadHelper(PersistencyHelper):
         Set the End policy and its parameters
         """
         self.data.policies.end.policyName = policyName
-        for key, val in params.iteritems():
+        for key, val in viewitems(params):
             setattr(self.data.policies.end, key, val)
 
     def endPolicy(self):
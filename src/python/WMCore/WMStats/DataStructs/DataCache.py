@@ -7,6 +7,7 @@ class DataCache(object):
     # from each server.
     _duration = 300  # 5 minitues
     _lastedActiveDataFromAgent = {}
+    _version = 0  # increased on every update, for the REST response cache
 
     @staticmethod
     def getDuration():
@@ -16,6 +17,10 @@ class DataCache(object):
     def setDuration(sec):
         DataCache._duration = sec
 
+    @staticmethod
+    def getVersion():
+        return DataCache._version
+
     @staticmethod
     def getlatestJobData():
         if (DataCache._lastedActiveDataFromAgent):
@@ -32,6 +37,7 @@ class DataCache(object):
     def setlatestJobData(jobData):
         DataCache._lastedActiveDataFromAgent["time"] = int(time.time())
         DataCache._lastedActiveDataFromAgent["data"] = jobData
+        DataCache._version += 1
 
     @staticmethod
     def islatestJobDataExpired():
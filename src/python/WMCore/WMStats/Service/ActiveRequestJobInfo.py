@@ -23,7 +23,8 @@ class ActiveRequestJobInfo(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl=DataCache.getDuration(), cache_version=DataCache.getVersion)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -50,7 +51,8 @@ class FilteredActiveRequestJobInfo(RESTEntity):
 
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl=DataCache.getDuration(), cache_version=DataCache.getVersion)
     @tools.expires(secs=-1)
     def get(self, mask=None, **input_condition):
         # This assumes DataCahe is periodically updated.
@@ -71,7 +73,8 @@ class ProtectedLFNList(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl=DataCache.getDuration(), cache_version=DataCache.getVersion)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -95,7 +98,8 @@ class ProtectedLFNListOnlyFinalOutput(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl=DataCache.getDuration(), cache_version=DataCache.getVersion)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -111,7 +115,8 @@ class GlobalLockList(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl=DataCache.getDuration(), cache_version=DataCache.getVersion)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -6,6 +6,7 @@ Implementation of handles is in corresponding modules, not here.
 
 import cherrypy
 
+from Utils.RateLimiter import rateLimiterFromConfig
 from WMCore.Configuration import Configuration
 from WMCore.REST.Server import RESTApi
 from WMCore.REST.Format import JSONFormat
@@ -37,6 +38,8 @@ class RestApiHub(RESTApi):
         cherrypy.log("WMStats REST hub configuration subset:\n%s" % config)
         # only allows json format for return value
         self.formats = [('application/json', JSONFormat())]
+        # per user and API quotas, if configured
+        self.rate_limiter = rateLimiterFromConfig(config, "wmstats")
         self._add({"info": ServerInfo(app, self, config, mount),
                    "teams": TeamInfo(app, self, config, mount),
                    "request": RequestInfo(app, self, config, mount),
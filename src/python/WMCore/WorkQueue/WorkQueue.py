@@ -88,11 +88,14 @@ class WorkQueue(WorkQueueBase):
         self.params.setdefault('DbName', 'workqueue')
         self.params.setdefault('InboxDbName', self.params['DbName'] + '_inbox')
         self.params.setdefault('ParentQueueCouchUrl', None)  # We get work from here
+        # keep in memory replicas of the elements, updated from the couch _changes feeds
+        self.params.setdefault('CacheElements', False)
+        self.params.setdefault('CacheParentElements', False)
 
         self.backend = WorkQueueBackend(self.params['CouchUrl'], self.params['DbName'],
                                         self.params['InboxDbName'],
                                         self.params['ParentQueueCouchUrl'], self.params.get('QueueURL'),
-                                        logger=self.logger)
+                                        logger=self.logger, cacheElements=self.params['CacheElements'])
         self.workqueueDS = WorkQueueDS(self.params['CouchUrl'], self.params['DbName'],
                                        self.params['InboxDbName'])
         if self.params.get('ParentQueueCouchUrl'):
@@ -100,10 +103,12 @@ class WorkQueue(WorkQueueBase):
                 if self.params.get('ParentQueueInboxCouchDBName'):
                     self.parent_queue = WorkQueueBackend(self.params['ParentQueueCouchUrl'].rsplit('/', 1)[0],
                                                          self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1],
-                                                         self.params['ParentQueueInboxCouchDBName'])
+                                                         self.params['ParentQueueInboxCouchDBName'],
+                                                         cacheElements=self.params['CacheParentElements'])
                 else:
                     self.parent_queue = WorkQueueBackend(self.params['ParentQueueCouchUrl'].rsplit('/', 1)[0],
-                                                         self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1])
+                                                         self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1],
+                                                         cacheElements=self.params['CacheParentElements'])
             except IndexError as ex:
                 # Probable cause: Someone didn't put the global WorkQueue name in
                 # the ParentCouchUrl
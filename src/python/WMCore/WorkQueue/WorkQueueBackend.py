@@ -17,6 +17,7 @@ from WMCore.Lexicon import sanitizeURL
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 from WMCore.WorkQueue.DataStructs.CouchWorkQueueElement import CouchWorkQueueElement, fixElementConflicts
 from WMCore.WorkQueue.DataStructs.WorkQueueElement import possibleSites
+from WMCore.WorkQueue.WorkQueueElementCache import sharedElementCache
 from WMCore.WorkQueue.WorkQueueExceptions import WorkQueueNoMatchingElements, WorkQueueError
 
 
@@ -43,7 +44,7 @@ class WorkQueueBackend(object):
 
     def __init__(self, db_url, db_name='workqueue',
                  inbox_name=None, parentQueue=None,
-                 queueUrl=None, logger=None):
+                 queueUrl=None, logger=None, cacheElements=False):
         if logger:
             self.logger = logger
         else:
@@ -64,6 +65,28 @@ class WorkQueueBackend(object):
         self.inbox = self.server.connectDatabase(inbox_name, create=False, size=10000)
         self.queueUrl = sanitizeURL(queueUrl or (db_url + '/' + db_name))['url']
         self.eleKey = 'WMCore.WorkQueue.DataStructs.WorkQueueElement.WorkQueueElement'
+        # in memory replicas of the elements, following the couch _changes feeds,
+        # shared with the other backends of the process on the same databases
+        self.elementCaches = {}
+        if cacheElements:
+            for db in (self.db, self.inbox):
+                self.elementCaches[db.name] = sharedElementCache(db, logger=self.logger)
+
+    def _elementCache(self, db):
+        """
+        Return the element replica of db brought up to date, or None if the
+        elements are not cached or can't be updated, to query couch instead
+        """
+        cache = self.elementCaches.get(db.name)
+        if cache is None:
+            return None
+        try:
+            cache.update()
+        except Exception as ex:
+            # the next update goes on from the last change applied
+            self.logger.warning("Failed to update the element cache of %s, querying couch: %s", db.name, str(ex))
+            return None
+        return cache
 
     def forceQueueSync(self):
         """Force a blocking replication - used only in tests"""
@@ -218,20 +241,32 @@ class WorkQueueBackend(object):
             if WorkflowName:
                 options['filter']['RequestName'] = WorkflowName
 
-            view = db.loadList('WorkQueue', 'filter', filterName, options, key)
-            view = json.loads(view)
+            cache = self._elementCache(db)
+            if cache is not None:
+                if returnIdOnly:
+                    return cache.elements(options['filter'], idOnly=True)
+                elements = [CouchWorkQueueElement.fromDocument(db, doc) for doc in cache.elements(options['filter'])]
+                return self._loadSpecs(elements) if loadSpec else elements
+
+            # decode the elements as they arrive, not the whole list output at once
+            rows = db.iterList('WorkQueue', 'filter', filterName, options, key)
             if returnIdOnly:
-                return view
-            elements = [CouchWorkQueueElement.fromDocument(db, row) for row in view]
+                return list(rows)
+            elements = [CouchWorkQueueElement.fromDocument(db, row) for row in rows]
 
         if loadSpec:
-            specs = {}  # cache as may have multiple elements for same spec
-            for ele in elements:
-                if ele['RequestName'] not in specs:
-                    wmspec = self.getWMSpec(ele['RequestName'])
-                    specs[ele['RequestName']] = wmspec
-                ele['WMSpec'] = specs[ele['RequestName']]
-            del specs
+            self._loadSpecs(elements)
+        return elements
+
+    def _loadSpecs(self, elements):
+        """Set the workflow of each element, loading each spec once"""
+        specs = {}  # cache as may have multiple elements for same spec
+        for ele in elements:
+            if ele['RequestName'] not in specs:
+                wmspec = self.getWMSpec(ele['RequestName'])
+                specs[ele['RequestName']] = wmspec
+            ele['WMSpec'] = specs[ele['RequestName']]
+        del specs
         return elements
 
     def getInboxElements(self, *args, **kwargs):
@@ -242,11 +277,11 @@ class WorkQueueBackend(object):
 
     def getElementsForWorkflow(self, workflow):
         """Get elements for a workflow"""
-        elements = self.db.loadView('WorkQueue', 'elementsByWorkflow',
-                                    {'key': workflow, 'include_docs': True, 'reduce': False})
+        rows = self.db.iterView('WorkQueue', 'elementsByWorkflow',
+                                {'key': workflow, 'include_docs': True, 'reduce': False})
         return [CouchWorkQueueElement.fromDocument(self.db,
                                                    x['doc'])
-                for x in elements.get('rows', [])]
+                for x in rows]
 
     def getElementsForParent(self, parent):
         """Get elements with the given parent"""
@@ -348,8 +383,12 @@ class WorkQueueBackend(object):
         options['descending'] = True
         options['resources'] = thresholds
         options['num_elem'] = 9999999  # magic number!
-        result = self.db.loadList('WorkQueue', 'workRestrictions', 'availableByPriority', options)
-        result = json.loads(result)
+        cache = self._elementCache(self.db)
+        if cache is not None:
+            result = cache.availableElements(thresholds)
+        else:
+            result = self.db.loadList('WorkQueue', 'workRestrictions', 'availableByPriority', options)
+            result = json.loads(result)
         self.logger.info("Retrieved %d elements from workRestrictions list for: %s",
                          len(result), self.queueUrl)
 
@@ -446,6 +485,10 @@ class WorkQueueBackend(object):
         #  c) or, once "numElems" elements have been accepted
         numSkip = 0
         breakOut = False
+        # with the elements cached, select them all at once and slice them like couch
+        cache = self._elementCache(self.db)
+        if cache is not None:
+            available = cache.availableElements(thresholds, team=team)
         while True:
             if breakOut:
                 # then we have reached the maximum number of elements to be accepted
@@ -453,8 +496,11 @@ class WorkQueueBackend(object):
             self.logger.info("  with limit docs: %s, and skip first %s docs", docsSliceSize, numSkip)
             options['skip'] = numSkip
 
-            result = self.db.loadList('WorkQueue', 'workRestrictions', 'availableByPriority', options)
-            result = json.loads(result)
+            if cache is not None:
+                result = available[numSkip:numSkip + docsSliceSize]
+            else:
+                result = self.db.loadList('WorkQueue', 'workRestrictions', 'availableByPriority', options)
+                result = json.loads(result)
             if result:
                 self.logger.info("Retrieved %d elements from workRestrictions list for: %s",
                                  len(result), self.queueUrl)
@@ -520,21 +566,30 @@ class WorkQueueBackend(object):
 
     def getActiveData(self):
         """Get data items we have work in the queue for"""
-        data = self.db.loadView('WorkQueue', 'activeData', {'reduce': True, 'group': True})
+        cache = self._elementCache(self.db)
+        if cache is not None:
+            return [{'dbs_url': dbs, 'name': name} for dbs, name in cache.activeData('Inputs')]
+        rows = self.db.iterView('WorkQueue', 'activeData', {'reduce': True, 'group': True})
         return [{'dbs_url': x['key'][0],
-                 'name': x['key'][1]} for x in data.get('rows', [])]
+                 'name': x['key'][1]} for x in rows]
 
     def getActiveParentData(self):
         """Get data items we have work in the queue for with parent"""
-        data = self.db.loadView('WorkQueue', 'activeParentData', {'reduce': True, 'group': True})
+        cache = self._elementCache(self.db)
+        if cache is not None:
+            return [{'dbs_url': dbs, 'name': name} for dbs, name in cache.activeData('ParentData')]
+        rows = self.db.iterView('WorkQueue', 'activeParentData', {'reduce': True, 'group': True})
         return [{'dbs_url': x['key'][0],
-                 'name': x['key'][1]} for x in data.get('rows', [])]
+                 'name': x['key'][1]} for x in rows]
 
     def getActivePileupData(self):
         """Get data items we have work in the queue for with pileup"""
-        data = self.db.loadView('WorkQueue', 'activePileupData', {'reduce': True, 'group': True})
+        cache = self._elementCache(self.db)
+        if cache is not None:
+            return [{'dbs_url': dbs, 'name': name} for dbs, name in cache.activeData('PileupData')]
+        rows = self.db.iterView('WorkQueue', 'activePileupData', {'reduce': True, 'group': True})
         return [{'dbs_url': x['key'][0],
-                 'name': x['key'][1]} for x in data.get('rows', [])]
+                 'name': x['key'][1]} for x in rows]
 
     def getElementsForData(self, data):
         """Get active elements for this dbs & data combo"""
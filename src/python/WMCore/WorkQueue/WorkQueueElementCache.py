@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""
+WorkQueueElementCache
+
+In memory replica of the elements of a workqueue couch database, indexed
+by status, request, subscription, site and priority, and kept current from
+the _changes feed of the database instead of querying its views. The
+replicas are shared by all the queues of a process using the same database,
+see sharedElementCache().
+"""
+
+from __future__ import division
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from future.utils import viewitems, viewvalues
+
+ELEMENT_KEY = 'WMCore.WorkQueue.DataStructs.WorkQueueElement.WorkQueueElement'
+
+# element fields indexed by value, sites are indexed from the SiteWhitelist
+INDEXED_FIELDS = ('Status', 'RequestName', 'SubscriptionId', 'Priority')
+
+# replicas of the process, by database url and name
+_SHARED_CACHES = {}
+_SHARED_CACHES_LOCK = threading.Lock()
+
+
+def copyDocuments(docs):
+    """
+    Return deep copies of documents decoded from couch, in one json round
+    trip which is much faster than copy.deepcopy
+    """
+    return json.loads(json.dumps(docs))
+
+
+def filterMatches(ele, filters):
+    """
+    Tell whether the element matches all the filters, each a value or a
+    list of accepted values, like the WorkQueue/filter list function
+    """
+    for key, value in viewitems(filters):
+        if key not in ele:
+            return False
+        if isinstance(value, list):
+            if ele[key] not in value:
+                return False
+        elif ele[key] != value:
+            return False
+    return True
+
+
+def siteMatches(ele, site):
+    """
+    Tell whether the element can run at the site, given its site lists
+    and data locations, like the WorkQueue/workRestrictions list function
+    """
+    if site in ele['SiteBlacklist'] or site not in ele['SiteWhitelist']:
+        return False
+    if ele.get('NoInputUpdate') is not True:
+        if any(site not in locations for locations in viewvalues(ele.get('Inputs') or {})):
+            return False
+        if ele.get('ParentFlag') and any(site not in locations
+                                         for locations in viewvalues(ele.get('ParentData') or {})):
+            return False
+    if ele.get('NoPileupUpdate') is not True:
+        if any(site not in locations for locations in viewvalues(ele.get('PileupData') or {})):
+            return False
+    return True
+
+
+def sharedElementCache(db, logger=None):
+    """
+    Return the replica of the elements of db shared by the whole process,
+    creating it on first use. The replica uses the connection of the first
+    db it was asked for.
+    """
+    key = (db['host'], db.name)
+    with _SHARED_CACHES_LOCK:
+        if key not in _SHARED_CACHES:
+            _SHARED_CACHES[key] = WorkQueueElementCache(db, logger=logger)
+        return _SHARED_CACHES[key]
+
+
+class WorkQueueElementCache(object):
+    """
+    Replica of the element documents of a workqueue database. update()
+    loads them all the first time, then applies the changes made since
+    the last update. Every checkInterval seconds the element ids and
+    statuses are checked against the elementsByStatus view, and the whole
+    replica reloaded if they differ.
+
+    Queries return copies of the documents, which callers can modify. The
+    replica can be used from several threads, updates and queries are
+    serialized by its lock.
+    """
+
+    def __init__(self, db, logger=None, checkInterval=3600, changesLimit=10000, pageSize=5000):
+        self.db = db
+        self.logger = logger or logging
+        self.checkInterval = checkInterval
+        self.changesLimit = changesLimit
+        self.pageSize = pageSize
+        self.docs = {}
+        self.indexes = {}
+        self.lastSeq = None
+        self.lastCheck = 0
+        self.stats = {'loads': 0, 'updates': 0, 'changes': 0, 'checks': 0, 'mismatches': 0}
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all the elements, the next update loads them again
+        """
+        self.docs = {}
+        self.indexes = dict((field, defaultdict(set)) for field in INDEXED_FIELDS + ('Site',))
+        self.lastSeq = None
+
+    def _indexKeys(self, ele):
+        """
+        Yield the (index, value) pairs of an element
+        """
+        for field in INDEXED_FIELDS:
+            yield field, ele.get(field)
+        for site in ele.get('SiteWhitelist') or []:
+            yield 'Site', site
+
+    def _add(self, doc):
+        """
+        Add or replace an element document
+        """
+        self._remove(doc['_id'])
+        self.docs[doc['_id']] = doc
+        for field, value in self._indexKeys(doc[ELEMENT_KEY]):
+            self.indexes[field][value].add(doc['_id'])
+
+    def _remove(self, docId):
+        """
+        Remove an element document, if there
+        """
+        doc = self.docs.pop(docId, None)
+        if doc is None:
+            return
+        for field, value in self._indexKeys(doc[ELEMENT_KEY]):
+            ids = self.indexes[field][value]
+            ids.discard(docId)
+            if not ids:
+                del self.indexes[field][value]
+
+    def load(self):
+        """
+        Load all the elements, and the sequence number to follow the changes from
+        """
+        startTime = time.time()
+        with self.lock:
+            # changes made while loading are applied by the next update
+            seq = self.db.info()['update_seq']
+            self.reset()
+            for row in self.db.iterView('WorkQueue', 'elementsByStatus', {'include_docs': True},
+                                        pageSize=self.pageSize):
+                if row.get('doc') and ELEMENT_KEY in row['doc']:
+                    self._add(row['doc'])
+            self.lastSeq = seq
+            self.lastCheck = time.time()
+            self.stats['loads'] += 1
+        self.logger.info("Loaded %d elements of %s in %.3f secs",
+                         len(self.docs), self.db.name, time.time() - startTime)
+
+    def update(self):
+        """
+        Bring the replica up to date with the database, return the number of
+        changes applied. If reading the changes fails, the changes applied
+        so far are kept and the next update goes on from the last one.
+        """
+        with self.lock:
+            if self.lastSeq is None:
+                self.load()
+                return len(self.docs)
+
+            numChanges = 0
+            while True:
+                count = 0
+                for row in self.db.iterChanges(self.lastSeq, limit=self.changesLimit, include_docs=True):
+                    doc = row.get('doc')
+                    if row.get('deleted') or not doc or ELEMENT_KEY not in doc:
+                        self._remove(row['id'])
+                    else:
+                        self._add(doc)
+                    self.lastSeq = row['seq']
+                    count += 1
+                numChanges += count
+                if count < self.changesLimit:
+                    break
+            self.stats['updates'] += 1
+            self.stats['changes'] += numChanges
+
+            if self.checkInterval is not None and time.time() - self.lastCheck > self.checkInterval:
+                self.check()
+            return numChanges
+
+    def check(self):
+        """
+        Check the element ids and statuses against the database views, reload
+        everything if they differ. Return True if they matched.
+        """
+        with self.lock:
+            self.lastCheck = time.time()
+            self.stats['checks'] += 1
+            statuses = dict((row['id'], row['key'])
+                            for row in self.db.iterView('WorkQueue', 'elementsByStatus', pageSize=self.pageSize))
+            replica = dict((docId, doc[ELEMENT_KEY].get('Status')) for docId, doc in viewitems(self.docs))
+            if statuses == replica:
+                return True
+
+            differences = len(set(viewitems(statuses)) ^ set(viewitems(replica)))
+            self.stats['mismatches'] += 1
+            self.logger.warning("Element replica of %s differs from couch by %d elements, reloading",
+                                self.db.name, differences)
+            self.load()
+            return False
+
+    def _select(self, **indexed):
+        """
+        Return the ids of the elements with all the given indexed values
+        """
+        ids = None
+        for field, value in sorted(viewitems(indexed), key=lambda item: len(self.indexes[item[0]].get(item[1], ()))):
+            if value is None:
+                continue
+            matching = self.indexes[field].get(value, set())
+            ids = set(matching) if ids is None else ids & matching
+            if not ids:
+                break
+        return set(self.docs) if ids is None else ids
+
+    def elements(self, filters=None, idOnly=False):
+        """
+        Return copies of the element documents matching the filters of the
+        WorkQueue/filter list function (or their ids if idOnly), sorted by id
+        """
+        filters = filters or {}
+        with self.lock:
+            ids = self._select(Status=filters.get('Status') if not isinstance(filters.get('Status'), list) else None,
+                               RequestName=filters.get('RequestName'),
+                               SubscriptionId=filters.get('SubscriptionId'))
+            ids = sorted(docId for docId in ids if filterMatches(self.docs[docId][ELEMENT_KEY], filters))
+            if idOnly:
+                return ids
+            return copyDocuments([self.docs[docId] for docId in ids])
+
+    def availableElements(self, resources, team=None, wfs=None):
+        """
+        Return copies of the Available element documents that can run at one
+        of the sites of resources, highest priority first, like the
+        WorkQueue/workRestrictions list on the availableByPriority view
+        """
+        result = []
+        with self.lock:
+            for priority in sorted(self.indexes['Priority'], reverse=True):
+                ids = self.indexes['Priority'][priority] & self.indexes['Status'].get('Available', set())
+                for docId in sorted(ids, reverse=True):
+                    ele = self.docs[docId][ELEMENT_KEY]
+                    if team and ele.get('TeamName') and team != ele['TeamName']:
+                        continue
+                    if wfs and ele['RequestName'] not in wfs:
+                        continue
+                    if any(siteMatches(ele, site) for site in resources):
+                        result.append(self.docs[docId])
+            return copyDocuments(result)
+
+    def activeData(self, field):
+        """
+        Return the (dbs url, data name) pairs of the data in field (Inputs,
+        ParentData or PileupData) of the Available elements, sorted like the
+        grouped activeData views, where a missing dbs url (null) comes first
+        """
+        data = set()
+        with self.lock:
+            for docId in self.indexes['Status'].get('Available', set()):
+                ele = self.docs[docId][ELEMENT_KEY]
+                for name in ele.get(field) or {}:
+                    data.add((ele.get('Dbs'), name))
+        return sorted(data, key=lambda item: (item[0] is not None, item[0] or '', item[1]))
@@ -8,6 +8,7 @@ Deriving classes should override algorithm, and optionally setup and terminate
 to perform thread-specific setup and clean-up operations
 """
 
+import json
 import logging
 import sys
 import threading
@@ -16,6 +17,7 @@ import traceback
 
 from WMCore.Database.DBExceptionHandler import db_exception_handler
 from WMCore.Database.Transaction import Transaction
+from WMCore.WorkerThreads.CycleStats import CycleStats
 
 
 class BaseWorkerThread(object):
@@ -51,6 +53,25 @@ class BaseWorkerThread(object):
         # Init the timing
         self.lastTime = time.time()
 
+        # Optional early wake up notification, set by WorkerThreadManager
+        # together with the minimum time to sleep between two cycles
+        self.wakeUpFlag = None
+        self.minIdleTime = 0
+
+        # Adaptive polling, also set by WorkerThreadManager. The idleTime
+        # is adjusted after every cycle between minIdleTime and maxIdleTime
+        # according to the work reported through reportCycleWork
+        self.adaptivePolling = False
+        self.pollInterval = None
+        self.maxIdleTime = None
+        self.idleCycles = 0
+        self.cycleItems = None
+        self.cycleWorkLimit = None
+        self.cycleStats = CycleStats()
+
+        # Opt-in cycle profiler, also set by WorkerThreadManager
+        self.profiler = None
+
         # Get the current DBFactory
         myThread = threading.currentThread()
         self.dbFactory = myThread.dbFactory
@@ -90,6 +111,42 @@ class BaseWorkerThread(object):
         """
         logging.error("Calling algorithm on BaseWorkerThread: Override me!")
 
+    def reportCycleWork(self, items, workLimit=None):
+        """
+        _reportCycleWork_
+
+        To be called by the algorithm of derived classes with the number of
+        work items processed in the current cycle and, if any, the maximum
+        number of items a single cycle is allowed to process.
+        """
+        self.cycleItems = items
+        self.cycleWorkLimit = workLimit
+
+    def adjustIdleTime(self):
+        """
+        _adjustIdleTime_
+
+        Adaptive polling: poll again soon if the last cycle hit its work
+        limit, back off exponentially (up to maxIdleTime) while idle and
+        go back to the configured pollInterval otherwise, or if the cycle
+        didn't report any work.
+        """
+        if not self.adaptivePolling:
+            return
+        if self.cycleItems is None:
+            self.idleCycles = 0
+            self.idleTime = self.pollInterval
+        elif self.cycleWorkLimit and self.cycleItems >= self.cycleWorkLimit:
+            self.idleCycles = 0
+            self.idleTime = max(self.minIdleTime, 1)
+        elif self.cycleItems == 0:
+            self.idleCycles += 1
+            self.idleTime = min(self.pollInterval * 2 ** (self.idleCycles - 1), self.maxIdleTime)
+        else:
+            self.idleCycles = 0
+            self.idleTime = self.pollInterval
+        logging.info("Next cycle of %s in %s secs", self.workerName, self.idleTime)
+
     def setUpHeartbeat(self, myThread):
         # heartbeat needed to be called in self.initInThread
         # to get the right name but before the self.setup
@@ -179,9 +236,21 @@ class BaseWorkerThread(object):
                             if self.useHeartbeat:
                                 self.heartbeatAPI.updateWorkerHeartbeat(self.workerName, "Running")
 
+                            if self.wakeUpFlag is not None:
+                                self.wakeUpFlag.clear()
+                            self.cycleItems = None
+                            self.cycleWorkLimit = None
+                            if self.profiler is not None:
+                                self.profiler.startCycle()
                             tSpent, results, _ = algorithmWithDBExceptionHandler(parameters)
+                            if self.profiler is not None:
+                                self.profiler.endCycle()
+                            self.cycleStats.addCycle(tSpent, self.cycleItems)
+                            self.adjustIdleTime()
                             if tSpent and self.useHeartbeat:
                                 logging.info("%s took %.3f secs to execute", self.workerName, tSpent)
+                                if results is None:
+                                    results = json.dumps(self.cycleStats.summary())
                                 self.heartbeatAPI.updateWorkerCycle(self.workerName, tSpent, results)
 
                             # Catch if someone forgets to commit/rollback
@@ -247,6 +316,9 @@ class BaseWorkerThread(object):
         Need to constantly watch if the thread is terminated for
         properly stopping/terminating it.
 
+        If a wake up flag is set, returns control early once an upstream
+        component notified it, but never before minIdleTime seconds.
+
         returns control when it's time to wake back up
         doesn't return any values
         """
@@ -259,5 +331,13 @@ class BaseWorkerThread(object):
             if self.notifyTerminate.isSet():
                 break
 
+            if self.wakeUpFlag is not None and self.idleTime - idleTime >= self.minIdleTime \
+                    and self.wakeUpFlag.isSet():
+                # the flag file might be gone already, then the latency is unknown
+                latency = self.wakeUpFlag.getLatency()
+                logging.info("Woken up by a notification after %s secs of sleep, notification latency %s secs",
+                             self.idleTime - idleTime, "unknown" if latency is None else "%.1f" % latency)
+                break
+
             time.sleep(1)
             idleTime -= 1
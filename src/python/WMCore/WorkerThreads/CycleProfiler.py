@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+_CycleProfiler_
+
+Opt-in profiling of the polling cycles of a worker thread, switched on at
+runtime by touching the 'profile' flag file in the component directory
+(optionally containing the number of cycles to profile), or by sending
+SIGUSR2 to the component, which touches that same flag.
+
+For the requested number of cycles it records:
+  * cProfile statistics of the worker thread (<name>.pstats)
+  * stack samples of the worker thread in the collapsed format used by
+    flamegraph.pl and speedscope (<name>.folded)
+  * number of calls and time spent per DAO and HTTP service (<name>.calls.json)
+written to the 'profiles' directory under the component directory.
+"""
+
+from __future__ import division
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from Utils.Timers import callCounter
+from WMCore.WorkerThreads.WakeUp import WakeUpFlag
+
+PROFILE_FLAG = "profile"
+PROFILE_DIR = "profiles"
+
+
+def profileOnSignal(componentDir, isignal=signal.SIGUSR2):
+    """
+    Touch the profile flag of the component every time the process receives
+    the given signal. Must be called from the main thread.
+    """
+    flagFile = os.path.join(componentDir, PROFILE_FLAG)
+
+    def touchFlag(isignal, iframe):
+        "Signal handler touching the profile flag"
+        with open(flagFile, 'a'):
+            os.utime(flagFile, None)
+
+    signal.signal(isignal, touchFlag)
+
+
+class StackSampler(threading.Thread):
+    """
+    _StackSampler_
+
+    Sample the stack of another thread at regular intervals and count the
+    collapsed stacks, e.g. "module:function;module:function 42"
+    """
+
+    def __init__(self, threadId, interval=0.01):
+        threading.Thread.__init__(self, name="StackSampler")
+        self.daemon = True
+        self.threadId = threadId
+        self.interval = interval
+        self.samples = Counter()
+        self._stopEvent = threading.Event()
+
+    def run(self):
+        while not self._stopEvent.is_set():
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s:%s" % (os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+            self._stopEvent.wait(self.interval)
+
+    def stop(self):
+        """
+        Stop sampling and wait for the sampler thread to finish
+        """
+        self._stopEvent.set()
+        self.join()
+
+
+class CycleProfiler(object):
+    """
+    _CycleProfiler_
+
+    Call startCycle/endCycle around every worker cycle.
+    """
+
+    def __init__(self, componentDir, workerName, sampleInterval=0.01):
+        self.workerName = workerName
+        self.outputDir = os.path.join(componentDir, PROFILE_DIR)
+        self.flag = WakeUpFlag(os.path.join(componentDir, PROFILE_FLAG))
+        self.sampleInterval = sampleInterval
+        self.cyclesLeft = 0
+        self.profile = None
+        self.sampler = None
+        self.stats = None
+        self.samples = Counter()
+
+    def _requestedCycles(self):
+        """
+        Read the number of cycles to profile from the flag file, default 1
+        """
+        try:
+            with open(self.flag.flagFile) as fo:
+                return max(int(fo.read().strip() or 1), 1)
+        except (IOError, OSError, ValueError):
+            return 1
+
+    def startCycle(self):
+        """
+        _startCycle_
+
+        Check whether profiling was requested and start profiling this cycle
+        """
+        if not self.cyclesLeft and self.flag.isSet():
+            self.flag.clear()
+            self.cyclesLeft = self._requestedCycles()
+            self.stats = None
+            self.samples = Counter()
+            callCounter.reset()
+            callCounter.enabled = True
+            logging.info("Profiling the next %d cycles of %s", self.cyclesLeft, self.workerName)
+
+        if not self.cyclesLeft:
+            return
+        self.sampler = StackSampler(threading.current_thread().ident, self.sampleInterval)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def endCycle(self):
+        """
+        _endCycle_
+
+        Stop profiling this cycle, and write the results out if it was the
+        last cycle requested
+        """
+        if self.profile is None:
+            return
+        self.profile.disable()
+        self.sampler.stop()
+        self.samples.update(self.sampler.samples)
+        if self.stats is None:
+            self.stats = pstats.Stats(self.profile)
+        else:
+            self.stats.add(self.profile)
+        self.profile = None
+        self.sampler = None
+
+        self.cyclesLeft -= 1
+        if not self.cyclesLeft:
+            callCounter.enabled = False
+            self.dump()
+
+    def dump(self):
+        """
+        _dump_
+
+        Write the profiling results to the component profiles directory
+        """
+        if not os.path.isdir(self.outputDir):
+            os.makedirs(self.outputDir)
+        prefix = os.path.join(self.outputDir, "%s-%s" % (self.workerName, time.strftime("%Y%m%d-%H%M%S")))
+
+        self.stats.dump_stats(prefix + ".pstats")
+        with open(prefix + ".folded", "w") as fo:
+            for stack, count in self.samples.most_common():
+                fo.write("%s %d\n" % (stack, count))
+        with open(prefix + ".calls.json", "w") as fo:
+            json.dump(callCounter.summary(), fo, indent=2, sort_keys=True)
+        logging.info("Profiling results of %s written to %s.*", self.workerName, prefix)
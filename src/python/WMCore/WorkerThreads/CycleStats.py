@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+_CycleStats_
+
+Rolling statistics of the polling cycles of a worker thread: how long each
+cycle took and how many work items it processed. Kept in memory by every
+BaseWorkerThread and published through the heartbeat tables, such that the
+throughput of each component can be monitored.
+"""
+
+from __future__ import division
+
+from collections import deque
+
+# upper edges (in seconds) of the cycle duration histogram bins
+DURATION_BINS = (1, 5, 10, 30, 60, 300, 900)
+
+
+class CycleStats(object):
+    """
+    _CycleStats_
+
+    Keep the last `window` cycles of a worker thread.
+    """
+
+    def __init__(self, window=100):
+        self.cycles = deque(maxlen=window)
+        self.totalCycles = 0
+
+    def addCycle(self, duration, items=None):
+        """
+        _addCycle_
+
+        Record a new cycle. Items is the number of work items processed in
+        that cycle, None if the worker doesn't report it.
+        """
+        self.cycles.append((duration or 0, items))
+        self.totalCycles += 1
+
+    @staticmethod
+    def _percentile(sortedValues, perc):
+        """
+        Nearest-rank percentile of an already sorted list
+        """
+        idx = int(perc / 100 * (len(sortedValues) - 1) + 0.5)
+        return sortedValues[idx]
+
+    def histogram(self):
+        """
+        _histogram_
+
+        Return a list with the number of cycles within each duration bin.
+        The last element counts the cycles longer than the last bin edge.
+        """
+        counts = [0] * (len(DURATION_BINS) + 1)
+        for duration, _ in self.cycles:
+            for idx, edge in enumerate(DURATION_BINS):
+                if duration <= edge:
+                    counts[idx] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def summary(self):
+        """
+        _summary_
+
+        Return a compact dictionary summarizing the cycles in the window.
+        """
+        if not self.cycles:
+            return {"cycles": self.totalCycles}
+
+        durations = sorted(duration for duration, _ in self.cycles)
+        itemCycles = [(duration, items) for duration, items in self.cycles if items is not None]
+
+        stats = {"cycles": self.totalCycles,
+                 "window": len(durations),
+                 "avg": round(sum(durations) / len(durations), 3),
+                 "p50": round(self._percentile(durations, 50), 3),
+                 "p90": round(self._percentile(durations, 90), 3),
+                 "max": round(durations[-1], 3),
+                 "hist": self.histogram()}
+        if itemCycles:
+            totalItems = sum(items for _, items in itemCycles)
+            totalTime = sum(duration for duration, _ in itemCycles)
+            stats["items"] = totalItems
+            stats["idle"] = len([items for _, items in itemCycles if items == 0])
+            stats["items_per_sec"] = round(totalItems / totalTime, 3) if totalTime else None
+        return stats
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+_WakeUp_
+
+Lightweight notification mechanism between agent components.
+
+An upstream component that just produced work for a downstream component
+touches a flag file in the downstream component directory. Worker threads
+listening on that flag check its modification time while they sleep (a
+single stat call per second) and start their next cycle early when it
+changed. Several notifications arriving within the same sleep period are
+coalesced into a single wake up, and the regular pollInterval stays in place
+as a fallback whenever no notification arrives.
+"""
+
+from __future__ import division
+
+import logging
+import os
+import time
+
+WAKEUP_FLAG = ".wakeup"
+
+
+def wakeUpFlagPath(config, componentName):
+    """
+    _wakeUpFlagPath_
+
+    Return the path to the wake up flag file of a given component, or None
+    if the component directory can't be resolved from the configuration.
+    """
+    compSect = getattr(config, componentName, None)
+    componentDir = getattr(compSect, "componentDir", None)
+    if componentDir is None:
+        if not hasattr(config, "General") or not hasattr(config.General, "workDir"):
+            return None
+        componentDir = os.path.join(config.General.workDir, componentName)
+    return os.path.join(componentDir, WAKEUP_FLAG)
+
+
+def notifyComponents(config, componentNames):
+    """
+    _notifyComponents_
+
+    Wake up the worker threads of the given components. Components not
+    deployed in this agent (no component directory) are silently skipped,
+    and a failure to notify is never fatal since the downstream component
+    will pick up the work in its next regular cycle anyway.
+    """
+    for componentName in componentNames:
+        flagFile = wakeUpFlagPath(config, componentName)
+        if flagFile is None or not os.path.isdir(os.path.dirname(flagFile)):
+            continue
+        try:
+            with open(flagFile, "a"):
+                os.utime(flagFile, None)
+        except (IOError, OSError) as ex:
+            logging.warning("Failed to notify component %s: %s", componentName, str(ex))
+    return
+
+
+class WakeUpFlag(object):
+    """
+    _WakeUpFlag_
+
+    Listening side of the wake up notification, one per worker thread.
+    """
+
+    def __init__(self, flagFile):
+        self.flagFile = flagFile
+        self.lastSeen = self._getMTime()
+
+    def _getMTime(self):
+        """
+        Return the modification time of the flag file, None if it's not there
+        """
+        try:
+            return os.stat(self.flagFile).st_mtime
+        except OSError:
+            return None
+
+    def isSet(self):
+        """
+        _isSet_
+
+        True if a notification arrived since the last call to clear()
+        """
+        mtime = self._getMTime()
+        return mtime is not None and mtime != self.lastSeen
+
+    def getLatency(self):
+        """
+        _getLatency_
+
+        Seconds elapsed since the last notification was sent, None if the
+        flag has never been notified.
+        """
+        mtime = self._getMTime()
+        if mtime is None:
+            return None
+        return max(time.time() - mtime, 0)
+
+    def clear(self):
+        """
+        _clear_
+
+        Acknowledge all the notifications received so far. To be called right
+        before the worker starts a new cycle, such that notifications sent
+        during the cycle trigger the next one.
+        """
+        self.lastSeen = self._getMTime()
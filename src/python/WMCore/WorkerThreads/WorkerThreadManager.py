@@ -12,6 +12,8 @@ import time
 
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.CycleProfiler import CycleProfiler
+from WMCore.WorkerThreads.WakeUp import WakeUpFlag, wakeUpFlagPath
 
 # keep track of a unique WTM number
 wtmcount = 0
@@ -61,6 +63,8 @@ class WorkerThreadManager(object):
         """
         # Work timing
         worker.idleTime = idleTime
+        worker.pollInterval = idleTime
+        worker.maxIdleTime = idleTime
         worker.component = self.component
         self.lock.acquire()
         self.slavecounter += 1
@@ -76,6 +80,51 @@ class WorkerThreadManager(object):
             if getattr(self.component.config.Agent, "useHeartbeat", True):
                 worker.heartbeatAPI = HeartbeatAPI(self.component.config.Agent.componentName,
                                                    idleTime, heartbeatTimeout)
+            self.prepareWakeUp(worker, getattr(self.component.config.Agent, "componentName", None))
+            self.prepareAdaptivePolling(worker, getattr(self.component.config.Agent, "componentName", None))
+            self.prepareProfiler(worker, getattr(self.component.config.Agent, "componentName", None))
+
+    def prepareWakeUp(self, worker, componentName):
+        """
+        Let the worker listen to wake up notifications from other components,
+        if enabled through the wakeUpOnNotification component parameter
+        """
+        if componentName is None:
+            return
+        compSect = getattr(self.component.config, componentName, None)
+        if not getattr(compSect, "wakeUpOnNotification", False):
+            return
+        flagFile = wakeUpFlagPath(self.component.config, componentName)
+        if flagFile is None:
+            return
+        worker.wakeUpFlag = WakeUpFlag(flagFile)
+        worker.minIdleTime = getattr(compSect, "minPollInterval", 0)
+        logging.info("Worker %s will wake up on notifications from %s", str(worker), flagFile)
+
+    def prepareAdaptivePolling(self, worker, componentName):
+        """
+        Let the worker adapt its polling interval to the work available,
+        if enabled through the adaptivePolling component parameter
+        """
+        if componentName is None:
+            return
+        compSect = getattr(self.component.config, componentName, None)
+        if not getattr(compSect, "adaptivePolling", False):
+            return
+        worker.adaptivePolling = True
+        worker.minIdleTime = getattr(compSect, "minPollInterval", 0)
+        worker.maxIdleTime = max(getattr(compSect, "maxPollInterval", worker.pollInterval), worker.pollInterval)
+        logging.info("Worker %s will poll adaptively between %s and %s secs",
+                     str(worker), worker.minIdleTime, worker.maxIdleTime)
+
+    def prepareProfiler(self, worker, componentName):
+        """
+        Let the worker be profiled on demand, see CycleProfiler
+        """
+        componentDir = getattr(getattr(self.component.config, componentName or "", None), "componentDir", None)
+        if componentDir is None:
+            return
+        worker.profiler = CycleProfiler(componentDir, "%s-%s" % (worker.__class__.__name__, worker.slaveid))
 
     def addWorker(self, worker, idleTime=60, hbTimeout=None, parameters=None):
         """
@@ -0,0 +1,262 @@
+"""
+In-memory test double of the htcondor.Schedd python bindings, good enough
+to exercise the BossAir condor plugins without a condor pool.
+
+Constraints are given in the ClassAd language and evaluated against plain
+dictionaries, supporting the subset used by the agent: attribute references,
+quoted strings, numbers, comparisons (==, !=, =?=, =!=, <, <=, >, >=) and
+the && / || / ! operators.
+"""
+from __future__ import (division, print_function)
+
+import re
+import threading
+import time
+from builtins import object
+from contextlib import contextmanager
+
+# classad -> python tokens, longest operators first
+_CLASSAD_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"|=\?=|=!=|==|!=|<=|>=|&&|\|\||!|[A-Za-z_][A-Za-z0-9_.]*|.',
+                             re.DOTALL)
+_OPERATORS = {"=?=": "==", "=!=": "!=", "&&": " and ", "||": " or ", "!": " not "}
+_LITERALS = {"true": "True", "false": "False", "undefined": "None"}
+
+# held while any MockSchedd transaction is open
+_TRANSACTION_LOCK = threading.Lock()
+
+
+class _UndefinedAttributes(dict):
+    """
+    Evaluation namespace where missing attributes are UNDEFINED (None)
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+def compileConstraint(constraint):
+    """
+    _compileConstraint_
+
+    Translate a ClassAd constraint expression into a python code object
+    """
+    if constraint is None or constraint is True or str(constraint).strip() == "":
+        constraint = "true"
+    pyExpr = []
+    for token in _CLASSAD_TOKENS.findall(str(constraint)):
+        if token in _OPERATORS:
+            pyExpr.append(_OPERATORS[token])
+        elif token.lower() in _LITERALS:
+            pyExpr.append(_LITERALS[token.lower()])
+        else:
+            pyExpr.append(token)
+    return compile("".join(pyExpr), "<constraint>", "eval")
+
+
+def matchAd(code, jobAd):
+    """
+    _matchAd_
+
+    Evaluate a compiled constraint against a job ad
+    """
+    try:
+        return bool(eval(code, {"__builtins__": {}}, _UndefinedAttributes(jobAd)))  # pylint: disable=eval-used
+    except TypeError:
+        # comparisons with UNDEFINED are never true
+        return False
+
+
+class MockSchedd(object):
+    """
+    _MockSchedd_
+
+    Keeps the job queue and the job history as lists of dictionaries,
+    indexed by the "ClusterId.ProcId" job id.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.jobs = {}
+        self.historyAds = []
+        self.nextClusterId = 1
+        self.queries = []
+        # seconds each transaction takes, to emulate a busy schedd
+        self.latency = kwargs.get('latency', 0)
+        # make every command fail, to emulate a broken schedd
+        self.failing = kwargs.get('failing', False)
+        self.lock = threading.Lock()
+
+    def addJobs(self, jobAds, clusterId=None, submitTime=None):
+        """
+        Queue a list of job ads in a new (or the given) cluster, returning
+        their job ids. JobStatus defaults to Idle.
+        """
+        with self.lock:
+            if clusterId is None:
+                clusterId = self.nextClusterId
+            self.nextClusterId = max(self.nextClusterId, clusterId + 1)
+        submitTime = int(submitTime or time.time())
+
+        jobIds = []
+        for procId, jobAd in enumerate(jobAds):
+            jobAd = dict(jobAd)
+            jobAd.update({"ClusterId": clusterId, "ProcId": procId})
+            jobAd.setdefault("JobStatus", 1)
+            jobAd.setdefault("QDate", submitTime)
+            jobAd.setdefault("EnteredCurrentStatus", submitTime)
+            jobId = "%s.%s" % (clusterId, procId)
+            self.jobs[jobId] = jobAd
+            jobIds.append(jobId)
+        return jobIds
+
+    def setStatus(self, jobIds, jobStatus, changeTime=None, **attrs):
+        """
+        Change the status (and any other attribute) of the given jobs
+        """
+        changeTime = int(changeTime or time.time())
+        for jobId in jobIds:
+            self.jobs[jobId].update(attrs)
+            self.jobs[jobId]["JobStatus"] = jobStatus
+            self.jobs[jobId]["EnteredCurrentStatus"] = changeTime
+        return
+
+    def leaveQueue(self, jobIds, jobStatus=4, changeTime=None):
+        """
+        Move jobs out of the queue into the history, like condor does
+        with completed (4) or removed (3) jobs.
+        """
+        self.setStatus(jobIds, jobStatus, changeTime)
+        for jobId in jobIds:
+            self.historyAds.append(self.jobs.pop(jobId))
+        return
+
+    @staticmethod
+    def _project(jobAd, projection):
+        if not projection:
+            return dict(jobAd)
+        return dict((attr, jobAd[attr]) for attr in projection if attr in jobAd)
+
+    def xquery(self, requirements="true", projection=None, limit=-1):
+        """
+        Query the job queue
+        """
+        self.queries.append(("xquery", requirements))
+        if self.failing:
+            raise RuntimeError("Failed to connect to schedd")
+        code = compileConstraint(requirements)
+        for jobAd in list(self.jobs.values()):
+            if limit == 0:
+                break
+            if matchAd(code, jobAd):
+                limit -= 1
+                yield self._project(jobAd, projection)
+
+    def query(self, constraint="true", attr_list=None, limit=-1):
+        return list(self.xquery(constraint, attr_list, limit))
+
+    def history(self, constraint, projection, match=-1, since=None):
+        """
+        Query the job history, newest jobs first, stopping at the first job
+        matching the `since` expression.
+        """
+        self.queries.append(("history", constraint))
+        if self.failing:
+            raise RuntimeError("Failed to connect to schedd")
+        code = compileConstraint(constraint)
+        sinceCode = compileConstraint(since) if since else None
+        for jobAd in reversed(self.historyAds):
+            if match == 0 or (sinceCode is not None and matchAd(sinceCode, jobAd)):
+                break
+            if matchAd(code, jobAd):
+                match -= 1
+                yield self._project(jobAd, projection)
+
+    def _selectJobIds(self, jobSpec):
+        """
+        Job ids selected by either a list of job ids or a constraint
+        """
+        if isinstance(jobSpec, (list, tuple, set)):
+            return [jobId for jobId in jobSpec if jobId in self.jobs]
+        code = compileConstraint(jobSpec)
+        return [jobId for jobId, jobAd in list(self.jobs.items()) if matchAd(code, jobAd)]
+
+    def act(self, action, jobSpec):
+        """
+        Remove jobs given either as a list of job ids or as a constraint,
+        whatever the action. Returns the summary ad of the command.
+        """
+        self.queries.append(("act", jobSpec))
+        if self.failing:
+            raise RuntimeError("Failed to connect to schedd")
+        jobIds = self._selectJobIds(jobSpec)
+        self.leaveQueue(jobIds, jobStatus=3)
+        return {"TotalSuccess": len(jobIds), "TotalError": 0}
+
+    def edit(self, jobSpec, attr, value):
+        """
+        Set an attribute of the jobs given either as a list of job ids or as
+        a constraint. Quoted string values are stored unquoted.
+        """
+        self.queries.append(("edit", jobSpec))
+        if self.failing:
+            raise RuntimeError("Failed to connect to schedd")
+        if isinstance(value, str) and len(value) > 1 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        jobIds = self._selectJobIds(jobSpec)
+        for jobId in jobIds:
+            self.jobs[jobId][attr] = value
+        return len(jobIds)
+
+    @contextmanager
+    def transaction(self, *args, **kwargs):
+        if self.failing:
+            raise RuntimeError("Failed to connect to schedd")
+        # like the htcondor bindings, only one transaction per process
+        if not _TRANSACTION_LOCK.acquire(False):
+            raise RuntimeError("Only one transaction may be active at a time in a process")
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            yield self
+        finally:
+            _TRANSACTION_LOCK.release()
+
+
+class MockSubmitResult(object):
+    """
+    Result of MockSubmit.queue_with_itemdata
+    """
+
+    def __init__(self, clusterId, numProcs):
+        self.clusterId = clusterId
+        self.numProcs = numProcs
+
+    def cluster(self):
+        return self.clusterId
+
+    def num_procs(self):
+        return self.numProcs
+
+
+class MockSubmit(dict):
+    """
+    _MockSubmit_
+
+    Version of htcondor.Submit queueing jobs in a MockSchedd
+    """
+
+    def __init__(self, description=None):
+        dict.__init__(self)
+        for line in (description or "").splitlines():
+            if "=" in line:
+                key, value = line.split("=", 1)
+                self[key.strip()] = value.strip()
+
+    def queue_with_itemdata(self, txn, count=1, itemdata=None):
+        jobAds = []
+        for item in itemdata or [{}]:
+            for dummyIdx in range(count):
+                jobAd = dict(self)
+                jobAd.update(item)
+                jobAds.append(jobAd)
+        jobIds = txn.addJobs(jobAds)
+        return MockSubmitResult(int(jobIds[0].split(".")[0]) if jobIds else None, len(jobIds))
@@ -103,6 +103,22 @@ class testFileTools(unittest.TestCase):
         self.assertEqual(cksum, "3774692924")
         return
 
+    def testAdler32(self):
+        """
+        Test the adler32 checksum calculation, with blocks of several sizes
+        """
+        filename = os.path.join(self.testDir, 'fileInfo.test')
+        with open(filename, 'w') as fObj:
+            fObj.write("")
+        self.assertEqual(FileTools.calculateAdler32(filename), "00000001")
+
+        silly = "This is a rather ridiculous string"
+        with open(filename, 'w') as fObj:
+            fObj.write(silly * 100001)
+        self.assertEqual(FileTools.calculateAdler32(filename), "827db5b1")
+        self.assertEqual(FileTools.calculateAdler32(filename, blockSize=4096), "827db5b1")
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+Unittests for the RateLimiter module
+"""
+
+from __future__ import division, print_function
+
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import cherrypy
+from cherrypy._cprequest import Request, Response
+from cherrypy.lib import httputil
+from nose.plugins.attrib import attr
+
+from Utils.RateLimiter import (MemoryStore, RateLimiter, SQLiteStore, TooManyRequests,
+                               rateLimiterFromConfig, slidingWindow, tokenBucket)
+from WMCore.Configuration import Configuration
+from WMCore.REST.Server import RESTApi, RESTArgs, RESTEntity, restcall
+
+
+def countAllowed(path, numCalls, results):
+    "Call a limiter sharing its states in path numCalls times, count the allowed calls"
+    limiter = RateLimiter({"*": {"limit": 100, "window": 3600}}, store=SQLiteStore(path, syncInterval=0))
+    results.put(sum(1 for _ in range(numCalls) if not limiter.check("user", "api")))
+
+
+class Ping(RESTEntity):
+    "Entity answering a constant"
+
+    def validate(self, apiobj, method, api, param, safe):
+        pass
+
+    @restcall(args=[])
+    def get(self):
+        return ["pong"]
+
+
+class App(object):
+    appname = "test"
+
+
+class RateLimiterTests(unittest.TestCase):
+    """
+    unittest for the rate limiting algorithms, stores and limiter
+    """
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempDir)
+
+    def loadRequest(self, user=None):
+        "Make a cherrypy request of the given user"
+        request = Request(httputil.Host('127.0.0.1', 8888), httputil.Host('10.0.0.1', 50000))
+        request.method = 'GET'
+        request.query_string = ''
+        request.headers = httputil.HeaderMap({'Accept': 'application/json'})
+        if user is not None:
+            request.user = user
+        cherrypy.serving.load(request, Response())
+
+    def testTokenBucket(self):
+        """
+        Test bursts and refills of the token bucket
+        """
+        state, wait = tokenBucket(None, 100, 1, 2, 3)
+        self.assertEqual((state, wait), ((2, 100), 0))
+        state, _ = tokenBucket(state, 100, 1, 2, 3)
+        state, _ = tokenBucket(state, 100, 1, 2, 3)
+        state, wait = tokenBucket(state, 100, 1, 2, 3)
+        self.assertEqual((state, wait), ((0, 100), 0.5))
+        # refilled at 2 per second, up to the burst size
+        state, wait = tokenBucket(state, 100.5, 1, 2, 3)
+        self.assertEqual((state, wait), ((0, 100.5), 0))
+        self.assertEqual(tokenBucket(state, 110, 1, 2, 3), ((2, 110), 0))
+        self.assertEqual(tokenBucket(state, 110, 4, 2, 3), ((3, 110), float("inf")))
+
+    def testSlidingWindow(self):
+        """
+        Test the window counts and the weight of the previous window
+        """
+        state = None
+        for _ in range(10):
+            state, wait = slidingWindow(state, 1005, 1, 10, 10)
+            self.assertEqual(wait, 0)
+        self.assertEqual(state, (1000, 10, 0))
+        state, wait = slidingWindow(state, 1005, 1, 10, 10)
+        # wait for the window to become the previous one, weighing 9/10
+        self.assertAlmostEqual(wait, 6)
+        state, wait = slidingWindow(state, 1011, 1, 10, 10)
+        self.assertEqual((state, wait), ((1010, 1, 10), 0))
+        state, wait = slidingWindow(state, 1011, 1, 10, 10)
+        self.assertAlmostEqual(wait, 1)
+        self.assertEqual(slidingWindow(state, 1013, 1, 10, 10), ((1010, 2, 10), 0))
+        # an old state does not count
+        self.assertEqual(slidingWindow(state, 1030, 1, 10, 10), ((1030, 1, 0), 0))
+
+    def testLimiter(self):
+        """
+        Test the quotas per user and endpoint, and the counters
+        """
+        for store in (MemoryStore(), SQLiteStore(os.path.join(self.tempDir, "rates.db")),
+                      SQLiteStore(os.path.join(self.tempDir, "rates0.db"), syncInterval=0)):
+            limiter = RateLimiter({"*": {"rate": 1, "burst": 2}, "bulk": {"limit": 1, "window": 60}},
+                                  store=store, label="test")
+            self.assertEqual([limiter.check("user1", "api") for _ in range(2)], [0, 0])
+            self.assertTrue(0.9 < limiter.check("user1", "api") <= 1)
+            self.assertEqual(limiter.check("user2", "api"), 0)
+            self.assertEqual(limiter.check("user1", "bulk"), 0)
+            self.assertTrue(limiter.check("user1", "bulk") > 0)
+            self.assertEqual((limiter.allowed("api"), limiter.rejected("api")), (3, 1))
+
+            stats = logging.statistics["RateLimiter"]["test"]
+            self.assertEqual((stats["Allowed"](None), stats["Rejected"](None)), (4, 2))
+            self.assertEqual(stats["Endpoints"](None)["bulk"], {"Allowed": 1, "Rejected": 1})
+        self.assertEqual(RateLimiter({"api": {"rate": 1}}).check("user", "other"), 0)
+
+    def testSharedStore(self):
+        """
+        Test processes sharing a SQLite store share the quotas
+        """
+        path = os.path.join(self.tempDir, "rates.db")
+        SQLiteStore(path)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=countAllowed, args=(path, 50, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        allowed = sum(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join()
+        self.assertEqual(allowed, 100)
+
+    def testBatchedStore(self):
+        """
+        Test stores merge their calls into the database every syncInterval
+        """
+        path = os.path.join(self.tempDir, "rates.db")
+        stores = [SQLiteStore(path, syncInterval=10) for _ in range(2)]
+        limiters = [RateLimiter({"*": {"limit": 100, "window": 3600}}, store=store) for store in stores]
+        self.assertEqual(sum(1 for _ in range(60) if not limiters[0].check("user", "api")), 60)
+        # nothing written yet, each store decides on its own
+        self.assertEqual(stores[0].transactions, 0)
+        self.assertEqual(sum(1 for _ in range(60) if not limiters[1].check("user", "api")), 60)
+
+        for store in stores + stores[:1]:
+            store.sync()
+        # one transaction per store with calls to merge
+        self.assertEqual(sum(store.transactions for store in stores), 2)
+        # both see the 120 calls of the window
+        for limiter in limiters:
+            self.assertTrue(limiter.check("user", "api") > 0)
+        self.assertEqual(limiters[0].check("user2", "api"), 0)
+
+        # merged once the interval is over
+        stores[0].update("user3|api", lambda state, now: ((now, 1, 0), 0), stores[0].lastSync + 11)
+        self.assertEqual(stores[0].transactions, 2)
+        self.assertEqual(stores[1]._read(stores[1]._connection(), "user2|api")[1], 1)
+
+    def testEnforce(self):
+        """
+        Test calls over the quota get a 429 error with a Retry-After header
+        """
+        limiter = RateLimiter({"api": {"rate": 0.1, "burst": 1}})
+
+        @limiter.make_limited("api")
+        def api():
+            return "result"
+
+        self.loadRequest({"dn": "/DC=ch/CN=user", "login": "user"})
+        self.assertEqual(api(), "result")
+        with self.assertRaises(TooManyRequests) as context:
+            api()
+        self.assertEqual(context.exception.status, 429)
+        context.exception.set_response()
+        self.assertEqual(cherrypy.serving.response.headers["Retry-After"], "10")
+        self.assertEqual(limiter.rejected("api"), 1)
+
+        # users are told apart by DN, login or address
+        self.assertTrue(limiter.check("/DC=ch/CN=user", "api") > 9)
+        self.loadRequest({"login": "user"})
+        self.assertEqual(api(), "result")
+        self.loadRequest()
+        self.assertEqual(api(), "result")
+        self.assertTrue(limiter.check("10.0.0.1", "api") > 9)
+
+    def testRESTApi(self):
+        """
+        Test the REST APIs refuse calls over the quota from the configuration
+        """
+        config = Configuration().section_("views").section_("data")
+        self.assertEqual(rateLimiterFromConfig(config, "test"), None)
+        config.rate_limits = {"ping": {"rate": 1, "burst": 1}}
+        config.rate_limits_store = os.path.join(self.tempDir, "rates.db")
+
+        api = RESTApi(App(), config, "/test")
+        api._add({"ping": Ping(App(), api, config, "/test")})
+        api.rate_limiter = rateLimiterFromConfig(config, "test")
+        self.assertTrue(isinstance(api.rate_limiter.store, SQLiteStore))
+        self.loadRequest({"dn": "/DC=ch/CN=user", "roles": {}})
+        self.assertTrue("pong" in "".join(api._call(RESTArgs(["ping"], {}))))
+        self.assertRaises(TooManyRequests, api._call, RESTArgs(["ping"], {}))
+
+        # returned as is, not reported as a server error
+        self.loadRequest({"dn": "/DC=ch/CN=user", "roles": {}})
+        with self.assertRaises(TooManyRequests) as context:
+            api.default("ping")
+        self.assertEqual(context.exception.status, 429)
+        self.assertFalse("X-Error-ID" in cherrypy.serving.response.headers)
+
+    @attr('performance', 'integration')
+    def testOverloadProtection(self):
+        """
+        Offer 4 users' requests at 2.5 times the capacity of a server with 8
+        threads taking 20ms per request, with and without a rate limit of
+        the users to 80% of the capacity. Compare the latency of the served
+        requests, which without limits grows with the backlog.
+        """
+        workers, serviceTime = 8, 0.02
+        capacity = workers / serviceTime
+        users, duration = 4, 3
+        offered = 2.5 * capacity
+
+        def run(limiter):
+            served, rejected = [], []
+
+            def handle(user, submitted):
+                if limiter and limiter.check(user, "api"):
+                    rejected.append(time.time() - submitted)
+                    return
+                time.sleep(serviceTime)
+                served.append(time.time() - submitted)
+
+            with ThreadPoolExecutor(workers) as server:
+                startTime = time.time()
+                for idx in range(int(offered * duration)):
+                    # open loop clients, sending at the offered rate whatever the server does
+                    delay = startTime + idx / offered - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    server.submit(handle, "user%d" % (idx % users), time.time())
+            served.sort()
+            return served, rejected
+
+        for name, limiter in [("no limits", None),
+                              ("rate limits", RateLimiter({"*": {"rate": 0.8 * capacity / users, "burst": 10}}))]:
+            served, rejected = run(limiter)
+            p50 = served[len(served) // 2]
+            p99 = served[int(math.ceil(len(served) * 0.99)) - 1]
+            print("%s: %d served, %d rejected, served latency p50 %.3f sec, p99 %.3f sec" %
+                  (name, len(served), len(rejected), p50, p99))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Unittests for Timers functions
+"""
+
+from __future__ import division, print_function
+
+import unittest
+
+from Utils.Timers import CallCounter, callCounter, countCalls, timeFunction
+
+
+class TimersTest(unittest.TestCase):
+    """
+    unittest for Timers functions
+    """
+
+    def tearDown(self):
+        callCounter.enabled = False
+        callCounter.reset()
+
+    def testTimeFunction(self):
+        """
+        Test the timeFunction decorator
+        """
+        tSpent, result, name = timeFunction(lambda x: x * 2)(21)
+        self.assertTrue(tSpent >= 0)
+        self.assertEqual(result, 42)
+        self.assertEqual(name, "<lambda>")
+
+    def testCallCounter(self):
+        """
+        Test the accounting of calls
+        """
+        counter = CallCounter()
+        counter.record("DAO", "Jobs.New", 0.5)
+        counter.record("DAO", "Jobs.New", 0.25)
+        counter.record("HTTP", "GET https://cmsweb.cern.ch", 1)
+        self.assertEqual(counter.summary(), {"DAO": {"Jobs.New": {"calls": 2, "time": 0.75}},
+                                             "HTTP": {"GET https://cmsweb.cern.ch": {"calls": 1, "time": 1}}})
+        counter.reset()
+        self.assertEqual(counter.summary(), {})
+
+    def testCountCalls(self):
+        """
+        Test that wrapped calls are only accounted when enabled
+        """
+        func = countCalls("DAO", "Dummy", lambda x: x + 1)
+        self.assertEqual(func(1), 2)
+        self.assertEqual(callCounter.summary(), {})
+
+        callCounter.enabled = True
+        self.assertEqual(func(1), 2)
+        self.assertEqual(func(2), 3)
+        self.assertEqual(callCounter.summary()["DAO"]["Dummy"]["calls"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
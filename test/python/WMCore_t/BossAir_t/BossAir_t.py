@@ -9,6 +9,7 @@ import getpass
 import os.path
 import subprocess
 import threading
+import time
 import unittest
 
 try:
@@ -539,6 +540,85 @@ class BossAirTest(unittest.TestCase):
 
         return
 
+    @attr('integration')
+    def testH_JobTable(self):
+        """
+        _JobTable_
+
+        Check that the job table of a tracking BossAir instance follows
+        the jobs submitted and killed by other instances.
+        """
+        config = self.getConfig()
+
+        trackAPI = BossAirAPI(config=config, insertStates=True)
+        submitAPI = BossAirAPI(config=config)
+
+        nJobs = 10
+        jobDummies = self.createDummyJobs(nJobs=nJobs, location='T3_US_Xanadu')
+        changeState = ChangeState(config)
+        changeState.propagate(jobDummies, 'created', 'new')
+        changeState.propagate(jobDummies, 'executing', 'created')
+        for job in jobDummies:
+            job['plugin'] = 'TestPlugin'
+            job['owner'] = 'tapas'
+
+        submitAPI.submit(jobs=jobDummies[:5])
+        # Test Plugin completes all the jobs it tracks
+        trackAPI.track()
+        self.assertEqual(len(trackAPI.jobTable), 0)
+        self.assertEqual(len(trackAPI.getComplete()), 5)
+
+        submitAPI.submit(jobs=jobDummies[5:])
+        trackAPI.track(wmbsIDs=[jobDummies[5]['id'], jobDummies[6]['id']])
+        self.assertEqual(len(trackAPI.jobTable), 3)
+        self.assertEqual(len(trackAPI.getComplete()), 7)
+
+        submitAPI.kill(jobs=[jobDummies[7]])
+        trackAPI.track()
+        self.assertEqual(len(trackAPI.jobTable), 0)
+        self.assertEqual(len(trackAPI._listRunJobs()), 0)
+        self.assertEqual(len(trackAPI.getComplete()), nJobs)
+
+        return
+
+    @attr('integration')
+    def testI_JobTableUpdates(self):
+        """
+        _JobTableUpdates_
+
+        Check that the job table of a tracking BossAir instance follows
+        the status changes made by other instances.
+        """
+        config = self.getConfig()
+
+        trackAPI = BossAirAPI(config=config, insertStates=True)
+        updateAPI = BossAirAPI(config=config)
+
+        jobDummies = self.createDummyJobs(nJobs=2, location='T3_US_Xanadu')
+        changeState = ChangeState(config)
+        changeState.propagate(jobDummies, 'created', 'new')
+        changeState.propagate(jobDummies, 'executing', 'created')
+        for job in jobDummies:
+            job['plugin'] = 'TestPlugin'
+            job['owner'] = 'tapas'
+        updateAPI.submit(jobs=jobDummies)
+
+        trackAPI._syncJobTable()
+        self.assertEqual(len(trackAPI.jobTable.getByStatus('New')), 2)
+
+        runJob = updateAPI._listRunJobs(active=True)[0]
+        runJob['status'] = 'Dead'
+        runJob['status_time'] = int(time.time()) + 10
+        updateAPI._updateJobs(jobs=[runJob])
+
+        trackAPI._syncJobTable()
+        self.assertEqual(len(trackAPI.jobTable), 2)
+        self.assertEqual(trackAPI.jobTable.get(runJob['id'])['status'], 'Dead')
+        self.assertEqual(trackAPI.jobTable.get(runJob['id'])['status_time'], runJob['status_time'])
+        self.assertEqual(len(trackAPI.jobTable.getByStatus('New')), 1)
+
+        return
+
 
 if __name__ == '__main__':
     unittest.main()
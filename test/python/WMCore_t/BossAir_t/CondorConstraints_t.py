@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+_CondorConstraints_t_
+
+Unit tests for the condor job constraint expressions, against mock schedds
+"""
+from __future__ import division, print_function
+
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.BossAir.Plugins.CondorConstraints import (attributeConstraints, jobIdConstraints,
+                                                      procIdRanges)
+from WMQuality.Emulators.PyCondorAPI.MockSchedd import MockSchedd
+
+
+def fillSchedd(schedd, numClusters, jobsPerCluster):
+    """
+    Queue clusters of jobs of two workflows, return the job ids
+    """
+    jobIds = []
+    for idx in range(numClusters):
+        jobAds = [{'WMAgent_RequestName': "Workflow%d" % (idx % 2)}] * jobsPerCluster
+        jobIds.extend(schedd.addJobs(jobAds))
+    return jobIds
+
+
+class CondorConstraintsTest(unittest.TestCase):
+    """
+    Test the constraint expressions built for bulk schedd actions
+    """
+
+    def testProcIdRanges(self):
+        """
+        Test grouping job ids into ProcId ranges
+        """
+        ranges = procIdRanges(["3.0", "3.1", "3.2", "3.5", "4.7", "3.6", "3.9"])
+        self.assertEqual(ranges, {3: [(0, 2), (5, 6), (9, 9)], 4: [(7, 7)]})
+        self.assertEqual(procIdRanges([]), {})
+
+    def testJobIdConstraints(self):
+        """
+        Test that the constraints select exactly the given jobs
+        """
+        schedd = MockSchedd()
+        jobIds = fillSchedd(schedd, 5, 20)
+        selected = jobIds[3:27] + jobIds[50:51] + jobIds[70:100:2]
+
+        constraints = jobIdConstraints(selected)
+        self.assertEqual(len(constraints), 1)
+        self.assertEqual(sorted(constraints[0][1]), sorted(selected))
+        matched = [jobAd for jobAd in schedd.xquery(constraints[0][0])]
+        self.assertEqual(sorted("%s.%s" % (ad['ClusterId'], ad['ProcId']) for ad in matched), sorted(selected))
+
+        # now split over several expressions
+        constraints = jobIdConstraints(selected, maxTerms=4)
+        self.assertEqual(len(constraints), 5)
+        self.assertEqual(sorted(sum([condorIds for _, condorIds in constraints], [])), sorted(selected))
+        for constraint, condorIds in constraints:
+            matched = ["%s.%s" % (ad['ClusterId'], ad['ProcId']) for ad in schedd.xquery(constraint)]
+            self.assertEqual(sorted(matched), sorted(condorIds))
+
+        self.assertEqual(jobIdConstraints([]), [])
+
+    def testAttributeConstraints(self):
+        """
+        Test selecting the jobs of some workflows
+        """
+        schedd = MockSchedd()
+        fillSchedd(schedd, 4, 10)
+
+        constraints = attributeConstraints('WMAgent_RequestName', ["Workflow1", "Workflow1"])
+        self.assertEqual(constraints, ['WMAgent_RequestName =?= "Workflow1"'])
+        self.assertEqual(len(list(schedd.xquery(constraints[0]))), 20)
+
+        constraints = attributeConstraints('WMAgent_RequestName', ["Workflow0", "Workflow1", "Workflow2"],
+                                           maxTerms=2)
+        self.assertEqual(len(constraints), 2)
+        self.assertEqual(sum(len(list(schedd.xquery(constraint))) for constraint in constraints), 40)
+
+    @attr('performance', 'integration')
+    def testBulkRemovePerformance(self):
+        """
+        Compare removing 100k jobs in groups of job ids with removing them
+        through ClusterId/ProcId range constraints, against a mock schedd
+        taking 10ms per command
+        """
+        numClusters = 500
+        jobsPerCluster = 200
+        latency = 0.01
+
+        schedd = MockSchedd()
+        jobIds = fillSchedd(schedd, numClusters, jobsPerCluster)
+        startTime = time.time()
+        numCommands = 0
+        for idx in range(0, len(jobIds), 50):
+            schedd.act("Remove", jobIds[idx:idx + 50])
+            time.sleep(latency)
+            numCommands += 1
+        print("Removed %d jobs in groups of job ids: %d commands in %.2f secs" % (len(jobIds), numCommands,
+                                                                                  time.time() - startTime))
+
+        schedd = MockSchedd()
+        jobIds = fillSchedd(schedd, numClusters, jobsPerCluster)
+        startTime = time.time()
+        constraints = jobIdConstraints(jobIds)
+        buildTime = time.time() - startTime
+        for constraint, _ in constraints:
+            schedd.act("Remove", constraint)
+            time.sleep(latency)
+        print("Removed %d jobs with range constraints: %d commands in %.2f secs (%.3f secs building them)" %
+              (len(jobIds), len(constraints), time.time() - startTime, buildTime))
+        self.assertEqual(len(schedd.jobs), 0)
+        self.assertEqual(len(constraints), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
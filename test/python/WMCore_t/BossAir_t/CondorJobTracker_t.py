@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+_CondorJobTracker_t_
+
+Unit tests for the incremental condor job tracking, against a mock schedd
+"""
+from __future__ import division, print_function
+
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.BossAir.Plugins.CondorJobTracker import CondorJobTracker
+from WMCore.BossAir.RunJob import RunJob
+from WMQuality.Emulators.PyCondorAPI.MockSchedd import MockSchedd
+
+EXIT_CODE_MAP = {0: "Unknown", 1: "Idle", 2: "Running", 3: "Removed",
+                 4: "Completed", 5: "Held", 6: "TransferOutput", 7: "Suspended"}
+STATE_MAP = {'New': 'Pending', 'Idle': 'Pending', 'Running': 'Running', 'Removed': 'Error',
+             'Completed': 'Complete', 'Held': 'Error', 'TransferOutput': 'Running',
+             'Suspended': 'Error', 'Timeout': 'Error', 'Unknown': 'Error'}
+
+
+class CondorJobTrackerTest(unittest.TestCase):
+    """
+    Test the CondorJobTracker against MockSchedd
+    """
+
+    def setUp(self):
+        self.schedd = MockSchedd()
+        self.tracker = CondorJobTracker('WMAgent_AgentName == "testAgent"', EXIT_CODE_MAP, STATE_MAP)
+
+    def createJobs(self, numJobs, submitTime=None):
+        """
+        Submit jobs to the mock schedd and return their RunJobs
+        """
+        gridIds = self.schedd.addJobs([{'WMAgent_AgentName': "testAgent"}] * numJobs, submitTime=submitTime)
+        jobs = []
+        for idx, gridId in enumerate(gridIds, start=1):
+            job = RunJob(jobid=idx)
+            job.update({'id': idx, 'gridid': gridId, 'status': 'Idle'})
+            jobs.append(job)
+        return jobs
+
+    def testMockSchedd(self):
+        """
+        Test the constraint evaluation of the mock schedd
+        """
+        self.schedd.addJobs([{'WMAgent_AgentName': "testAgent"}, {'WMAgent_AgentName': "otherAgent"}])
+        self.schedd.setStatus(["1.1"], 2, changeTime=100)
+        self.assertEqual(len(list(self.schedd.xquery('WMAgent_AgentName == "testAgent"'))), 1)
+        self.assertEqual(len(list(self.schedd.xquery('true'))), 2)
+        self.assertEqual(len(list(self.schedd.xquery('JobStatus =?= 2 || !(ProcId >= 1)'))), 2)
+        self.assertEqual(len(list(self.schedd.xquery('JobStatus =!= 2 && EnteredCurrentStatus > 100'))), 1)
+        self.assertEqual(len(list(self.schedd.xquery('UndefinedAttr > 1'))), 0)
+        self.assertEqual(list(self.schedd.xquery('ProcId == 1', ['JobStatus'])), [{'JobStatus': 2}])
+
+        self.schedd.leaveQueue(["1.0", "1.1"])
+        self.assertEqual(len(list(self.schedd.xquery())), 0)
+        self.assertEqual(len(list(self.schedd.history('true', ['ProcId']))), 2)
+        self.assertEqual(list(self.schedd.history('true', ['ProcId'], 1)), [{'ProcId': 1}])
+
+    def testTrack(self):
+        """
+        Test status changes through full and incremental queries
+        """
+        jobs = self.createJobs(4, submitTime=time.time() - 3600)
+
+        running, changed, complete = self.tracker.track(self.schedd, jobs)
+        self.assertEqual(len(running), 4)
+        self.assertEqual(changed, [])
+        self.assertEqual(complete, [])
+        self.assertEqual(self.schedd.queries[-1], ('xquery', 'WMAgent_AgentName == "testAgent"'))
+
+        # one starts running, one completes and leaves the queue
+        self.schedd.setStatus([jobs[0]['gridid']], 2, MachineAttrGLIDEIN_CMSSite0="T2_CH_CERN")
+        self.schedd.leaveQueue([jobs[1]['gridid']])
+        running, changed, complete = self.tracker.track(self.schedd, jobs)
+        self.assertEqual(self.schedd.queries[-1][0], 'history')
+        self.assertEqual(sorted(job['id'] for job in running), [1, 3, 4])
+        self.assertEqual(sorted(job['id'] for job in changed), [1, 2])
+        self.assertEqual([job['id'] for job in complete], [2])
+        self.assertEqual(jobs[0]['status'], 'Running')
+        self.assertEqual(jobs[0]['location'], 'T2_CH_CERN')
+        self.assertEqual(jobs[0]['globalState'], 'Running')
+        self.assertEqual(jobs[1]['globalState'], 'Complete')
+
+        # nothing changes, nothing is reported
+        running, changed, complete = self.tracker.track(self.schedd, [jobs[0], jobs[2], jobs[3]])
+        self.assertEqual(len(running), 3)
+        self.assertEqual(changed, [])
+        self.assertEqual(complete, [])
+
+        # jobs vanishing without trace are only completed by the next full query
+        self.schedd.jobs.pop(jobs[3]['gridid'])
+        running, changed, complete = self.tracker.track(self.schedd, [jobs[0], jobs[2], jobs[3]])
+        self.assertEqual(complete, [])
+        self.tracker.lastFullQuery -= self.tracker.fullQueryInterval
+        running, changed, complete = self.tracker.track(self.schedd, [jobs[0], jobs[2], jobs[3]])
+        self.assertEqual(self.schedd.queries[-1][0], 'xquery')
+        self.assertEqual([job['id'] for job in complete], [4])
+        self.assertEqual(jobs[3]['status'], 'Completed')
+
+    def testNewJobs(self):
+        """
+        Test that jobs submitted after the full query are tracked
+        """
+        oldJobs = self.createJobs(2)
+        self.tracker.track(self.schedd, oldJobs)
+        newJobs = self.createJobs(2)
+        self.schedd.setStatus([newJobs[0]['gridid']], 5)
+
+        running, changed, complete = self.tracker.track(self.schedd, oldJobs + newJobs)
+        self.assertEqual(len(running), 3)
+        self.assertEqual([job['gridid'] for job in changed], [newJobs[0]['gridid']])
+        self.assertEqual(complete, changed)
+        self.assertEqual(newJobs[0]['globalState'], 'Error')
+
+    def testQueryFailure(self):
+        """
+        Test that a failed query results in a full query next time
+        """
+        jobs = self.createJobs(2)
+        self.tracker.track(self.schedd, jobs)
+
+        def failingHistory(*args, **kwargs):
+            raise RuntimeError("Failed to connect to schedd")
+
+        self.schedd.history = failingHistory
+        self.assertRaises(RuntimeError, self.tracker.track, self.schedd, jobs)
+        self.assertTrue(self.tracker.needsFullQuery())
+
+    @attr('performance', 'integration')
+    def testTrackPerformance(self):
+        """
+        Compare the full and incremental tracking cycles with 100k jobs in the
+        queue, 1% of them changing status between cycles
+        """
+        numJobs = 100000
+        jobs = self.createJobs(numJobs, submitTime=time.time() - 3600)
+
+        startTime = time.time()
+        self.tracker.track(self.schedd, jobs)
+        fullTime = time.time() - startTime
+
+        self.schedd.setStatus([job['gridid'] for job in jobs[::100]], 2)
+        startTime = time.time()
+        running, changed, dummyComplete = self.tracker.track(self.schedd, jobs)
+        incrementalTime = time.time() - startTime
+
+        self.assertEqual(len(running), numJobs)
+        self.assertEqual(len(changed), numJobs // 100)
+        print("Tracking %d jobs: full cycle %.3f secs, incremental cycle %.3f secs" % (numJobs, fullTime,
+                                                                                      incrementalTime))
+
+
+if __name__ == "__main__":
+    unittest.main()
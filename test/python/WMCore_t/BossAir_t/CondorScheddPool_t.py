@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+_CondorScheddPool_t_
+
+Unit tests for the condor submission pipeline, against mock schedds
+"""
+from __future__ import division, print_function
+
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from Utils.IteratorTools import grouper
+from WMCore.BossAir.Plugins.CondorScheddPool import (LOCAL_SCHEDD, SubmitPipeline, makeGridId,
+                                                     scheddTransaction, splitGridId)
+from WMQuality.Emulators.PyCondorAPI.MockSchedd import MockSchedd, MockSubmit
+
+
+def buildBatch(jobs):
+    """
+    Build the submit request of a batch of jobs
+    """
+    sub = MockSubmit("universe = vanilla\nexecutable = submit.sh")
+    jobParams = [{'My.WMAgent_JobID': str(job)} for job in jobs]
+    return sub, jobParams
+
+
+def submittedJobs(schedds):
+    """
+    Sorted list of job ids queued in a dictionary of mock schedds
+    """
+    jobIds = []
+    for schedd, _ in schedds.values():
+        jobIds.extend(int(jobAd['My.WMAgent_JobID']) for jobAd in schedd.jobs.values())
+    return sorted(jobIds)
+
+
+class CondorScheddPoolTest(unittest.TestCase):
+    """
+    Test the SubmitPipeline
+    """
+
+    def testGridIds(self):
+        """
+        Test the grid ids of jobs in local and remote schedds
+        """
+        self.assertEqual(makeGridId(LOCAL_SCHEDD, 12, 3), "12.3")
+        self.assertEqual(splitGridId("12.3"), (LOCAL_SCHEDD, "12.3"))
+        gridId = makeGridId("vocms0250.cern.ch", 12, 3)
+        self.assertEqual(gridId, "vocms0250.cern.ch#12.3")
+        self.assertEqual(splitGridId(gridId), ("vocms0250.cern.ch", "12.3"))
+
+    def testTransactions(self):
+        """
+        Test that a single schedd transaction is open at a time in the process
+        """
+        schedd1, schedd2 = MockSchedd(), MockSchedd()
+        with schedd1.transaction():
+            self.assertRaises(RuntimeError, schedd2.transaction().__enter__)
+
+        opened = threading.Event()
+
+        def otherTransaction():
+            with scheddTransaction(schedd2):
+                opened.set()
+
+        with scheddTransaction(schedd1):
+            thread = threading.Thread(target=otherTransaction)
+            thread.start()
+            self.assertFalse(opened.wait(0.2))
+        thread.join()
+        self.assertTrue(opened.is_set())
+
+    def testSingleSchedd(self):
+        """
+        Test submission of several batches to the local schedd
+        """
+        schedds = {LOCAL_SCHEDD: (MockSchedd(), 1)}
+        pipeline = SubmitPipeline(schedds, buildBatch)
+        batches = pipeline.run(grouper(range(95), 10))
+
+        self.assertEqual(len(batches), 10)
+        self.assertTrue(all(batch.error is None for batch in batches))
+        self.assertEqual(sorted(batch.clusterId for batch in batches), list(range(1, 11)))
+        self.assertEqual(submittedJobs(schedds), list(range(95)))
+        self.assertEqual(pipeline.stats[LOCAL_SCHEDD]['jobs'], 95)
+        self.assertEqual(pipeline.stats[LOCAL_SCHEDD]['batches'], 10)
+
+    def testSeveralSchedds(self):
+        """
+        Test that batches are spread over the schedds
+        """
+        schedds = {"schedd1": (MockSchedd(latency=0.01), 2),
+                   "schedd2": (MockSchedd(latency=0.01), 1)}
+        pipeline = SubmitPipeline(schedds, buildBatch)
+        batches = pipeline.run(grouper(range(200), 5))
+
+        self.assertEqual(len(batches), 40)
+        self.assertTrue(all(batch.error is None for batch in batches))
+        self.assertEqual(submittedJobs(schedds), list(range(200)))
+        self.assertTrue(pipeline.stats["schedd1"]['batches'] > 0)
+        self.assertTrue(pipeline.stats["schedd2"]['batches'] > 0)
+
+    def testFailingSchedd(self):
+        """
+        Test that a broken schedd doesn't prevent the submission
+        """
+        schedds = {"schedd1": (MockSchedd(failing=True), 2),
+                   "schedd2": (MockSchedd(), 1)}
+        pipeline = SubmitPipeline(schedds, buildBatch, maxFailures=1)
+        batches = pipeline.run(grouper(range(100), 10))
+
+        self.assertEqual(len(batches), 10)
+        self.assertTrue(all(batch.error is None for batch in batches))
+        self.assertTrue(all(batch.scheddName == "schedd2" for batch in batches))
+        self.assertEqual(submittedJobs(schedds), list(range(100)))
+        self.assertEqual(pipeline.healthy, set(["schedd2"]))
+
+    def testAllFailing(self):
+        """
+        Test that batches are reported as failed when no schedd works
+        """
+        schedds = {LOCAL_SCHEDD: (MockSchedd(failing=True), 1)}
+        pipeline = SubmitPipeline(schedds, buildBatch, maxFailures=2)
+        batches = pipeline.run(grouper(range(100), 10))
+
+        self.assertEqual(len(batches), 10)
+        self.assertTrue(all(batch.error is not None for batch in batches))
+        self.assertTrue(all(batch.clusterId is None for batch in batches))
+        # only maxFailures transactions were tried
+        self.assertEqual(len([batch for batch in batches if batch.tried]), 2)
+
+        # no schedd at all
+        batches = SubmitPipeline({}, buildBatch).run(grouper(range(100), 10))
+        self.assertEqual(len(batches), 10)
+        self.assertTrue(all(batch.error is not None for batch in batches))
+
+    def testBuildFailure(self):
+        """
+        Test that a batch failing to build doesn't affect the others
+        """
+
+        def badBuildBatch(jobs):
+            if 13 in jobs:
+                raise ValueError("Bad job")
+            return buildBatch(jobs)
+
+        schedds = {LOCAL_SCHEDD: (MockSchedd(), 1)}
+        batches = SubmitPipeline(schedds, badBuildBatch).run(grouper(range(100), 10))
+        self.assertEqual(len([batch for batch in batches if batch.error is not None]), 1)
+        self.assertEqual(len(submittedJobs(schedds)), 90)
+
+    @attr('performance', 'integration')
+    def testSubmitPerformance(self):
+        """
+        Measure the submission rate against mock schedds with a transaction
+        latency of 0.2 secs for 200 jobs, building the classads serially vs
+        through the pipeline with one and three schedds
+        """
+        numJobs = 10000
+        latency = 0.2
+        jobsPerSubmit = 200
+
+        def slowBuildBatch(jobs):
+            # roughly the time needed to build the classads of real jobs
+            time.sleep(latency / 2)
+            return buildBatch(jobs)
+
+        schedd = MockSchedd(latency=latency)
+        startTime = time.time()
+        for jobs in grouper(range(numJobs), jobsPerSubmit):
+            sub, jobParams = slowBuildBatch(jobs)
+            with schedd.transaction() as txn:
+                sub.queue_with_itemdata(txn, 1, iter(jobParams))
+        print("Serial submission: %.1f jobs/sec" % (numJobs / (time.time() - startTime)))
+
+        for numSchedds in (1, 3):
+            schedds = dict(("schedd%d" % idx, (MockSchedd(latency=latency), 2)) for idx in range(numSchedds))
+            startTime = time.time()
+            batches = SubmitPipeline(schedds, slowBuildBatch).run(grouper(range(numJobs), jobsPerSubmit))
+            rate = numJobs / (time.time() - startTime)
+            self.assertEqual(submittedJobs(schedds), list(range(numJobs)))
+            self.assertTrue(all(batch.error is None for batch in batches))
+            print("Pipelined submission to %d schedds: %.1f jobs/sec" % (numSchedds, rate))
+
+
+if __name__ == "__main__":
+    unittest.main()
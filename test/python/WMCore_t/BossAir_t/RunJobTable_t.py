@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+_RunJobTable_t_
+
+Unit tests for the in-process table of active RunJobs
+"""
+from __future__ import division, print_function
+
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.BossAir.RunJob import RunJob
+from WMCore.BossAir.RunJobTable import RunJobTable
+
+
+def makeRunJobs(numJobs, status='Idle', firstID=1):
+    """
+    Create RunJobs with consecutive ids
+    """
+    runJobs = []
+    for runJobID in range(firstID, firstID + numJobs):
+        runJob = RunJob(jobid=runJobID + 1000)
+        runJob.update({'id': runJobID, 'gridid': "1.%i" % runJobID, 'status': status})
+        runJobs.append(runJob)
+    return runJobs
+
+
+class RunJobTableTest(unittest.TestCase):
+    """
+    Test the RunJobTable indexes
+    """
+
+    def testIndexes(self):
+        """
+        Test lookups by the different indexes
+        """
+        table = RunJobTable(makeRunJobs(10))
+        self.assertEqual(len(table), 10)
+        self.assertTrue(5 in table)
+        self.assertEqual(table.get(5)['gridid'], "1.5")
+        self.assertEqual(table.getByGridID("1.5")['id'], 5)
+        self.assertIsNone(table.getByGridID("2.5"))
+        self.assertEqual([rj['id'] for rj in table.getByJobID(1005)], [5])
+        self.assertEqual(len(table.getByStatus('Idle')), 10)
+        self.assertEqual(table.getByStatus('Running'), [])
+
+        self.assertEqual(len(table.listJobs()), 10)
+        self.assertEqual([rj['id'] for rj in table.listJobs(runJobIDs=[3, 4, 99])], [3, 4])
+        self.assertEqual([rj['id'] for rj in table.listJobs(wmbsIDs=[1003, 1007])], [3, 7])
+        self.assertEqual([rj['id'] for rj in table.listJobs(runJobIDs=[3, 4], wmbsIDs=[1004, 1007])], [4])
+
+        table.remove([5, 6, 99])
+        self.assertEqual(len(table), 8)
+        self.assertIsNone(table.get(5))
+        self.assertIsNone(table.getByGridID("1.6"))
+        self.assertEqual(table.getByJobID(1005), [])
+        self.assertEqual(len(table.getByStatus('Idle')), 8)
+        self.assertEqual(sorted(table.ids()), [1, 2, 3, 4, 7, 8, 9, 10])
+
+    def testChanges(self):
+        """
+        Test updates in place and through other RunJob instances
+        """
+        runJobs = makeRunJobs(4)
+        table = RunJobTable(runJobs)
+
+        # modified in place, e.g. by a plugin
+        runJobs[0]['status'] = 'Running'
+        table.reindex([runJobs[0]])
+        self.assertEqual([rj['id'] for rj in table.getByStatus('Running')], [1])
+        self.assertEqual(len(table.getByStatus('Idle')), 3)
+
+        # modified in a copy loaded from the database
+        copyJob = RunJob(jobid=1002)
+        copyJob.update({'id': 2, 'status': 'Timeout', 'status_time': 123})
+        table.update([copyJob])
+        self.assertTrue(table.get(2) is runJobs[1])
+        self.assertEqual(runJobs[1]['status'], 'Timeout')
+        self.assertEqual(runJobs[1]['status_time'], 123)
+        self.assertEqual(runJobs[1]['gridid'], "1.2")
+        self.assertEqual([rj['id'] for rj in table.getByStatus('Timeout')], [2])
+
+        # replacing a job
+        newJob = makeRunJobs(1, status='Held', firstID=3)[0]
+        table.add([newJob])
+        self.assertEqual(len(table), 4)
+        self.assertTrue(table.get(3) is newJob)
+        self.assertEqual([rj['id'] for rj in table.getByStatus('Held')], [3])
+        self.assertEqual(len(table.getByStatus('Idle')), 1)
+
+    @attr('performance', 'integration')
+    def testTablePerformance(self):
+        """
+        Time a tracking-like cycle over 200k jobs, where 1% of them change
+        """
+        numJobs = 200000
+        table = RunJobTable(makeRunJobs(numJobs))
+
+        startTime = time.time()
+        changedJobs = []
+        for runJob in table.listJobs():
+            if runJob['id'] % 100 == 0:
+                runJob['status'] = 'Running'
+                changedJobs.append(runJob)
+        table.reindex(changedJobs)
+        table.remove([runJob['id'] for runJob in changedJobs[::2]])
+        table.add(makeRunJobs(numJobs // 100, firstID=numJobs + 1))
+        cycleTime = time.time() - startTime
+
+        self.assertEqual(len(table.getByStatus('Running')), numJobs // 200)
+        print("RunJobTable cycle over %d jobs took %.3f secs" % (numJobs, cycleTime))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,8 +21,33 @@ from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller
 from WMComponent.JobTracker.JobTrackerPoller import JobTrackerPoller
 from WMCore.BossAir.BossAirAPI import BossAirAPI
 from WMCore.BossAir.StatusPoller import StatusPoller
-from WMCore.BossAir.Plugins.SimpleCondorPlugin import activityToType
+from WMCore.BossAir.Plugins.CondorScheddPool import LOCAL_SCHEDD, makeGridId
+from WMCore.BossAir.Plugins.SimpleCondorPlugin import SimpleCondorPlugin, activityToType
+from WMCore.BossAir.RunJob import RunJob
 from WMCore.JobStateMachine.ChangeState import ChangeState
+from WMQuality.Emulators.PyCondorAPI.MockSchedd import MockSchedd
+
+
+def makeSubmitJobs(numJobs, numTasks=1):
+    """
+    Create RunJobs with all the fields used to build the submit parameters
+    """
+    jobs = []
+    for idx in range(numJobs):
+        job = RunJob(jobid=idx)
+        job.update({'id': idx, 'retry_count': idx % 3, 'cache_dir': '/data/JobCache/job_%i' % idx,
+                    'sandbox': '/data/sandbox/TestWorkflow-Sandbox.tar.bz2', 'packageDir': '/data/package',
+                    'possibleSites': ['T2_CH_CERN', 'T1_US_FNAL'] if idx % 2 else ['T1_US_FNAL'],
+                    'potentialSites': ['T2_CH_CERN', 'T1_US_FNAL'],
+                    'request_name': 'pdmvserv_HIG-RunIISummer15GS-01331_00274_v2__160308_111346_296',
+                    'task_name': '/TestWorkflow/Task%i' % (idx % numTasks), 'task_id': idx % numTasks,
+                    'task_type': 'Production', 'activity': 'production', 'wf_priority': 10000,
+                    'taskPriority': 1, 'estimatedJobTime': 3600, 'estimatedMemoryUsage': 2000,
+                    'estimatedDiskUsage': 1000000, 'numberOfCores': 4, 'scramArch': ['slc7_amd64_gcc630'],
+                    'swVersion': ['CMSSW_10_2_0'], 'inputDataset': '/MinBias/Summer15-v1/GEN-SIM',
+                    'inputDatasetLocations': ['T2_CH_CERN'], 'inputPileup': None})
+        jobs.append(job)
+    return jobs
 
 
 class SimpleCondorPluginTest(BossAirTest):
@@ -450,6 +475,116 @@ class SimpleCondorPluginTest(BossAirTest):
             matchedGroup = match.groups()[0] if match else 'undefined'
             self.assertEqual(group, matchedGroup)
 
+    def testJobParameters(self):
+        """
+        _testJobParameters_
+
+        Test that job parameters built from the cached templates are specific
+        to every job and consistent across jobs
+        """
+        config = self.getConfig()
+        plugin = SimpleCondorPlugin(config)
+
+        jobs = makeSubmitJobs(4, numTasks=2)
+        jobParams = plugin.getJobParameters(jobs)
+        self.assertEqual(len(plugin.jobTemplates), 2)
+        self.assertEqual(len(jobParams), 4)
+        # all the jobs in a cluster must have the same keys
+        for ad in jobParams:
+            self.assertEqual(sorted(ad), sorted(jobParams[0]))
+
+        self.assertEqual(jobParams[1]['Arguments'], "TestWorkflow-Sandbox.tar.bz2 1 1")
+        self.assertEqual(jobParams[1]['initial_Dir'], "/data/JobCache/job_1")
+        self.assertEqual(jobParams[1]['My.WMAgent_JobID'], "1")
+        self.assertEqual(jobParams[0]['My.DESIRED_Sites'], '"T1_US_FNAL"')
+        self.assertEqual(jobParams[1]['My.DESIRED_Sites'], '"T1_US_FNAL,T2_CH_CERN"')
+        self.assertEqual(jobParams[1]['My.WMAgent_SubTaskName'], '"/TestWorkflow/Task1"')
+        self.assertEqual(jobParams[2]['My.WMAgent_SubTaskName'], '"/TestWorkflow/Task0"')
+        self.assertEqual(jobParams[1]['My.PostJobPrio2'], "-1")
+        self.assertEqual(jobParams[1]['My.CMSGroups'], '"HIG"')
+        self.assertEqual(jobParams[1]['My.DESIRED_CMSPileups'], 'UNDEFINED')
+        self.assertEqual(jobParams[1]['My.OriginalCpus'], '4')
+
+        # changing a job in place doesn't change the template of the others
+        jobParams[1]['My.OriginalCpus'] = '8'
+        self.assertEqual(plugin.getJobParameters(jobs)[3]['My.OriginalCpus'], '4')
+        jobs[3]['numberOfCores'] = 8
+        self.assertEqual(plugin.getJobParameters(jobs)[3]['My.OriginalCpus'], '8')
+        self.assertEqual(len(plugin.jobTemplates), 3)
+
+    @attr('performance', 'integration')
+    def testJobParametersPerformance(self):
+        """
+        _testJobParametersPerformance_
+
+        Time building the submit parameters of 50k jobs of 10 tasks
+        """
+        config = self.getConfig()
+        plugin = SimpleCondorPlugin(config)
+        jobs = makeSubmitJobs(50000, numTasks=10)
+
+        startTime = time.time()
+        jobParams = plugin.getJobParameters(jobs)
+        elapsed = time.time() - startTime
+        self.assertEqual(len(jobParams), 50000)
+        print("Built the submit parameters of %d jobs in %.3f secs (%.1f jobs/sec)" % (len(jobs), elapsed,
+                                                                                     len(jobs) / elapsed))
+
+    def testBulkActions(self):
+        """
+        _testBulkActions_
+
+        Test the bulk kill and site/priority updates against mock schedds
+        """
+        config = self.getConfig()
+        plugin = SimpleCondorPlugin(config)
+        schedds = {LOCAL_SCHEDD: MockSchedd(), "remote": MockSchedd(), "broken": MockSchedd(failing=True)}
+        plugin.submitSchedds = {LOCAL_SCHEDD: 1, "remote": 1}
+        plugin.getSchedd = schedds.get
+
+        jobs = []
+        for scheddName in (LOCAL_SCHEDD, "remote"):
+            jobAds = [{'WMAgent_AgentName': plugin.agent, 'WMAgent_JobID': len(jobs) + idx,
+                       'WMAgent_RequestName': "Workflow%d" % (idx % 2), 'WMAgent_SubTaskName': "/Workflow/Task",
+                       'DESIRED_Sites': "T1_US_FNAL,T2_CH_CERN" if idx % 3 else "T2_CH_CERN",
+                       'ExtDESIRED_Sites': "T1_US_FNAL,T2_CH_CERN", 'JobPrio': 1} for idx in range(10)]
+            for jobId in schedds[scheddName].addJobs(jobAds):
+                jobs.append({'id': len(jobs), 'jobid': len(jobs),
+                             'gridid': makeGridId(scheddName, *jobId.split("."))})
+
+        # drain CERN: jobs only able to run there are returned to be killed
+        jobToKill, failedJobs = plugin.bulkUpdateSiteInformation(jobs, "T2_CH_CERN", True)
+        self.assertEqual(failedJobs, [])
+        self.assertEqual(sorted(job['id'] for job in jobToKill), [0, 3, 6, 9, 10, 13, 16, 19])
+        self.assertEqual(schedds["remote"].jobs["1.1"]['DESIRED_Sites'], "T1_US_FNAL")
+
+        # kill them with a single command per schedd
+        self.assertEqual(plugin.bulkKill(jobToKill), [])
+        self.assertEqual(len(schedds[LOCAL_SCHEDD].jobs) + len(schedds["remote"].jobs), 12)
+        self.assertEqual(len([query for query in schedds["remote"].queries if query[0] == "act"]), 1)
+
+        # jobs in a broken schedd are reported as failed
+        brokenJobs = [{'id': 100, 'jobid': 100, 'gridid': makeGridId("broken", 1, 0)}]
+        self.assertEqual(plugin.bulkKill(jobs[1:3] + brokenJobs), brokenJobs)
+        self.assertRaises(RuntimeError, plugin.kill, brokenJobs, raiseEx=True)
+
+        plugin.bulkUpdateJobInformation([{'workflow': "Workflow0", 'task': "/Workflow/Task",
+                                          'requestPriority': 10, 'taskPriority': 0}])
+        priorities = [jobAd['JobPrio'] for jobAd in schedds["remote"].jobs.values()
+                      if jobAd['WMAgent_RequestName'] == "Workflow0"]
+        self.assertTrue(priorities and all(int(str(prio)) == 10 for prio in priorities))
+
+        plugin.bulkKillWorkflows(["Workflow0", "Workflow1"])
+        self.assertEqual(len(schedds[LOCAL_SCHEDD].jobs) + len(schedds["remote"].jobs), 0)
+
+        # ads without a WMAgent_JobID, e.g. from older agents, are skipped
+        schedds[LOCAL_SCHEDD].addJobs([{'WMAgent_AgentName': plugin.agent, 'DESIRED_Sites': "T2_CH_CERN",
+                                        'ExtDESIRED_Sites': "T2_CH_CERN"}])
+        self.assertEqual(plugin.bulkUpdateSiteInformation(jobs, "T2_CH_CERN", True), ([], []))
+
+        plugin.submitSchedds["broken"] = 1
+        self.assertEqual(plugin.bulkUpdateSiteInformation(jobs, "T2_CH_CERN", False)[1], jobs)
+
     def testActivityToTypeMap(self):
         """
         _testActivityToTypeMap_
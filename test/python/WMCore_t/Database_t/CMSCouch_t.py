@@ -370,6 +370,42 @@ class CMSCouchTest(unittest.TestCase):
         self.assertEqual(1, len(self.db.allDocs({'limit':1}, ["1", "3"])['rows']))
         self.assertTrue('error' in self.db.allDocs(keys = ["1", "4"])['rows'][1])
 
+    def testIterView(self):
+        """
+        Test paginated views give the same rows as loadView
+        """
+        view_ddoc = {
+            '_id': '_design/foo',
+            'language': 'javascript',
+            'views': {
+                'byGroup': {
+                    'map': 'function(doc) {if (doc.group != null) {emit(doc.group, null); emit(doc.group, 1)}}',
+                    'reduce': '_count'
+                },
+            }
+        }
+        self.db.queue(view_ddoc)
+        for i in range(50):
+            self.db.queue(Document(id="%02d" % i, inputDict={'group': i % 7}))
+        self.db.commit()
+
+        for options in [{'reduce': False}, {'reduce': False, 'descending': True},
+                        {'reduce': False, 'startkey': 2, 'endkey': 5, 'limit': 17},
+                        {'reduce': False, 'key': 3, 'include_docs': True}, {'group': True}]:
+            rows = self.db.loadView('foo', 'byGroup', options)['rows']
+            for pageSize in [1, 3, 1000]:
+                self.assertEqual(list(self.db.iterView('foo', 'byGroup', options, pageSize=pageSize)), rows)
+
+        keys = list(range(8))
+        rows = self.db.loadView('foo', 'byGroup', {'reduce': False}, keys)['rows']
+        for threads in [1, 3]:
+            self.assertEqual(list(self.db.iterView('foo', 'byGroup', {'reduce': False}, keys,
+                                                   pageSize=2, threads=threads)), rows)
+        self.assertEqual(list(self.db.iterAllDocs({'startkey': "10"}, pageSize=7)),
+                         self.db.allDocs({'startkey': "10"})['rows'])
+        self.assertEqual(list(self.db.iterAllDocs(keys=["01", "99"], pageSize=1)),
+                         self.db.allDocs(keys=["01", "99"])['rows'])
+
     def testUpdateBulkDocuments(self):
         """
         Test AllDocs with options
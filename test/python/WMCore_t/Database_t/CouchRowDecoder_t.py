@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+_CouchRowDecoder_t_
+
+Unit tests for the incremental decoding of couch rows, and a benchmark of
+the client memory on a large view served by a local fake couch server
+"""
+from __future__ import division, print_function
+
+import json
+import multiprocessing
+import resource
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from nose.plugins.attrib import attr
+
+from WMCore.Database.CMSCouch import CouchRowDecoder, Database
+
+VIEW_BODY = b'{"total_rows":3,"offset":1,"rows":[\r\n' \
+            b'{"id":"a","key":["a",1],"value":{"text":"x,\\ny"}},\r\n' \
+            b'{"id":"b","key":["b",2],"value":null},\r\n' \
+            b'{"id":"c","key":["c",3],"value":[1,2]}\r\n' \
+            b']}\n'
+
+VIEW_ROWS = [{"id": "a", "key": ["a", 1], "value": {"text": "x,\ny"}},
+             {"id": "b", "key": ["b", 2], "value": None},
+             {"id": "c", "key": ["c", 3], "value": [1, 2]}]
+
+
+def splitBody(body, size):
+    "Return the body in chunks of size bytes"
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class FakeCouchHandler(BaseHTTPRequestHandler):
+    """
+    Serve any GET with a view of numRows rows, written as it is generated
+    """
+    numRows = 1000000
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"total_rows":%d,"offset":0,"rows":[\r\n' % self.numRows)
+        lines = []
+        for i in range(self.numRows):
+            lines.append(b'{"id":"wf_%07d","key":["wf_%07d","T1_US_FNAL_Disk"],'
+                         b'"value":{"Jobs":%d,"Status":"Available","Priority":100000}}' % (i, i, i))
+            if len(lines) == 1000 or i == self.numRows - 1:
+                self.wfile.write(b",\r\n".join(lines) + (b",\r\n" if i < self.numRows - 1 else b"\r\n"))
+                lines = []
+        self.wfile.write(b"]}\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def readView(url, streamed, results):
+    "Read the whole view, returning the rows count and the peak memory increase in MB"
+    startRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    db = Database("test", url)
+    if streamed:
+        numRows = sum(1 for _ in db.iterView("fake", "rows", pageSize=10 ** 7))
+    else:
+        numRows = len(db.loadView("fake", "rows")["rows"])
+    results.put((numRows, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - startRSS) / 1024))
+
+
+class CouchRowDecoderTest(unittest.TestCase):
+    """
+    Test the decoding of couch responses in any chunks
+    """
+
+    def testViewRows(self):
+        """
+        Test view rows are decoded whatever the chunks, with the header
+        """
+        for size in [1, 2, 7, 64, len(VIEW_BODY)]:
+            decoder = CouchRowDecoder()
+            self.assertEqual(list(decoder.decode(splitBody(VIEW_BODY, size))), VIEW_ROWS)
+            self.assertEqual(decoder.header, {"total_rows": 3, "offset": 1})
+
+        decoder = CouchRowDecoder()
+        body = b'{"rows":[\n{"key":null,"value":10}\n],\n"update_seq":"42-g1AAAA"}'
+        self.assertEqual(list(decoder.decode([body])), [{"key": None, "value": 10}])
+        self.assertEqual(decoder.header, {"update_seq": "42-g1AAAA"})
+
+        decoder = CouchRowDecoder()
+        self.assertEqual(list(decoder.decode([b'{"total_rows":0,"offset":0,"rows":[\r\n\r\n]}\n'])), [])
+        self.assertEqual(decoder.header, {"total_rows": 0, "offset": 0})
+
+    def testRowsAreLazy(self):
+        """
+        Test each row is yielded as soon as its line is received
+        """
+        received = []
+
+        def chunks():
+            for chunk in splitBody(VIEW_BODY, 5):
+                received.append(chunk)
+                yield chunk
+
+        rows = CouchRowDecoder().decode(chunks())
+        self.assertEqual(next(rows), VIEW_ROWS[0])
+        self.assertTrue(len(b"".join(received)) < VIEW_BODY.index(b'{"id":"b"') + 5)
+
+    def testListRows(self):
+        """
+        Test list outputs, one element per line or not
+        """
+        docs = [{"_id": "1", "Status": "Available"}, {"_id": "2", "Status": "Acquired"}]
+        for body in [b"[\n" + b",\n".join(json.dumps(doc).encode() for doc in docs) + b"\n]",
+                     json.dumps(docs).encode(), b"[\n\n]", b"[]"]:
+            expected = docs if b"_id" in body else []
+            for size in [1, 3, len(body)]:
+                self.assertEqual(list(CouchRowDecoder().decode(splitBody(body, size))), expected)
+        self.assertEqual(list(CouchRowDecoder().decode([b'"Filter parameters required"'])),
+                         ["Filter parameters required"])
+
+    def testOtherResponses(self):
+        """
+        Test responses without a row per line are decoded as a whole
+        """
+        decoder = CouchRowDecoder()
+        body = json.dumps({"total_rows": 3, "offset": 1, "rows": VIEW_ROWS}, indent=2).encode()
+        self.assertEqual(list(decoder.decode(splitBody(body, 3))), VIEW_ROWS)
+        self.assertEqual(decoder.header, {"total_rows": 3, "offset": 1})
+
+        decoder = CouchRowDecoder()
+        self.assertEqual(list(decoder.decode([b'{"error":"not_found",', b'"reason":"missing"}\n'])), [])
+        self.assertEqual(decoder.header, {"error": "not_found", "reason": "missing"})
+
+        self.assertRaises(ValueError, list, CouchRowDecoder().decode([b'{"rows":[\n{"id":\n]}']))
+
+    @attr('performance', 'integration')
+    def testPeakMemory(self):
+        """
+        Compare the peak memory of reading a 1M rows view from a local fake
+        couch server at once with loadView, or row by row with iterView
+        """
+        server = HTTPServer(("127.0.0.1", 0), FakeCouchHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:%d" % server.server_address[1]
+            for name, streamed in [("loadView", False), ("iterView", True)]:
+                results = multiprocessing.Queue()
+                process = multiprocessing.Process(target=readView, args=(url, streamed, results))
+                process.start()
+                numRows, peakMB = results.get(timeout=600)
+                process.join()
+                self.assertEqual(numRows, FakeCouchHandler.numRows)
+                print("%s of %d rows: peak RSS increase %.0f MB" % (name, numRows, peakMB))
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
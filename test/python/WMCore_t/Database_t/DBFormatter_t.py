@@ -14,6 +14,7 @@ import unittest
 
 from nose.plugins.attrib import attr
 
+from Utils.Timers import callCounter
 from WMCore.Database.DBFormatter import DBFormatter
 from WMCore.Database.Transaction import Transaction
 from WMQuality.TestInit import TestInit
@@ -93,5 +94,45 @@ insert into test (bind1, bind2) values (:bind1, :bind2) """
         self.assertEqual(output, {'bind2': 'value2a', 'bind1': 'value1a'})
 
 
+class DummyDAO(DBFormatter):
+    "DAO defining its own execute"
+
+    def execute(self, value=None):
+        return value
+
+
+class InheritedDAO(DummyDAO):
+    "DAO inheriting execute"
+
+    def __init__(self, logger, dbinterface):
+        DummyDAO.__init__(self, logger, dbinterface)
+        DummyDAO.__init__(self, logger, dbinterface)
+
+
+class DAOCallCountTest(unittest.TestCase):
+    """
+    Unit tests for the accounting of DAO calls
+    """
+
+    def tearDown(self):
+        callCounter.enabled = False
+        callCounter.reset()
+
+    def testCallCount(self):
+        """
+        Test DAO calls are accounted once, under the module of their class
+        """
+        dao = InheritedDAO(None, None)
+        self.assertNotIn('execute', dao.__dict__)
+        self.assertEqual(dao.execute(1), 1)
+        self.assertEqual(callCounter.summary(), {})
+
+        callCounter.enabled = True
+        self.assertEqual(dao.execute(2), 2)
+        self.assertEqual(DummyDAO(None, None).execute(value=3), 3)
+        self.assertEqual(callCounter.summary()["DAO"][__name__]["calls"], 2)
+        self.assertEqual(InheritedDAO.execute.__doc__, DummyDAO.execute.__doc__)
+
+
 if __name__ == "__main__":
     unittest.main()
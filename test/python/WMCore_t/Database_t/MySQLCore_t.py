@@ -122,5 +122,26 @@ class DBCoreTest(unittest.TestCase):
 
         return
 
+    def testPositionalBinds(self):
+        """
+        _testPositionalBinds_
+
+        Verify that binds given as tuples are passed through in the order of
+        the bind variables in the query.
+        """
+        sql = "INSERT INTO FILE_LUMIS (FILE_ID, RUN_NUM, LUMI_SECTION_NUM) VALUES (:file_id, :run_num, :lumi_section_num)"
+        binds = [(1, 1, 27414), (1, 1, 26422)]
+
+        myInterface = MySQLInterface(logger = logging, engine = None)
+        (updatedSQL, bindList) = myInterface.substitute(sql, binds)
+
+        self.assertEqual(updatedSQL, "INSERT INTO FILE_LUMIS (FILE_ID, RUN_NUM, LUMI_SECTION_NUM) VALUES (%s, %s, %s)")
+        self.assertEqual(bindList, binds)
+
+        (updatedSQL, bindList) = myInterface.substitute(sql, (1, 1, 29838))
+        self.assertEqual(bindList, [(1, 1, 29838)])
+
+        return
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,6 +8,10 @@ General test of Lexicon
 
 import unittest
 import os
+import timeit
+
+from nose.plugins.attrib import attr
+
 from WMCore.WMBase import getTestBase
 from WMCore.Lexicon import *
 
@@ -891,6 +895,71 @@ class LexiconTest(unittest.TestCase):
         self.assertRaises(AssertionError, taskStepName, "Task@testName")
         self.assertRaises(AssertionError, taskStepName, "t" * 51)
 
+    def testCompiledChecks(self):
+        """
+        Test the compiled regular expressions and the checks using them
+        """
+        self.assertTrue(compileRegexp(DATASET_RE) is compileRegexp(DATASET_RE))
+        self.assertTrue(check(DATASET_RE, '/a/b-v1/RAW'))
+        with self.assertRaises(AssertionError) as context:
+            check(DATASET_RE, '/c/d-v2/aod')
+        self.assertEqual(str(context.exception),
+                         "'/c/d-v2/aod' does not match regular expression %s" % DATASET_RE)
+        self.assertRaises(AssertionError, check, TIER['re'], 'AOD' * 40, TIER['maxLength'])
+
+        self.assertTrue(checkAny(LFNBASE_RES, '/store/temp/user/jha/prim/proc/v1', "LFN"))
+        with self.assertRaises(AssertionError) as context:
+            lfnBase('/bad')
+        message = "LFN candidate: /bad doesn't match any of the following regular expressions:\n"
+        self.assertEqual(str(context.exception), message + "".join("  %s\n" % rx for rx in LFNBASE_RES))
+
+    @attr('performance', 'integration')
+    def testCheckPerformance(self):
+        """
+        Time each Lexicon check on a valid candidate
+        """
+        candidates = [(DBSUser, 'cmsprod@vocms19.cern.ch'),
+                      (searchblock, '/Higgs/blah-v2/RECO#*'),
+                      (searchdataset, '/Higgs*/blah-v2/RECO'),
+                      (searchstr, 'Higgs*'),
+                      (namestr, 'Higgs/blah'),
+                      (sitetier, 'T2'),
+                      (jobrange, '1-5,7,9-10'),
+                      (cmsname, 'T1_US_FNAL'),
+                      (countrycode, 'US'),
+                      (block, '/Higgs/blah-v2/RECO#abc-123'),
+                      (identifier, 'Some_id.1'),
+                      (globalTag, '106X_upgrade2018_realistic_v11_L1v1::All'),
+                      (dataset, '/Higgs/blah-v2/RECO'),
+                      (procdataset, 'RunIISummer20UL18-106X_v2-v1'),
+                      (publishdatasetname, 'MyPublication'),
+                      (userprocdataset, 'weinberg-MyPublication-%s' % ('a' * 32)),
+                      (physicsgroup, 'Tracker'),
+                      (procversion, 12),
+                      (procstring, 'PromptReco'),
+                      (procstringT0, 'PromptReco'),
+                      (acqname, 'Run2018A'),
+                      (campaign, 'RunIISummer20UL18'),
+                      (primdataset, 'Higgs'),
+                      (taskStepName, 'StepOne'),
+                      (hnName, 'jha'),
+                      (lfn, '/store/mc/RunIISummer20UL18/Higgs/AODSIM/106X_v2-v1/100000/ABCDEF.root'),
+                      (lfn, '/store/lhe/12345/ABCDEF.lhe'),
+                      (lfnBase, '/store/temp/user/jha/prim/proc/v1'),
+                      (userLfn, '/store/user/jha/subdir/workflow/subdir/file.tgz'),
+                      (userLfnBase, '/store/user/jha/subdir/workflow/subdir'),
+                      (cmsswversion, 'CMSSW_10_6_4'),
+                      (couchurl, 'https://cmsweb.cern.ch/couchdb'),
+                      (requestName, 'pdmvserv_task_HIG-RunIISummer20UL18wmLHEGEN-00001__v1_T'),
+                      (validateUrl, 'https://cmsweb.cern.ch/reqmgr2'),
+                      (primaryDatasetType, 'mc'),
+                      (activity, 'production')]
+        numCalls = 20000
+        for check, candidate in candidates:
+            self.assertTrue(check(candidate))
+            elapsed = timeit.timeit(lambda: check(candidate), number=numCalls)
+            print("%-20s %.2f us per call" % (check.__name__, elapsed / numCalls * 1e6))
+
 
 if __name__ == "__main__":
     unittest.main()
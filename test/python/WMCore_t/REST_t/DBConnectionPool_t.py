@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+_DBConnectionPool_t_
+
+Unit tests for the REST database connection pool, run with a stand-in of
+the cx_Oracle module
+"""
+from __future__ import division, print_function
+
+import json
+import logging
+import threading
+import time
+import types
+import unittest
+
+from cherrypy import engine
+from nose.plugins.attrib import attr
+
+from WMCore.REST.Server import DBConnectionPool, DBConnectionPoolStats
+
+
+class Connection(object):
+    """
+    Stand-in of a cx_Oracle connection
+    """
+
+    def __init__(self, module):
+        self.dbmodule = module
+        self.version = "19.0.0.0.0"
+        self.stmtcachesize = 20
+        self.cachesizes = []
+        self.closed = False
+
+    def __setattr__(self, name, value):
+        if name == "stmtcachesize" and hasattr(self, "cachesizes"):
+            self.cachesizes.append(value)
+        object.__setattr__(self, name, value)
+
+    def ping(self):
+        if self.dbmodule.fail:
+            raise RuntimeError("ORA-03113: end-of-file on communication channel")
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        return self
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def makeModule(latency=0):
+    """
+    Stand-in of the cx_Oracle module taking latency seconds to connect
+    """
+    module = types.ModuleType("cx_Oracle")
+    module.latency = latency
+    module.fail = False
+    module.connections = []
+    module.clientversion = lambda: (19, 3, 0, 0, 0)
+
+    def connect(user, password, dsn, threaded=False):
+        time.sleep(module.latency)
+        module.connections.append(Connection(module))
+        return module.connections[-1]
+
+    module.connect = connect
+    return module
+
+
+class DBConnectionPoolTest(unittest.TestCase):
+    """
+    Test pool warm-up, concurrent connections, limits and statistics
+    """
+
+    def makePool(self, latency=0, **spec):
+        dbspec = {"type": makeModule(latency), "schema": "cms_test", "clientid": "test@localhost",
+                  "liveness": "select sysdate from dual", "user": "cms_test_r", "password": "secret",
+                  "dsn": "int2r", "timeout": 300, "trace": False}
+        dbspec.update(spec)
+        pool = DBConnectionPool("Test", dbspec)
+        pool.start()
+        self.addCleanup(self.stopPool, pool)
+        return pool
+
+    @staticmethod
+    def stopPool(pool):
+        pool.stop()
+        pool.join()
+        engine.unsubscribe("start", pool.start)
+        engine.unsubscribe("stop", pool.stop)
+
+    @staticmethod
+    def waitFor(condition, timeout=5):
+        until = time.time() + timeout
+        while not condition() and time.time() < until:
+            time.sleep(0.01)
+        return condition()
+
+    def testCheckout(self):
+        """
+        Test getting and putting back connections, and their statistics
+        """
+        pool = self.makePool(stmtcache=100)
+        dbh, err = pool.get("GET test api", "Test")
+        self.assertEqual(err, None)
+        self.assertEqual(dbh["connection"].cachesizes, [100])
+        pool.put(dbh)
+        self.assertTrue(self.waitFor(lambda: len(pool.idle) == 1))
+        # the statement cache is only set on new connections
+        dbh2, _ = pool.get("GET test api", "Test")
+        self.assertTrue(dbh2 is dbh)
+        self.assertEqual(dbh["connection"].cachesizes, [100])
+
+        pool.put(dbh2, bad=True)
+        self.assertTrue(self.waitFor(lambda: dbh2["connection"] is None))
+        pool.dbspec["type"].fail = True
+        self.assertEqual(pool.get("GET test api", "Test")[1][0].__class__, RuntimeError)
+
+        stats = pool.stats
+        self.assertEqual((stats.checkouts, stats.errors, stats.timeouts), (2, 1, 0))
+        self.assertEqual(stats.connects, 1 + pool.max_tries)
+        self.assertEqual(stats.reconnects, 1)
+        self.assertEqual(stats.disconnects, 1 + pool.max_tries)
+        self.assertTrue(0 < stats.checkout_rate() <= 2)
+
+        published = logging.statistics["DBConnectionPool"][stats.label]
+        self.assertEqual(stats.label, "cms_test_r@int2r Test")
+        self.assertEqual(published["Checkouts"](None), 2)
+        self.assertEqual(published["Idle"](None), 0)
+
+    def testWarmup(self):
+        """
+        Test the minimum connections are made on start and kept open
+        """
+        pool = self.makePool(**{"min-connections": 3, "timeout": 0})
+        self.assertTrue(self.waitFor(lambda: len(pool.idle) == 3))
+        self.assertEqual(pool.stats.connects, 3)
+        dbhs = [pool.get("GET test api", "Test")[0] for _ in range(4)]
+        self.assertEqual(pool.stats.connects, 4)
+        # expired idle connections are closed down to the minimum
+        for dbh in dbhs:
+            pool.put(dbh)
+        self.assertTrue(self.waitFor(lambda: pool.stats.disconnects == 1))
+        self.assertTrue(self.waitFor(lambda: len(pool.idle) == 3 and not pool.inuse))
+        self.assertEqual(pool.stats.connects, 4)
+
+    def testConcurrentConnections(self):
+        """
+        Test connections are made concurrently, up to the pool limit
+        """
+        pool = self.makePool(0.3, **{"connect-threads": 4, "max-connections": 4})
+        results = []
+
+        def get():
+            results.append(pool.get("GET test api", "Test"))
+
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        startTime = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(time.time() - startTime < 0.9)
+        self.assertEqual(len(pool.inuse), 4)
+
+        # over the limit requests wait for a release, or time out
+        pool.connection_wait_time = 0.5
+        thread = threading.Thread(target=get)
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(len(pool.waiting), 1)
+        pool.put(results[0][0])
+        thread.join()
+        self.assertTrue(results[-1][0] is results[0][0])
+        self.assertEqual(pool.get("GET test api", "Test"), (None, None))
+
+        stats = pool.stats
+        self.assertEqual((stats.checkouts, stats.timeouts), (5, 1))
+        self.assertEqual(sum(stats.waits), 6)
+        self.assertEqual(stats.wait_percentile(50), 0.5)
+        self.assertEqual(stats.wait_percentile(99), 1)
+        self.assertEqual(stats.histogram()["1000"], 1)
+
+    def testStats(self):
+        """
+        Test the wait time percentiles
+        """
+        stats = DBConnectionPoolStats()
+        self.assertEqual(stats.wait_percentile(50), 0)
+        for waited in [0.0005] * 90 + [0.015] * 9 + [30]:
+            stats.checkout(waited, {"connection": None}, None)
+        self.assertEqual(stats.wait_percentile(50), 0.001)
+        self.assertEqual(stats.wait_percentile(95), 0.02)
+        self.assertEqual(stats.wait_percentile(99), 0.02)
+        self.assertEqual(stats.wait_percentile(100), 10)
+        self.assertEqual(stats.checkouts, 100)
+        json.dumps(stats.histogram())
+
+    @attr('performance', 'integration')
+    def testBurstPerformance(self):
+        """
+        Compare 50 requests arriving at once on a pool whose connections
+        take 100ms to make, one at a time, concurrently and pre-warmed
+        """
+        for name, spec in [("one at a time", {"connect-threads": 0}),
+                           ("4 connection threads", {"connect-threads": 4}),
+                           ("16 connection threads", {"connect-threads": 16}),
+                           ("pre-warmed to 50", {"connect-threads": 4, "min-connections": 50})]:
+            pool = self.makePool(0.1, **spec)
+            pool.connection_wait_time = 30
+            self.waitFor(lambda: len(pool.idle) == spec.get("min-connections", 0), 30)
+            threads = [threading.Thread(target=pool.get, args=("GET test api", "Test")) for _ in range(50)]
+            startTime = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.time() - startTime
+            print("50 connections %s: %.2f secs, wait p50 %.3f secs, p99 %.3f secs" %
+                  (name, elapsed, pool.stats.wait_percentile(50), pool.stats.wait_percentile(99)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,3 +12,117 @@ RawFormat()
 DigestETag('md5')
 MD5ETag()
 SHA1ETag()
+
+import json
+import time
+import unittest
+import zlib
+
+from nose.plugins.attrib import attr
+
+from WMCore.REST.Format import _stream_compress_deflate, json_encoder
+
+
+def makeRows(numRows):
+    """WMStats-like request rows"""
+    return [{"RequestName": "user_Campaign%d_TaskChain_%06d" % (idx % 40, idx),
+             "RequestStatus": "running-open", "RequestPriority": 100000 + idx,
+             "Campaign": "Campaign%d" % (idx % 40), "OutputDatasets": ["/Primary%d/Era-v1/AODSIM" % idx],
+             "SiteWhitelist": ["T1_US_FNAL", "T2_CH_CERN"], "TotalInputEvents": idx * 1000,
+             "AgentJobInfo": {"agent%d" % (idx % 5): {"status": {"success": idx, "failure": 0}}}}
+            for idx in range(numRows)]
+
+
+class JSONFormatTest(unittest.TestCase):
+    """
+    Test the JSON output, one line per object in chunks of complete lines
+    """
+
+    def format(self, rows, **kwargs):
+        etag = SHA1ETag()
+        fmt = JSONFormat(**kwargs)
+        chunks = list(fmt.stream_chunked(rows, etag, '{"result": [\n', "]}\n"))
+        return chunks, etag.value()
+
+    def testChunks(self):
+        """
+        Test coalescing the lines into chunks keeps the output and lines
+        """
+        rows = makeRows(1000)
+        lineChunks, lineETag = self.format(rows, encoder='json', chunk_size=0)
+        self.assertEqual(len(lineChunks), 1002)
+        self.assertEqual(lineChunks[0], '{"result": [\n')
+        self.assertEqual(lineChunks[1], " " + json.dumps(rows[0]) + "\n")
+        self.assertEqual(lineChunks[2], "," + json.dumps(rows[1]) + "\n")
+
+        chunks, etag = self.format(rows, encoder='json', chunk_size=16 * 1024)
+        self.assertEqual("".join(chunks), "".join(lineChunks))
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) >= 16 * 1024)
+        self.assertEqual(etag, lineETag)
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith("\n"))
+        self.assertEqual(json.loads("".join(chunks)), {"result": rows})
+
+        chunks, _ = self.format([], encoder='json')
+        self.assertEqual(chunks, ['{"result": [\n]}\n'])
+
+        # the standard library is the default
+        chunks, etag = self.format(rows, chunk_size=16 * 1024)
+        self.assertEqual("".join(chunks), "".join(lineChunks))
+        self.assertEqual(etag, lineETag)
+
+    def testEncoders(self):
+        """
+        Test the output of every encoder available is the same JSON
+        """
+        rows = makeRows(100) + [{1: "integer key", "big": 2 ** 70, "text": u"café / 100%"}]
+        expected = json.loads(json.dumps({"result": rows}))
+        for name in ('json', 'orjson', 'ujson', 'fast'):
+            try:
+                json_encoder(name)
+            except ValueError:
+                continue
+            chunks, _ = self.format(rows, encoder=name)
+            self.assertEqual(json.loads("".join(chunks)), expected, name)
+            lines = "".join(chunks).splitlines()
+            self.assertEqual(len(lines), len(rows) + 2)
+            self.assertEqual(json.loads(lines[1][1:]), expected["result"][0])
+        self.assertRaises(ValueError, json_encoder, 'cjson')
+
+    def testCompressedChunks(self):
+        """
+        Test the deflate output still expands to the original text
+        """
+        chunks, _ = self.format(makeRows(2000), encoder='fast', chunk_size=8 * 1024)
+        compressed = list(_stream_compress_deflate(chunks, 9, 64 * 1024))
+        z = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.assertEqual(b"".join(z.decompress(part) for part in compressed), "".join(chunks).encode("utf-8"))
+
+    @attr('performance', 'integration')
+    def testThroughput(self):
+        """
+        Compare the JSON formatting and deflate compression throughput of one
+        chunk per line with the standard json library, with the coalesced
+        chunks and the fastest encoder
+        """
+        numRows = 100000
+        rows = makeRows(numRows)
+        for label, kwargs in [("one chunk per line, json", {"encoder": "json", "chunk_size": 0}),
+                              ("64kB chunks, json", {"encoder": "json"}),
+                              ("64kB chunks, fast encoder", {"encoder": "fast"})]:
+            startTime = time.time()
+            chunks = list(JSONFormat(**kwargs).stream_chunked(rows, SHA1ETag(), '{"result": [\n', "]}\n"))
+            formatTime = time.time() - startTime
+            size = sum(len(chunk) for chunk in chunks)
+
+            startTime = time.time()
+            chunks = JSONFormat(**kwargs).stream_chunked(rows, SHA1ETag(), '{"result": [\n', "]}\n")
+            compressed = sum(len(part) for part in _stream_compress_deflate(chunks, 9, 64 * 1024))
+            compressTime = time.time() - startTime
+            print("%s: %d rows/s, %.1f MB/s formatting, %d rows/s, %.1f MB/s deflated (%.1f MB to %.1f MB)" %
+                  (label, numRows / formatTime, size / formatTime / 1e6, numRows / compressTime,
+                   size / compressTime / 1e6, size / 1e6, compressed / 1e6))
+
+if __name__ == "__main__":
+    unittest.main()
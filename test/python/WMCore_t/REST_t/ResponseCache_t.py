@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+_ResponseCache_t_
+
+Unit tests for the server side cache of REST responses
+"""
+from __future__ import division, print_function
+
+import time
+import unittest
+import zlib
+
+import cherrypy
+from cherrypy._cprequest import Request, Response
+from cherrypy.lib import httputil
+from nose.plugins.attrib import attr
+
+from WMCore.REST.Server import RESTApi, RESTArgs, RESTEntity, ResponseCache, restcall, rows
+
+
+class DataVersion(object):
+    version = 0
+
+    @staticmethod
+    def getVersion():
+        return DataVersion.version
+
+
+class Cached(RESTEntity):
+    """
+    Entity counting how many times it builds its response
+    """
+    calls = 0
+
+    def validate(self, apiobj, method, api, param, safe):
+        for key in list(param.kwargs):
+            safe.kwargs[key] = param.kwargs.pop(key)
+
+    @restcall(args=['num', 'status'], cache_ttl=60, cache_version=DataVersion.getVersion)
+    def get(self, num=10, status=None):
+        Cached.calls += 1
+        return [{"RequestName": "request%d" % idx, "RequestStatus": status, "version": DataVersion.version}
+                for idx in range(int(num))]
+
+    @restcall(args=['num', 'status'])
+    def post(self, num=10, status=None):
+        return []
+
+
+class Uncached(RESTEntity):
+    calls = 0
+
+    def validate(self, apiobj, method, api, param, safe):
+        return
+
+    @restcall(args=[])
+    def get(self):
+        Uncached.calls += 1
+        return rows(["foo"])
+
+
+class App(object):
+    appname = "test"
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """
+    Test answering GET requests from the response cache
+    """
+
+    def setUp(self):
+        Cached.calls = Uncached.calls = 0
+        DataVersion.version = 0
+        self.api = RESTApi(App(), None, "/test")
+        self.api._add({"cached": Cached(App(), self.api, None, "/test"),
+                       "uncached": Uncached(App(), self.api, None, "/test")})
+
+    def call(self, api, kwargs=None, method='GET', user=None, **headers):
+        """
+        Run a request through the REST API, return the response status,
+        body and headers
+        """
+        request = Request(httputil.Host('127.0.0.1', 8888), httputil.Host('127.0.0.1', 50000))
+        request.method = method
+        request.query_string = ''
+        request.headers = httputil.HeaderMap(dict({'Accept': 'application/json'}, **headers))
+        request.user = user or {'dn': '/test/dn', 'roles': {}}
+        cherrypy.serving.load(request, Response())
+        try:
+            body = self.api._call(RESTArgs([api], dict(kwargs or {})))
+        except cherrypy.HTTPRedirect as ex:
+            return ex.status, None, cherrypy.response.headers
+        return 200, body, cherrypy.response.headers
+
+    def testCachedResponses(self):
+        """
+        Test hits, misses and 304 answers without calling the API
+        """
+        status, body, headers = self.call("cached", {"status": "running-open"})
+        self.assertEqual(headers["X-REST-Cache"], "miss")
+        etag = headers["ETag"]
+        self.assertEqual(self.call("cached", {"status": "running-open"})[:2], (status, body))
+        self.assertEqual(Cached.calls, 1)
+
+        status, _, headers = self.call("cached", {"status": "running-open"}, **{"If-None-Match": etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(headers["ETag"], etag)
+        self.assertEqual(headers["X-REST-Cache"], "hit")
+
+        # other arguments, encoding or user roles are other responses
+        self.call("cached", {"status": "completed"})
+        status, compressed, headers = self.call("cached", {"status": "running-open"}, **{"Accept-Encoding": "deflate"})
+        self.assertEqual(headers["Content-Encoding"], "deflate")
+        self.assertEqual(zlib.decompress(compressed, -zlib.MAX_WBITS), body.encode("utf-8"))
+        self.call("cached", {"status": "running-open"},
+                  user={'dn': '/test/dn', 'roles': {'admin': {'group': set(['reqmgr']), 'site': set()}}})
+        self.assertEqual(Cached.calls, 4)
+        # same roles and other dn share the response
+        self.call("cached", {"status": "running-open"}, user={'dn': '/other/dn', 'roles': {}})
+        self.assertEqual(Cached.calls, 4)
+        self.assertEqual(self.api.response_cache.hits, 3)
+
+        self.call("uncached")
+        self.assertEqual(self.call("uncached")[2].get("X-REST-Cache"), None)
+        self.assertEqual(Uncached.calls, 2)
+
+    def testInvalidation(self):
+        """
+        Test responses are rebuilt once the data version changes, after an
+        update, or when they expire
+        """
+        body = self.call("cached", {"status": "running-open"})[1]
+        DataVersion.version = 1
+        newBody = self.call("cached", {"status": "running-open"})[1]
+        self.assertNotEqual(newBody, body)
+        self.call("cached", {"status": "running-open"})
+        self.assertEqual(Cached.calls, 2)
+
+        self.call("cached", {"status": "running-open"}, method='POST')
+        self.call("cached", {"status": "running-open"})
+        self.assertEqual(Cached.calls, 3)
+
+        self.api.methods['GET']['cached']['cache_ttl'] = 0.1
+        self.api.response_cache.invalidate("cached")
+        self.call("cached", {"status": "running-open"})
+        time.sleep(0.2)
+        self.call("cached", {"status": "running-open"})
+        self.assertEqual(Cached.calls, 5)
+
+    def testEviction(self):
+        """
+        Test the least recently used responses are evicted
+        """
+        cache = ResponseCache(max_size=100)
+        for key in "abc":
+            cache.put(key, b"x" * 40, '"etag"', {}, 60)
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.get("b")["body"], b"x" * 40)
+        cache.put("d", b"x" * 40, '"etag"', {}, 60)
+        self.assertEqual(cache.get("c"), None)
+        self.assertEqual(cache.size, 80)
+        cache.put("e", b"x" * 200, '"etag"', {}, 60)
+        self.assertEqual(cache.get("e"), None)
+        self.assertEqual(cache.get("b", version=1), None)
+        cache.invalidate()
+        self.assertEqual(cache.size, 0)
+
+    @attr('performance', 'integration')
+    def testCachePerformance(self):
+        """
+        Compare building a response of 20k requests for every poll with
+        serving it from the cache
+        """
+        numPolls = 20
+        kwargs = {"num": 20000, "status": "running-open"}
+        self.api.methods['GET']['cached']['cache_ttl'] = 0
+        startTime = time.time()
+        for _ in range(numPolls):
+            self.call("cached", kwargs, **{"Accept-Encoding": "deflate"})
+        uncachedTime = (time.time() - startTime) / numPolls
+
+        self.api.methods['GET']['cached']['cache_ttl'] = 60
+        startTime = time.time()
+        for _ in range(numPolls):
+            self.call("cached", kwargs, **{"Accept-Encoding": "deflate"})
+        cachedTime = (time.time() - startTime) / numPolls
+        print("Response of 20k requests: %.4f secs building it, %.4f secs from the cache" % (uncachedTime,
+                                                                                             cachedTime))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+_Validation_t_
+
+Unit tests for the REST argument validation
+"""
+from __future__ import division, print_function
+
+import re
+import timeit
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.REST.Error import InvalidParameter
+from WMCore.REST.Server import RESTApi, RESTArgs, RESTEntity, restcall
+from WMCore.REST.Validation import (validate_num, validate_numlist, validate_strlist,
+                                    validate_ustr, validate_ustrlist)
+
+RX_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,150}$")
+RX_BNAME = re.compile(br"^[A-Za-z0-9_.-]{1,150}$")
+
+
+class Requests(RESTEntity):
+    """
+    Entity taking a bulk list of request names and a status
+    """
+
+    def validate(self, apiobj, method, api, param, safe):
+        validate_ustrlist("name", param, safe, RX_NAME)
+        validate_ustr("status", param, safe, RX_NAME, optional=True)
+        validate_num("priority", param, safe, optional=True, bare=True, minval=0)
+
+    @restcall(args=['name', 'status', 'priority'])
+    def post(self, name, status, priority):
+        return name
+
+
+class Elements(RESTEntity):
+    """
+    Entity taking bulk lists of element ids and their progress
+    """
+
+    def validate(self, apiobj, method, api, param, safe):
+        validate_strlist("id", param, safe, RX_BNAME)
+        validate_numlist("jobs", param, safe, minval=0)
+
+    @restcall(args=['id', 'jobs'])
+    def put(self, id, jobs):
+        return id
+
+
+class App(object):
+    appname = "test"
+
+
+class ValidationTest(unittest.TestCase):
+    """
+    Test the validation of single and list arguments
+    """
+
+    def setUp(self):
+        self.names = ["pdmvserv_task_HIG-RunIISummer20UL18wmLHEGEN-00001__v1_T_%d" % idx for idx in range(1000)]
+        self.api = RESTApi(App(), None, "/test")
+        self.api._add({"requests": Requests(App(), self.api, None, "/test"),
+                       "elements": Elements(App(), self.api, None, "/test")})
+
+    def testStrList(self):
+        """
+        Test list arguments are converted and checked as a whole
+        """
+        for value, expected in [(None, []), ("a", [u"a"]), ([b"a", u"b"], [u"a", u"b"])]:
+            safe = RESTArgs([], {})
+            validate_ustrlist("name", RESTArgs([], {"name": value}), safe, RX_NAME)
+            self.assertEqual(safe.kwargs["name"], expected)
+        safe = RESTArgs([], {})
+        validate_strlist("name", RESTArgs([], {"name": [b"a", u"b", u""]}), safe, re.compile(b"^[ab]*$"))
+        self.assertEqual(safe.kwargs["name"], [b"a", b"b", b""])
+
+        # the first bad value raises the same error as a single value would
+        for value in [["a", "b c"], ["a", 1], ["a", b"\xff"]]:
+            with self.assertRaises(InvalidParameter) as context:
+                validate_ustr("name", RESTArgs([], {"name": value[1]}), RESTArgs([], {}), RX_NAME)
+            with self.assertRaises(InvalidParameter) as listContext:
+                validate_ustrlist("name", RESTArgs([], {"name": value}), RESTArgs([], {}), RX_NAME)
+            self.assertEqual(listContext.exception.info, context.exception.info)
+        with self.assertRaises(InvalidParameter) as context:
+            validate_strlist("name", RESTArgs([], {"name": ["a", "b c"]}), RESTArgs([], {}), RX_BNAME,
+                             custom_err="Bad names")
+        self.assertEqual(context.exception.info, "Bad names")
+
+    def testNumList(self):
+        """
+        Test numeric list arguments are converted and checked as a whole
+        """
+        for value, expected in [(None, []), ("1", [1]), ([1, "2", b"3", " 4"], [1, 2, 3, 4])]:
+            safe = RESTArgs([], {})
+            validate_numlist("num", RESTArgs([], {"num": value}), safe)
+            self.assertEqual(safe.kwargs["num"], expected)
+
+        for value, kwargs in [([1, " 4"], {"bare": True}), ([1, 2.0], {}), ([1, "x"], {}),
+                              ([5, 1], {"minval": 2}), ([1, 5], {"maxval": 2})]:
+            with self.assertRaises(InvalidParameter) as context:
+                validate_num("num", RESTArgs([], {"num": value[1]}), RESTArgs([], {}), **kwargs)
+            with self.assertRaises(InvalidParameter) as listContext:
+                validate_numlist("num", RESTArgs([], {"num": value}), RESTArgs([], {}), **kwargs)
+            self.assertEqual(listContext.exception.info, context.exception.info)
+
+    def testAPIValidator(self):
+        """
+        Test the API validators made when adding the APIs
+        """
+        apiobj = self.api.methods['POST']['requests']
+        param = RESTArgs([], {"name": self.names[:2], "priority": "10"})
+        safe = apiobj['validate'](apiobj, 'POST', 'requests', param)
+        self.assertEqual(safe.kwargs, {"name": self.names[:2], "status": None, "priority": 10})
+        self.assertEqual(param.kwargs, {})
+
+        param = RESTArgs(["extra"], {"name": self.names[:2]})
+        self.assertRaises(InvalidParameter, apiobj['validate'], apiobj, 'POST', 'requests', param)
+        param = RESTArgs([], {"name": self.names[:2], "other": 1})
+        self.assertRaises(InvalidParameter, apiobj['validate'], apiobj, 'POST', 'requests', param)
+
+    @attr('performance', 'integration')
+    def testValidationPerformance(self):
+        """
+        Time the validation of a request to each API, with 1000 names in
+        the list arguments
+        """
+        numCalls = 200
+        for method, api, kwargs in [('POST', 'requests', {"name": self.names, "status": "assigned"}),
+                                    ('PUT', 'elements', {"id": self.names, "jobs": list(range(1000))})]:
+            apiobj = self.api.methods[method][api]
+            validate = apiobj['validate']
+            elapsed = timeit.timeit(lambda: validate(apiobj, method, api, RESTArgs([], dict(kwargs))),
+                                    number=numCalls)
+            print("%s %s validation: %.3f ms per call" % (method, api, elapsed / numCalls * 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
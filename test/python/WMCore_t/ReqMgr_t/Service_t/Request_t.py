@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+_Request_t_
+
+Unit tests for the ReqMgr2 request GET API, run against the in memory
+stand-in of the ReqMgr couch database
+"""
+from __future__ import division
+
+import unittest
+
+from WMCore.Database.CMSCouch import CouchNotFoundError
+from WMCore.ReqMgr.Service.Request import Request
+from WMCore_t.Services_t.RequestDB_t.RequestDBPlanner_t import CouchStandIn, StandInReader, makeRequest
+
+
+class RequestGetTest(unittest.TestCase):
+    """
+    Test the requests Request.get returns for the query string arguments
+    """
+
+    def setUp(self):
+        self.server = CouchStandIn(500)
+        # only the database service is needed to get requests
+        self.request = Request.__new__(Request)
+        self.request.reqmgr_db_service = StandInReader(self.server)
+        self.requests = [makeRequest(idx) for idx in range(500)]
+
+    def expected(self, **conditions):
+        return dict((doc["RequestName"], doc) for doc in self.requests
+                    if all(doc.get(key) in values for key, values in conditions.items()))
+
+    def testGet(self):
+        """
+        Test queries on one or several views, and the response formats
+        """
+        expected = self.expected(RequestStatus=["running-open", "acquired"], RequestType=["TaskChain"],
+                                 Campaign=["Campaign3", "Campaign5"])
+        self.assertTrue(expected)
+        result = list(self.request.get(status=["running-open", "acquired"], request_type=["TaskChain"],
+                                       campaign=["Campaign3", "Campaign5"]))
+        self.assertEqual(result, [expected])
+
+        result = list(self.request.get(status=["running-open", "acquired"], request_type=["TaskChain"],
+                                       campaign=["Campaign3", "Campaign5"], common_dict=1))
+        self.assertEqual(sorted(doc["RequestName"] for doc in result), sorted(expected))
+
+        result = self.request.get(status=["running-open", "acquired"], request_type=["TaskChain"],
+                                  campaign=["Campaign3", "Campaign5"], detail="false")
+        self.assertEqual(sorted(result), sorted(expected))
+
+        # team and status are read from a single view
+        expected = self.expected(Team=["relval"], RequestStatus=["completed"])
+        self.assertTrue(expected)
+        self.assertEqual(list(self.request.get(team=["relval"], status=["completed"])), [expected])
+
+        self.assertEqual(self.request.get(status=["not-a-status"], campaign=["Campaign3"]), [])
+
+    def testMask(self):
+        """
+        Test only the mask keys of the requests are returned
+        """
+        expected = self.expected(RequestStatus=["completed"], Campaign=["Campaign1"])
+        self.assertTrue(expected)
+        result = list(self.request.get(status=["completed"], campaign=["Campaign1"],
+                                       mask=["RequestType", "Team", "NoSuchKey"]))
+        self.assertEqual(result, [dict((name, {"RequestType": doc["RequestType"], "Team": doc["Team"],
+                                               "NoSuchKey": None})
+                                       for name, doc in expected.items())])
+
+    def testRequestName(self):
+        """
+        Test getting requests by name, a single one must exist
+        """
+        doc = self.requests[6]
+        self.assertEqual(list(self.request.get(name=doc["RequestName"])), [{doc["RequestName"]: doc}])
+        self.assertEqual(self.request.get(name=[doc["RequestName"]], status=["new"]), [])
+        names = [self.requests[idx]["RequestName"] for idx in (6, 16)] + ["user_Missing_000000"]
+        result = list(self.request.get(name=names))
+        self.assertEqual(sorted(result[0]), sorted(names[:2]))
+
+        self.assertRaises(CouchNotFoundError, self.request.get, name="user_Missing_000000")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""
+_RequestDBPlanner_t_
+
+Unit tests for the RequestDBReader query planner, run against an in memory
+stand-in of the ReqMgr couch database
+"""
+from __future__ import division, print_function
+
+import json
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.Database.CMSCouch import CouchNotFoundError, Database
+from WMCore.Services.RequestDB.RequestDBReader import RequestDBReader
+
+STATUSES = ["new", "assignment-approved", "assigned", "staging", "staged", "acquired",
+            "running-open", "running-closed", "completed", "announced"]
+TYPES = ["MonteCarlo", "ReReco", "TaskChain", "StepChain", "Resubmission"]
+
+
+def makeRequest(idx):
+    """
+    Synthetic request document, of a few kB like the real ones
+    """
+    status = STATUSES[idx % len(STATUSES)]
+    requestType = TYPES[(idx // len(STATUSES)) % len(TYPES)]
+    campaign = "Campaign%d" % ((idx // 50) % 40)
+    doc = {"_id": "user_%s_%s_%06d" % (campaign, requestType, idx),
+           "RequestName": "user_%s_%s_%06d" % (campaign, requestType, idx),
+           "RequestStatus": status,
+           "RequestType": requestType,
+           "Campaign": campaign,
+           "PrepID": "PREP-%s-%05d" % (campaign, idx % 1000),
+           "Requestor": "user%d" % (idx % 7),
+           "RequestTransition": [{"Status": status, "UpdateTime": 1600000000 + idx + step, "DN": "user"}
+                                 for step, status in enumerate(STATUSES[:idx % len(STATUSES) + 1])],
+           "Task1": dict(("Parameter%d" % i, "value of parameter %d for request %d" % (i, idx))
+                         for i in range(40))}
+    if status not in ("new", "assignment-approved"):
+        doc["Team"] = "production" if idx % 3 else "relval"
+    return doc
+
+
+# python equivalents of the ReqMgr couchapp map functions
+VIEWS = {"bystatus": lambda doc: [(doc["RequestStatus"], doc["RequestTransition"][-1]["UpdateTime"])],
+         "bytype": lambda doc: [(doc["RequestType"], None)],
+         "bycampaign": lambda doc: [(doc["Campaign"], None)],
+         "byprepid": lambda doc: [(doc["PrepID"], None)],
+         "byteamandstatus": lambda doc: [([doc["Team"], doc["RequestStatus"]], None)] if "Team" in doc else [],
+         "requestsbystatusandtype": lambda doc: [([doc["RequestStatus"], doc["RequestType"]], None)]}
+
+
+class CouchStandIn(object):
+    """
+    Stand-in for a CouchServer serving a synthetic ReqMgr database: view and
+    _all_docs responses go through a JSON round trip, each request taking
+    latency seconds more, like they would from a remote couch
+    """
+
+    url = "http://localhost:5984"
+
+    def __init__(self, numRequests, latency=0):
+        self.latency = latency
+        self.calls = []
+        self.names = {}
+        self.views = dict((view, {}) for view in VIEWS)
+        for idx in range(numRequests):
+            doc = makeRequest(idx)
+            self.names[doc["_id"]] = idx
+            for view, mapFunc in VIEWS.items():
+                for key, value in mapFunc(doc):
+                    self.views[view].setdefault(json.dumps(key), []).append((idx, doc["_id"], key, value))
+
+    def connectDatabase(self, dbname, create=True):
+        return StandInDatabase(self, dbname)
+
+    def serve(self, call, result):
+        self.calls.append(call)
+        time.sleep(self.latency)
+        return json.loads(json.dumps(result))
+
+    def document(self, idx):
+        doc = makeRequest(idx)
+        doc["_rev"] = "1-%032x" % idx
+        doc["_attachments"] = {"spec": {"stub": True, "length": 51712}}
+        return doc
+
+
+class StandInDatabase(Database):
+    """
+    Stand-in for a CMSCouch Database of a CouchStandIn
+    """
+
+    def __init__(self, server, dbname):
+        # no connection to set up
+        dict.__init__(self, host=server.url)
+        self.server = server
+        self.name = dbname
+        self.thread = threading.current_thread().name
+
+    def getDoc(self, docName):
+        if docName not in self.server.names:
+            raise CouchNotFoundError("not_found", {}, "missing")
+        return self.server.serve(("getDoc", docName, self.thread), self.server.document(self.server.names[docName]))
+
+    def loadView(self, design, view, options=None, keys=None):
+        options = options or {}
+        rows = []
+        for key in keys or []:
+            for idx, docID, rowKey, value in self.server.views[view].get(json.dumps(key), []):
+                row = {"id": docID, "key": rowKey, "value": value}
+                if options.get("include_docs"):
+                    row["doc"] = self.server.document(idx)
+                rows.append(row)
+        return self.server.serve(("view", view, self.thread), {"total_rows": len(rows), "offset": 0, "rows": rows})
+
+    def allDocs(self, options=None, keys=None):
+        options = options or {}
+        rows = []
+        for key in keys or []:
+            if key not in self.server.names:
+                rows.append({"key": key, "error": "not_found"})
+                continue
+            row = {"id": key, "key": key, "value": {"rev": "1-%032x" % self.server.names[key]}}
+            if options.get("include_docs"):
+                row["doc"] = self.server.document(self.server.names[key])
+            rows.append(row)
+        return self.server.serve(("allDocs", len(keys or []), self.thread), {"rows": rows})
+
+
+class StandInReader(RequestDBReader):
+    """
+    RequestDBReader talking to a CouchStandIn
+    """
+
+    def __init__(self, server, couchapp="ReqMgr"):
+        RequestDBReader.__init__(self, server.connectDatabase("reqmgr_workload_cache"), couchapp)
+        # the planner threads connect to the stand-in too
+        self.couchServer = server
+
+
+class RequestDBPlannerTest(unittest.TestCase):
+    """
+    Test the query planner gives the same requests as fetching the documents
+    of every view and intersecting them
+    """
+
+    def setUp(self):
+        self.server = CouchStandIn(2000)
+        self.reader = StandInReader(self.server)
+
+    def viewIntersection(self, viewQueries):
+        """
+        Request.get before the planner: documents of every view, intersected
+        """
+        requestInfo = [self.reader.getRequestByCouchView(view, {"include_docs": True}, keys)
+                       for view, keys in viewQueries]
+        names = set(requestInfo[0])
+        for info in requestInfo[1:]:
+            names &= set(info)
+        return dict((name, requestInfo[0][name]) for name in names)
+
+    def testPlanner(self):
+        """
+        Test the requests and the couch calls made by the planner
+        """
+        viewQueries = [("bystatus", ["running-open", "acquired"]), ("bytype", ["TaskChain"]),
+                       ("bycampaign", ["Campaign3", "Campaign5"])]
+        expected = self.viewIntersection(viewQueries)
+        self.assertTrue(len(expected) > 3)
+        for doc in expected.values():
+            self.assertFalse('_rev' in doc or '_attachments' in doc)
+
+        self.server.calls = []
+        self.assertEqual(self.reader.getRequestByCouchViews(viewQueries), expected)
+        self.assertEqual(sorted(call[1] for call in self.server.calls if call[0] == "view"),
+                         ["bycampaign", "bystatus", "bytype"])
+        # the views run in other threads, only the surviving documents are fetched
+        self.assertFalse("MainThread" in [call[2] for call in self.server.calls if call[0] == "view"])
+        self.assertEqual([call[:2] for call in self.server.calls if call[0] == "allDocs"], [("allDocs", len(expected))])
+
+        self.server.calls = []
+        self.assertEqual(sorted(self.reader.getRequestByCouchViews(viewQueries, detail=False)), sorted(expected))
+        self.assertEqual([call for call in self.server.calls if call[0] == "allDocs"], [])
+
+        # documents fetched in concurrent batches
+        self.reader.docBatchSize = 3
+        self.server.calls = []
+        self.assertEqual(self.reader.getRequestByCouchViews(viewQueries), expected)
+        batches = [call[1] for call in self.server.calls if call[0] == "allDocs"]
+        self.assertEqual(sum(batches), len(expected))
+        self.assertEqual(max(batches), 3)
+        self.assertEqual(len(batches), (len(expected) + 2) // 3)
+
+    def testRequestNames(self):
+        """
+        Test filtering on request names, some of them missing
+        """
+        names = [makeRequest(idx)["RequestName"] for idx in (6, 17, 18)] + ["user_Missing_000000"]
+        result = self.reader.getRequestByCouchViews([], requestNames=names)
+        self.assertEqual(sorted(result), sorted(names[:3]))
+        self.assertEqual(result[names[0]]["RequestStatus"], "running-open")
+        self.assertEqual(sorted(self.reader.getRequestByCouchViews([], requestNames=names, detail=False)),
+                         sorted(names[:3]))
+
+        result = self.reader.getRequestByCouchViews([("bystatus", ["running-open"])], requestNames=names)
+        self.assertEqual(list(result), [names[0]])
+        self.assertEqual(self.reader.getRequestByCouchViews([("bystatus", ["running-open"])],
+                                                            requestNames=names[0], detail=False), [names[0]])
+        self.assertEqual(self.reader.getRequestByCouchViews([("bystatus", ["new"])], requestNames=names[0]), {})
+
+        # a single request name must exist
+        self.assertRaises(CouchNotFoundError, self.reader.getRequestByCouchViews, [], requestNames=names[3])
+        self.assertRaises(CouchNotFoundError, self.reader.getRequestByCouchViews,
+                          [("bystatus", ["running-open"])], requestNames=[names[3]])
+
+    def testMaskAndEmptyResults(self):
+        """
+        Test the documents filter and queries matching nothing
+        """
+        viewQueries = [("byteamandstatus", [["relval", "completed"]]), ("bycampaign", ["Campaign0"])]
+        expected = self.viewIntersection(viewQueries)
+        self.assertTrue(expected)
+        result = self.reader.getRequestByCouchViews(viewQueries, docFilter=lambda doc: {"Team": doc["Team"]})
+        self.assertEqual(result, dict((name, {"Team": "relval"}) for name in expected))
+
+        self.assertEqual(self.reader.getRequestByCouchViews([]), {})
+        self.assertEqual(self.reader.getRequestByCouchViews([], detail=False), [])
+
+        # disjoint views, nothing to fetch
+        self.server.calls = []
+        self.assertEqual(self.reader.getRequestByCouchViews([("bystatus", ["new"]), ("bystatus", ["assigned"])]), {})
+        self.assertEqual([call for call in self.server.calls if call[0] == "allDocs"], [])
+        self.assertEqual(self.reader.getRequestByCouchViews([("bystatus", ["not-a-status"])], detail=False), [])
+
+    @attr('performance', 'integration')
+    def testPlannerPerformance(self):
+        """
+        Compare fetching the documents of every view and intersecting them with
+        the planner, on 200k requests and a couch answering in 10ms
+        """
+        self.server = CouchStandIn(200000, latency=0.01)
+        self.reader = StandInReader(self.server)
+        queries = {"status, type and campaign": [("bystatus", ["running-open"]), ("bytype", ["TaskChain"]),
+                                                 ("bycampaign", ["Campaign3"])],
+                   "team and status": [("byteamandstatus", [["relval", "running-open"]])],
+                   "active status and prepid": [("bystatus", STATUSES[2:8]),
+                                                ("byprepid", ["PREP-Campaign1-00%d%d6" % (i, j)
+                                                              for i in range(10) for j in range(10)])]}
+        for name, viewQueries in queries.items():
+            startTime = time.time()
+            expected = self.viewIntersection(viewQueries)
+            viewsTime = time.time() - startTime
+
+            startTime = time.time()
+            result = self.reader.getRequestByCouchViews(viewQueries)
+            plannerTime = time.time() - startTime
+            print("Query on %s matching %d of 200k requests: %.3f secs with the planner, "
+                  "%.3f secs fetching the documents of every view" % (name, len(result), plannerTime, viewsTime))
+            self.assertEqual(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,10 +5,67 @@ Unit test for pycurl_manager module.
 from __future__ import division
 
 import tempfile
+import threading
+import time
 import unittest
+from http.client import HTTPException
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pycurl
+
 from Utils.CertTools import getKeyCertFromEnv
+from WMCore.Database.CMSCouch import CouchRowDecoder
 from WMCore.Services.pycurl_manager import RequestHandler, ResponseHeader, getdata, cern_sso_cookie
 
+VIEW_BODY = b'{"total_rows":3,"offset":0,"rows":[\r\n' \
+            b'{"id":"a","key":"a","value":{"text":"x,\\ny"}},\r\n' \
+            b'{"id":"b","key":"b","value":null},\r\n' \
+            b'{"id":"c","key":"c","value":[1,2]}\r\n' \
+            b']}\n'
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """
+    Serve the view body in small pieces, stopping after the first row until
+    released, an error, a redirect to the view and a stalled response
+    """
+    protocol_version = "HTTP/1.1"
+    release = threading.Event()
+
+    def sendBody(self, status, pieces):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            if piece is None:
+                self.release.wait(10)
+                continue
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            self.wfile.flush()
+            time.sleep(0.01)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path.startswith("/view"):
+            # pieces of 7 bytes split the rows anywhere
+            pieces = [VIEW_BODY[i:i + 7] for i in range(0, len(VIEW_BODY), 7)]
+            firstRowEnd = VIEW_BODY.index(b'{"id":"b"') // 7 + 1
+            self.sendBody(200, pieces[:firstRowEnd] + [None] + pieces[firstRowEnd:])
+        elif self.path.startswith("/missing"):
+            self.sendBody(404, [b'{"error":"not_found",', b'"reason":"missing"}\n'])
+        elif self.path.startswith("/moved"):
+            self.send_response(301)
+            self.send_header("Location", "/view")
+            self.send_header("Content-Length", "9")
+            self.end_headers()
+            self.wfile.write(b"moved to ")
+        elif self.path.startswith("/stalled"):
+            self.sendBody(200, [VIEW_BODY[:10], None])
+
+    def log_message(self, *args):
+        pass
+
 
 class PyCurlManager(unittest.TestCase):
     """Test pycurl_manager module"""
@@ -151,5 +208,85 @@ class PyCurlManager(unittest.TestCase):
         serverHeader = res.getHeaderKey("Server")
         self.assertTrue(serverHeader.startswith("CherryPy/") or serverHeader.startswith("openresty/"))
 
+
+class StreamTest(unittest.TestCase):
+    """
+    Test streaming responses with RequestHandler.stream from a local server
+    """
+
+    def setUp(self):
+        StreamHandler.release.clear()
+        self.server = HTTPServer(("127.0.0.1", 0), StreamHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.mgr = RequestHandler()
+
+    def tearDown(self):
+        StreamHandler.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def testStreamRows(self):
+        """
+        Test the rows are decoded as soon as they are received, whatever the
+        chunks they come in
+        """
+        chunks = []
+
+        def received():
+            for chunk in self.mgr.stream(self.url + "/view", {"limit": 3}, encode=True):
+                chunks.append(chunk)
+                yield chunk
+
+        decoder = CouchRowDecoder()
+        rows = decoder.decode(received())
+        # the server waits to send the rest of the view
+        self.assertEqual(next(rows), {"id": "a", "key": "a", "value": {"text": "x,\ny"}})
+        self.assertTrue(len(b"".join(chunks)) < VIEW_BODY.index(b'{"id":"c"'))
+        StreamHandler.release.set()
+        self.assertEqual(list(rows), [{"id": "b", "key": "b", "value": None},
+                                      {"id": "c", "key": "c", "value": [1, 2]}])
+        self.assertEqual(decoder.header, {"total_rows": 3, "offset": 0})
+        self.assertEqual(b"".join(chunks), VIEW_BODY)
+        self.assertTrue(len(chunks) > 1)
+
+    def testStreamRedirect(self):
+        """
+        Test the body of a followed redirect is not streamed
+        """
+        StreamHandler.release.set()
+        self.assertEqual(b"".join(self.mgr.stream(self.url + "/moved", {})), VIEW_BODY)
+
+    def testStreamError(self):
+        """
+        Test error responses raise HTTPException with the status and body,
+        without streaming the body
+        """
+        chunks = []
+        with self.assertRaises(HTTPException) as context:
+            for chunk in self.mgr.stream(self.url + "/missing", "key=x"):
+                chunks.append(chunk)
+        self.assertEqual(chunks, [])
+        self.assertEqual(context.exception.status, 404)
+        self.assertEqual(context.exception.result, b'{"error":"not_found","reason":"missing"}\n')
+        self.assertEqual(context.exception.url, self.url + "/missing")
+        self.assertEqual(context.exception.req_data, "key=x")
+
+    def testStreamTimeout(self):
+        """
+        Test the transfer times out without data for timeout seconds, not
+        counting the time the caller takes between chunks
+        """
+        self.mgr.timeout = 1
+        chunks = self.mgr.stream(self.url + "/stalled", {})
+        self.assertEqual(next(chunks), VIEW_BODY[:10])
+        time.sleep(1.5)
+        with self.assertRaises(pycurl.error) as context:
+            next(chunks)
+        self.assertEqual(context.exception.args[0], pycurl.E_OPERATION_TIMEDOUT)
+
+
 if __name__ == "__main__":
     unittest.main()
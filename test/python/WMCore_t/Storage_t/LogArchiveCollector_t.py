@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+_LogArchiveCollector_t_
+
+Unit tests for the streaming logArchive collector
+"""
+from __future__ import division, print_function
+
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.Storage.Backends.CPImpl import CPImpl
+from WMCore.Storage.LogArchiveCollector import LogArchiveCollector
+from WMCore.Storage.Registry import registerStageOutImpl
+from WMCore.Storage.StageInMgr import StageInMgr
+from WMCore.Storage.StageOutError import StageOutFailure
+
+
+class CopyImpl(CPImpl):
+    """
+    Local copies done in python, optionally taking some more time like
+    a remote copy would
+    """
+    latency = 0
+
+    def createStageOutCommand(self, sourcePFN, targetPFN, options=None, checksums=None):
+        return sourcePFN, targetPFN
+
+    def executeCommand(self, command):
+        time.sleep(self.latency)
+        try:
+            shutil.copyfile(*command)
+        except (IOError, OSError) as ex:
+            raise StageOutFailure("Copy failed: %s" % str(ex))
+        return 0
+
+
+class SlowCopyImpl(CopyImpl):
+    latency = 0.05
+
+
+class HangingCopyImpl(CopyImpl):
+    """
+    Copies of the files named Hanging* take a long time
+    """
+
+    def executeCommand(self, command):
+        if os.path.basename(command[0]).startswith('Hanging'):
+            time.sleep(1)
+        return CopyImpl.executeCommand(self, command)
+
+
+registerStageOutImpl("test-stagein-copy", CopyImpl)
+registerStageOutImpl("test-stagein-slow-copy", SlowCopyImpl)
+registerStageOutImpl("test-stagein-hanging-copy", HangingCopyImpl)
+
+
+class LogArchiveCollectorTest(unittest.TestCase):
+    """
+    Test collecting logArchives staged in from a local directory
+    """
+
+    def setUp(self):
+        self.testDir = tempfile.mkdtemp()
+        self.storageDir = os.path.join(self.testDir, 'storage')
+        self.workingDir = os.path.join(self.testDir, 'job')
+        os.makedirs(self.workingDir)
+        # the StageInMgr copies into the current directory
+        self.cwd = os.getcwd()
+        os.chdir(self.workingDir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.testDir, ignore_errors=True)
+
+    def makeLogArchives(self, numFiles, size=1024):
+        """
+        Put some logArchives in the storage directory, return their LFNs
+        """
+        lfns = []
+        for idx in range(numFiles):
+            lfn = '/store/unmerged/logs/prod/%d/Job%d-logArchive.tar.gz' % (idx % 3, idx)
+            pfn = self.storageDir + lfn
+            if not os.path.isdir(os.path.dirname(pfn)):
+                os.makedirs(os.path.dirname(pfn))
+            with open(pfn, 'wb') as fd:
+                fd.write(os.urandom(size))
+            lfns.append(lfn)
+        return lfns
+
+    def makeStageInMgr(self, command='test-stagein-copy'):
+        stageInMgr = StageInMgr(**{'command': command, 'option': '', 'phedex-node': 'T2_CH_CERN',
+                                   'lfn-prefix': self.storageDir})
+        stageInMgr.numberOfRetries = 0
+        stageInMgr.retryPauseTime = 0
+        return stageInMgr
+
+    def testCollect(self):
+        """
+        Test archiving logArchives, some of them missing
+        """
+        lfns = self.makeLogArchives(30, size=100 * 1000)
+        missing = ['/store/unmerged/logs/prod/0/Missing%d-logArchive.tar.gz' % idx for idx in range(3)]
+        collector = LogArchiveCollector(self.makeStageInMgr(), maxConcurrency=4, maxStagedFiles=5,
+                                        bufferSize=4096)
+
+        tarName = os.path.join(self.testDir, 'logs.tar')
+        with tarfile.open(tarName, 'w:') as tarFile:
+            archived, failed = collector(tarFile, lfns + missing,
+                                         arcname=lambda pfn: os.path.join('job', os.path.basename(pfn)))
+
+        self.assertEqual(archived, set(lfns))
+        self.assertEqual(sorted(failed), sorted(missing))
+        self.assertEqual(collector.stats['files'], 30)
+        self.assertEqual(collector.stats['failed'], 3)
+        self.assertEqual(collector.stats['bytes'], 30 * 100 * 1000)
+        # nothing left behind in the working directory
+        self.assertEqual(os.listdir(self.workingDir), [])
+
+        with tarfile.open(tarName, 'r:') as tarFile:
+            members = dict((member.name, member) for member in tarFile.getmembers())
+            self.assertEqual(sorted(members), sorted(os.path.join('job', os.path.basename(lfn)) for lfn in lfns))
+            for lfn in lfns:
+                with open(self.storageDir + lfn, 'rb') as fd:
+                    content = tarFile.extractfile(members[os.path.join('job', os.path.basename(lfn))]).read()
+                    self.assertEqual(content, fd.read())
+
+    def testNothingToCollect(self):
+        """
+        Test collecting no or only missing logArchives
+        """
+        collector = LogArchiveCollector(self.makeStageInMgr())
+        with tarfile.open(os.path.join(self.testDir, 'logs.tar'), 'w:') as tarFile:
+            self.assertEqual(collector(tarFile, []), (set(), {}))
+            archived, failed = collector(tarFile, ['/store/unmerged/logs/prod/0/Missing-logArchive.tar.gz'])
+        self.assertEqual(archived, set())
+        self.assertEqual(list(failed), ['/store/unmerged/logs/prod/0/Missing-logArchive.tar.gz'])
+
+    def testTimeout(self):
+        """
+        Test giving up on a hanging stage in, without leaving its file behind
+        """
+        lfns = self.makeLogArchives(5)
+        hanging = '/store/unmerged/logs/prod/0/Hanging-logArchive.tar.gz'
+        with open(self.storageDir + hanging, 'wb') as fd:
+            fd.write(os.urandom(1024))
+        collector = LogArchiveCollector(self.makeStageInMgr('test-stagein-hanging-copy'), maxConcurrency=2)
+
+        with tarfile.open(os.path.join(self.testDir, 'logs.tar'), 'w:') as tarFile:
+            archived, failed = collector(tarFile, [hanging] + lfns, timeout=0.3, joinTimeout=10)
+
+        self.assertEqual(archived, set(lfns))
+        self.assertEqual(list(failed), [hanging])
+        # the hanging transfer was waited for and its file removed
+        self.assertEqual(os.listdir(self.workingDir), [])
+
+    @attr('performance', 'integration')
+    def testCollectPerformance(self):
+        """
+        Compare staging in all the logArchives one at a time and then
+        archiving them, with streaming them into the archive with concurrent
+        stage ins, for transfers taking 50ms each
+        """
+        numFiles = 200
+        lfns = self.makeLogArchives(numFiles, size=500 * 1000)
+        stageInMgr = self.makeStageInMgr('test-stagein-slow-copy')
+
+        startTime = time.time()
+        localLogs = [stageInMgr(LFN=lfn)['PFN'] for lfn in lfns]
+        with tarfile.open(os.path.join(self.testDir, 'serial.tar'), 'w:') as tarFile:
+            for log in localLogs:
+                tarFile.add(name=log, arcname=os.path.basename(log))
+                os.remove(log)
+        serialTime = time.time() - startTime
+
+        for concurrency in (4, 16):
+            collector = LogArchiveCollector(stageInMgr, maxConcurrency=concurrency)
+            with tarfile.open(os.path.join(self.testDir, 'streamed.tar'), 'w:') as tarFile:
+                archived, _ = collector(tarFile, lfns)
+            print("Collected %d logArchives of 500kB: %.2f secs (%.1f MB/s) streaming with %d concurrent "
+                  "stage ins, %.2f secs one at a time" % (numFiles, collector.stats['time'],
+                                                          collector.stats['MBPerSec'], concurrency, serialTime))
+            self.assertEqual(len(archived), numFiles)
+
+
+if __name__ == "__main__":
+    unittest.main()
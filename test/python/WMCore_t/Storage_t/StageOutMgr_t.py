@@ -3,20 +3,227 @@ Created on Jun 18, 2009
 
 @author: meloam
 '''
-import unittest
+from __future__ import print_function
+
 import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
 
 import WMCore.Storage.StageOutMgr as StageOutMgr
+from Utils.FileTools import calculateAdler32
+from WMCore.Algorithms.Alarm import Alarm, alarmHandler
+from WMCore.Storage.Backends.UnittestImpl import WinImpl
+from WMCore.Storage.Registry import registerStageOutImpl
+from WMCore.Storage.StageOutError import StageOutFailure
+
+
+class SlowImpl(WinImpl):
+    """
+    Successful transfers taking 50ms, like a remote copy would
+    """
+
+    def createStageOutCommand(self, sourcePFN, targetPFN, options=None, checksums=None):
+        return "SLOW"
+
+    def executeCommand(self, command):
+        time.sleep(0.05)
+        return 0
+
+
+class HangImpl(WinImpl):
+    """
+    Transfers hanging until released, but the ones of file0
+    """
+    release = threading.Event()
+    removed = []
+
+    def createTargetName(self, protocol, pfn):
+        return pfn
+
+    def createStageOutCommand(self, sourcePFN, targetPFN, options=None, checksums=None):
+        return "HANG %s" % targetPFN
+
+    def executeCommand(self, command):
+        if not command.endswith('file0.root'):
+            self.release.wait()
+        return 0
+
+    def removeFile(self, pfnToRemove):
+        self.removed.append(pfnToRemove)
+
+
+registerStageOutImpl("test-slow", SlowImpl)
+registerStageOutImpl("test-hang", HangImpl)
+
 
 class StageOutMgrTest(unittest.TestCase):
 
     def setUp(self):
         # shut up SiteLocalConfig
         os.putenv('CMS_PATH', os.getcwd())
+        self.testDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.testDir, ignore_errors=True)
 
     def testName(self):
         pass
 
+    def makeManager(self, command):
+        """
+        Stage out manager using the given unittest backend as override
+        """
+        manager = StageOutMgr.StageOutMgr(**{'command': command, 'option': '', 'phedex-node': 'T2_CH_CERN',
+                                             'lfn-prefix': os.path.join(self.testDir, 'storage')})
+        manager.numberOfRetries = 0
+        manager.retryPauseTime = 0
+        return manager
+
+    def makeFiles(self, numFiles, size=1024):
+        """
+        Create local files to stage out, with their checksums
+        """
+        filesToStage = []
+        for idx in range(numFiles):
+            pfn = os.path.join(self.testDir, "output%d.root" % idx)
+            with open(pfn, 'wb') as fd:
+                fd.write(os.urandom(size))
+            filesToStage.append({'LFN': '/store/unmerged/output%d.root' % idx, 'PFN': pfn, 'PNN': None,
+                                 'StageOutCommand': None, 'Checksums': {'adler32': calculateAdler32(pfn)}})
+        return filesToStage
+
+    def testStageOutFiles(self):
+        """
+        Test staging out files concurrently, with a checksum mismatch
+        """
+        manager = self.makeManager('test-copy')
+        filesToStage = self.makeFiles(10)
+        filesToStage[3]['Checksums'] = {'adler32': '0000abcd'}
+        filesToStage[5]['Checksums'] = None
+
+        manager.validateChecksums = True
+        results = manager.stageOutFiles(filesToStage, maxConcurrency=3)
+        self.assertEqual([fileToStage for fileToStage, _ in results], filesToStage)
+        for idx, (fileToStage, error) in enumerate(results):
+            if idx == 3:
+                self.assertTrue(isinstance(error, StageOutFailure))
+                self.assertEqual(fileToStage['StageOutReport'], [])
+                self.assertFalse(os.path.exists(fileToStage['PFN'] + '2'))
+                continue
+            self.assertEqual(error, None)
+            self.assertEqual(fileToStage['PNN'], 'T2_CH_CERN')
+            self.assertEqual(fileToStage['StageOutCommand'], 'test-copy')
+            self.assertTrue(fileToStage['PFN'].endswith(fileToStage['LFN']))
+            self.assertEqual([(report['StageOutType'], report['StageOutExit'])
+                              for report in fileToStage['StageOutReport']], [('FALLBACK', 0)])
+            self.assertTrue(os.path.exists(os.path.join(self.testDir, "output%d.root2" % idx)))
+
+        self.assertEqual(list(manager.failed), ['/store/unmerged/output3.root'])
+        self.assertEqual(len(manager.completedFiles), 9)
+
+        # the local checksums are only validated on demand
+        manager = self.makeManager('test-copy')
+        results = manager.stageOutFiles(self.makeFiles(10)[:3] + [filesToStage[3]])
+        self.assertTrue(all(error is None for _, error in results))
+
+        self.assertEqual(manager.stageOutFiles([]), [])
+
+    def testFallbacks(self):
+        """
+        Test that every file goes through the fallbacks in order
+        """
+        manager = self.makeManager('test-fail')
+        manager.fallbacks.append({'command': 'test-win', 'option': None, 'phedex-node': 'T1_US_FNAL_Disk',
+                                  'lfn-prefix': 'srm://cmssrm.fnal.gov'})
+        filesToStage = [{'LFN': '/store/unmerged/file%d.root' % idx, 'PFN': 'file%d.root' % idx,
+                         'PNN': None, 'StageOutCommand': None, 'Checksums': None} for idx in range(20)]
+
+        for fileToStage, error in manager.stageOutFiles(filesToStage):
+            self.assertEqual(error, None)
+            self.assertEqual(fileToStage['PNN'], 'T1_US_FNAL_Disk')
+            self.assertEqual(fileToStage['PFN'], 'srm://cmssrm.fnal.gov' + fileToStage['LFN'])
+            self.assertEqual([(report['StageOutCommand'], report['StageOutExit'])
+                              for report in fileToStage['StageOutReport']],
+                             [('test-fail', 60310), (None, 0)])
+        self.assertEqual(len(manager.completedFiles), 20)
+
+        manager = self.makeManager('test-fail')
+        results = manager.stageOutFiles(filesToStage, maxConcurrency=1)
+        self.assertTrue(all(isinstance(error, StageOutFailure) for _, error in results))
+        self.assertEqual(sorted(manager.failed), sorted(fileToStage['LFN'] for fileToStage in filesToStage))
+        self.assertEqual(manager.completedFiles, {})
+
+    def testStageOutTimeout(self):
+        """
+        Test the files of transfers still running when the stage out times
+        out are deleted once they complete
+        """
+        manager = self.makeManager('test-hang')
+        filesToStage = [{'LFN': '/store/unmerged/file%d.root' % idx, 'PFN': 'file%d.root' % idx,
+                         'PNN': None, 'StageOutCommand': None, 'Checksums': None} for idx in range(4)]
+        storage = os.path.join(self.testDir, 'storage')
+        HangImpl.release.clear()
+        del HangImpl.removed[:]
+
+        oldHandler = signal.signal(signal.SIGALRM, alarmHandler)
+        signal.alarm(1)
+        try:
+            with self.assertRaises(Alarm):
+                manager.stageOutFiles(filesToStage, maxConcurrency=2)
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, oldHandler)
+        self.assertTrue(manager.aborted)
+
+        # file0 was staged out, file1 and file2 are still being transferred
+        manager.cleanSuccessfulStageOuts()
+        self.assertEqual(HangImpl.removed, [storage + '/store/unmerged/file0.root'])
+        self.assertEqual(manager.completedFiles, {})
+
+        HangImpl.release.set()
+        for _ in range(50):
+            if len(HangImpl.removed) == 3:
+                break
+            time.sleep(0.1)
+        self.assertEqual(sorted(HangImpl.removed), [storage + '/store/unmerged/file%d.root' % idx
+                                                    for idx in range(3)])
+        self.assertEqual(manager.completedFiles, {})
+        self.assertEqual(sorted(manager.failed), ['/store/unmerged/file1.root', '/store/unmerged/file2.root'])
+        # file3 was never transferred
+        self.assertEqual(filesToStage[3].get('StageOutReport'), None)
+
+    @attr('performance', 'integration')
+    def testStageOutFilesPerformance(self):
+        """
+        Compare staging out files one at a time with concurrent transfers
+        taking 50ms each
+        """
+        numFiles = 100
+        filesToStage = self.makeFiles(numFiles, size=2 * 1024 * 1024)
+
+        manager = self.makeManager('test-slow')
+        startTime = time.time()
+        for fileToStage in filesToStage:
+            manager(dict(fileToStage))
+        serialTime = time.time() - startTime
+
+        for concurrency in (1, 4, 8):
+            manager = self.makeManager('test-slow')
+            manager.validateChecksums = True
+            startTime = time.time()
+            results = manager.stageOutFiles([dict(fileToStage) for fileToStage in filesToStage],
+                                            maxConcurrency=concurrency)
+            print("Staged out %d files of 2MB: %.2f secs with %d concurrent transfers (checksums validated), "
+                  "%.2f secs one at a time" % (numFiles, time.time() - startTime, concurrency, serialTime))
+            self.assertEqual(len(manager.completedFiles), numFiles)
+            self.assertTrue(all(error is None for _, error in results))
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
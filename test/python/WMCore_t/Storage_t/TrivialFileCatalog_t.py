@@ -8,9 +8,13 @@ Test the parsing of the TFC.
 from builtins import str
 
 import os
+import time
 import unittest
 import nose
 import tempfile
+import threading
+
+from nose.plugins.attrib import attr
 
 from xml.dom.minidom import parseString
 from WMCore.WMBase import getTestBase
@@ -195,6 +199,107 @@ class TrivialFileCatalogTest(unittest.TestCase):
         pfn = tfc.matchLFN('srmv2', in_lfn)
         self.assertEqual(out_pfn, pfn)
 
+    def testCompiledRules(self):
+        """
+        Test the rule order, chains of chains and the compiled rules
+        """
+        tfc = TrivialFileCatalog()
+        tfc.addMapping("direct", "/+store/unmerged/(.*)", "/unmerged/$1")
+        tfc.addMapping("direct", "/+store/(.*)", "/data/store/$1")
+        # a chain to a protocol defined later and a chain of chains
+        tfc.addMapping("srmv2", "(.*)", "srm://se.example.org/?SFN=$1", chain="xrootd")
+        tfc.addMapping("xrootd", "/+data/(.*)", "root://xrootd.example.org//$1", chain="direct")
+        tfc.addMapping("xrootd", "/+(.*)", "root://other.example.org//$1", chain="direct")
+
+        self.assertEqual(tfc.matchLFN("direct", "/store/unmerged/file.root"), "/unmerged/file.root")
+        self.assertEqual(tfc.matchLFN("direct", "/store/data/file.root"), "/data/store/data/file.root")
+        self.assertEqual(tfc.matchLFN("xrootd", "/store/data/file.root"),
+                         "root://xrootd.example.org//store/data/file.root")
+        self.assertEqual(tfc.matchLFN("xrootd", "/store/unmerged/file.root"),
+                         "root://other.example.org//unmerged/file.root")
+        self.assertEqual(tfc.matchLFN("srmv2", "/store/data/file.root"),
+                         "srm://se.example.org/?SFN=root://xrootd.example.org//store/data/file.root")
+        self.assertEqual(tfc.matchLFN("direct", "/other/file.root"), None)
+        self.assertEqual(tfc.matchLFN("srmv2", "/other/file.root"), None)
+        self.assertEqual(tfc.matchLFN("unknown", "/store/data/file.root"), None)
+        self.assertEqual(sorted(tfc.compiledRules['lfn-to-pfn']), ["direct", "srmv2", "xrootd"])
+
+        # a failed chain moves on to the next rule
+        tfc.addMapping("local", "/+(.*)", "/local/$1", chain="unknown")
+        tfc.addMapping("local", "/+(.*)", "/fallback/$1")
+        self.assertEqual(tfc.matchLFN("local", "/store/file.root"), "/fallback/store/file.root")
+
+        # new mappings invalidate the compiled rules
+        tfc.addMapping("direct", "/+other/(.*)", "/other/$1")
+        self.assertEqual(tfc.compiledRules, {})
+        self.assertEqual(tfc.matchLFN("direct", "/other/file.root"), "/other/file.root")
+
+
+    def testResultReferences(self):
+        """
+        Test the $N references of the rule results
+        """
+        tfc = TrivialFileCatalog()
+        tfc.addMapping("direct", "/+store/([^/]+)/(.*)", "/$2/{$1}/$1")
+        tfc.addMapping("direct", "/+other/(.*)", "/other/$1/$0/$3")
+        tfc.addMapping("chained", "([^/]+)/(.*)", "$1|$2|$3", chain="direct")
+        self.assertEqual(tfc.matchLFN("direct", "/store/data/file.root"), "/file.root/{data}/data")
+        # references to missing parts are kept
+        self.assertEqual(tfc.matchLFN("direct", "/other/file.root"), "/other/file.root/$0/$3")
+        # the text before a chained match is a part too
+        self.assertEqual(tfc.matchLFN("chained", "/store/data/file.root"), "/|file.root|{data}/data")
+
+    def testConcurrentMatches(self):
+        """
+        Test threads sharing the catalog while it gets compiled
+        """
+        tfc = TrivialFileCatalog()
+        tfc.addMapping("direct", "/+store/(.*)", "/data/store/$1")
+        errors = []
+
+        def matchFiles(offset):
+            try:
+                for idx in range(2000):
+                    lfn = "/store/file_%d.root" % ((idx + offset) % 20)
+                    if tfc.matchLFN("direct", lfn) != "/data" + lfn:
+                        errors.append(lfn)
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=matchFiles, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @attr('performance', 'integration')
+    def testMatchPerformance(self):
+        """
+        Time translating 100k distinct LFNs through a chained rule, and
+        100k lookups of 10k LFNs
+        """
+        tfc = TrivialFileCatalog()
+        tfc.addMapping("direct", "/+store/unmerged/(.*)", "/unmerged/$1")
+        tfc.addMapping("direct", "/+store/temp/(.*)", "/temp/$1")
+        tfc.addMapping("direct", "/+store/user/(.*)", "/user/$1")
+        tfc.addMapping("direct", "/+store/(.*)", "/data/store/$1")
+        tfc.addMapping("srmv2", "/+(.*)", "srm://se.example.org:8443/srm/managerv2?SFN=$1", chain="direct")
+        lfns = ["/store/mc/Campaign/Dataset/AODSIM/v1/%05d/file_%d.root" % (idx // 1000, idx)
+                for idx in range(100000)]
+
+        startTime = time.time()
+        for lfn in lfns:
+            tfc.matchLFN("srmv2", lfn)
+        print("Translated %d distinct LFNs in %.2f secs" % (len(lfns), time.time() - startTime))
+
+        startTime = time.time()
+        for lfn in lfns[:10000] * 10:
+            tfc.matchLFN("srmv2", lfn)
+        print("Translated 10k LFNs 10 times in %.2f secs" % (time.time() - startTime))
+        self.assertEqual(tfc.matchLFN("srmv2", lfns[0]),
+                         "srm://se.example.org:8443/srm/managerv2?SFN=data/store/mc/Campaign/Dataset/AODSIM/v1/00000/file_0.root")
+
 
 if __name__ == "__main__":
     unittest.main()
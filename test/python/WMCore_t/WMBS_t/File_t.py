@@ -7,8 +7,11 @@ Unit tests for the WMBS File class.
 
 import logging
 import threading
+import time
 import unittest
 
+from nose.plugins.attrib import attr
+
 from WMCore.DAOFactory import DAOFactory
 from WMCore.DataStructs.File import File as WMFile
 from WMCore.DataStructs.Run import Run
@@ -623,6 +626,66 @@ class FileTest(unittest.TestCase):
 
         return
 
+    def testAddRunLumiBulk(self):
+        """
+        _testAddRunLumiBulk_
+
+        Test the bulk insertion of run/lumi information for several files,
+        including duplicate lumis and files not yet available in WMBS.
+        """
+        testFileA = File(lfn="/this/is/a/lfnA", size=1024, events=10)
+        testFileA.create()
+        testFileB = File(lfn="/this/is/a/lfnB", size=1024, events=10)
+        testFileB.create()
+
+        runLumiBinds = [{'lfn': testFileA['lfn'], 'runs': {Run(1, *[1, 2, 3]), Run(2, *[4])}},
+                        {'lfn': testFileB['lfn'], 'runs': {Run(1, *[5, 6])}},
+                        {'lfn': "/this/is/not/in/wmbs", 'runs': {Run(1, *[7])}}]
+
+        lumiAction = self.daofactory(classname="Files.AddRunLumi")
+        lumiAction.execute(file=runLumiBinds)
+        # inserting the same lumis again must not fail
+        lumiAction.execute(file=runLumiBinds)
+
+        runLumiAction = self.daofactory(classname="Files.GetBulkRunLumi")
+        result = runLumiAction.execute(files=[{'id': testFileA['id']}, {'id': testFileB['id']}])
+        self.assertEqual(sorted(result[testFileA['id']][1]), [1, 2, 3])
+        self.assertEqual(result[testFileA['id']][2], [4])
+        self.assertEqual(sorted(result[testFileB['id']][1]), [5, 6])
+
+        return
+
+    @attr('performance', 'integration')
+    def testAddRunLumiPerformance(self):
+        """
+        _testAddRunLumiPerformance_
+
+        Measure the lumis/sec inserted for a T0 like workload, where every
+        job produces a few files with thousands of lumi sections each.
+        """
+        nFiles = 20
+        nLumis = 5000
+        runLumiBinds = []
+        fileIDs = []
+        for i in range(nFiles):
+            testFile = File(lfn="/this/is/a/lfn%d" % i, size=1024, events=10)
+            testFile.create()
+            fileIDs.append({'id': testFile['id']})
+            runLumiBinds.append({'lfn': testFile['lfn'],
+                                 'runs': {Run(1, *list(range(i * nLumis + 1, (i + 1) * nLumis + 1)))}})
+
+        lumiAction = self.daofactory(classname="Files.AddRunLumi")
+        startTime = time.time()
+        lumiAction.execute(file=runLumiBinds)
+        endTime = time.time()
+        logging.info("AddRunLumi performance: %s lumis/sec", nFiles * nLumis / (endTime - startTime))
+
+        runLumiAction = self.daofactory(classname="Files.GetBulkRunLumi")
+        result = runLumiAction.execute(files=fileIDs)
+        self.assertEqual(sum(len(result[fileID][1]) for fileID in result), nFiles * nLumis)
+
+        return
+
     def testGetAncestorLFNs(self):
         """
         _testGenAncestorLFNs_
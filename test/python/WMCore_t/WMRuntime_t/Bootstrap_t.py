@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+_Bootstrap_t_
+
+Keep the job bootstrap imports minimal, every job pays for them
+"""
+from __future__ import division
+
+import os
+import subprocess
+import sys
+import unittest
+
+from WMCore.WMRuntime.Tools.ImportProfiler import parseImportTime, summarizeImports
+
+# modules the job runtime imports on top of Bootstrap
+RUNTIME_MODULES = ["WMCore.WMSpec.WMWorkload", "WMCore.FwkJobReport.Report", "WMCore.WMRuntime.Watchdog",
+                   "WMCore.Storage.SiteLocalConfig", "WMCore.DataStructs.JobPackage"]
+
+# slow to import and never needed by a job startup
+FORBIDDEN_MODULES = ["tkinter", "urllib.request", "http.client", "email.parser", "ssl", "PSetTweaks.WMTweak",
+                     "future.moves.urllib.request", "WMCore.Services.Requests"]
+
+
+def importProfile(modules):
+    """
+    Import modules in a fresh interpreter, return its import profile
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    command = [sys.executable, "-X", "importtime", "-c", "import %s" % ", ".join(modules)]
+    process = subprocess.Popen(command, env=env, stderr=subprocess.PIPE, universal_newlines=True)
+    _, stderr = process.communicate()
+    if process.returncode:
+        raise RuntimeError("Failed to import %s:\n%s" % (modules, stderr))
+    return parseImportTime(stderr.splitlines())[0]
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime needs python 3.7")
+class BootstrapImportTest(unittest.TestCase):
+    """
+    Test the modules imported when starting a job
+    """
+
+    def testBootstrapImports(self):
+        """
+        Bootstrap itself must stay a minimal module
+        """
+        profile = importProfile(["WMCore.WMRuntime.Bootstrap"])
+        modules = set(module for module, _, _, _ in profile)
+        summary = summarizeImports([profile])
+
+        wmcoreModules = sorted(module for module in modules if module.split('.')[0] in ('WMCore', 'Utils'))
+        self.assertTrue(len(wmcoreModules) <= 10, wmcoreModules)
+        self.assertTrue(summary['numModules'] <= 150)
+        for module in FORBIDDEN_MODULES + RUNTIME_MODULES:
+            self.assertFalse(module in modules, "%s imported by Bootstrap" % module)
+
+    def testRuntimeImports(self):
+        """
+        The modules needed to run a job must not drag slow unused ones
+        """
+        profile = importProfile(["WMCore.WMRuntime.Bootstrap"] + RUNTIME_MODULES)
+        modules = set(module for module, _, _, _ in profile)
+        summary = summarizeImports([profile])
+
+        self.assertTrue(summary['numModules'] <= 230)
+        for module in FORBIDDEN_MODULES:
+            self.assertFalse(module in modules, "%s imported by the job runtime" % module)
+
+
+if __name__ == "__main__":
+    unittest.main()
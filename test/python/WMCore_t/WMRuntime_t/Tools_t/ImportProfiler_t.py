@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+_ImportProfiler_t_
+
+Unit tests for the import time aggregation
+"""
+from __future__ import division, print_function
+
+import sys
+import unittest
+
+from WMCore.WMRuntime.Tools.ImportProfiler import formatSummary, parseImportTime, profileCommand, summarizeImports
+
+IMPORT_LOG = """WMAgent bootstrap output
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _io
+import time:       200 |        300 |   io
+import time:      1000 |       1500 | WMCore.WMRuntime.Bootstrap
+import time:       500 |        500 | json
+some job output
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |   io
+import time:      2000 |       2500 | WMCore.WMSpec.WMWorkload
+"""
+
+
+class ImportProfilerTest(unittest.TestCase):
+    """
+    Test parsing and aggregating -X importtime output
+    """
+
+    def testParse(self):
+        """
+        Test parsing the output of two processes mixed with other lines
+        """
+        processes = parseImportTime(IMPORT_LOG.splitlines())
+        self.assertEqual(len(processes), 2)
+        self.assertEqual(processes[0], [('_io', 100, 100, 2), ('io', 200, 300, 1),
+                                        ('WMCore.WMRuntime.Bootstrap', 1000, 1500, 0), ('json', 500, 500, 0)])
+        self.assertEqual(processes[1][1], ('WMCore.WMSpec.WMWorkload', 2000, 2500, 0))
+        self.assertEqual(parseImportTime(IMPORT_LOG.splitlines()[2:5]), [processes[0][:3]])
+
+    def testSummary(self):
+        """
+        Test the aggregation over processes
+        """
+        summary = summarizeImports(parseImportTime(IMPORT_LOG.splitlines()), top=2)
+        self.assertEqual(summary['numProcesses'], 2)
+        self.assertEqual(summary['numImports'], 6)
+        self.assertEqual(summary['numModules'], 5)
+        self.assertAlmostEqual(summary['totalTime'], 0.0045)
+        self.assertEqual(summary['topModules'], [('WMCore.WMSpec.WMWorkload', 0.002),
+                                                 ('WMCore.WMRuntime.Bootstrap', 0.001)])
+        self.assertEqual(summary['topPackages'], [('WMCore', 0.003), ('io', 0.0005)])
+        self.assertTrue(formatSummary(summary).startswith("2 processes imported 6 modules (5 distinct)"))
+
+    @unittest.skipIf(sys.version_info < (3, 7), "-X importtime needs python 3.7")
+    def testProfileCommand(self):
+        """
+        Test profiling the imports of python subprocesses
+        """
+        command = [sys.executable, "-c",
+                   "import subprocess, sys; subprocess.check_call([sys.executable, '-c', 'import json'])"]
+        exitCode, processes = profileCommand(command)
+        self.assertEqual(exitCode, 0)
+        self.assertEqual(len(processes), 2)
+        self.assertTrue('json' in [module for module, _, _, _ in processes[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+_ProcessSampler_t_
+
+Unit tests for the /proc based process tree sampler
+"""
+from __future__ import division, print_function
+
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
+from WMCore.WMRuntime.Tools.ProcessSampler import (ProcessTreeSampler, listProcessTree, readPSS, readStat,
+                                                   readStatus)
+
+# a parent allocating ~50MB and busy looping, with two sleeping children
+BUSY_TREE = """
+import subprocess, time
+children = [subprocess.Popen(['sleep', '60']) for _ in range(2)]
+data = bytearray(50 * 1000 * 1000)
+while True:
+    pass
+"""
+
+
+class ProcessSamplerTest(unittest.TestCase):
+    """
+    Test sampling a running process tree
+    """
+
+    def setUp(self):
+        self.process = subprocess.Popen([sys.executable, "-c", BUSY_TREE])
+        # wait for the children to be there
+        for _ in range(50):
+            if len(listProcessTree(self.process.pid)) == 3:
+                break
+            time.sleep(0.1)
+
+    def tearDown(self):
+        for pid in reversed(listProcessTree(self.process.pid)):
+            try:
+                os.kill(pid, 9)
+            except OSError:
+                pass
+        self.process.wait()
+
+    def testProcFiles(self):
+        """
+        Test reading the /proc files of a single process
+        """
+        ppid, cpuTicks = readStat(self.process.pid)
+        self.assertEqual(ppid, os.getpid())
+        self.assertTrue(cpuTicks >= 0)
+        rss, vsize = readStatus(self.process.pid)
+        self.assertTrue(0 < rss <= vsize)
+        self.assertTrue(0 < readPSS(self.process.pid) <= rss)
+
+    def testProcessTree(self):
+        """
+        Test listing the process tree, with and without the children files
+        """
+        tree = listProcessTree(self.process.pid, useChildrenFiles=False)
+        self.assertEqual(len(tree), 3)
+        self.assertEqual(tree[0], self.process.pid)
+        if os.path.exists('/proc/self/task/%d/children' % os.getpid()):
+            self.assertEqual(sorted(listProcessTree(self.process.pid, useChildrenFiles=True)), sorted(tree))
+
+    def testSample(self):
+        """
+        Test the samples and the statistics over them
+        """
+        sampler = ProcessTreeSampler(self.process.pid, maxSamples=2)
+        for _ in range(3):
+            sample = sampler.sample()
+            time.sleep(0.2)
+
+        self.assertEqual(sample['numProcs'], 3)
+        self.assertTrue(sample['rss'] >= 50)
+        self.assertTrue(0 < sample['pss'] <= sample['rss'] <= sample['vsize'])
+        self.assertTrue(sample['pcpu'] > 10)
+        self.assertEqual(len(sampler.samples), 2)
+
+        summary = sampler.summary()
+        self.assertEqual(sampler.numSamples, 3)
+        self.assertEqual(summary['pcpu']['min'], 0.0)
+        self.assertTrue(summary['pcpu']['min'] <= summary['pcpu']['average'] <= summary['pcpu']['max'])
+        self.assertTrue(summary['rss']['max'] >= 50)
+
+        self.tearDown()
+        self.assertEqual(sampler.sample(), None)
+        self.assertEqual(sampler.numSamples, 3)
+        self.assertEqual(ProcessTreeSampler(1).summary(), None)
+
+    @attr('performance', 'integration')
+    def testSampleOverhead(self):
+        """
+        Compare the time taken by a sample with the ps and smaps commands
+        the PerformanceMonitor used to run, and with the /proc sampler
+        """
+        numSamples = 50
+        pid = self.process.pid
+
+        startTime = time.time()
+        for _ in range(numSamples):
+            subprocessAlgos.runCommand("ps -p %i -o pid,ppid,rss,pcpu,pmem,cmd -ww | grep %i" % (pid, pid))
+            subprocessAlgos.runCommand("awk '/^Pss/ {pss += $2} END {print pss}' /proc/%i/smaps" % pid)
+        commandTime = (time.time() - startTime) / numSamples
+
+        sampler = ProcessTreeSampler(pid)
+        startTime = time.time()
+        for _ in range(numSamples):
+            sampler.sample()
+        samplerTime = (time.time() - startTime) / numSamples
+
+        print("Per sample: %.2f ms with ps/smaps commands (main process only), %.2f ms with the /proc sampler "
+              "(whole tree of %d processes)" % (commandTime * 1000, samplerTime * 1000,
+                                                len(listProcessTree(pid))))
+        self.assertTrue(samplerTime < commandTime)
+
+
+if __name__ == "__main__":
+    unittest.main()
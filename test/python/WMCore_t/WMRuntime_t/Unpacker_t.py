@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""
+_Unpacker_t_
+
+Unit tests for the sandbox unpacking and the node sandbox cache
+"""
+from __future__ import division, print_function
+
+import fcntl
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+
+from nose.plugins.attrib import attr
+
+from WMCore.WMRuntime import Unpacker
+
+
+class UnpackerTest(unittest.TestCase):
+    """
+    Test unpacking sandboxes, with and without the cache
+    """
+
+    def setUp(self):
+        self.testDir = tempfile.mkdtemp()
+        self.cacheDir = os.path.join(self.testDir, 'cache')
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.testDir, ignore_errors=True)
+
+    def makeSandbox(self, name, numFiles=10, fileSize=100):
+        """
+        Create a sandbox tarball with a WMCore.zip and a WMSandbox module
+        """
+        sourceDir = os.path.join(self.testDir, 'source-%s' % name)
+        os.makedirs(os.path.join(sourceDir, 'WMSandbox', 'Task', 'cmsRun1'))
+        with zipfile.ZipFile(os.path.join(sourceDir, 'WMCore.zip'), 'w') as zfile:
+            zfile.writestr('WMCore/WMRuntime/Startup.py', "print('Startup %s')\n" % name)
+        for path in ('__init__.py', 'Task/__init__.py', 'Task/cmsRun1/__init__.py'):
+            with open(os.path.join(sourceDir, 'WMSandbox', path), 'w') as fd:
+                fd.write("# %s\n" % name)
+        for idx in range(numFiles):
+            with open(os.path.join(sourceDir, 'WMSandbox', 'Task', 'file%d.txt' % idx), 'wb') as fd:
+                fd.write(os.urandom(fileSize))
+        os.symlink('Task/cmsRun1', os.path.join(sourceDir, 'WMSandbox', 'link'))
+
+        sandbox = os.path.join(self.testDir, '%s-Sandbox.tar.bz2' % name)
+        with tarfile.open(sandbox, 'w:bz2') as tfile:
+            for entry in os.listdir(sourceDir):
+                tfile.add(os.path.join(sourceDir, entry), arcname=entry)
+        return sandbox
+
+    def jobArea(self, name):
+        jobArea = os.path.join(self.testDir, name)
+        os.makedirs(jobArea)
+        os.chdir(jobArea)
+        return jobArea
+
+    def listTree(self, directory):
+        tree = {}
+        for dirPath, dirNames, fileNames in os.walk(directory):
+            for fileName in fileNames + [name for name in dirNames if os.path.islink(os.path.join(dirPath, name))]:
+                path = os.path.join(dirPath, fileName)
+                if os.path.islink(path):
+                    tree[os.path.relpath(path, directory)] = os.readlink(path)
+                else:
+                    with open(path, 'rb') as fd:
+                        tree[os.path.relpath(path, directory)] = fd.read()
+        return tree
+
+    def testCachedWorkArea(self):
+        """
+        Test that jobs get the same work area with and without the cache,
+        with their own copy of the cached files
+        """
+        sandbox = self.makeSandbox('A')
+        self.jobArea('plain')
+        plainDir = Unpacker.createWorkArea(sandbox)
+
+        jobDirs = []
+        for idx in range(2):
+            self.jobArea('cached%d' % idx)
+            jobDir = Unpacker.createWorkArea(sandbox, sandboxCache=self.cacheDir)
+            Unpacker.installPackage(jobDir, sandbox, idx)
+            jobDirs.append(jobDir)
+            self.assertEqual(sorted(os.listdir(jobDir)), sorted(os.listdir(plainDir)))
+
+        plainTree = self.listTree(plainDir)
+        for idx, jobDir in enumerate(jobDirs):
+            jobTree = self.listTree(jobDir)
+            self.assertEqual(jobTree.pop('WMSandbox/JobIndex.py'), b"jobIndex = %d\n" % idx)
+            self.assertTrue('WMSandbox/JobPackage.pcl' in jobTree)
+            jobTree.pop('WMSandbox/JobPackage.pcl')
+            self.assertEqual(jobTree, plainTree)
+
+        # a job changing its files changes neither the cache nor the other jobs
+        key = Unpacker.sandboxHash(sandbox)
+        with open(os.path.join(jobDirs[0], 'WMSandbox', '__init__.py'), 'w') as fd:
+            fd.write("# changed\n")
+        self.assertEqual(self.listTree(jobDirs[1])['WMSandbox/__init__.py'], b"# A\n")
+        self.assertEqual(self.listTree(os.path.join(self.cacheDir, key))['WMSandbox/__init__.py'], b"# A\n")
+        self.assertFalse(os.stat(os.path.join(self.cacheDir, key, 'WMSandbox', '__init__.py')).st_mode & 0o222)
+        self.assertFalse(os.path.islink(os.path.join(jobDirs[0], 'WMSandbox')))
+
+        self.assertEqual(sorted(name for name in os.listdir(self.cacheDir) if not name.startswith('.')),
+                         [key, key + '.lock', key + '.meta'])
+
+    def testCacheFallback(self):
+        """
+        Test extracting the sandbox when the cache can't be used
+        """
+        sandbox = self.makeSandbox('A')
+        self.jobArea('job')
+        # the cache directory is a file
+        with open(self.cacheDir, 'w') as fd:
+            fd.write("not a directory")
+        jobDir = Unpacker.createWorkArea(sandbox, sandboxCache=self.cacheDir)
+        self.assertTrue(os.path.isfile(os.path.join(jobDir, 'WMSandbox', 'Task', 'cmsRun1', '__init__.py')))
+        self.assertTrue(os.stat(os.path.join(jobDir, 'WMSandbox', '__init__.py')).st_mode & 0o200)
+
+    def testCopyFailure(self):
+        """
+        Test a failure copying the cached sandbox leaves no partial copy
+        behind, and the sandbox is extracted instead
+        """
+        sandbox = self.makeSandbox('A')
+        jobDir = self.jobArea('job')
+        os.makedirs(os.path.join(jobDir, 'job', 'WMSandbox', 'Task'))
+        # the job already has a file the sandbox provides, so copying it fails
+        with open(os.path.join(jobDir, 'job', 'WMSandbox', 'Task', 'file5.txt'), 'w') as fd:
+            fd.write("job file")
+        self.assertRaises(OSError, Unpacker.unpackFromCache, sandbox, os.path.join(jobDir, 'job'), self.cacheDir)
+        self.assertEqual(self.listTree(os.path.join(jobDir, 'job')), {'WMSandbox/Task/file5.txt': b"job file"})
+
+        jobDir = Unpacker.createWorkArea(sandbox, sandboxCache=self.cacheDir)
+        for dirPath, _, fileNames in os.walk(jobDir):
+            for fileName in fileNames:
+                info = os.lstat(os.path.join(dirPath, fileName))
+                self.assertEqual(info.st_nlink, 1)
+                self.assertTrue(info.st_mode & 0o200)
+        self.assertTrue(os.path.islink(os.path.join(jobDir, 'WMSandbox', 'link')))
+
+    def testFailedExtraction(self):
+        """
+        Test a sandbox that can't be extracted leaves nothing in the cache
+        """
+        sandbox = os.path.join(self.testDir, 'Bad-Sandbox.tar.bz2')
+        with open(sandbox, 'wb') as fd:
+            fd.write(os.urandom(1000))
+        jobDir = os.path.join(self.testDir, 'job')
+        os.makedirs(jobDir)
+        self.assertRaises(tarfile.TarError, Unpacker.unpackFromCache, sandbox, jobDir, self.cacheDir)
+        self.assertEqual(os.listdir(self.cacheDir), [])
+        self.assertEqual(os.listdir(jobDir), [])
+
+    def testConcurrentExtraction(self):
+        """
+        Test that jobs unpacking the same sandbox at the same time extract it once
+        """
+        sandbox = self.makeSandbox('A', numFiles=200, fileSize=10000)
+        results = []
+
+        def unpack(idx):
+            jobDir = os.path.join(self.testDir, 'job%d' % idx)
+            os.makedirs(jobDir)
+            results.append(Unpacker.unpackFromCache(sandbox, jobDir, self.cacheDir))
+
+        threads = [threading.Thread(target=unpack, args=(idx,)) for idx in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(sorted(meta['cached'] for meta in results), [False, True, True, True, True])
+        self.assertEqual(len(set(meta['extractTime'] for meta in results)), 1)
+        self.assertEqual([name for name in os.listdir(self.cacheDir) if name.startswith('.')], [])
+
+    def testEviction(self):
+        """
+        Test evicting the least recently used sandboxes, without breaking the jobs using them
+        """
+        sandboxes = [self.makeSandbox(name, numFiles=10, fileSize=100000) for name in 'ABC']
+        keys = [Unpacker.sandboxHash(sandbox) for sandbox in sandboxes]
+        jobDirs = []
+        for idx, sandbox in enumerate(sandboxes):
+            jobDir = os.path.join(self.testDir, 'job%d' % idx)
+            os.makedirs(jobDir)
+            # room for two sandboxes
+            Unpacker.unpackFromCache(sandbox, jobDir, self.cacheDir, maxCacheSize=2500000)
+            jobDirs.append(jobDir)
+            time.sleep(0.01)
+
+        self.assertFalse(os.path.exists(os.path.join(self.cacheDir, keys[0])))
+        self.assertFalse(os.path.exists(os.path.join(self.cacheDir, keys[0] + '.meta')))
+        self.assertFalse(os.path.exists(os.path.join(self.cacheDir, keys[0] + '.lock')))
+        self.assertTrue(os.path.isdir(os.path.join(self.cacheDir, keys[1])))
+        self.assertTrue(os.path.isdir(os.path.join(self.cacheDir, keys[2])))
+        # the job of the evicted sandbox still has all its files
+        self.assertEqual(len(self.listTree(os.path.join(jobDirs[0], 'WMSandbox', 'Task'))), 12)
+
+        # using B again makes C the least recently used
+        jobDir = os.path.join(self.testDir, 'job3')
+        os.makedirs(jobDir)
+        Unpacker.unpackFromCache(sandboxes[1], jobDir, self.cacheDir, maxCacheSize=2500000)
+        time.sleep(0.01)
+        # C is not evicted while a job is copying it
+        with open(os.path.join(self.cacheDir, keys[2] + '.lock'), 'a') as lockFd:
+            fcntl.flock(lockFd, fcntl.LOCK_SH)
+            self.assertEqual(Unpacker.evictFromCache(self.cacheDir, 1500000), [keys[1]])
+        self.assertEqual(Unpacker.evictFromCache(self.cacheDir, 1500000), [])
+        jobDir = os.path.join(self.testDir, 'job4')
+        os.makedirs(jobDir)
+        Unpacker.unpackFromCache(sandboxes[1], jobDir, self.cacheDir, maxCacheSize=2500000)
+        time.sleep(0.01)
+        self.assertEqual(Unpacker.evictFromCache(self.cacheDir, 1500000), [keys[2]])
+        self.assertEqual(Unpacker.evictFromCache(self.cacheDir, 0, keep=keys[1]), [])
+
+    @attr('performance', 'integration')
+    def testCachePerformance(self):
+        """
+        Compare extracting a sandbox of 2000 files for every job with copying
+        it from the cache
+        """
+        numJobs = 10
+        sandbox = self.makeSandbox('A', numFiles=2000, fileSize=5000)
+
+        startTime = time.time()
+        for idx in range(numJobs):
+            self.jobArea('plain%d' % idx)
+            Unpacker.createWorkArea(sandbox)
+        plainTime = (time.time() - startTime) / numJobs
+
+        startTime = time.time()
+        for idx in range(numJobs):
+            self.jobArea('cached%d' % idx)
+            Unpacker.createWorkArea(sandbox, sandboxCache=self.cacheDir)
+        cachedTime = (time.time() - startTime) / numJobs
+
+        print("Work area per job: %.3f secs extracting the sandbox, %.3f secs with the cache "
+              "(first job extracting it)" % (plainTime, cachedTime))
+        self.assertTrue(cachedTime < plainTime)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+"""
+_WorkQueueElementCache_t_
+
+Unit tests of the in memory replica of the workqueue elements, against an
+in memory database serving the views and _changes feed it reads, and a
+benchmark of the couch requests made per work acquisition cycle
+"""
+from __future__ import division, print_function
+
+import copy
+import json
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.WorkQueue import WorkQueueElementCache as ElementCacheModule
+from WMCore.WorkQueue.WorkQueueElementCache import (ELEMENT_KEY, WorkQueueElementCache, filterMatches,
+                                                    sharedElementCache, siteMatches)
+
+
+def makeElement(docId, status='Available', priority=100000, request='wf1', **kwargs):
+    "Return an element document"
+    ele = {'Status': status, 'Priority': priority, 'RequestName': request, 'SubscriptionId': None,
+           'SiteWhitelist': ['T1_US_FNAL', 'T2_CH_CERN'], 'SiteBlacklist': [], 'TeamName': 'production',
+           'Dbs': 'https://cmsweb.cern.ch/dbs/prod/global/DBSReader',
+           'Inputs': {}, 'ParentData': {}, 'PileupData': {}, 'ParentFlag': False,
+           'NoInputUpdate': False, 'NoPileupUpdate': False}
+    ele.update(kwargs)
+    return {'_id': docId, 'type': 'WorkQueueElement', ELEMENT_KEY: ele}
+
+
+class FakeWorkQueueDB(dict):
+    """
+    Database keeping documents and their changes in memory, counting the
+    requests made to it and the rows they returned
+    """
+
+    def __init__(self, name='workqueue', host='http://localhost:5984'):
+        dict.__init__(self, host=host)
+        self.name = name
+        self.failAfter = None  # number of changes returned before failing
+        self.docs = {}
+        self.lastSeq = 0
+        self.changes = {}  # couch keeps only the last change of each document
+        self.requests = 0
+        self.rows = 0
+
+    def save(self, doc):
+        self.docs[doc['_id']] = copy.deepcopy(doc)
+        self._change(doc['_id'])
+
+    def delete(self, docId):
+        del self.docs[docId]
+        self._change(docId)
+
+    def _change(self, docId):
+        self.lastSeq += 1
+        self.changes[docId] = self.lastSeq
+
+    def info(self):
+        self.requests += 1
+        return {'db_name': self.name, 'update_seq': '%d-g1AAAA' % self.lastSeq}
+
+    def iterView(self, design, view, options=None, keys=None, pageSize=1000, threads=1):
+        assert (design, view) == ('WorkQueue', 'elementsByStatus')
+        self.requests += 1
+        options = options or {}
+        for docId in sorted(docId for docId in self.docs if ELEMENT_KEY in self.docs[docId]):
+            row = {'id': docId, 'key': self.docs[docId][ELEMENT_KEY]['Status'], 'value': {'_id': docId}}
+            if options.get('include_docs'):
+                row['doc'] = copy.deepcopy(self.docs[docId])
+            self.rows += 1
+            yield row
+
+    def iterChanges(self, since=-1, limit=None, include_docs=False):
+        self.requests += 1
+        since = int(since.split('-')[0])
+        changes = sorted((seq, docId) for docId, seq in self.changes.items() if seq > since)
+        for count, (seq, docId) in enumerate(changes[:limit]):
+            if count == self.failAfter:
+                raise IOError("Connection reset by peer")
+            row = {'seq': '%d-g1AAAA' % seq, 'id': docId}
+            if docId not in self.docs:
+                row['deleted'] = True
+            elif include_docs:
+                row['doc'] = copy.deepcopy(self.docs[docId])
+            self.rows += 1
+            yield row
+
+
+class WorkQueueElementCacheTest(unittest.TestCase):
+    """
+    Test the replica follows the database and answers like the couch views
+    """
+
+    def setUp(self):
+        self.db = FakeWorkQueueDB()
+        self.db.save(makeElement('a', priority=10, Inputs={'/a/b/c#1': ['T1_US_FNAL']}))
+        self.db.save(makeElement('b', status='Acquired', request='wf2', SubscriptionId=5))
+        self.db.save(makeElement('c', priority=20, request='wf2', PileupData={'/mb/x/y': ['T2_CH_CERN']}))
+        self.db.save({'_id': 'wf1', 'type': 'WMSpec'})
+        self.cache = WorkQueueElementCache(self.db, changesLimit=2)
+
+    def tearDown(self):
+        ElementCacheModule._SHARED_CACHES.clear()
+
+    def testLoadAndChanges(self):
+        """
+        Test the first update loads the elements, then changes are applied
+        """
+        self.assertEqual(self.cache.update(), 3)
+        self.assertEqual(self.cache.elements(idOnly=True), ['a', 'b', 'c'])
+        self.assertEqual(self.cache.update(), 0)
+
+        self.db.save(makeElement('b', status='Running', request='wf2'))
+        self.db.save(makeElement('d', status='Available', request='wf3'))
+        self.db.save(makeElement('e', status='Available', request='wf3'))
+        self.db.delete('a')
+        self.assertEqual(self.cache.update(), 4)
+        self.assertEqual(self.cache.elements(idOnly=True), ['b', 'c', 'd', 'e'])
+        self.assertEqual(self.cache.elements({'Status': 'Running'}, idOnly=True), ['b'])
+        self.assertEqual(self.cache.elements({'Status': 'Acquired'}), [])
+        self.assertEqual(self.cache.elements({'RequestName': 'wf3'}, idOnly=True), ['d', 'e'])
+        self.assertEqual(self.cache.indexes['Status']['Available'], set(['c', 'd', 'e']))
+        self.assertNotIn('wf1', self.cache.indexes['RequestName'])
+        self.assertEqual(self.cache.stats['changes'], 4)
+
+        # results are copies of the replica
+        self.cache.elements({'Status': 'Running'})[0][ELEMENT_KEY]['Status'] = 'Done'
+        self.assertEqual(self.cache.elements({'Status': 'Running'}, idOnly=True), ['b'])
+
+    def testUpdateFailure(self):
+        """
+        Test a failed update keeps the changes applied, the next one goes on from there
+        """
+        self.cache.update()
+        for docId in 'defg':
+            self.db.save(makeElement(docId, request='wf4'))
+        self.db.failAfter = 1
+        self.assertRaises(IOError, self.cache.update)
+        # the change read before the failure is kept
+        self.assertEqual(self.cache.elements({'RequestName': 'wf4'}, idOnly=True), ['d'])
+        self.db.failAfter = None
+        self.assertEqual(self.cache.update(), 3)
+        self.assertEqual(self.cache.elements({'RequestName': 'wf4'}, idOnly=True), ['d', 'e', 'f', 'g'])
+        self.assertEqual(self.cache.stats['loads'], 1)
+
+    def testSharedCache(self):
+        """
+        Test the queues of a process share one replica per database
+        """
+        cache = sharedElementCache(self.db)
+        self.assertTrue(sharedElementCache(FakeWorkQueueDB()) is cache)
+        self.assertFalse(sharedElementCache(FakeWorkQueueDB('workqueue_inbox')) is cache)
+        self.assertFalse(sharedElementCache(FakeWorkQueueDB(host='http://other:5984')) is cache)
+
+        results = []
+
+        def query():
+            cache.update()
+            results.append(cache.elements(idOnly=True))
+
+        threads = [threading.Thread(target=query) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [['a', 'b', 'c']] * 10)
+        self.assertEqual(cache.stats['loads'], 1)
+
+    def testFilters(self):
+        """
+        Test filters match like the WorkQueue/filter list
+        """
+        ele = makeElement('a', SubscriptionId=5)[ELEMENT_KEY]
+        self.assertTrue(filterMatches(ele, {}))
+        self.assertTrue(filterMatches(ele, {'Status': 'Available', 'SubscriptionId': 5}))
+        self.assertTrue(filterMatches(ele, {'Status': ['Acquired', 'Available']}))
+        self.assertFalse(filterMatches(ele, {'Status': ['Acquired', 'Running']}))
+        self.assertFalse(filterMatches(ele, {'Status': 'Available', 'RequestName': 'wf2'}))
+        self.assertFalse(filterMatches(ele, {'since': 1}))
+
+        self.cache.update()
+        self.assertEqual(self.cache.elements({'SubscriptionId': 5}, idOnly=True), ['b'])
+        self.assertEqual(self.cache.elements({'Status': ['Acquired', 'Available'], 'RequestName': 'wf2'},
+                                             idOnly=True), ['b', 'c'])
+
+    def testSiteRestrictions(self):
+        """
+        Test available elements are selected like the WorkQueue/workRestrictions list
+        """
+        ele = makeElement('a', Inputs={'/a/b/c#1': ['T1_US_FNAL']}, ParentData={'/a/b/d#1': ['T2_CH_CERN']},
+                          PileupData={'/mb/x/y': ['T1_US_FNAL', 'T2_CH_CERN']})[ELEMENT_KEY]
+        self.assertTrue(siteMatches(ele, 'T1_US_FNAL'))
+        self.assertFalse(siteMatches(ele, 'T2_CH_CERN'))
+        self.assertFalse(siteMatches(ele, 'T2_DE_DESY'))
+        ele['ParentFlag'] = True
+        self.assertFalse(siteMatches(ele, 'T1_US_FNAL'))
+        ele['NoInputUpdate'] = True
+        self.assertTrue(siteMatches(ele, 'T2_CH_CERN'))
+        ele['SiteBlacklist'] = ['T2_CH_CERN']
+        self.assertFalse(siteMatches(ele, 'T2_CH_CERN'))
+        ele['PileupData'] = {'/mb/x/y': []}
+        self.assertFalse(siteMatches(ele, 'T1_US_FNAL'))
+        ele['NoPileupUpdate'] = True
+        self.assertTrue(siteMatches(ele, 'T1_US_FNAL'))
+
+        self.db.save(makeElement('d', priority=20, TeamName='other'))
+        self.cache.update()
+        available = self.cache.availableElements({'T1_US_FNAL': 100, 'T2_CH_CERN': 100})
+        self.assertEqual([doc['_id'] for doc in available], ['d', 'c', 'a'])
+        available = self.cache.availableElements({'T1_US_FNAL': 100}, team='production')
+        self.assertEqual([doc['_id'] for doc in available], ['a'])
+        available = self.cache.availableElements({'T2_CH_CERN': 100}, wfs=['wf2'])
+        self.assertEqual([doc['_id'] for doc in available], ['c'])
+        self.assertEqual(self.cache.availableElements({}), [])
+
+    def testActiveData(self):
+        """
+        Test the active data of available elements
+        """
+        self.cache.update()
+        dbs = 'https://cmsweb.cern.ch/dbs/prod/global/DBSReader'
+        self.assertEqual(self.cache.activeData('Inputs'), [(dbs, '/a/b/c#1')])
+        self.assertEqual(self.cache.activeData('ParentData'), [])
+        self.assertEqual(self.cache.activeData('PileupData'), [(dbs, '/mb/x/y')])
+
+        # elements without a dbs url
+        self.db.save(makeElement('d', Dbs=None, Inputs={'/z/b/c#1': ['T1_US_FNAL']}))
+        self.cache.update()
+        self.assertEqual(self.cache.activeData('Inputs'), [(None, '/z/b/c#1'), (dbs, '/a/b/c#1')])
+
+    def testCheck(self):
+        """
+        Test the replica is reloaded when it differs from the database
+        """
+        self.cache.update()
+        self.assertTrue(self.cache.check())
+        # a change the replica missed, e.g. after a database compaction
+        self.db.docs['a'][ELEMENT_KEY]['Status'] = 'Canceled'
+        self.assertFalse(self.cache.check())
+        self.assertEqual(self.cache.stats['mismatches'], 1)
+        self.assertEqual(self.cache.elements({'Status': 'Canceled'}, idOnly=True), ['a'])
+
+        self.cache.checkInterval = 0
+        self.db.docs['b'][ELEMENT_KEY]['Status'] = 'Done'
+        time.sleep(0.01)
+        self.cache.update()
+        self.assertEqual(self.cache.elements({'Status': 'Done'}, idOnly=True), ['b'])
+        self.assertEqual(self.cache.stats['loads'], 3)
+
+    @attr('performance', 'integration')
+    def testRequestsPerCycle(self):
+        """
+        Compare the database requests, rows transferred and time of work
+        acquisition cycles querying the workRestrictions list, or the replica
+        updated from the changes
+        """
+        numElements, numCycles, changesPerCycle = 20000, 20, 200
+        resources = {'T1_US_FNAL': 1000, 'T2_CH_CERN': 1000}
+
+        for useCache in (False, True):
+            for i in range(numElements):
+                self.db.save(makeElement('ele_%06d' % i, priority=i % 10, request='wf_%d' % (i % 500),
+                                         Inputs={'/a/b/c#%d' % i: ['T1_US_FNAL']}))
+            cache = WorkQueueElementCache(self.db)
+            self.db.requests = self.db.rows = 0
+            startTime = time.time()
+            for cycle in range(numCycles):
+                for i in range(changesPerCycle):
+                    docId = 'ele_%06d' % ((cycle * changesPerCycle + i) % numElements)
+                    self.db.save(makeElement(docId, status='Acquired', request='wf_%d' % (i % 500)))
+                if useCache:
+                    cache.update()
+                    available = cache.availableElements(resources)
+                else:
+                    # the workRestrictions list output, decoded by the client
+                    available = [doc for doc in self.db.docs.values()
+                                 if doc.get(ELEMENT_KEY, {}).get('Status') == 'Available' and
+                                 any(siteMatches(doc[ELEMENT_KEY], site) for site in resources)]
+                    available = json.loads(json.dumps(available))
+                    self.db.requests += 1
+                    self.db.rows += len(available)
+                self.assertEqual(len(available), numElements - (cycle + 1) * changesPerCycle + 2)
+            print("%s: %d cycles with %d elements, per cycle %.1f couch requests, %d rows and %.3f secs" %
+                  ("replica" if useCache else "list", numCycles, numElements, self.db.requests / numCycles,
+                   self.db.rows / numCycles, (time.time() - startTime) / numCycles))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+_CycleProfiler_t_
+
+Unit tests for the worker thread cycle profiler.
+"""
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+from Utils.Timers import callCounter, countCalls
+from WMCore.WorkerThreads.CycleProfiler import CycleProfiler, PROFILE_DIR, PROFILE_FLAG, profileOnSignal
+
+
+def busyCall():
+    """
+    Something to profile
+    """
+    endTime = time.time() + 0.05
+    while time.time() < endTime:
+        pass
+
+
+class CycleProfilerTest(unittest.TestCase):
+    """
+    Unit tests for CycleProfiler
+    """
+
+    def setUp(self):
+        self.componentDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.componentDir)
+        callCounter.enabled = False
+        callCounter.reset()
+
+    def runCycle(self, profiler, func):
+        profiler.startCycle()
+        func()
+        profiler.endCycle()
+
+    def testProfiling(self):
+        """
+        Test that cycles are only profiled on request
+        """
+        profiler = CycleProfiler(self.componentDir, "DummyWorker", sampleInterval=0.001)
+        daoCall = countCalls("DAO", "WMCore.WMBS.MySQL.Jobs.New", busyCall)
+
+        self.runCycle(profiler, daoCall)
+        self.assertFalse(os.path.exists(os.path.join(self.componentDir, PROFILE_DIR)))
+
+        with open(os.path.join(self.componentDir, PROFILE_FLAG), "w") as fo:
+            fo.write("2")
+        self.runCycle(profiler, daoCall)
+        self.assertTrue(callCounter.enabled)
+        self.assertFalse(os.path.exists(os.path.join(self.componentDir, PROFILE_DIR)))
+        self.runCycle(profiler, daoCall)
+        self.assertFalse(callCounter.enabled)
+
+        outputFiles = os.listdir(os.path.join(self.componentDir, PROFILE_DIR))
+        self.assertEqual(sorted(os.path.splitext(fname)[1] for fname in outputFiles),
+                         [".folded", ".json", ".pstats"])
+        for fname in outputFiles:
+            fname = os.path.join(self.componentDir, PROFILE_DIR, fname)
+            if fname.endswith(".json"):
+                with open(fname) as fo:
+                    calls = json.load(fo)
+                self.assertEqual(calls["DAO"]["WMCore.WMBS.MySQL.Jobs.New"]["calls"], 2)
+            elif fname.endswith(".folded"):
+                with open(fname) as fo:
+                    self.assertIn("busyCall", fo.read())
+
+        # nothing else gets profiled
+        self.runCycle(profiler, daoCall)
+        self.assertEqual(len(os.listdir(os.path.join(self.componentDir, PROFILE_DIR))), 3)
+
+    def testProfileOnSignal(self):
+        """
+        Test that the signal touches the profile flag
+        """
+        handler = signal.getsignal(signal.SIGUSR2)
+        try:
+            profileOnSignal(self.componentDir)
+            os.kill(os.getpid(), signal.SIGUSR2)
+            self.assertTrue(os.path.exists(os.path.join(self.componentDir, PROFILE_FLAG)))
+        finally:
+            signal.signal(signal.SIGUSR2, handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+_CycleStats_t_
+
+Unit tests for the worker thread cycle statistics and adaptive polling.
+"""
+from __future__ import absolute_import
+
+import json
+import logging
+import threading
+import unittest
+
+from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.CycleStats import CycleStats, DURATION_BINS
+
+
+class CycleStatsTest(unittest.TestCase):
+    """
+    Unit tests for CycleStats
+    """
+
+    def setUp(self):
+        myThread = threading.currentThread()
+        myThread.dbFactory = None
+        myThread.logger = logging.getLogger()
+
+    def testSummary(self):
+        """
+        Test the rolling window statistics
+        """
+        stats = CycleStats(window=10)
+        self.assertEqual(stats.summary(), {"cycles": 0})
+
+        for duration in range(1, 21):
+            stats.addCycle(duration, items=duration * 10 if duration % 2 else 0)
+        summary = stats.summary()
+        self.assertEqual(summary["cycles"], 20)
+        self.assertEqual(summary["window"], 10)
+        self.assertEqual(summary["max"], 20)
+        self.assertEqual(summary["p50"], 16)
+        self.assertEqual(summary["idle"], 5)
+        self.assertEqual(summary["items"], 10 * (11 + 13 + 15 + 17 + 19))
+        self.assertEqual(len(summary["hist"]), len(DURATION_BINS) + 1)
+        self.assertEqual(sum(summary["hist"]), 10)
+        # it has to fit in the heartbeat outcome column
+        self.assertTrue(len(json.dumps(summary)) < 1000)
+
+        # workers not reporting work items
+        stats = CycleStats()
+        stats.addCycle(0.5)
+        self.assertNotIn("items", stats.summary())
+        self.assertEqual(stats.summary()["hist"][0], 1)
+
+    def testAdaptivePolling(self):
+        """
+        Test the idle time adjustment according to the work reported
+        """
+        worker = BaseWorkerThread()
+        worker.idleTime = worker.pollInterval = 60
+        worker.minIdleTime = 10
+        worker.maxIdleTime = 300
+
+        # disabled, nothing changes
+        worker.reportCycleWork(0)
+        worker.adjustIdleTime()
+        self.assertEqual(worker.idleTime, 60)
+
+        worker.adaptivePolling = True
+        for expected in (60, 120, 240, 300, 300):
+            worker.reportCycleWork(0)
+            worker.adjustIdleTime()
+            self.assertEqual(worker.idleTime, expected)
+
+        worker.reportCycleWork(100, workLimit=100)
+        worker.adjustIdleTime()
+        self.assertEqual(worker.idleTime, 10)
+
+        worker.reportCycleWork(50, workLimit=100)
+        worker.adjustIdleTime()
+        self.assertEqual(worker.idleTime, 60)
+
+        worker.reportCycleWork(0)
+        worker.adjustIdleTime()
+        worker.reportCycleWork(None)
+        worker.adjustIdleTime()
+        self.assertEqual(worker.idleTime, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
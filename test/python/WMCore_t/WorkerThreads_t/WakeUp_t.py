@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+_WakeUp_t_
+
+Unit tests for the worker thread wake up notifications.
+"""
+from __future__ import absolute_import
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from mock import mock
+from nose.plugins.attrib import attr
+
+from WMCore.Configuration import Configuration
+from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeUp import WakeUpFlag, notifyComponents, wakeUpFlagPath
+
+
+class WakeUpTest(unittest.TestCase):
+    """
+    Unit tests for WakeUp
+    """
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.config = Configuration()
+        self.config.section_("General")
+        self.config.General.workDir = self.workDir
+        self.config.component_("JobAccountant")
+        self.config.JobAccountant.componentDir = os.path.join(self.workDir, "JobAccountant")
+        os.makedirs(self.config.JobAccountant.componentDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def testFlagPath(self):
+        """
+        Test the flag file resolution from the configuration
+        """
+        self.assertEqual(wakeUpFlagPath(self.config, "JobAccountant"),
+                         os.path.join(self.workDir, "JobAccountant", ".wakeup"))
+        # no componentDir, use the agent workDir
+        self.assertEqual(wakeUpFlagPath(self.config, "ErrorHandler"),
+                         os.path.join(self.workDir, "ErrorHandler", ".wakeup"))
+        self.assertIsNone(wakeUpFlagPath(Configuration(), "ErrorHandler"))
+
+    def testNotification(self):
+        """
+        Test that notifications are received and coalesced
+        """
+        flag = WakeUpFlag(wakeUpFlagPath(self.config, "JobAccountant"))
+        self.assertFalse(flag.isSet())
+        self.assertIsNone(flag.getLatency())
+
+        notifyComponents(self.config, ["JobAccountant", "ErrorHandler"])
+        self.assertTrue(flag.isSet())
+        # undeployed components are not notified
+        self.assertFalse(os.path.exists(wakeUpFlagPath(self.config, "ErrorHandler")))
+
+        # a burst of notifications gets acknowledged at once
+        notifyComponents(self.config, ["JobAccountant"])
+        self.assertTrue(flag.isSet())
+        self.assertTrue(flag.getLatency() >= 0)
+        flag.clear()
+        self.assertFalse(flag.isSet())
+
+        # mtime resolution might be coarse in some filesystems
+        time.sleep(0.01)
+        notifyComponents(self.config, ["JobAccountant"])
+        self.assertTrue(flag.isSet())
+
+    def testSleepThread(self):
+        """
+        Test that a worker sleeping on a notification wakes up early
+        """
+        myThread = threading.currentThread()
+        myThread.dbFactory = None
+        myThread.logger = logging.getLogger()
+
+        worker = BaseWorkerThread()
+        worker.idleTime = 60
+        worker.notifyTerminate = threading.Event()
+        worker.wakeUpFlag = WakeUpFlag(wakeUpFlagPath(self.config, "JobAccountant"))
+        worker.minIdleTime = 1
+
+        notifier = threading.Timer(1, notifyComponents, args=(self.config, ["JobAccountant"]))
+        notifier.start()
+        startTime = time.time()
+        worker.sleepThread()
+        self.assertTrue(time.time() - startTime < 10)
+        notifier.join()
+
+    def testSleepThreadUnknownLatency(self):
+        """
+        Test waking up when the flag file is gone before reading the latency
+        """
+        myThread = threading.currentThread()
+        myThread.dbFactory = None
+        myThread.logger = logging.getLogger()
+
+        worker = BaseWorkerThread()
+        worker.idleTime = 60
+        worker.notifyTerminate = threading.Event()
+        worker.wakeUpFlag = WakeUpFlag(wakeUpFlagPath(self.config, "JobAccountant"))
+        worker.minIdleTime = 0
+
+        notifyComponents(self.config, ["JobAccountant"])
+        with mock.patch.object(WakeUpFlag, 'getLatency', return_value=None):
+            with self.assertLogs(level='INFO') as logs:
+                worker.sleepThread()
+        self.assertIn("notification latency unknown secs", logs.output[-1])
+
+    @attr('performance', 'integration')
+    def testChainLatency(self):
+        """
+        Measure the latency from a job completion, notified by JobTracker, to
+        its resubmission through the JobAccountant, ErrorHandler, RetryManager
+        and JobSubmitter workers, all sleeping with a 5 minutes pollInterval
+        """
+        chain = ["JobAccountant", "ErrorHandler", "RetryManager", "JobSubmitter"]
+        pollInterval = 300
+        wokenUp = {}
+
+        def runComponent(componentName, nextComponent):
+            myThread = threading.currentThread()
+            myThread.dbFactory = None
+            myThread.logger = logging.getLogger()
+            worker = BaseWorkerThread()
+            worker.idleTime = pollInterval
+            worker.notifyTerminate = threading.Event()
+            worker.wakeUpFlag = WakeUpFlag(wakeUpFlagPath(self.config, componentName))
+            worker.minIdleTime = 1
+            worker.sleepThread()
+            worker.wakeUpFlag.clear()
+            wokenUp[componentName] = time.time()
+            if nextComponent:
+                notifyComponents(self.config, [nextComponent])
+
+        threads = []
+        for componentName, nextComponent in zip(chain, chain[1:] + [None]):
+            self.config.component_(componentName)
+            getattr(self.config, componentName).componentDir = os.path.join(self.workDir, componentName)
+            if not os.path.isdir(getattr(self.config, componentName).componentDir):
+                os.makedirs(getattr(self.config, componentName).componentDir)
+            threads.append(threading.Thread(target=runComponent, args=(componentName, nextComponent)))
+        for thread in threads:
+            thread.start()
+
+        # let every worker start sleeping, then complete the job
+        time.sleep(1.5)
+        completionTime = time.time()
+        notifyComponents(self.config, [chain[0]])
+        for thread in threads:
+            thread.join()
+
+        latency = wokenUp[chain[-1]] - completionTime
+        logging.info("Job completion to resubmission latency: %.1f secs, %d secs polling only",
+                     latency, len(chain) * pollInterval)
+        self.assertTrue(latency < pollInterval)
+
+
+if __name__ == "__main__":
+    unittest.main()